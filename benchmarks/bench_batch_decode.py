@@ -0,0 +1,68 @@
+"""Parse -> store cost per subpacket for runs of bulk sensor subpackets, one by one vs. batch decoding"""
+
+import random
+import time
+from io import BytesIO
+
+import connections.debug.radio_packets as radio_packets
+from main_window.competition.comp_packet_parser import CompPacketParser
+from main_window.device_manager import DeviceManager, FullAddress
+from main_window.packet_parser import SubpacketBatch
+from main_window.rocket_data import RocketData
+from util.detail import LOGGER
+
+RUN_LENGTHS = [1, 4, 8, 16, 64, 256, 4096]
+SUBPACKETS_PER_CASE = 20_000
+
+FULL_ADDRESS = FullAddress('BENCH', 'BENCH_ADDRESS')
+
+
+def _frame(run_length: int) -> bytes:
+    random.seed(0)
+    data = bytearray()
+    for i in range(run_length):
+        data.extend(radio_packets.bulk_sensor(i * 10, *(random.uniform(0, 1e4) for _ in range(9)),
+                                              random.randint(0, 0x09)))
+    return bytes(data)
+
+
+def _one_by_one(parser: CompPacketParser, rocket_data: RocketData, data: bytes) -> None:
+    byte_stream = BytesIO(data)
+    while byte_stream.tell() < len(data):
+        parser.set_endianness(True, True)
+        rocket_data.add_bundle(FULL_ADDRESS, parser.extract(byte_stream))
+
+
+def _batch(parser: CompPacketParser, rocket_data: RocketData, data: bytes) -> None:
+    parser.set_endianness(True, True)
+    for parsed_data in parser.extract_batch(BytesIO(data)):
+        if isinstance(parsed_data, SubpacketBatch):
+            rocket_data.add_columns(FULL_ADDRESS, parsed_data.columns)
+        else:
+            rocket_data.add_bundle(FULL_ADDRESS, parsed_data)
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    parser = CompPacketParser()
+    device_manager = DeviceManager(None, None)
+
+    print(f"{'run length':>10} {'one by one':>14} {'batch':>14}")
+    for run_length in RUN_LENGTHS:
+        data = _frame(run_length)
+        repeats = max(1, SUBPACKETS_PER_CASE // run_length)
+
+        results = []
+        for ingest in (_one_by_one, _batch):
+            rocket_data = RocketData(device_manager, autosave=False)
+
+            start = time.perf_counter()
+            for _ in range(repeats):
+                ingest(parser, rocket_data, data)
+            results.append((time.perf_counter() - start) / (repeats * run_length))
+
+        print(f"{run_length:>10} {results[0] * 1e6:>11.2f} us {results[1] * 1e6:>11.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Write time, size and load time of a binary flight log vs. the csv save"""
+
+import os
+import tempfile
+import time
+
+from main_window.data_entry_id import DataEntryIds, DataEntryValues
+from main_window.device_manager import DeviceManager, DeviceType
+from main_window.rocket_data import RocketData
+
+NUM_BUNDLES = 100_000
+
+BULK_IDS = [
+    DataEntryIds.CALCULATED_ALTITUDE,
+    DataEntryIds.ACCELERATION_X,
+    DataEntryIds.ACCELERATION_Y,
+    DataEntryIds.ACCELERATION_Z,
+    DataEntryIds.LATITUDE,
+    DataEntryIds.LONGITUDE,
+]
+
+
+def main(num_bundles: int = NUM_BUNDLES):
+    device_manager = DeviceManager(None, None)
+    device_manager.register_device(DeviceType.BNB_STAGE_1_FLARE, None, ('BENCH', 'BNB_STAGE_1_FLARE'))
+    full_address = device_manager.get_full_address(DeviceType.BNB_STAGE_1_FLARE)
+
+    rocket_data = RocketData(device_manager, autosave=False)
+    for i in range(num_bundles):
+        bundle = {DataEntryIds.TIME: i * 10, DataEntryIds.STATE: DataEntryValues.STATE_STANDBY}
+        for j, data_id in enumerate(BULK_IDS):
+            bundle[data_id] = i * 0.001 + j / 3
+        rocket_data.add_bundle(full_address, bundle)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'session.csv')
+        log_path = os.path.join(tmp_dir, 'session.flog')
+
+        start = time.perf_counter()
+        rocket_data.save(csv_path)
+        csv_write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rocket_data.save_log(log_path)
+        log_write = time.perf_counter() - start
+
+        loaded = RocketData(device_manager, autosave=False)
+        start = time.perf_counter()
+        loaded.load(log_path)
+        log_load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded.series_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.CALCULATED_ALTITUDE)
+        log_series = time.perf_counter() - start
+
+        print(f"{num_bundles} bundles, {len(BULK_IDS) + 2} values per bundle")
+        print(f"  csv:        write {csv_write:8.3f} s, {os.path.getsize(csv_path) / 1e6:8.1f} MB")
+        print(f"  flight log: write {log_write:8.3f} s, {os.path.getsize(log_path) / 1e6:8.1f} MB, "
+              f"load {log_load * 1e3:.2f} ms, first series {log_series * 1e3:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
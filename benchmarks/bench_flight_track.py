@@ -0,0 +1,90 @@
+"""
+Drawing the flight track on the map after each new fix, for increasingly long flights: plotting every fix received vs.
+FlightTrack's simplified line (reading the new fixes, re-simplifying the tail, drawing).
+"""
+
+import statistics
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from main_window.competition.mapping.flight_track import FlightTrack, to_world
+from main_window.competition.mapping.map_data import MapDataSource
+from main_window.competition.mapping.mapbox_utils import TILE_SIZE
+from main_window.data_entry_id import DataEntryIds
+from main_window.device_manager import DeviceManager, DeviceType
+from util.detail import LOGGER
+from main_window.rocket_data import RocketData
+
+NUM_FIXES = [1_000, 10_000, 100_000, 1_000_000]
+NUM_UPDATES = 20
+ZOOM = 16
+FIGURE_SIZE = (12.8, 7.2)  # Inches, at 100 dpi
+
+DEVICE = DeviceType.BNB_STAGE_1_FLARE
+LATITUDE, LONGITUDE = 32.9401, -106.9119
+
+
+def _flight(num_fixes: int):
+    """
+    :return: Latitudes and longitudes of a drifting descent under a parachute, with ~2 m of GPS noise
+    """
+    rng = np.random.default_rng(0)
+    t = np.linspace(0, 1, num_fixes)
+    latitudes = LATITUDE + 0.02 * t + 2e-4 * np.sin(40 * np.pi * t) + rng.normal(scale=2e-5, size=num_fixes)
+    longitudes = LONGITUDE + 0.03 * t ** 2 + 2e-4 * np.cos(40 * np.pi * t) + rng.normal(scale=2e-5, size=num_fixes)
+    return latitudes, longitudes
+
+
+def _draw(canvas: FigureCanvasAgg, line: np.ndarray) -> None:
+    ax = canvas.figure.axes[0]
+    for old_line in ax.get_lines():
+        old_line.remove()
+    ax.plot(line[:, 0], line[:, 1], color="red")
+    canvas.draw()
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    device_manager = DeviceManager(None, None)
+    device_manager.register_device(DEVICE, None, ('CONNECTION', DEVICE.name))
+
+    print(f"{'fixes':>10} {'all fixes':>12} {'track':>12} {'track points':>14}")
+    for num_fixes in NUM_FIXES:
+        latitudes, longitudes = _flight(num_fixes + NUM_UPDATES)
+        canvas = FigureCanvasAgg(Figure(figsize=FIGURE_SIZE, dpi=100))
+        canvas.figure.add_subplot()
+
+        rocket_data = RocketData(device_manager)
+        full_address = device_manager.get_full_address(DEVICE)
+        rocket_data.add_columns(full_address, {DataEntryIds.TIME: np.arange(num_fixes),
+                                               DataEntryIds.LATITUDE: latitudes[:num_fixes],
+                                               DataEntryIds.LONGITUDE: longitudes[:num_fixes]})
+        flight_track = FlightTrack(rocket_data, [DEVICE])
+        flight_track.line(DEVICE, MapDataSource.SRAD, ZOOM)  # Reads and simplifies the flight so far
+
+        naive_latencies, track_latencies = [], []
+        for i in range(num_fixes, num_fixes + NUM_UPDATES):
+            rocket_data.add_bundle(full_address, {DataEntryIds.TIME: i, DataEntryIds.LATITUDE: latitudes[i],
+                                                  DataEntryIds.LONGITUDE: longitudes[i]})
+
+            start = time.perf_counter()
+            times, fix_latitudes = rocket_data.series_by_device(DEVICE, DataEntryIds.LATITUDE)
+            _, fix_longitudes = rocket_data.series_by_device(DEVICE, DataEntryIds.LONGITUDE)
+            _draw(canvas, to_world(fix_latitudes, fix_longitudes) * TILE_SIZE * 2 ** ZOOM)
+            naive_latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            line = flight_track.line(DEVICE, MapDataSource.SRAD, ZOOM)
+            _draw(canvas, line * TILE_SIZE * 2 ** ZOOM)
+            track_latencies.append(time.perf_counter() - start)
+
+        print(f"{num_fixes:>10} {statistics.median(naive_latencies) * 1e3:>9.1f} ms "
+              f"{statistics.median(track_latencies) * 1e3:>9.1f} ms {len(line):>14}")
+        rocket_data.shutdown()
+
+
+if __name__ == '__main__':
+    main()
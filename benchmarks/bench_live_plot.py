@@ -0,0 +1,104 @@
+"""
+Refreshing an altitude plot after each new point, for increasingly long sessions of 100 Hz data, at 1280x720: plotting
+every point received (as before) vs. the live series decimated to the plot width, for the full flight and the last 60 s.
+"""
+
+import statistics
+import sys
+import time
+import types
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+
+from main_window.accel_widget import AccelWidget
+from main_window.data_entry_id import DataEntryIds
+from main_window.device_manager import DeviceManager, DeviceType
+from main_window.live_series import LiveSeries
+from main_window.mplwidget import TIME_WINDOWS
+from main_window.rocket_data import RocketData
+from profiles.mpl_funcs import receive_time_series
+from profiles.rockets.bnb import BNBProfile
+from util.detail import LOGGER
+
+NUM_SAMPLES = [10_000, 100_000, 1_000_000, 3_600_000]  # Up to 10 hours
+NUM_FRAMES = 20
+SAMPLE_INTERVAL_MS = 10
+WINDOW_SIZE = (1280, 720)
+
+DEVICE = DeviceType.BNB_STAGE_1_FLARE
+
+
+def _all_points(self, plot_widget, label) -> None:
+    """
+    Every point received, blitted over the cached background
+    """
+    times, values = self.rocket_data.series_by_device(label.device, DataEntryIds.CALCULATED_ALTITUDE)
+    blit_manager = plot_widget.blit_manager
+    if blit_manager.scene != "all points":
+        blit_manager.reset("all points")
+        blit_manager.add("line", plot_widget.canvas.ax.plot(times, values)[0])
+    line = blit_manager.get("line")
+    line.set_data(times, values)
+    blit_manager.update([line])
+
+
+def _frame_time(app: QApplication, num_samples: int, time_window_index: int, plot_fn) -> float:
+    device_manager = DeviceManager(None, None)
+    device_manager.register_device(DEVICE, None, ('CONNECTION', DEVICE.name))
+    rocket_data = RocketData(device_manager)
+    full_address = device_manager.get_full_address(DEVICE)
+    t = np.arange(num_samples + NUM_FRAMES) * SAMPLE_INTERVAL_MS
+    altitudes = 3000 * np.sin(np.pi * t / t[-1]) + np.random.default_rng(0).normal(scale=5, size=len(t))
+    rocket_data.add_columns(full_address, {DataEntryIds.TIME: t[:num_samples],
+                                           DataEntryIds.CALCULATED_ALTITUDE: altitudes[:num_samples]})
+
+    profile = BNBProfile()
+    label = next(label for label in profile.labels if label.name == "Stage1Altitude")
+    widget = AccelWidget()
+    widget.resize(*WINDOW_SIZE)
+    widget.show()
+    widget.time_window_box.setCurrentIndex(time_window_index)
+    app.processEvents()
+
+    live_series = dict()
+
+    def get_live_series(device, data_id):
+        if (device, data_id) not in live_series:
+            live_series[(device, data_id)] = LiveSeries(rocket_data, device, data_id)
+        return live_series[(device, data_id)]
+
+    self = types.SimpleNamespace(rocket_data=rocket_data, rocket_profile=profile, get_live_series=get_live_series)
+    plot_fn(self, widget, label)  # Background and first read
+
+    latencies = []
+    for i in range(num_samples, num_samples + NUM_FRAMES):
+        rocket_data.add_bundle(full_address, {DataEntryIds.TIME: t[i], DataEntryIds.CALCULATED_ALTITUDE: altitudes[i]})
+        start = time.perf_counter()
+        plot_fn(self, widget, label)
+        app.processEvents()  # Paints what was blitted
+        latencies.append(time.perf_counter() - start)
+
+    widget.close()
+    rocket_data.shutdown()
+    return statistics.median(latencies)
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    app = QApplication(sys.argv[:1])
+    full_flight = next(i for i, (_, window) in enumerate(TIME_WINDOWS) if window is None)
+    last_60_s = next(i for i, (_, window) in enumerate(TIME_WINDOWS) if window == 60_000)
+
+    print(f"{'samples':>10} {'all points':>12} {'full flight':>12} {'last 60 s':>12}")
+    for num_samples in NUM_SAMPLES:
+        all_points = _frame_time(app, num_samples, full_flight, _all_points)
+        full = _frame_time(app, num_samples, full_flight, receive_time_series)
+        trailing = _frame_time(app, num_samples, last_60_s, receive_time_series)
+        print(f"{num_samples:>10} {all_points * 1e3:>9.1f} ms {full * 1e3:>9.1f} ms {trailing * 1e3:>9.1f} ms")
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
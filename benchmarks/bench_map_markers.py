@@ -0,0 +1,57 @@
+"""
+Map update latency during a simulated descent, a device drifting a few meters between GPS fixes, through MappingThread
+and MapProcess as in the app
+"""
+
+import statistics
+import sys
+import time
+
+from PyQt5.QtCore import QCoreApplication
+
+from main_window.competition.mapping.map_data import MapData
+from main_window.competition.mapping.mapping_thread import MappingThread, DEFAULT_RADIUS
+from main_window.device_manager import DeviceManager, DeviceType
+from main_window.rocket_data import RocketData
+from profiles.rockets.bnb import BNBProfile
+from util.detail import LOGGER
+
+WIDGET_SIZE = (1280, 720)
+NUM_UPDATES = 300
+DRIFT = 2e-5  # Degrees per update, ~2 m
+RENDER_TIMEOUT_S = 60
+
+DEVICE = DeviceType.BNB_STAGE_1_FLARE
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    app = QCoreApplication(sys.argv[:1])
+
+    map_data = MapData()
+    rocket_data = RocketData(DeviceManager(None, None))
+    mapping_thread = MappingThread(None, map_data, rocket_data, BNBProfile())  # Not started, plotMap() called directly
+    mapping_thread.setDesiredMapSize(*WIDGET_SIZE)
+
+    latencies = []
+    for i in range(NUM_UPDATES + 1):
+        latitude, longitude = 49.2606 - i * DRIFT, -123.2460 + i * DRIFT / 2
+
+        start = time.perf_counter()
+        if not mapping_thread.plotMap({DEVICE: latitude}, {DEVICE: longitude}, DEFAULT_RADIUS):
+            assert mapping_thread.receiveRender(timeout=RENDER_TIMEOUT_S)
+        map_data.get_map_value().image[0, 0].sum()  # Touch the pixels, as drawing it would
+        latencies.append(time.perf_counter() - start)
+
+    latencies = sorted(latencies[1:])  # First includes tile loading
+    print(f"{NUM_UPDATES} updates, {mapping_thread.render_service.num_sent} map renders: "
+          f"median {statistics.median(latencies) * 1e3:.2f} ms, "
+          f"p95 {latencies[int(0.95 * len(latencies))] * 1e3:.2f} ms, max {latencies[-1] * 1e3:.2f} ms")
+
+    mapping_thread.shutdown()
+    rocket_data.shutdown()
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Dragging the window bigger: a burst of map size changes arriving faster than maps render, through MappingThread and
+MapProcess as in the app. Time until the map for the final size is displayed, and how many maps were rendered for it.
+"""
+
+import statistics
+import sys
+import time
+
+from PyQt5.QtCore import QCoreApplication
+
+from main_window.competition.mapping.map_data import MapData
+from main_window.competition.mapping.mapping_thread import MappingThread, DEFAULT_RADIUS
+from main_window.device_manager import DeviceManager, DeviceType
+from main_window.rocket_data import RocketData
+from profiles.rockets.bnb import BNBProfile
+from util.detail import LOGGER
+
+NUM_BURSTS = 5
+SIZES_PER_BURST = 20
+RESIZE_INTERVAL_S = 0.001  # Resize events while dragging
+RENDER_TIMEOUT_S = 60
+
+DEVICE = DeviceType.BNB_STAGE_1_FLARE
+LATITUDE, LONGITUDE = 49.2606, -123.2460
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    app = QCoreApplication(sys.argv[:1])
+
+    map_data = MapData()
+    rocket_data = RocketData(DeviceManager(None, None))
+    mapping_thread = MappingThread(None, map_data, rocket_data, BNBProfile())  # Not started, plotMap() called directly
+
+    # Loads the tiles
+    mapping_thread.setDesiredMapSize(640, 480)
+    if not mapping_thread.plotMap({DEVICE: LATITUDE}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS):
+        assert mapping_thread.receiveRender(timeout=RENDER_TIMEOUT_S)
+
+    latencies = []
+    for burst in range(NUM_BURSTS):
+        num_sent = mapping_thread.render_service.num_sent
+        start = time.perf_counter()
+        for i in range(SIZES_PER_BURST):
+            width = 800 + 20 * i + burst
+            mapping_thread.setDesiredMapSize(width, width * 9 // 16)
+            mapping_thread.plotMap({DEVICE: LATITUDE}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+            mapping_thread.receiveRender()
+            time.sleep(RESIZE_INTERVAL_S)
+
+        while mapping_thread.render_service.is_busy:
+            mapping_thread.receiveRender(timeout=RENDER_TIMEOUT_S)
+        latencies.append(time.perf_counter() - start)
+        assert mapping_thread.render_service.num_failed == 0
+
+    print(f"{NUM_BURSTS} bursts of {SIZES_PER_BURST} sizes: final size displayed after median "
+          f"{statistics.median(latencies) * 1e3:.0f} ms, {mapping_thread.render_service.num_sent - num_sent} "
+          f"maps rendered for the last burst")
+
+    mapping_thread.shutdown()
+    rocket_data.shutdown()
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Map update latency at common widget sizes:
+- end-to-end, from request to image readable by the UI thread, through MappingThread and MapProcess
+- transfer only, a frame of the widget size coming back from a process through a queue (pickled) vs. a FrameRing
+"""
+
+import multiprocessing
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from PyQt5.QtCore import QCoreApplication
+
+from main_window.competition.mapping.frame_ring import FrameRing, FrameWriter, slot_size_for
+from main_window.competition.mapping.map_data import MapData
+from main_window.competition.mapping.mapping_thread import MappingThread, DEFAULT_RADIUS
+from main_window.device_manager import DeviceManager, DeviceType
+from main_window.rocket_data import RocketData
+from profiles.rockets.bnb import BNBProfile
+from util.detail import LOGGER
+
+WIDGET_SIZES = [(640, 480), (1280, 720), (1920, 1080), (2560, 1440)]
+NUM_UPDATES = 50
+RENDER_TIMEOUT_S = 60
+
+DEVICE = DeviceType.BNB_STAGE_1_FLARE
+
+
+def _percentiles(latencies) -> str:
+    latencies = sorted(latencies)
+    return f"{statistics.median(latencies) * 1e3:>7.2f} ms {latencies[int(0.95 * len(latencies))] * 1e3:>7.2f} ms"
+
+
+def _frame_source(request_queue, result_queue):
+    """Stands in for MapProcess, with a ready made frame"""
+    frame_writer = FrameWriter()
+    image = None
+    while True:
+        request = request_queue.get()
+        if request is None:
+            break
+
+        shape, frame_slot = request
+        if image is None or image.shape != shape:
+            image = np.full(shape, 127, dtype=np.uint8)
+        if frame_slot is None:
+            result_queue.put(image)
+        else:
+            result_queue.put(frame_writer.write(frame_slot, image, (0, 1, 0, 1)))
+    frame_writer.close()
+
+
+def bench_transfer():
+    request_queue = multiprocessing.Queue()
+    result_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_frame_source, args=(request_queue, result_queue), daemon=True)
+    process.start()
+
+    print(f"{'frame size':>12} {'queue median':>14} {'p95':>10} {'ring median':>14} {'p95':>10}")
+    for width, height in WIDGET_SIZES:
+        shape = (height, width, 3)
+        frame_ring = FrameRing(slot_size_for(width, height))
+
+        results = []
+        for use_ring in (False, True):
+            latencies = []
+            for i in range(NUM_UPDATES + 1):
+                start = time.perf_counter()
+                if use_ring:
+                    request_queue.put((shape, frame_ring.slot(i % 2, i)))
+                    image = frame_ring.frame(i % 2, result_queue.get())
+                else:
+                    request_queue.put((shape, None))
+                    image = result_queue.get()
+                image[-1, -1].sum()
+                latencies.append(time.perf_counter() - start)
+            del image
+            results.append(_percentiles(latencies[1:]))
+
+        print(f"{width:>5}x{height:<6} {results[0]:>25} {results[1]:>25}")
+        frame_ring.close()
+
+    request_queue.put(None)
+    process.join()
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    app = QCoreApplication(sys.argv[:1])
+
+    bench_transfer()
+    print()
+
+    map_data = MapData()
+    rocket_data = RocketData(DeviceManager(None, None))
+    mapping_thread = MappingThread(None, map_data, rocket_data, BNBProfile())  # Not started, plotMap() called directly
+
+    print(f"{'widget size':>12} {'image':>12} {'median':>10} {'p95':>10}")
+    for width, height in WIDGET_SIZES:
+        mapping_thread.setDesiredMapSize(width, height)
+
+        latencies = []
+        for i in range(NUM_UPDATES + 1):
+            latitude, longitude = 49.2606 + i * 1e-5, -123.2460 + i * 1e-5
+
+            start = time.perf_counter()
+            if not mapping_thread.plotMap({DEVICE: latitude}, {DEVICE: longitude}, DEFAULT_RADIUS):
+                assert mapping_thread.receiveRender(timeout=RENDER_TIMEOUT_S)
+            image = map_data.get_map_value().image
+            image[0, 0].sum()  # Touch the pixels, as drawing it would
+            latencies.append(time.perf_counter() - start)
+
+        # First includes tile loading
+        print(f"{width:>5}x{height:<6} {image.shape[1]:>5}x{image.shape[0]:<6} {_percentiles(latencies[1:])}")
+
+    mapping_thread.shutdown()
+    rocket_data.shutdown()
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
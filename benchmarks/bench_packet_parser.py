@@ -0,0 +1,70 @@
+"""
+Parser throughput for bulk sensor subpackets: the per-field extract() from before precompiled structs vs. extract() and
+extract_batch(), the latter on runs as long as a radio packet carries and as a capture replays.
+"""
+
+import time
+from io import BytesIO
+
+from main_window.competition.comp_packet_parser import CompPacketParser
+from tests.packet_parser_utils import LegacyCompPacketParser, bulk_sensor_run
+from util.detail import LOGGER
+
+RUN_LENGTHS = [1, 8, 64]
+SUBPACKETS_PER_CASE = 20_000
+
+# Speedups over the legacy extract() that the parser must keep, checked on runs of at least the given length.
+# Measured 2.2-2.7x for extract(), where dispatch and the event counters weigh more than decoding now, and 16x for
+# extract_batch() on runs of 64
+MIN_EXTRACT_SPEEDUP = (8, 1.8)
+MIN_BATCH_SPEEDUP = (64, 5)
+
+
+def extract_all(parser: CompPacketParser, data: bytes) -> None:
+    byte_stream = BytesIO(data)
+    while byte_stream.tell() < len(data):
+        parser.set_endianness(True, True)
+        parser.extract(byte_stream)
+
+
+def extract_batch_all(parser: CompPacketParser, data: bytes) -> None:
+    parser.set_endianness(True, True)
+    for _ in parser.extract_batch(BytesIO(data)):
+        pass
+
+
+def time_per_subpacket(parse, parser: CompPacketParser, data: bytes, run_length: int, num_subpackets: int) -> float:
+    """
+    :return: Seconds per subpacket, best of three
+    """
+    repeats = max(1, num_subpackets // run_length)
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            parse(parser, data)
+        best = min(best, (time.perf_counter() - start) / (repeats * run_length))
+    return best
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+
+    print(f"{'run length':>10} {'legacy extract':>15} {'extract':>18} {'extract_batch':>18}")
+    for run_length in RUN_LENGTHS:
+        data = bulk_sensor_run(run_length)
+        legacy = time_per_subpacket(extract_all, LegacyCompPacketParser(), data, run_length, SUBPACKETS_PER_CASE)
+        current = time_per_subpacket(extract_all, CompPacketParser(), data, run_length, SUBPACKETS_PER_CASE)
+        batch = time_per_subpacket(extract_batch_all, CompPacketParser(), data, run_length, SUBPACKETS_PER_CASE)
+        print(f"{run_length:>10} {legacy * 1e6:>12.2f} us {current * 1e6:>9.2f} us {legacy / current:>4.1f}x "
+              f"{batch * 1e6:>9.2f} us {legacy / batch:>4.1f}x")
+
+        for name, speedup, (min_run_length, min_speedup) in (('extract', legacy / current, MIN_EXTRACT_SPEEDUP),
+                                                             ('extract_batch', legacy / batch, MIN_BATCH_SPEEDUP)):
+            assert run_length < min_run_length or speedup >= min_speedup, \
+                f"{name} is only {speedup:.1f}x faster than legacy extract on runs of {run_length}, " \
+                f"expected {min_speedup}x"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Frame time of the data plot at typical window sizes, as shown on screen (the Qt repaint included): the map with two
+marks moving and their position text changing, and an altitude time series receiving one point per frame. Redrawing
+the whole figure as before vs. receive_map() and receive_time_series(), which blit over a cached background.
+"""
+
+import statistics
+import sys
+import time
+import types
+
+import numpy as np
+from matplotlib.offsetbox import AnnotationBbox, OffsetImage
+from PyQt5.QtWidgets import QApplication
+
+from main_window.accel_widget import AccelWidget
+from main_window.competition.comp_app import MAP_MARKER
+from main_window.competition.mapping.map_data import MapData, MapDataValue
+from main_window.competition.mapping.mapbox_utils import AbsoluteText
+from main_window.data_entry_id import DataEntryIds
+from main_window.device_manager import DeviceManager, DeviceType
+from main_window.live_series import LiveSeries
+from main_window.rocket_data import RocketData
+from profiles.mpl_funcs import receive_map, receive_time_series
+from profiles.rockets.bnb import BNBProfile
+from util.detail import LOGGER
+
+WINDOW_SIZES = [(640, 480), (1280, 720), (1920, 1080)]
+NUM_FRAMES = 50
+NUM_SERIES_POINTS = 10_000  # Already received when the frames start
+ZOOM = 16
+
+DEVICE = DeviceType.BNB_STAGE_1_FLARE
+
+
+def _map_value(frame: int, width: int, height: int, image: np.ndarray) -> MapDataValue:
+    marks = [(width / 2 + frame, height / 2 + frame), (width / 3 - frame, height / 3)]
+    text = [AbsoluteText(10, -10, f"Stage 1: {49.2606 + frame * 1e-5:.5f}, {-123.2460:.5f}",
+                         background_color="white", alignment=("bottom", "left"))]
+    track = [np.array([[0, 0], [width / 2, height / 2 + frame]], dtype=float)]
+    return MapDataValue(ZOOM, 0.1, image, marks, text, track)
+
+
+def _full_redraw_map(self) -> None:
+    """
+    What receive_map() did before: new artists for everything, then a full draw
+    """
+    zoom, radius, map_image, mark, text, track = self.map_data.get_map_value()
+    ax = self.plot_widget.canvas.ax
+    for artist in ax.artists + ax.texts + ax.lines:
+        artist.remove()
+    if self.im:
+        self.im.remove()
+    self.im = ax.imshow(map_image)
+    for line in track:
+        ax.plot(line[:, 0], line[:, 1], color="red", scalex=False, scaley=False)
+    for xy in mark:
+        ax.add_artist(AnnotationBbox(OffsetImage(MAP_MARKER), xy, frameon=False))
+    for t in text:
+        ax.text(t.getPixelX(zoom), ax.get_ylim()[0] + t.getPixelY(zoom), t.getText(), fontsize=t.getSize(),
+                verticalalignment=t.getAlignment()[0], horizontalalignment=t.getAlignment()[1],
+                bbox=dict(facecolor=t.getBackgroundColor(), linewidth=0))
+    self.plot_widget.canvas.draw()
+
+
+def _full_redraw_time_series(self, plot_widget, label) -> None:
+    """
+    What receive_time_series() did before: clear the axes, plot the whole series, full draw
+    """
+    ax = plot_widget.canvas.ax
+    ax.cla()
+    ax.plot(*self.rocket_data.series_by_device(label.device, self.rocket_profile.label_to_data_id[label.name]))
+    ax.grid()
+    ax.set_xlabel("Time (ms)")
+    ax.set_ylabel(f"{label.name} ({self.rocket_profile.label_unit[label.name]})")
+    ax.set_title(f"{label.device.name} {label.name}", fontsize=10, pad=10, wrap=True)
+    plot_widget.canvas.draw()
+
+
+def _frame_time(app: QApplication, frame_fn) -> float:
+    latencies = []
+    for frame in range(NUM_FRAMES):
+        start = time.perf_counter()
+        frame_fn(frame)
+        app.processEvents()  # Paints what was drawn or blitted
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies[1:])  # Without the first full draw
+
+
+def _bench_map(app: QApplication, width: int, height: int, map_fn) -> float:
+    widget = AccelWidget()
+    widget.resize(width, height)
+    widget.show()
+    app.processEvents()
+    image = np.random.default_rng(0).integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    self = types.SimpleNamespace(plot_widget=widget, map_data=MapData(), im=None, map_image=None)
+
+    def frame_fn(frame):
+        self.map_data.set_map_value(_map_value(frame, width, height, image))
+        map_fn(self)
+
+    frame_time = _frame_time(app, frame_fn)
+    widget.close()
+    return frame_time
+
+
+def _bench_time_series(app: QApplication, width: int, height: int, series_fn) -> float:
+    device_manager = DeviceManager(None, None)
+    device_manager.register_device(DEVICE, None, ('CONNECTION', DEVICE.name))
+    rocket_data = RocketData(device_manager)
+    full_address = device_manager.get_full_address(DEVICE)
+    t = np.arange(NUM_SERIES_POINTS + NUM_FRAMES)
+    altitudes = 3000 * np.sin(np.pi * t / len(t))  # Climbs to apogee, so the limits keep growing at first
+    rocket_data.add_columns(full_address, {DataEntryIds.TIME: t[:NUM_SERIES_POINTS],
+                                           DataEntryIds.CALCULATED_ALTITUDE: altitudes[:NUM_SERIES_POINTS]})
+
+    profile = BNBProfile()
+    label = next(label for label in profile.labels if label.name == "Stage1Altitude")
+    widget = AccelWidget()
+    widget.resize(width, height)
+    widget.show()
+    app.processEvents()
+    live_series = LiveSeries(rocket_data, DEVICE, profile.label_to_data_id[label.name])
+    self = types.SimpleNamespace(rocket_data=rocket_data, rocket_profile=profile, im=None,
+                                 get_live_series=lambda device, data_id: live_series)
+
+    def frame_fn(frame):
+        i = NUM_SERIES_POINTS + frame
+        rocket_data.add_bundle(full_address, {DataEntryIds.TIME: t[i], DataEntryIds.CALCULATED_ALTITUDE: altitudes[i]})
+        series_fn(self, widget, label)
+
+    frame_time = _frame_time(app, frame_fn)
+    widget.close()
+    rocket_data.shutdown()
+    return frame_time
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    app = QApplication(sys.argv[:1])
+
+    print(f"{'window':>10} {'plot':>12} {'full redraw':>12} {'blit':>12}")
+    for width, height in WINDOW_SIZES:
+        for name, bench, before, after in (("map", _bench_map, _full_redraw_map, receive_map),
+                                           ("time series", _bench_time_series, _full_redraw_time_series,
+                                            receive_time_series)):
+            full_redraw = bench(app, width, height, before)
+            blit = bench(app, width, height, after)
+            print(f"{width:>5}x{height:<4} {name:>12} {full_redraw * 1e3:>9.1f} ms {blit * 1e3:>9.1f} ms")
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Maximum sustainable packets/s through parse -> store, replaying a capture as fast as possible, and the rate of UI
+update signals it generates"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from PyQt5.QtCore import QCoreApplication, Qt
+
+import connections.debug.radio_packets as radio_packets
+from connections.capture import CaptureWriter
+from connections.connection import ConnectionMessage
+from connections.debug.debug_connection import DebugConnection
+from connections.replay.replay_connection import ReplayConnection, AS_FAST_AS_POSSIBLE
+from main_window.device_manager import DeviceManager, DeviceType, FullAddress
+from main_window.packet_parser import DEVICE_TYPE_TO_ID
+from main_window.read_thread import ReadThread, CONNECTION_MESSAGE_READ_EVENT
+from main_window.rocket_data import RocketData
+from profiles.rockets.bnb import BNBProfile
+from util.event_stats import get_event_stats_snapshot
+
+NUM_FRAMES = 20_000
+
+CONNECTION_NAME = 'BNB_STAGE_1_CONNECTION'
+DEVICE_ADDRESS = 'BNB_STAGE_1_ADDRESS'
+
+
+def record(path: str, num_frames: int) -> None:
+    """Same traffic DebugConnection generates: a bulk sensor and an orientation subpacket per frame"""
+    random.seed(0)
+    connection = DebugConnection(DEVICE_ADDRESS, DEVICE_TYPE_TO_ID[DeviceType.BNB_STAGE_1_FLARE],
+                                 generate_radio_packets=False)
+    writer = CaptureWriter(path)
+    for i in range(num_frames):
+        data = bytearray()
+        data.extend(radio_packets.bulk_sensor(i * 10, *(random.uniform(0, 1e6) for _ in range(7)),
+                                              random.uniform(49.26, 49.27), random.uniform(-123.26, -123.24),
+                                              random.randint(0, 0x09)))
+        data.extend(radio_packets.orientation(i * 10, *(random.uniform(-1, 1) for _ in range(4))))
+        writer.write(CONNECTION_NAME, ConnectionMessage(DEVICE_ADDRESS, connection, data))
+    writer.close()
+
+
+def main(num_frames: int = NUM_FRAMES):
+    app = QCoreApplication(sys.argv[:1])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        capture_path = os.path.join(tmp_dir, 'session.cap')
+        record(capture_path, num_frames)
+
+        profile = BNBProfile()
+        device_manager = DeviceManager(None, None)
+        device_manager.register_device(DeviceType.BNB_STAGE_1_FLARE, None, FullAddress(CONNECTION_NAME, DEVICE_ADDRESS))
+        rocket_data = RocketData(device_manager)
+
+        connection = ReplayConnection(capture_path, CONNECTION_NAME, speed=AS_FAST_AS_POSSIBLE)
+        snapshot = get_event_stats_snapshot()
+
+        start = time.perf_counter()
+        read_thread = ReadThread({CONNECTION_NAME: connection}, rocket_data, profile.construct_packet_parser(),
+                                 device_manager)
+        num_signals = [0]
+        # Direct connection counts on the read thread, each of these would be a queued event for the UI thread
+        read_thread.sig_received.connect(lambda: num_signals.__setitem__(0, num_signals[0] + 1), Qt.DirectConnection)
+        read_thread.start()
+        CONNECTION_MESSAGE_READ_EVENT.wait(snapshot, timeout=600, num_expected=num_frames)
+        elapsed = time.perf_counter() - start
+
+        read_thread.shutdown()
+        connection.shutdown()
+        rocket_data.shutdown()
+
+    print(f"{num_frames} frames ({2 * num_frames} subpackets) in {elapsed:.2f} s: "
+          f"{num_frames / elapsed:,.0f} frames/s, {2 * num_frames / elapsed:,.0f} bundles/s")
+    print(f"{num_signals[0]} UI signals: {num_signals[0] / elapsed:,.0f} signals/s, "
+          f"{num_signals[0] / num_frames:.1f} per frame")
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Latency from a recovery deployment to the new trajectory, re-simulating in the OpenRocket worker that RocketSim starts
+when constructed vs. in a new process and JVM for each simulation as before, and with the results cached on disk. Needs the
+OpenRocket jar (see util.detail).
+"""
+
+import statistics
+import tempfile
+import time
+
+from connections.sim.hw import simulation_cache
+from connections.sim.hw.rocket_sim import RocketSim, SimulationWorker
+from util.detail import LOGGER
+
+ORK_FILE = 'Silvertip-01-05-2022.ork'
+S_TO_US = 1_000_000
+DROGUE_S = 10  # Since launch
+MAIN_S = 20
+NUM_FLIGHTS = 3
+
+
+class ProcessPerSimulationRocketSim(RocketSim):
+    """Starts a worker for each simulation, as RocketSim did before keeping one, kept only for comparison"""
+
+    def _start_worker(self) -> None:
+        pass
+
+    def _run_simulation(self):
+        warm_worker = self._worker
+        self._worker = SimulationWorker(self._ork_file, self._drogue_component_name, self._main_component_name)
+        try:
+            return super()._run_simulation()
+        finally:
+            self._worker.shutdown()
+            self._worker = warm_worker
+
+
+def _fly(make_rocket_sim, cache_dir: str) -> dict:
+    """
+    :return: Seconds to construct (first trajectory), to deploy the drogue and the main
+    """
+    simulation_cache.SIMULATION_CACHE = cache_dir
+    start = time.perf_counter()
+    rocket_sim = make_rocket_sim(ORK_FILE)
+    latencies = {'construct': time.perf_counter() - start}
+
+    clock = rocket_sim.get_clock()
+    rocket_sim.launch()
+    for name, deploy, deploy_s in (('drogue', rocket_sim.deploy_drogue, DROGUE_S),
+                                   ('main', rocket_sim.deploy_main, MAIN_S)):
+        clock.add_time((deploy_s - rocket_sim.get_time_since_launch()) * S_TO_US)
+        start = time.perf_counter()
+        deploy()
+        latencies[name] = time.perf_counter() - start
+
+    rocket_sim.shutdown()
+    return latencies
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    print(f"{'':>24} {'construct':>10} {'drogue':>10} {'main':>10}")
+    with tempfile.TemporaryDirectory() as shared_cache_dir:
+        _fly(RocketSim, shared_cache_dir)  # Fills the cache for the cached flights
+
+        for name, make_rocket_sim, cache_dir in (('process per simulation', ProcessPerSimulationRocketSim, None),
+                                                 ('warm worker', RocketSim, None),
+                                                 ('cached', RocketSim, shared_cache_dir)):
+            flights = []
+            for _ in range(NUM_FLIGHTS):
+                with tempfile.TemporaryDirectory() as flight_cache_dir:  # Simulates everything, unless cached
+                    flights.append(_fly(make_rocket_sim, cache_dir or flight_cache_dir))
+            medians = {key: statistics.median(flight[key] for flight in flights) for key in flights[0]}
+            print(f"{name:>24} {medians['construct']:>8.2f} s {medians['drogue']:>8.2f} s {medians['main']:>8.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Insert rate and memory of RocketData's columnar store vs. the dual SortedDict store it replaced"""
+
+import time
+import tracemalloc
+from collections import namedtuple
+from typing import Callable
+
+from sortedcontainers import SortedDict
+
+from main_window.data_entry_id import DataEntryIds
+from main_window.device_manager import DeviceManager, DeviceType
+from main_window.rocket_data import RocketData, DataEntryKey
+
+NUM_SAMPLES = 1_000_000
+
+BULK_IDS = [
+    DataEntryIds.CALCULATED_ALTITUDE,
+    DataEntryIds.ACCELERATION_X,
+    DataEntryIds.ACCELERATION_Y,
+    DataEntryIds.ACCELERATION_Z,
+    DataEntryIds.ORIENTATION_1,
+    DataEntryIds.ORIENTATION_2,
+    DataEntryIds.ORIENTATION_3,
+    DataEntryIds.LATITUDE,
+    DataEntryIds.LONGITUDE,
+]
+
+Result = namedtuple('Result', ('name', 'inserts_per_s', 'bytes_per_million'))
+
+
+class LegacyStore:
+    """The add_bundle write path from before the columnar store, kept only for comparison"""
+
+    def __init__(self):
+        self.timeset = SortedDict()
+        self.keyset = dict()
+        self.last_time = 0
+
+    def add_bundle(self, full_address, incoming_data):
+        if DataEntryIds.TIME in incoming_data:
+            self.last_time = incoming_data[DataEntryIds.TIME]
+
+        if self.last_time not in self.timeset:
+            self.timeset[self.last_time] = {}
+
+        for data_id in incoming_data:
+            key = DataEntryKey(full_address, data_id)
+
+            if key not in self.keyset:
+                self.keyset[key] = SortedDict()
+            self.timeset[self.last_time][key] = incoming_data[data_id]
+            self.keyset[key][self.last_time] = incoming_data[data_id]
+
+
+def _bundles(num_samples: int):
+    values_per_bundle = len(BULK_IDS) + 1  # + TIME
+    for i in range(num_samples // values_per_bundle):
+        bundle = {DataEntryIds.TIME: i * 10}
+        for j, data_id in enumerate(BULK_IDS):
+            bundle[data_id] = i * 0.25 + j
+        yield bundle
+
+
+def _measure(name: str, make_store: Callable, full_address, num_samples: int) -> Result:
+    bundles = list(_bundles(num_samples))
+    samples = sum(len(b) for b in bundles)
+
+    # Timed and traced separately, tracemalloc slows down allocation heavy code a lot
+    store = make_store()
+    start = time.perf_counter()
+    for bundle in bundles:
+        store.add_bundle(full_address, bundle)
+    elapsed = time.perf_counter() - start
+    del store
+
+    tracemalloc.start()
+    store = make_store()
+    for bundle in bundles:
+        store.add_bundle(full_address, bundle)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return Result(name, samples / elapsed, used * 1e6 / samples)
+
+
+def main(num_samples: int = NUM_SAMPLES):
+    device_manager = DeviceManager(None, None)
+    device_manager.register_device(DeviceType.BNB_STAGE_1_FLARE, None, ('BENCH', 'BNB_STAGE_1_FLARE'))
+    full_address = device_manager.get_full_address(DeviceType.BNB_STAGE_1_FLARE)
+
+    def make_rocket_data():
+        return RocketData(device_manager, autosave=False)  # Would otherwise compete for the lock
+
+    results = [
+        _measure('dual SortedDict (legacy)', LegacyStore, full_address, num_samples),
+        _measure('columnar', make_rocket_data, full_address, num_samples),
+    ]
+
+    print(f"{num_samples} samples, {len(BULK_IDS) + 1} values per bundle")
+    for result in results:
+        print(f"{result.name:>26}: {result.inserts_per_s:>12,.0f} samples/s, "
+              f"{result.bytes_per_million / 1e6:>8.1f} MB per million samples")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+RocketSim reads over a full flight, as the SIM's barometer and accelerometer make them every firmware loop, from a
+synthetic trajectory of OpenRocket's size: np.interp over the whole trajectory per value vs. the interpolation cursor.
+Also get_time_series at points of the flight, Python loop vs. searchsorted.
+"""
+
+import time
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from connections.sim.hw.rocket_sim import RocketSim, FlightDataType, FlightEvent, FlightState
+from connections.sim.hw.sensors.sensor import SensorType
+from connections.sim.hw.sensors.sensor_sim import SensorSim
+from util.detail import LOGGER
+
+FLIGHT_S = 300
+LOOP_US = 10_000  # Firmware loop, one barometer and one accelerometer read each
+NUM_TIME_SERIES = 100
+
+
+class SyntheticRocketSim(RocketSim):
+    """RocketSim over a made up trajectory instead of one from OpenRocket, which is not needed to measure reads"""
+
+    def _start_worker(self) -> None:
+        pass  # Not asked for any simulation, and it would run alongside the reads
+
+    def _run_simulation(self):
+        # OpenRocket takes short steps under thrust and longer ones after
+        times = np.concatenate((np.arange(0, 5, 0.0025), np.arange(5, FLIGHT_S, 0.05), [FLIGHT_S]))
+        apogee = FLIGHT_S / 4
+        altitude = np.maximum(0, 3000 - 3000 * ((times - apogee) / apogee) ** 2)
+        altitude[times > apogee] = np.maximum(0, 3000 * (1 - (times[times > apogee] - apogee) / (FLIGHT_S - apogee)))
+
+        rng = np.random.default_rng(0)
+        data = {data_type: rng.normal(size=len(times)).cumsum() for data_type in FlightDataType}
+        data[FlightDataType.TYPE_TIME] = times
+        data[FlightDataType.TYPE_ALTITUDE] = altitude
+        data[FlightDataType.TYPE_AIR_PRESSURE] = 101325 * (1 - 2.25577e-5 * altitude) ** 5.25588
+        data[FlightDataType.TYPE_AIR_TEMPERATURE] = 288.15 - 0.0065 * altitude
+
+        events = {FlightEvent.IGNITION: [0.0], FlightEvent.LAUNCH: [0.0], FlightEvent.APOGEE: [apogee],
+                  FlightEvent.GROUND_HIT: [float(FLIGHT_S)], FlightEvent.SIMULATION_END: [float(FLIGHT_S)]}
+        return data, events
+
+
+class LegacyRocketSim(SyntheticRocketSim):
+    """The reads from before the interpolation cursor, kept only for comparison"""
+
+    def get_time_series(self, data_type: FlightDataType) -> Tuple[Iterable[float], Iterable[float]]:
+        times = self._data[FlightDataType.TYPE_TIME]
+        data = self._data[data_type]
+        current_time = self.get_time_since_launch()
+
+        end_index = 0
+        for i in range(len(times)):
+            if times[i] < current_time:
+                end_index = i
+            else:
+                break
+
+        return np.copy(times[:end_index + 1]), np.copy(data[:end_index + 1])
+
+    def get_data(self, data_type: FlightDataType) -> float:
+        if self.get_flight_state() == FlightState.STANDBY:
+            return self._data[data_type][0]
+        else:
+            return np.interp(self.get_time_since_launch(), self._data[FlightDataType.TYPE_TIME], self._data[data_type])
+
+
+def _fly(rocket_sim: RocketSim) -> Tuple[float, float, list]:
+    """
+    :return: Seconds spent in sensor reads and in get_time_series, altitudes read along the flight
+    """
+    sensors = [SensorSim(SensorType.BAROMETER, rocket_sim), SensorSim(SensorType.ACCELEROMETER, rocket_sim)]
+    clock = rocket_sim.get_clock()
+    rocket_sim.launch()
+
+    reads_s = time_series_s = 0
+    altitudes = []
+    num_loops = FLIGHT_S * 1_000_000 // LOOP_US
+    for i in range(num_loops):
+        clock.add_time(LOOP_US)
+        start = time.perf_counter()
+        for sensor in sensors:
+            sensor.read()
+        reads_s += time.perf_counter() - start
+
+        if i % (num_loops // NUM_TIME_SERIES) == 0:
+            start = time.perf_counter()
+            altitudes.append(rocket_sim.get_time_series(FlightDataType.TYPE_ALTITUDE)[1][-1])
+            time_series_s += time.perf_counter() - start
+    return reads_s, time_series_s, altitudes
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    num_reads = FLIGHT_S * 1_000_000 // LOOP_US
+
+    results = {}
+    for name, make_rocket_sim in (('np.interp', LegacyRocketSim), ('cursor', SyntheticRocketSim)):
+        results[name] = _fly(make_rocket_sim('bench.ork'))
+    assert results['np.interp'][2] == results['cursor'][2]
+
+    print(f"{FLIGHT_S} s flight, {num_reads:,} barometer + accelerometer reads, {NUM_TIME_SERIES} get_time_series")
+    print(f"{'':>10} {'per read':>12} {'all reads':>12} {'get_time_series':>16}")
+    for name, (reads_s, time_series_s, _) in results.items():
+        print(f"{name:>10} {reads_s / num_reads * 1e6:>9.2f} us {reads_s:>10.3f} s "
+              f"{time_series_s / NUM_TIME_SERIES * 1e3:>13.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
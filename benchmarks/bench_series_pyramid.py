@@ -0,0 +1,93 @@
+"""
+Min/max/mean over time ranges of a 10 million sample series (~2.8 hours at 1 kHz), through RocketData: scanning the
+samples in the range vs. the aggregate pyramid. Also the cost of building it and of keeping it up to date as data
+arrives, and of reading a 1000 pixel wide plot of the whole series.
+"""
+
+import statistics
+import time
+
+import numpy as np
+
+from main_window.data_entry_id import DataEntryIds
+from main_window.device_manager import DeviceManager, DeviceType
+from main_window.live_series import decimate_min_max
+from main_window.rocket_data import RocketData
+from util.detail import LOGGER
+
+NUM_SAMPLES = 10_000_000
+SAMPLE_INTERVAL_MS = 1
+RANGE_LENGTHS_MS = [1_000, 60_000, 3_600_000, NUM_SAMPLES * SAMPLE_INTERVAL_MS]
+NUM_QUERIES = 20
+NUM_BUNDLES = 1000  # Live data, one sample each
+PLOT_WIDTH = 1000
+
+DEVICE = DeviceType.BNB_STAGE_1_FLARE
+DATA_ID = DataEntryIds.CALCULATED_ALTITUDE
+
+
+def _median_ms(fn, *args) -> float:
+    latencies = []
+    for _ in range(NUM_QUERIES):
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1e3
+
+
+def _scan(rocket_data: RocketData, t_start: int, t_end: int):
+    _, values = rocket_data.series_by_device(DEVICE, DATA_ID, t_start, t_end)
+    return np.min(values), np.max(values), np.mean(values)
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    device_manager = DeviceManager(None, None)
+    device_manager.register_device(DEVICE, None, ('CONNECTION', DEVICE.name))
+    rocket_data = RocketData(device_manager)
+    full_address = device_manager.get_full_address(DEVICE)
+
+    rng = np.random.default_rng(0)
+    times = np.arange(NUM_SAMPLES) * SAMPLE_INTERVAL_MS
+    values = np.cumsum(rng.normal(size=NUM_SAMPLES))
+    rocket_data.add_columns(full_address, {DataEntryIds.TIME: times, DATA_ID: values})
+
+    start = time.perf_counter()
+    rocket_data.summary_by_device(DEVICE, DATA_ID)
+    print(f"Pyramid built in {(time.perf_counter() - start) * 1e3:.0f} ms for {NUM_SAMPLES:,} samples")
+
+    latencies = []
+    for i in range(NUM_BUNDLES):
+        rocket_data.add_bundle(full_address, {DataEntryIds.TIME: int(times[-1]) + 1 + i, DATA_ID: 0.0})
+        start = time.perf_counter()
+        rocket_data.summary_by_device(DEVICE, DATA_ID, int(times[-1]) - 60_000)
+        latencies.append(time.perf_counter() - start)
+    print(f"Last minute summary after each new sample: {statistics.median(latencies) * 1e3:.2f} ms")
+
+    print(f"{'range':>12} {'scan':>12} {'pyramid':>12}")
+    for length in RANGE_LENGTHS_MS:
+        t_start = int(rng.integers(0, NUM_SAMPLES * SAMPLE_INTERVAL_MS - length + 1)) + 7  # Not bucket aligned
+        t_end = t_start + length - 1
+        scanned = _scan(rocket_data, t_start, t_end)
+        summary = rocket_data.summary_by_device(DEVICE, DATA_ID, t_start, t_end)
+        assert (summary.minimum, summary.maximum) == scanned[:2]
+        assert np.isclose(summary.mean, scanned[2])
+
+        print(f"{length / 1000:>10.0f} s {_median_ms(_scan, rocket_data, t_start, t_end):>9.3f} ms "
+              f"{_median_ms(rocket_data.summary_by_device, DEVICE, DATA_ID, t_start, t_end):>9.3f} ms")
+
+    def decimated():
+        series = rocket_data.series_by_device(DEVICE, DATA_ID)
+        return decimate_min_max(*series, series[0][0], series[0][-1], PLOT_WIDTH)
+
+    def aggregated():
+        return rocket_data.aggregate_by_device(DEVICE, DATA_ID, num_buckets=PLOT_WIDTH)
+
+    print(f"{PLOT_WIDTH} px plot of everything: decimating the samples {_median_ms(decimated):.1f} ms, "
+          f"from the pyramid {_median_ms(aggregated):.2f} ms ({len(aggregated().times)} buckets)")
+
+    rocket_data.shutdown()
+
+
+if __name__ == '__main__':
+    main()
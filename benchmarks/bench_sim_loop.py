@@ -0,0 +1,129 @@
+"""
+Simulated seconds per wall second of SimConnection's request loop, against a scripted stand-in for the firmware that
+issues FLARE's mix of requests: a time update and five sensor reads every 10 ms, a continuity check every 100 ms and a
+telemetry radio packet every 500 ms. The stand-in is Python too, so the numbers are a lower bound of what the real
+firmware gets.
+"""
+
+import os
+import sys
+import time
+
+from connections.sim.hw.clock_sim import Clock
+from connections.sim.hw.hw_sim import HWSim
+from connections.sim.hw.ignitor_sim import Ignitor, IgnitorType
+from connections.sim.hw.sensors.dummy_sensor import DummySensor
+from connections.sim.hw.sensors.sensor import SensorType, REQUIRED_SENSOR_FLOATS
+from connections.sim.hw.xbee_module_sim import START_DELIMITER, NEEDS_ESCAPING, ESCAPE_CHAR, ESCAPE_XOR, FrameType
+from connections.sim.sim_connection import SimConnection
+from util.detail import LOGGER
+
+SIMULATED_S = 300  # About a full flight
+GS_ADDRESS = "0013A20041678FC0"
+
+FIRMWARE = """
+import binascii
+import sys
+
+A = ord('A')
+ENCODE = bytes.maketrans(b'0123456789abcdef', bytes(range(A, A + 16)))
+DECODE = bytes.maketrans(bytes(range(A, A + 16)), b'0123456789abcdef')
+NUM_STEPS = int(sys.argv[1])
+RADIO_FRAME = bytes.fromhex(sys.argv[2])
+out, inp = sys.stdout.buffer, sys.stdin.buffer
+
+
+def send(id_, data):
+    out.write(binascii.hexlify(bytes([id_]) + len(data).to_bytes(2, 'big') + data).translate(ENCODE))
+
+
+def request(id_, data):
+    send(id_, data)
+    out.flush()
+    while True:  # Radio packets from the ground can come first
+        header = binascii.unhexlify(inp.read(6).translate(DECODE))
+        data = binascii.unhexlify(inp.read(2 * int.from_bytes(header[1:], 'big')).translate(DECODE))
+        if header[0] != 0x52:
+            return data
+
+
+out.write(b'SYN')
+out.flush()
+assert inp.read(3) == b'ACK'
+send(0x01, bytes([0x04, 0x03, 0x02, 0x01, 0xC0, 0x00, 0x00, 0x00]))  # Big endian ints and floats
+
+for step in range(NUM_STEPS):
+    request(0x74, (10_000).to_bytes(4, 'big'))
+    for sensor_id in (3, 2, 1, 4, 0):  # Barometer, accelerometer, IMU, temperature, GPS
+        request(0x73, bytes([sensor_id]))
+    if step % 10 == 0:
+        send(0x50, bytes([33, 1]))
+        request(0x61, bytes([33]))
+        send(0x50, bytes([33, 0]))
+    if step % 50 == 0:
+        send(0x52, RADIO_FRAME)
+
+out.flush()
+inp.read()  # Idle until shut down
+"""
+
+
+class ClockOnlyRocketSim:
+    """HWSim only needs the clock of the rocket sim for time updates, which keeps OpenRocket out of the benchmark"""
+
+    def __init__(self):
+        self._clock = Clock()
+
+    def get_clock(self) -> Clock:
+        return self._clock
+
+    def shutdown(self) -> None:
+        pass
+
+
+class ScriptedSimConnection(SimConnection):
+    def _find_executable(self, executable_name):
+        self.executablePath = [sys.executable, '-c', FIRMWARE, str(SIMULATED_S * 100), _radio_frame().hex()]
+        self.firmwareDir = os.getcwd()
+
+
+def _radio_frame() -> bytes:
+    """
+    :return: XBee TX request frame to the ground station, with a telemetry sized payload
+    """
+    payload = bytes([1]) + bytes.fromhex(GS_ADDRESS) + b'\xff\xfe\x00\x00' + bytes(range(0x20, 0x5C))
+    checksum = 0xFF - ((FrameType.TX_REQUEST + sum(payload)) & 0xFF)
+    frame = bytearray()
+    for b in (len(payload) + 1).to_bytes(2, 'big') + bytes([FrameType.TX_REQUEST]) + payload + bytes([checksum]):
+        frame += bytes([ESCAPE_CHAR, b ^ ESCAPE_XOR]) if b in NEEDS_ESCAPING else bytes([b])
+    return bytes([START_DELIMITER]) + frame
+
+
+def main():
+    rocket_sim = ClockOnlyRocketSim()
+    sensors = [DummySensor(sensor_type, (1.0,) * REQUIRED_SENSOR_FLOATS[sensor_type])
+               for sensor_type in (SensorType.GPS, SensorType.IMU, SensorType.ACCELEROMETER, SensorType.BAROMETER,
+                                   SensorType.TEMPERATURE)]
+    ignitors = [Ignitor(IgnitorType.MAIN, 33, 33, 20), Ignitor(IgnitorType.DROGUE, 33, 33, 15)]
+    hw_sim = HWSim(rocket_sim, sensors, ignitors)
+
+    num_radio_packets = 0
+
+    def receive(message):
+        nonlocal num_radio_packets
+        num_radio_packets += 1
+
+    start = time.perf_counter()
+    connection = ScriptedSimConnection("Bench", GS_ADDRESS, hw_sim)
+    connection.registerCallback(receive)
+    while rocket_sim.get_clock().get_time_ms() < SIMULATED_S * 1000:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    connection.shutdown()
+
+    print(f"{SIMULATED_S} simulated s in {elapsed:.2f} s: {SIMULATED_S / elapsed:.1f} simulated s per s "
+          f"({SIMULATED_S * 100 * 6 / elapsed:,.0f} requests/s, {num_radio_packets} radio packets)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""MB/s of SIM traffic through the stream filters, byte at a time generators vs. chunked decoding"""
+
+import collections
+import os
+import random
+import time
+from io import BytesIO
+
+from connections.sim.stream_filter import A, ReadFilter, WriteFilter
+from util.detail import LOGS_DIR, SESSION_ID
+
+TRAFFIC_BYTES = 2_000_000  # Decoded
+PAYLOAD_SIZES = [1, 2, 4, 12, 36, 120]  # Pin writes and reads, time updates, sensor reads, radio packets
+LOG_HISTORY_SIZE = 500
+
+
+class LegacyReadFilter:
+    """The ReadFilter from before chunked decoding, kept only for comparison"""
+
+    def __init__(self, bufstream, size: int) -> None:
+        self.circularBuffer = collections.deque(maxlen=size)
+        self._logged_stream = self._read_and_log(self._filter(bufstream))
+
+    def _read_and_log(self, stream_gen):
+        with open(os.path.join(LOGS_DIR, "streamlog_" + SESSION_ID), "wb") as f:
+            while True:
+                c = next(stream_gen)
+                self.circularBuffer.append(c)
+                f.write(c)
+                f.flush()
+                yield c
+
+    def _filter(self, stream):
+        while True:
+            msb = stream.read(1)[0] - A
+            lsb = stream.read(1)[0] - A
+            yield bytes([(msb << 4) | lsb])
+
+    def read(self, number: int) -> bytes:
+        data = bytearray()
+        for _ in range(number):
+            data += next(self._logged_stream)
+        return bytes(data)
+
+
+class LegacyWriteFilter:
+    """The WriteFilter from before chunked encoding, kept only for comparison"""
+
+    def __init__(self, bufstream) -> None:
+        self.stream = bufstream
+
+    def write(self, data: bytes) -> None:
+        for c in data:
+            self.stream.write(bytes([(c >> 4) + A]))
+            self.stream.write(bytes([(c & 0x0F) + A]))
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def _packets() -> list:
+    random.seed(0)
+    packets = []
+    size = 0
+    while size < TRAFFIC_BYTES:
+        payload = bytes(random.getrandbits(8) for _ in range(random.choice(PAYLOAD_SIZES)))
+        packets.append(bytes([0x73]) + len(payload).to_bytes(2, "big") + payload)
+        size += len(packets[-1])
+    return packets
+
+
+def _write(make_filter, packets: list) -> float:
+    """
+    :return: MB/s, sent as SimConnection._send_sim_packet does, one write and flush per packet
+    """
+    stream = BytesIO()
+    write_filter = make_filter(stream)
+    start = time.perf_counter()
+    for packet in packets:
+        write_filter.write(packet)
+        write_filter.flush()
+    return sum(map(len, packets)) / (time.perf_counter() - start) / 1e6
+
+
+def _read(make_filter, encoded: bytes, num_bytes: int) -> float:
+    """
+    :return: MB/s, read as SimConnection._run does: id, length and then payload
+    """
+    read_filter = make_filter(BytesIO(encoded), LOG_HISTORY_SIZE)
+    start = time.perf_counter()
+    num_read = 0
+    while num_read < num_bytes:
+        read_filter.read(1)
+        [msb, lsb] = read_filter.read(2)
+        length = (msb << 8) | lsb
+        read_filter.read(length)
+        num_read += 3 + length
+    return num_read / (time.perf_counter() - start) / 1e6
+
+
+def main():
+    packets = _packets()
+    encoded = BytesIO()
+    WriteFilter(encoded).write(b''.join(packets))
+    num_bytes = sum(map(len, packets))
+
+    print(f"{len(packets):,} packets, {num_bytes / 1e6:.1f} MB")
+    print(f"{'':>6} {'legacy':>12} {'chunked':>12}")
+    print(f"{'write':>6} {_write(LegacyWriteFilter, packets):>7.2f} MB/s {_write(WriteFilter, packets):>7.2f} MB/s")
+    print(f"{'read':>6} {_read(LegacyReadFilter, encoded.getvalue(), num_bytes):>7.2f} MB/s "
+          f"{_read(ReadFilter, encoded.getvalue(), num_bytes):>7.2f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""TileGrid.genStitchedMap time for square grids of synthetic tiles in a temporary cache"""
+
+import io
+import math
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from main_window.competition.mapping import mapbox_utils
+from util.detail import LOGGER
+
+GRID_SIZES = [2, 5, 10]
+NUM_REPEATS = 5
+ZOOM = 18
+ORIGIN_TILE = (41321, 89729)  # UBC
+
+
+def _tile_center(x: float, y: float) -> mapbox_utils.MapPoint:
+    n = 2 ** ZOOM
+    longitude = (x + 0.5) / n * 360 - 180
+    latitude = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 0.5) / n))))
+    return mapbox_utils.MapPoint(latitude, longitude)
+
+
+def _write_tiles(grid: mapbox_utils.TileGrid) -> None:
+    rng = np.random.default_rng(0)
+    tiles = []
+    for row in grid.ta:
+        for tile in row:
+            pixels = rng.integers(0, 255, (mapbox_utils.TILE_SIZE, mapbox_utils.TILE_SIZE, 3), dtype=np.uint8)
+            buffer = io.BytesIO()
+            Image.fromarray(pixels).save(buffer, format="jpeg", quality=90)
+            tiles.append((tile.key, buffer.getvalue()))
+    mapbox_utils.getTileStore().put_many(tiles)
+
+
+def _clear_stitched_cache() -> None:
+    stitched_map_cache = getattr(mapbox_utils, 'STITCHED_MAP_CACHE', None)
+    if stitched_map_cache is not None:
+        stitched_map_cache.clear()
+
+
+def _time(fn, setup=lambda: None) -> float:
+    latencies = []
+    for _ in range(NUM_REPEATS):
+        setup()
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    mapbox_utils.maps = None  # Never hit the network
+    mapbox_utils.SAVE_STITCHED_MAPS = True  # Off by default, "from disk" measures loading the saved map
+
+    print(f"{'grid':>6} {'first (decode)':>15} {'from tiles':>12} {'from disk':>12} {'cached':>10}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        mapbox_utils.MAPBOX_CACHE = cache_dir
+        for n in GRID_SIZES:
+            x, y = ORIGIN_TILE
+            grid = mapbox_utils.TileGrid(_tile_center(x, y), _tile_center(x + n - 1, y + n - 1), ZOOM)
+            assert (grid.width, grid.height) == (n, n)
+            _write_tiles(grid)
+
+            start = time.perf_counter()
+            grid.genStitchedMap()  # Decodes every tile, saves the stitched map
+            first = time.perf_counter() - start
+
+            # Tiles already decoded in memory
+            from_tiles = _time(grid.genStitchedMap, setup=_clear_stitched_cache)
+
+            # Nothing in memory, saved stitched map is read back
+            def clear_all():
+                mapbox_utils.TILE_CACHE.clear()
+                _clear_stitched_cache()
+            from_disk = _time(grid.genStitchedMap, setup=clear_all)
+
+            grid.genStitchedMap()
+            cached = _time(grid.genStitchedMap)
+
+            print(f"{n:>3}x{n:<2} {first * 1e3:>12.1f} ms {from_tiles * 1e3:>9.2f} ms {from_disk * 1e3:>9.2f} ms "
+                  f"{cached * 1e3:>7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
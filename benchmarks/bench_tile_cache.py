@@ -0,0 +1,64 @@
+"""Repeated map refreshes over the same area, as MapProcess does them, with synthetic tiles in a temporary cache"""
+
+import io
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from main_window.competition.mapping import mapbox_utils
+from util.detail import LOGGER
+
+NUM_REFRESHES = 50
+ZOOM = 18
+
+# Corners of the area, a 3x2 tile grid around UBC
+P1 = mapbox_utils.MapPoint(49.266904, -123.252976)
+P2 = mapbox_utils.MapPoint(49.265903, -123.251222)
+
+
+def _write_tiles(grid: mapbox_utils.TileGrid) -> None:
+    rng = np.random.default_rng(0)
+    tiles = []
+    for row in grid.ta:
+        for tile in row:
+            pixels = rng.integers(0, 255, (mapbox_utils.TILE_SIZE, mapbox_utils.TILE_SIZE, 3), dtype=np.uint8)
+            buffer = io.BytesIO()
+            Image.fromarray(pixels).save(buffer, format="jpeg", quality=90)
+            tiles.append((tile.key, buffer.getvalue()))
+    mapbox_utils.getTileStore().put_many(tiles)
+
+
+def _refresh() -> float:
+    start = time.perf_counter()
+    grid = mapbox_utils.TileGrid(P1, P2, ZOOM)
+    grid.downloadArrayImages()
+    grid.genStitchedMap()
+    return time.perf_counter() - start
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    mapbox_utils.maps = None  # Never hit the network
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        mapbox_utils.MAPBOX_CACHE = cache_dir
+        _write_tiles(mapbox_utils.TileGrid(P1, P2, ZOOM))
+
+        latencies = [_refresh() for _ in range(NUM_REFRESHES + 1)]
+        print(f"first refresh: {latencies[0] * 1e3:.2f} ms")
+        latencies = sorted(latencies[1:])
+        print(f"next {NUM_REFRESHES}: median {statistics.median(latencies) * 1e3:.2f} ms, "
+              f"p95 {latencies[int(0.95 * len(latencies))] * 1e3:.2f} ms")
+
+    tile_cache = getattr(mapbox_utils, 'TILE_CACHE', None)
+    if tile_cache is not None:
+        stats = tile_cache.stats()
+        print(f"tile cache: {stats.hits} hits, {stats.misses} misses ({stats.hit_rate:.1%} hit rate), "
+              f"{stats.entries} tiles in {stats.nbytes / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
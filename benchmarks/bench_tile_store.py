@@ -0,0 +1,124 @@
+"""
+Per file tile layout vs. the SQLite tile store, for a seeded launch area: storing the tiles, copying the cache (e.g. onto
+a field laptop), checking that every tile is there, and a cold start map render (fresh store, nothing decoded yet).
+The OS file cache is warm in every case.
+"""
+
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from main_window.competition.mapping import mapbox_utils, tile_seeder
+from main_window.competition.mapping.tile_store import FileTileStore, SqliteTileStore
+from util.detail import LOGGER
+
+LATITUDE, LONGITUDE = 32.9401, -106.9119  # Spaceport America
+RADIUS = 2  # km
+MIN_ZOOM, MAX_ZOOM = 10, 18
+NUM_DISTINCT_TILES = 32
+NUM_RENDERS = 5
+
+# Corners of the rendered map, a 3x2 tile grid
+P1 = mapbox_utils.MapPoint(32.9409, -106.9128)
+P2 = mapbox_utils.MapPoint(32.9396, -106.9105)
+
+
+def _tile_images() -> list:
+    """
+    :return: Satellite-like jpegs, smooth enough to compress to a realistic size
+    """
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(NUM_DISTINCT_TILES):
+        coarse = rng.integers(0, 255, (64, 64, 3), dtype=np.uint8)
+        pixels = Image.fromarray(coarse).resize((mapbox_utils.TILE_SIZE, mapbox_utils.TILE_SIZE), Image.BICUBIC)
+        buffer = io.BytesIO()
+        pixels.save(buffer, format="jpeg", quality=85)
+        images.append(buffer.getvalue())
+    return images
+
+
+def _area_keys() -> list:
+    keys = []
+    for zoom in range(MIN_ZOOM, MAX_ZOOM + 1):
+        grid = tile_seeder.area_grid(LATITUDE, LONGITUDE, RADIUS, zoom)
+        keys += [tile.key for row in grid.ta for tile in row]
+    return keys
+
+
+def _directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def _cold_render(open_store) -> float:
+    latencies = []
+    for _ in range(NUM_RENDERS):
+        mapbox_utils.TILE_CACHE.clear()
+        mapbox_utils.STITCHED_MAP_CACHE.clear()
+
+        start = time.perf_counter()
+        mapbox_utils.TILE_STORE = open_store()
+        grid = mapbox_utils.TileGrid(P1, P2, MAX_ZOOM)
+        grid.downloadArrayImages()
+        image = grid.genStitchedMap()
+        latencies.append(time.perf_counter() - start)
+
+        assert image.any()
+        mapbox_utils.TILE_STORE.close()
+    return statistics.median(latencies)
+
+
+def _time(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    LOGGER.setLevel('ERROR')
+    mapbox_utils.maps = None  # Never hit the network
+    mapbox_utils.SAVE_STITCHED_MAPS = False
+
+    images = _tile_images()
+    keys = _area_keys()
+    items = [(key, images[i % len(images)]) for i, key in enumerate(keys)]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        raw_dir = os.path.join(work_dir, "files", "raw")
+        db_path = os.path.join(work_dir, "sqlite", mapbox_utils.TILE_STORE_NAME)
+        os.makedirs(os.path.dirname(db_path))
+
+        file_store = FileTileStore(raw_dir)
+        file_store_time = _time(lambda: file_store.put_many(items))
+        sqlite_store = SqliteTileStore(db_path)
+        sqlite_store_time = _time(lambda: sqlite_store.put_many(items))
+        sqlite_store.close()
+
+        file_size, sqlite_size = _directory_size(raw_dir), os.path.getsize(db_path)
+        print(f"{len(keys)} tiles, zoom {MIN_ZOOM} to {MAX_ZOOM}: {file_size / 1e6:.1f} MB as files, "
+              f"{sqlite_size / 1e6:.1f} MB as SQLite")
+        print(f"{'':>24} {'files':>10} {'sqlite':>10}")
+
+        sqlite_store = SqliteTileStore(db_path)
+        sqlite_contains_time = _time(lambda: all(sqlite_store.contains(key) for key in keys))
+        sqlite_store.close()
+        results = [
+            ("store all", file_store_time, sqlite_store_time),
+            ("copy cache", _time(lambda: shutil.copytree(raw_dir, os.path.join(work_dir, "files_copy"))),
+             _time(lambda: shutil.copy2(db_path, os.path.join(work_dir, "sqlite_copy.mbtiles")))),
+            ("check every tile", _time(lambda: all(file_store.contains(key) for key in keys)), sqlite_contains_time),
+            ("cold start 3x2 render", _cold_render(lambda: FileTileStore(raw_dir)),
+             _cold_render(lambda: SqliteTileStore(db_path))),
+        ]
+        for name, file_time, sqlite_time in results:
+            print(f"{name:>24} {file_time * 1e3:>7.1f} ms {sqlite_time * 1e3:>7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
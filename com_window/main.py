@@ -5,7 +5,9 @@ import PyQt5
 import serial.tools.list_ports
 from PyQt5 import QtCore, QtWidgets, uic
 
-from util.detail import BUNDLED_DATA, LOGGER
+from connections.capture import CAPTURE_EXTENSION, CaptureError
+from connections.replay.replay_connection import replay_connections
+from util.detail import BUNDLED_DATA, LOGGER, LOGS_DIR
 from profiles.rocket_profile_list import ROCKET_PROFILES
 
 if hasattr(QtCore.Qt, "AA_EnableHighDpiScaling"):
@@ -24,6 +26,7 @@ CONNECTIONS = {
     'Serial': ConnectionRequirements(com_port=True, baud_rate=True, nmea_serial_port=True, nmea_baud_rate=True),
     'Debug': ConnectionRequirements(com_port=False, baud_rate=False, nmea_serial_port=True, nmea_baud_rate=True),
     'SIM': ConnectionRequirements(com_port=False, baud_rate=False, nmea_serial_port=False, nmea_baud_rate=False),
+    'Replay': ConnectionRequirements(com_port=False, baud_rate=False, nmea_serial_port=False, nmea_baud_rate=False),
 }
 
 class ComWindow(QtWidgets.QMainWindow, Ui_MainWindow):
@@ -83,6 +86,17 @@ class ComWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             self.chosen_connection = self.chosen_rocket.construct_debug_connection(nmea_serial_port, nmea_baud_rate)
         elif connection == 'SIM':
             self.chosen_connection = self.chosen_rocket.construct_sim_connection(nmea_serial_port, nmea_baud_rate)
+        elif connection == 'Replay':
+            capture_path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Open capture", LOGS_DIR,
+                                                                    f"Captures (*{CAPTURE_EXTENSION})")
+            if not capture_path:
+                return  # Cancelled, stay in this window
+            try:
+                self.chosen_connection = replay_connections(capture_path)
+            except (CaptureError, ValueError, OSError) as e:
+                LOGGER.exception(f"Cannot replay {capture_path}")
+                QtWidgets.QMessageBox.critical(self, "Cannot replay capture", f"{capture_path}:\n{e}")
+                return  # Stay in this window to pick another capture
         else:
             raise Exception("Unknown connection")
 
@@ -0,0 +1,161 @@
+"""
+Raw capture of the ConnectionMessages received from connections, for deterministic replay (see ReplayConnection).
+
+Layout (all integers little endian):
+
+    header    16 bytes: magic, format version, reserved
+    frames    one per ConnectionMessage, back to back:
+                  frame header   20 bytes: receive time (s, monotonic, relative to first frame), flags,
+                                 connection name length, device address length, data length
+                  connection name, device address (UTF-8), data
+
+Frames are appended as they arrive and flushed every CAPTURE_FLUSH_INTERVAL_S, so that a crash only loses the frames of
+the last interval.
+"""
+
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+from typing import BinaryIO, Iterator, Optional
+
+from .connection import Connection, ConnectionMessage
+
+MAGIC = b'UBCRCAP\x00'
+VERSION = 1
+
+HEADER = struct.Struct('<8sHHI')  # magic, version, reserved, reserved
+FRAME_HEADER = struct.Struct('<dHHHxxI')  # time, flags, connection name length, device address length, data length
+
+CAPTURE_EXTENSION = '.cap'
+CAPTURE_FLUSH_INTERVAL_S = 1.0
+
+# Set (to 0) to not record captures, e.g. for tests. It is read from the environment like OFFLINE_MAPS_ENV
+CAPTURE_ENV = "GROUND_STATION_CAPTURE"
+CAPTURE_ENABLED = os.environ.get(CAPTURE_ENV, "") != "0"
+
+FLAG_INT_BIG_ENDIAN = 0x01
+FLAG_FLOAT_BIG_ENDIAN = 0x02
+FLAG_NO_DEVICE_ADDRESS = 0x04  # device_address was None, as opposed to ''
+
+CaptureFrame = namedtuple('CaptureFrame', ['time', 'connection_name', 'device_address', 'data',
+                                           'int_big_endian', 'float_big_endian'])
+
+
+class CaptureError(Exception):
+    pass
+
+
+class CaptureWriter:
+    """
+    Appends timestamped frames to a capture file. Thread safe, connections call back from their own threads.
+    """
+
+    def __init__(self, path: str, flush_interval_s: float = CAPTURE_FLUSH_INTERVAL_S) -> None:
+        """
+        :param path:
+        :type path: str
+        :param flush_interval_s: Frames are flushed to the file at least this often, from a thread of the writer
+        :type flush_interval_s: float
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file: Optional[BinaryIO] = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        self._file.flush()  # Readable as a capture from the start
+        self._start_time = None
+
+        self._flush_interval_s = flush_interval_s
+        self._closed = threading.Event()
+        self._flush_thread = threading.Thread(target=self._flush_periodically, name="CaptureFlush", daemon=True)
+        self._flush_thread.start()
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self._flush_interval_s):
+            self.flush()
+
+    def write(self, connection_name: str, message: ConnectionMessage) -> None:
+        """
+        :param connection_name: Name of message.connection, as in the connections dict given to MainApp
+        :type connection_name: str
+        :param message:
+        :type message: ConnectionMessage
+        """
+        now = time.monotonic()
+        connection: Connection = message.connection
+        flags = 0
+        if connection.isIntBigEndian():
+            flags |= FLAG_INT_BIG_ENDIAN
+        if connection.isFloatBigEndian():
+            flags |= FLAG_FLOAT_BIG_ENDIAN
+        if message.device_address is None:
+            flags |= FLAG_NO_DEVICE_ADDRESS
+
+        name = connection_name.encode('utf-8')
+        address = b'' if message.device_address is None else message.device_address.encode('utf-8')
+        data = bytes(message.data)
+
+        with self._lock:
+            if self._file is None:
+                return  # Closed, e.g. message arriving during shutdown
+
+            if self._start_time is None:
+                self._start_time = now
+
+            self._file.write(FRAME_HEADER.pack(now - self._start_time, flags, len(name), len(address), len(data)))
+            self._file.write(name)
+            self._file.write(address)
+            self._file.write(data)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        self._closed.set()
+        self._flush_thread.join()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_capture(path: str) -> Iterator[CaptureFrame]:
+    """
+    Frames of a capture in the order they were received. A frame cut short by a crash ends the capture.
+
+    :param path:
+    :type path: str
+    :return: Iterator over frames
+    :rtype: Iterator[CaptureFrame]
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise CaptureError(f"{path} is not a capture")
+        _, version, _, _ = HEADER.unpack(header)
+        if version != VERSION:
+            raise CaptureError(f"Unsupported capture version {version}")
+
+        while True:
+            frame_header = f.read(FRAME_HEADER.size)
+            if len(frame_header) < FRAME_HEADER.size:
+                return
+
+            frame_time, flags, name_length, address_length, data_length = FRAME_HEADER.unpack(frame_header)
+            body = f.read(name_length + address_length + data_length)
+            if len(body) < name_length + address_length + data_length:
+                return
+
+            name = body[:name_length].decode('utf-8')
+            address = None if flags & FLAG_NO_DEVICE_ADDRESS else \
+                body[name_length:name_length + address_length].decode('utf-8')
+
+            yield CaptureFrame(time=frame_time,
+                               connection_name=name,
+                               device_address=address,
+                               data=body[name_length + address_length:],
+                               int_big_endian=bool(flags & FLAG_INT_BIG_ENDIAN),
+                               float_big_endian=bool(flags & FLAG_FLOAT_BIG_ENDIAN))
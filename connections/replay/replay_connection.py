@@ -0,0 +1,155 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ..capture import CaptureFrame, read_capture
+from ..connection import Connection, ConnectionMessage
+from util.detail import LOGGER
+from util.event_stats import Event
+
+REPLAY_FRAME_EVENT = Event('replay_frame')
+
+AS_FAST_AS_POSSIBLE = None
+
+
+class ReplayConnection(Connection):
+
+    def __init__(
+            self,
+            capture_path: str,
+            connection_name: str,
+            speed: Optional[float] = 1.0,
+            stage: int = 1,
+            nmea_serial_port: Optional[str] = None,
+            nmea_baud_rate: Optional[int] = None) -> None:
+        """
+        Plays back the frames a connection recorded in a capture file (see connections.capture). Playback starts once
+        a callback is registered, and frames are always delivered in their recorded order from a single thread.
+
+        :param capture_path:
+        :type capture_path: str
+        :param connection_name: Which recorded connection to play back
+        :type connection_name: str
+        :param speed: Multiple of the recorded rate, or AS_FAST_AS_POSSIBLE to deliver frames back to back
+        :type speed: Optional[float]
+        """
+        if speed is not AS_FAST_AS_POSSIBLE and speed <= 0:
+            raise ValueError(f"Invalid replay speed {speed}")
+
+        self.capture_path = capture_path
+        self.connection_name = connection_name
+        self.speed = speed
+        self.stage = stage
+        self.nmea_serial_port = nmea_serial_port
+        self.nmea_baud_rate = nmea_baud_rate
+
+        self.frames: List[CaptureFrame] = [f for f in read_capture(capture_path) if f.connection_name == connection_name]
+        if not self.frames:
+            raise ValueError(f"No frames for connection_name={connection_name} in {capture_path}")
+
+        self.device_address = self.frames[0].device_address
+        self.bigEndianInts = self.frames[0].int_big_endian
+        self.bigEndianFloats = self.frames[0].float_big_endian
+
+        self.frames_sent = 0
+        self.done = threading.Event()
+
+        self.callback = None
+        self.lock = threading.RLock()  # Protects callback variable and any other "state" variables
+        self.cv = threading.Condition(self.lock)
+        self._is_shutting_down = False
+
+        self.replayThread = threading.Thread(target=self._run, daemon=True, name="ReplayConnectionThread")
+        self.replayThread.start()
+
+    def _run(self) -> None:
+        with self.cv:
+            self.cv.wait_for(lambda: self._is_shutting_down or self.callback is not None)
+            callback = self.callback
+
+        LOGGER.debug(f"Replay of {self.connection_name} started ({len(self.frames)} frames, speed={self.speed})")
+        start_time = time.monotonic()
+        first_frame_time = self.frames[0].time
+
+        for frame in self.frames:
+            if self.speed is not AS_FAST_AS_POSSIBLE:
+                due = start_time + (frame.time - first_frame_time) / self.speed
+                with self.cv:
+                    self.cv.wait_for(lambda: self._is_shutting_down, timeout=max(0.0, due - time.monotonic()))
+
+            if self._is_shutting_down:
+                break
+
+            callback(ConnectionMessage(device_address=frame.device_address, connection=self, data=frame.data))
+            self.frames_sent += 1
+            REPLAY_FRAME_EVENT.increment()
+
+        self.done.set()
+        LOGGER.debug(f"Replay of {self.connection_name} finished ({self.frames_sent} frames sent)")
+
+    def wait_until_done(self, timeout: Optional[float] = None) -> bool:
+        """
+        :param timeout: Seconds, or None to wait forever
+        :type timeout: Optional[float]
+        :return: True if every frame was delivered (or the replay was shut down) before the timeout
+        :rtype: bool
+        """
+        return self.done.wait(timeout)
+
+    def registerCallback(self, fn) -> None:
+        with self.cv:
+            self.callback = fn
+            self.cv.notify_all()
+
+    def send(self, device_address, data) -> None:
+        if device_address != self.device_address:
+            raise Exception(f"Connection does not support address={device_address}")
+        self.broadcast(data)
+
+    def broadcast(self, data) -> None:
+        # Nothing on the other end of a recording
+        LOGGER.info(f"{data} dropped, address={self.device_address} is a ReplayConnection")
+
+    def shutdown(self) -> None:
+        with self.cv:
+            self._is_shutting_down = True
+            self.cv.notify_all()
+        self.replayThread.join()
+
+    def isIntBigEndian(self) -> bool:
+        return self.bigEndianInts
+
+    def isFloatBigEndian(self) -> bool:
+        return self.bigEndianFloats
+
+    def getDeviceAddress(self) -> Optional[str]:
+        return self.device_address
+
+    def getKissAddress(self) -> Optional[str]:
+        return None
+
+    def getStage(self) -> int:
+        return self.stage
+
+    def getNMEASerialPort(self) -> Optional[str]:
+        return self.nmea_serial_port
+
+    def getNMEABaudRate(self) -> Optional[int]:
+        return self.nmea_baud_rate
+
+
+def replay_connections(capture_path: str, speed: Optional[float] = 1.0) -> Dict[str, ReplayConnection]:
+    """
+    One ReplayConnection per connection recorded in a capture, keyed by the recorded connection names so the result can
+    be given to RocketProfile.construct_app().
+
+    :param capture_path:
+    :type capture_path: str
+    :param speed: See ReplayConnection
+    :type speed: Optional[float]
+    :return:
+    :rtype: Dict[str, ReplayConnection]
+    """
+    names = list(dict.fromkeys(frame.connection_name for frame in read_capture(capture_path)))
+    return {name: ReplayConnection(capture_path, name, speed=speed, stage=stage)
+            for stage, name in enumerate(names, start=1)}
@@ -33,6 +33,7 @@ class HWSim:
         self._rocket_sim = rocket_sim
 
         self._pin_modes = {}
+        self._analog_values = {}  # Last value read from each pin, reads are logged when it changes
 
         self._sensors = {s.get_type(): s for s in sensors}
 
@@ -83,7 +84,9 @@ class HWSim:
             val = 0
             if pin in self._ignitor_reads:
                 val = self._ignitor_reads[pin].read()
-                LOGGER.debug(f"Analog read from pin={pin} returned value={val}")
+                if self._analog_values.get(pin) != val:
+                    self._analog_values[pin] = val
+                    LOGGER.debug(f"Analog read from pin={pin} returned value={val}")
 
             # else:
             #     voltage_sensor = self._sensors[SensorType.VOLTAGE]
@@ -1,14 +1,21 @@
+import bisect
 import multiprocessing
+import queue
 import numpy as np
 from os import path
-from typing import Dict, List, Union, Tuple, Iterable
+from typing import Dict, List, Optional, Union, Tuple, Iterable
 from enum import Enum, auto
 from orhelper import OpenRocketInstance, Helper, FlightDataType, FlightEvent
 from multiprocessing import Process, Queue
 
+from . import simulation_cache
 from .clock_sim import Clock
 from util.detail import LOGGER, OPEN_ROCKET_PATH, ORK_FILES_PATH
 
+CURSOR_STEPS = 8  # Samples the cursor steps through before it searches instead
+WORKER_POLL_S = 1  # How often a wait for a simulation checks that the worker is still running
+WORKER_SHUTDOWN_TIMEOUT_S = 10  # Before the worker is terminated
+
 
 class FlightState(Enum):
     STANDBY = auto()
@@ -18,6 +25,141 @@ class FlightState(Enum):
     LANDED = auto()
 
 
+class TrajectoryCursor:
+    def __init__(self, times: List[float]) -> None:
+        """
+        Interpolates series sampled at times to the same values np.interp gives. Reads move forward with the clock, a
+        few samples at a time, so the samples around the time read are found by stepping from the last ones, once for
+        all the series read at that time. Longer jumps are searched for.
+
+        Times and values are lists of Python floats, indexing and arithmetic on them is much faster than on NumPy
+        scalars.
+
+        :param times: Sorted
+        :type times: List[float]
+        """
+        self._times = times
+        self._index = -1  # Last sample at or before the last time read, -1 if there are none
+        self._time = None  # Of the last read
+
+    def _locate(self, t: float) -> int:
+        """
+        :return: Last sample at or before t, -1 if there are none
+        :rtype: int
+        """
+        times = self._times
+        index = max(self._index, 0)
+        if times[index] <= t:
+            for _ in range(CURSOR_STEPS):
+                if index + 1 == len(times) or times[index + 1] > t:
+                    return index
+                index += 1
+        return bisect.bisect_right(times, t) - 1
+
+    def interpolate(self, t: float, values: List[float]) -> float:
+        """
+        :param t:
+        :type t: float
+        :param values: At each of the times
+        :type values: List[float]
+        :return: Value at t, the first or last value outside of the times
+        :rtype: float
+        """
+        if t != self._time:
+            self._index = self._locate(t)
+            self._time = t
+
+        index = self._index
+        times = self._times
+        if index < 0:
+            return values[0]
+        if index == len(times) - 1 or times[index] == t:
+            return values[index]
+
+        # Same arithmetic as np.interp, including how it works around values that are not finite
+        before, after = values[index], values[index + 1]
+        slope = (after - before) / (times[index + 1] - times[index])
+        value = slope * (t - times[index]) + before
+        if value != value:
+            value = slope * (t - times[index + 1]) + after
+            if value != value and before == after:
+                value = before
+        return value
+
+
+class SimulationWorker:
+    def __init__(self, ork_file: str, drogue_component_name: str, main_component_name: str) -> None:
+        """
+        Process that starts an OpenRocket JVM and loads the document as soon as it is created, then runs simulations of
+        it on request. Re-simulating on deployment then costs only the simulation.
+
+        :param ork_file: Path
+        :type ork_file: str
+        :param drogue_component_name:
+        :type drogue_component_name: str
+        :param main_component_name:
+        :type main_component_name: str
+        """
+        # Due to JPype limitations, the JVM cannot be restarted by the same process.
+        # https://jpype.readthedocs.io/en/latest/install.html#known-bugs-limitations
+        # To work around this, the JVM runs in its own process, which is kept for all the simulations.
+        self._requests = Queue()
+        self._results = Queue()
+        self._process = Process(target=_run_simulation_worker, args=(
+            ork_file,
+            drogue_component_name,
+            main_component_name,
+            self._requests,
+            self._results
+        ), name="OpenRocket", daemon=True)
+        self._process.start()
+        self._is_used = False
+
+    def simulate(self, seed: int, drogue_deployment_time: Union[float, None],
+                 main_deployment_time: Union[float, None]) -> Tuple[Dict[FlightDataType, np.ndarray],
+                                                                   Dict[FlightEvent, List[float]]]:
+        """
+        :param seed:
+        :type seed: int
+        :param drogue_deployment_time: Since launch, None if it is not deployed
+        :type drogue_deployment_time: Union[float, None]
+        :param main_deployment_time: Since launch, None if it is not deployed
+        :type main_deployment_time: Union[float, None]
+        :return: data, events
+        :rtype: Tuple[Dict[FlightDataType, np.ndarray], Dict[FlightEvent, List[float]]]
+        """
+        self._is_used = True
+        self._requests.put((seed, drogue_deployment_time, main_deployment_time))
+        while True:
+            try:
+                result = self._results.get(timeout=WORKER_POLL_S)
+                break
+            except queue.Empty:
+                if not self._process.is_alive():
+                    raise Exception(f"OpenRocket worker exited with code {self._process.exitcode}")
+
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def shutdown(self) -> None:
+        if self._process is None:
+            return
+
+        if self._is_used:
+            self._requests.put(None)
+            self._process.join(timeout=WORKER_SHUTDOWN_TIMEOUT_S)
+            if self._process.is_alive():
+                LOGGER.warning("OpenRocket worker did not shut down, terminating it")
+                self._process.terminate()
+        else:
+            # Nothing to finish, and no point in waiting for the JVM to start only to stop it
+            self._process.terminate()
+        self._process.join()
+        self._process.close()
+        self._process = None
+
+
 class RocketSim:
 
     def __init__(self, ork_file_name: str, random_seed: int = 0,
@@ -34,9 +176,22 @@ class RocketSim:
         self._main_deployment_time: float = None
 
         multiprocessing.set_start_method('spawn', True)
+        # Started now, the deployment times (and so their cache keys) are only known in flight, where they are seldom
+        # cached. Its JVM then starts while the initial data is loaded, and is warm by the first deployment
+        self._worker: Optional[SimulationWorker] = None
+        self._start_worker()
 
         # Populate with initial data
-        self._data, self._events = self._run_simulation()
+        try:
+            data, self._events = self._run_simulation()
+        except Exception:
+            self.shutdown()
+            raise
+        self._load_trajectory(data)
+
+    def _start_worker(self) -> None:
+        if self._worker is None:
+            self._worker = SimulationWorker(self._ork_file, self._drogue_component_name, self._main_component_name)
 
     def launch(self) -> None:
         assert self.get_flight_state() == FlightState.STANDBY
@@ -94,12 +249,27 @@ class RocketSim:
                     else:
                         merged_events[event] = [time]
 
-        self._data = new_data
+        self._load_trajectory(new_data)
         self._events = merged_events
 
         LOGGER.info(
             f"Recovery deployed at time {self.get_time()} s, and altitude {self.get_data(FlightDataType.TYPE_ALTITUDE)} m")
 
+    def _load_trajectory(self, data: Dict[FlightDataType, np.ndarray]) -> None:
+        self._data = data
+
+        # Series that interpolate through the cursor, others (if OpenRocket leaves any empty) go through np.interp
+        times = np.asarray(data[FlightDataType.TYPE_TIME], dtype=np.float64)
+        self._cursor_series: Dict[FlightDataType, List[float]] = {}
+        for data_type, values in data.items():
+            try:
+                values = np.asarray(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                continue
+            if values.shape == times.shape:
+                self._cursor_series[data_type] = values.tolist()
+        self._cursor = TrajectoryCursor(times.tolist())
+
     def get_flight_state(self) -> FlightState:
         if self._state != FlightState.STANDBY and self.get_time_since_launch() >= self._events[FlightEvent.GROUND_HIT][0]:
             self._state = FlightState.LANDED
@@ -132,22 +302,19 @@ class RocketSim:
     def get_time_series(self, data_type: FlightDataType) -> Tuple[Iterable[float], Iterable[float]]:
         times = self._data[FlightDataType.TYPE_TIME]
         data = self._data[data_type]
-        current_time = self.get_time_since_launch()
 
-        end_index = 0
-        for i in range(len(times)):
-            if times[i] < current_time:
-                end_index = i
-            else:
-                break
-
-        return np.copy(times[:end_index+1]), np.copy(data[:end_index+1])
+        # Samples before the current time, at least the first
+        end = max(int(np.searchsorted(times, self.get_time_since_launch(), side='left')), 1)
+        return np.copy(times[:end]), np.copy(data[:end])
 
     def get_data(self, data_type: FlightDataType) -> float:
-        if self.get_flight_state() == FlightState.STANDBY:
+        if self._state == FlightState.STANDBY:  # Same as get_flight_state(), which only leaves STANDBY on launch
             return self._data[data_type][0]
-        else:
+
+        values = self._cursor_series.get(data_type)
+        if values is None:
             return np.interp(self.get_time_since_launch(), self._data[FlightDataType.TYPE_TIME], self._data[data_type])
+        return self._cursor.interpolate(self.get_time_since_launch(), values)
 
     def get_clock(self) -> Clock:
         return self._clock
@@ -162,28 +329,18 @@ class RocketSim:
         return self._main_deployment_time
 
     def _run_simulation(self):
-        # Due to JPype limitations, the JVM cannot be restarted by the same process.
-        # https://jpype.readthedocs.io/en/latest/install.html#known-bugs-limitations
-        # To work around this, we spawn a new process each time we want to run a simulation.
-        q = Queue()
-        p = Process(target=_process_simulation, args=(
-            self._ork_file,
-            self._random_seed,
-            self._drogue_deployment_time,
-            self._main_deployment_time,
-            self._drogue_component_name,
-            self._main_component_name,
-            q
-        ))
-
-        p.start()
-        result = q.get()
-        p.join()
-        p.close()
-
-        if isinstance(result, Exception):
-            raise result
-
+        # Simulated at the rounded times too, so that the cached result is exactly the one they give
+        drogue_deployment_time = simulation_cache.round_deployment_time(self._drogue_deployment_time)
+        main_deployment_time = simulation_cache.round_deployment_time(self._main_deployment_time)
+        key = simulation_cache.cache_key(self._ork_file, self._random_seed, self._drogue_component_name,
+                                         self._main_component_name, drogue_deployment_time, main_deployment_time)
+
+        result = simulation_cache.load_simulation(key) if key is not None else None
+        if result is None:
+            self._start_worker()
+            result = self._worker.simulate(self._random_seed, drogue_deployment_time, main_deployment_time)
+            if key is not None:
+                simulation_cache.store_simulation(key, *result)
         data, events = result
 
         assert events[FlightEvent.IGNITION][0] == 0
@@ -193,52 +350,75 @@ class RocketSim:
         return data, events
 
     def shutdown(self):
-        pass # TODO: Ensure that process is closed
+        if self._worker is not None:
+            self._worker.shutdown()
 
 
-def _process_simulation(
+def _run_simulation_worker(
         ork_file,
-        seed,
-        drogue_deployment_time,
-        main_deployment_time,
         drogue_component_name,
         main_component_name,
+        request_queue,
         result_queue):
+    """
+    Answers each (seed, drogue_deployment_time, main_deployment_time) request with (data, events) or an Exception, until
+    a None request.
+    """
     try:
         with OpenRocketInstance(jar_path=OPEN_ROCKET_PATH) as instance:
             try:
                 orh = Helper(instance)
 
                 doc = orh.load_doc(ork_file)
-                sim = doc.getSimulation(0)
+            except Exception as ex: # Must convert exception java string to regular string before leaving JVM
+                error = Exception(f"Error inside JVM: {ex}")
+            else:
+                error = None
 
-                # Configure
-                sim.getOptions().setRandomSeed(seed)
-                opts = sim.getOptions()
-                opts.setGeodeticComputation(orh.openrocket_core.util.GeodeticComputationStrategy.FLAT)
+            for request in iter(request_queue.get, None):
+                result_queue.put(error or _process_simulation(orh, doc, *request, drogue_component_name,
+                                                              main_component_name))
+            return  # JVM shut down on `with` statement exit
 
-                # Setup drogue
-                _setup_recovery_device(orh, sim, drogue_component_name, drogue_deployment_time)
+    except Exception as e:
+        error = Exception(f"Error starting OpenRocket: {e}")
 
-                # Setup main
-                _setup_recovery_device(orh, sim, main_component_name, main_deployment_time)
+    for _ in iter(request_queue.get, None):
+        result_queue.put(error)
 
-                orh.run_simulation(sim)
 
-                data = orh.get_timeseries(sim, list(FlightDataType))
+def _process_simulation(
+        orh,
+        doc,
+        seed,
+        drogue_deployment_time,
+        main_deployment_time,
+        drogue_component_name,
+        main_component_name):
+    try:
+        sim = doc.getSimulation(0)
 
-                events = orh.get_events(sim)
+        # Configure
+        sim.getOptions().setRandomSeed(seed)
+        opts = sim.getOptions()
+        opts.setGeodeticComputation(orh.openrocket_core.util.GeodeticComputationStrategy.FLAT)
 
-            except Exception as ex: # Must convert exception java string to regular string before leaving JVM
-                result_queue.put(Exception(f"Error inside JVM: {ex}"))
-                return
+        # Setup drogue, set for every simulation since the document is reused
+        _setup_recovery_device(orh, sim, drogue_component_name, drogue_deployment_time)
 
-    except Exception as e:
-        result_queue.put(Exception(f"Error starting OpenRocket: {e}"))
-        return
+        # Setup main
+        _setup_recovery_device(orh, sim, main_component_name, main_deployment_time)
+
+        orh.run_simulation(sim)
+
+        data = orh.get_timeseries(sim, list(FlightDataType))
+
+        events = orh.get_events(sim)
+
+    except Exception as ex: # Must convert exception java string to regular string before leaving JVM
+        return Exception(f"Error inside JVM: {ex}")
 
-    # JVM shut down on `while` statement exit
-    result_queue.put((data, events))
+    return data, events
 
 def _setup_recovery_device(orh, sim, component_name, time):
 
@@ -18,16 +18,17 @@ class SensorSim(Sensor):
         self.sensor_type = sensor_type
         self.rocket_sim = rocket_sim
         self._error_stdev = error_stdev
+        self._read_sensor = {
+            SensorType.BAROMETER: self._read_barometer,
+            SensorType.ACCELEROMETER: self._read_accelerometer,
+        }[sensor_type]
 
     def read(self) -> Tuple[float]:
         """
         :brief: return data for sensor
         :return: the sensor data
         """
-        data = {
-            SensorType.BAROMETER: self._read_barometer,
-            SensorType.ACCELEROMETER: self._read_accelerometer,
-        }[self.sensor_type]()
+        data = self._read_sensor()
 
         assert len(data) == REQUIRED_SENSOR_FLOATS[self.sensor_type]
 
@@ -0,0 +1,121 @@
+"""
+OpenRocket simulation results kept on disk, so that simulating the same flight again (every SIM start, every test)
+does not need OpenRocket. Files are named by a hash of everything that determines the result.
+"""
+import hashlib
+import os
+import zipfile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from orhelper import FlightDataType, FlightEvent
+
+from util.detail import LOCAL, LOGGER, OPEN_ROCKET_PATH
+
+SIMULATION_CACHE = os.path.join(LOCAL, "simulation_cache")
+SIMULATION_CACHE_VERSION = 1  # Of the key and file format, bump to ignore existing files
+DEPLOYMENT_TIME_DECIMALS = 6  # Deployment times are rounded to this many decimals (s), to leave out float noise
+
+_DATA_PREFIX = "data_"
+_EVENT_PREFIX = "event_"
+_NONE_SERIES = "none_series"  # Names of the series OpenRocket has no values for, np.array(None) from orhelper
+
+SimulationResult = Tuple[Dict[FlightDataType, np.ndarray], Dict[FlightEvent, List[float]]]
+
+
+def round_deployment_time(deployment_time: Optional[float]) -> Optional[float]:
+    return None if deployment_time is None else round(deployment_time, DEPLOYMENT_TIME_DECIMALS)
+
+
+def cache_key(ork_file: str, seed: int, drogue_component_name: str, main_component_name: str,
+              drogue_deployment_time: Optional[float], main_deployment_time: Optional[float]) -> Optional[str]:
+    """
+    :param ork_file: Path, its contents are part of the key
+    :type ork_file: str
+    :param drogue_deployment_time: Rounded with round_deployment_time()
+    :type drogue_deployment_time: Optional[float]
+    :param main_deployment_time: Rounded with round_deployment_time()
+    :type main_deployment_time: Optional[float]
+    :return: None if the ork file cannot be read, OpenRocket reports that
+    :rtype: Optional[str]
+    """
+    try:
+        with open(ork_file, 'rb') as f:
+            ork_hash = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+    key = (SIMULATION_CACHE_VERSION, os.path.basename(OPEN_ROCKET_PATH), ork_hash, seed, drogue_component_name,
+           main_component_name, drogue_deployment_time, main_deployment_time)
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+def load_simulation(key: str) -> Optional[SimulationResult]:
+    """
+    :param key: From cache_key()
+    :type key: str
+    :return: data, events as the simulation returned them. None if they are not cached
+    :rtype: Optional[SimulationResult]
+    """
+    path = os.path.join(SIMULATION_CACHE, key + ".npz")
+    if not os.path.exists(path):
+        return None
+
+    data = {}
+    events = {}
+    try:
+        with np.load(path) as npz:
+            for name in npz.files:
+                if name.startswith(_DATA_PREFIX):
+                    data[FlightDataType[name[len(_DATA_PREFIX):]]] = npz[name]
+                elif name.startswith(_EVENT_PREFIX):
+                    events[FlightEvent[name[len(_EVENT_PREFIX):]]] = npz[name].tolist()
+                elif name == _NONE_SERIES:
+                    data.update({FlightDataType[series]: np.array(None) for series in npz[name]})
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        LOGGER.exception(f"Ignoring unreadable cached simulation {path}")
+        return None
+
+    return data, events
+
+
+def store_simulation(key: str, data: Dict[FlightDataType, np.ndarray], events: Dict[FlightEvent, List[float]]) -> None:
+    """
+    Stores data and events unless a series is something else than numbers or None, which are only kept in memory.
+    Failing to write (read-only or full disk) is logged, the simulation is then only kept in memory too.
+
+    :param key: From cache_key()
+    :type key: str
+    :param data:
+    :type data: Dict[FlightDataType, np.ndarray]
+    :param events:
+    :type events: Dict[FlightEvent, List[float]]
+    """
+    arrays = {}
+    none_series = []
+    for data_type, values in data.items():
+        values = np.asarray(values)
+        if values.dtype.kind in 'biuf':
+            arrays[_DATA_PREFIX + data_type.name] = values
+        elif values.shape == () and values.item() is None:
+            none_series.append(data_type.name)
+        else:
+            LOGGER.warning(f"Not caching simulation with {data_type.name} of dtype {values.dtype}")
+            return
+    arrays[_NONE_SERIES] = np.array(none_series, dtype=str)
+    arrays.update({_EVENT_PREFIX + event.name: np.array(times, dtype=np.float64) for event, times in events.items()})
+
+    # Written to a temporary file first, so that an interrupted write never leaves a partial file under the key
+    path = os.path.join(SIMULATION_CACHE, key + ".npz")
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(SIMULATION_CACHE, exist_ok=True)
+        with open(temporary_path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(temporary_path, path)
+    except OSError as e:
+        LOGGER.warning(f"Not caching simulation, cannot write {path}: {e}")
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
@@ -2,6 +2,7 @@ import os
 import subprocess as sp
 import threading
 import struct
+import time
 from enum import Enum
 from pathlib import Path
 
@@ -33,6 +34,7 @@ class SimTxId(Enum):
 
 
 LOG_HISTORY_SIZE = 500
+SPEED_REPORT_INTERVAL_S = 10  # Simulated seconds per wall second are measured and logged over this many wall seconds
 
 ID_TO_SENSOR = {
     0x00: SensorType.GPS,
@@ -64,6 +66,11 @@ class SimConnection(Connection):
 
         self.bigEndianInts = None
         self.bigEndianFloats = None
+        self._sensor_structs = {}  # Number of floats: struct.Struct, once endianness is known
+
+        # Simulated seconds per wall second over the last SPEED_REPORT_INTERVAL_S, None until measured
+        self.simulated_speed: Optional[float] = None
+        self._speed_start = None  # Wall time (s), simulated time (ms) at the start of the measurement
 
         self.stdin_lock = threading.RLock()  # Since SIM Thread and Send Thread / XBee Thread both send packets
 
@@ -106,12 +113,21 @@ class SimConnection(Connection):
     def broadcast(self, data):
         self._xbee.send_to_rocket(data)
 
-    def _send_sim_packet(self, id_, data):
+    def _send_sim_packet(self, id_, data, flush=True):
+        """
+        :param flush: False for responses from the SIM thread, which flushes them before waiting on the firmware
+        :type flush: bool
+        """
         id_ = id_.to_bytes(length=1, byteorder="big")
         length = len(data).to_bytes(length=2, byteorder="big")
         packet = id_ + length + data
         with self.stdin_lock:
             self.stdin.write(packet)
+            if flush:
+                self.stdin.flush()
+
+    def _flush_responses(self):
+        with self.stdin_lock:
             self.stdin.flush()
 
     def _send_radio_sim(self, data):
@@ -150,6 +166,7 @@ class SimConnection(Connection):
         self.rocket.wait()
 
         self.thread.join()  # join thread
+        self.stdout.close()
 
     # AKA handle "Config" packet
     def _getEndianness(self):
@@ -162,6 +179,7 @@ class SimConnection(Connection):
 
         self.bigEndianInts = data[0] == 0x04
         self.bigEndianFloats = data[4] == 0xC0
+        self._sensor_structs = {}
 
         LOGGER.info(
             f"SIM: Big Endian Ints - {self.bigEndianInts}, Big Endian Floats - {self.bigEndianFloats} (device_address={self.device_address})"
@@ -181,8 +199,7 @@ class SimConnection(Connection):
         pin, value = self.stdout.read(2)
         self._hw_sim.set_pin_mode(pin, PinModes.INPUT)
 
-        self._hw_sim.digital_write(pin, value)
-        LOGGER.info(f"SIM: Pin {pin} set to {value} (device_address={self.device_address})")
+        self._hw_sim.digital_write(pin, value)  # Logged by HWSim, as are pin modes
 
     def _handlePinMode(self):
         length = self._getLength()
@@ -190,7 +207,6 @@ class SimConnection(Connection):
         pin, mode = self.stdout.read(2)
 
         self._hw_sim.set_pin_mode(pin, mode)
-        LOGGER.info(f"SIM: Mode for pin {pin} set to {mode} (device_address={self.device_address})")
 
     def _handleRadio(self):
         length = self._getLength()
@@ -207,16 +223,18 @@ class SimConnection(Connection):
         pin = self.stdout.read(length)[0]
         self._hw_sim.set_pin_mode(pin, PinModes.OUTPUT)
         result = self._hw_sim.analog_read(pin).to_bytes(2, "big")
-        self._send_sim_packet(SimTxId.ANALOG_READ.value, result)
+        self._send_sim_packet(SimTxId.ANALOG_READ.value, result, flush=False)
 
     def _handleSensorRead(self):
         length = self._getLength()
         assert length == 1
         sensor_id = self.stdout.read(length)[0]
         sensor_data = self._hw_sim.sensor_read(ID_TO_SENSOR[sensor_id])
-        endianness = ">" if self.bigEndianFloats else "<"
-        result = struct.pack(f"{endianness}{len(sensor_data)}f", *sensor_data)
-        self._send_sim_packet(SimTxId.SENSOR_READ.value, result)
+        sensor_struct = self._sensor_structs.get(len(sensor_data))
+        if sensor_struct is None:
+            endianness = ">" if self.bigEndianFloats else "<"
+            sensor_struct = self._sensor_structs[len(sensor_data)] = struct.Struct(f"{endianness}{len(sensor_data)}f")
+        self._send_sim_packet(SimTxId.SENSOR_READ.value, sensor_struct.pack(*sensor_data), flush=False)
 
     def _handleTimeUpdate(self):
         length = self._getLength()
@@ -224,7 +242,21 @@ class SimConnection(Connection):
         endianness = "big" if self.bigEndianInts else "little"
         delta_us = int.from_bytes(self.stdout.read(length), endianness)
         new_time_ms = self._hw_sim.time_update(delta_us)
-        self._send_sim_packet(SimTxId.TIME_UPDATE.value, new_time_ms.to_bytes(4, endianness))
+        self._send_sim_packet(SimTxId.TIME_UPDATE.value, new_time_ms.to_bytes(4, endianness), flush=False)
+        self._measure_speed(new_time_ms)
+
+    def _measure_speed(self, time_ms: int):
+        now = time.monotonic()
+        if self._speed_start is None:
+            self._speed_start = (now, time_ms)
+            return
+
+        start, start_time_ms = self._speed_start
+        if now - start >= SPEED_REPORT_INTERVAL_S:
+            self.simulated_speed = (time_ms - start_time_ms) / 1000 / (now - start)
+            self._speed_start = (now, time_ms)
+            LOGGER.info(f"SIM: {self.simulated_speed:.1f} simulated s per s, at {time_ms / 1000:.1f} s "
+                        f"(device_address={self.device_address})")
 
     packetHandlers = {
         # DO NOT HANDLE "CONFIG" - it should be received only once at the start
@@ -242,13 +274,16 @@ class SimConnection(Connection):
 
         try:
             while True:
+                # Responses are flushed together, once the firmware has nothing more to send until it gets them
+                if not self.stdout.num_buffered:
+                    self._flush_responses()
 
-                id = self.stdout.read(1)[0]  # Returns 0 if process was killed
+                id = self.stdout.read(1)[0]  # Raises EOFError if process was killed
 
                 if id not in SimConnection.packetHandlers:
                     LOGGER.error(f"SIM protocol violation!!! Shutting down. (device_address={self.device_address})")
                     for b in self.stdout.getHistory():
-                        LOGGER.error(hex(b[0]))
+                        LOGGER.error(hex(b))
                     LOGGER.error("^^^^ violation.")
                     return
 
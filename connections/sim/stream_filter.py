@@ -1,58 +1,107 @@
-import collections
+import binascii
 import os
+import time
+
 from util.detail import LOGS_DIR, SESSION_ID
 
 A = ord('A')
 
+READ_CHUNK_SIZE = 65536  # Encoded bytes read from the stream at most at once
+LOG_FLUSH_INTERVAL_S = 1.0  # Stream log is written in chunks and flushed at most this often
+
+_HEX_DIGITS = b'0123456789abcdef'
+
+# Each byte is sent as two nibbles in [A, A + 16), which map to and from hex digits. Anything else decodes to a
+# character that is not a hex digit, so that unhexlify raises instead of skipping or misreading it.
+_ENCODE_TABLE = bytes.maketrans(_HEX_DIGITS, bytes(range(A, A + 16)))
+_DECODE_TABLE = bytearray(b'x' * 256)
+_DECODE_TABLE[A:A + 16] = _HEX_DIGITS
+_DECODE_TABLE = bytes(_DECODE_TABLE)
+
+
 class ReadFilter:
     def __init__(self, bufstream, size: int) -> None:
         """
-        :param bufstream: Buffered stream like a subprocess stdout, that supports read() and peek().
+        Reads the stream in chunks of whatever is available, decodes them all at once and keeps the decoded bytes in a
+        buffer that read() slices from.
+
+        :param bufstream: Buffered stream like a subprocess stdout, that supports read1().
         :type bufstream: Buffered stream
         :param size: Size of in-memory circular log buffer
         :type size: int
         """
+        self.stream = bufstream
+        self.size = size
 
-        filtered_stream = self._filter(bufstream)
-
-        self.circularBuffer = collections.deque(maxlen=size)
-        self._logged_stream = self._read_and_log(filtered_stream)
+        # Decoded bytes, _position is the next one to read. The size bytes before it are the history.
+        self._buffer = bytearray()
+        self._position = 0
+        self._odd_nibble = b''  # First half of a byte split across chunks
 
-    def _read_and_log(self, stream_gen):
         self._logfilePath = os.path.join(LOGS_DIR, "streamlog_" + SESSION_ID)
-        with open(self._logfilePath, "wb") as f:
-            while True:
-                c = next(stream_gen)
-                self.circularBuffer.append(c)
-                f.write(c)
-                f.flush()
-                yield c
-
-    def _filter(self, stream):
-        while True:
-            msb = stream.read(1)[0] - A
-            lsb = stream.read(1)[0] - A
-            yield bytes([(msb << 4) | lsb])
+        self._logfile = open(self._logfilePath, "wb")
+        self._last_flush = time.monotonic()
+
+    def _fill(self) -> None:
+        chunk = self.stream.read1(READ_CHUNK_SIZE)
+        if not chunk:
+            raise EOFError("SIM stream closed")
+
+        chunk = self._odd_nibble + chunk
+        end = len(chunk) & ~1
+        self._odd_nibble = chunk[end:]
+        decoded = binascii.unhexlify(chunk[:end].translate(_DECODE_TABLE))
+
+        # Drop what was read, apart from the history, once it outweighs what is left
+        discard = self._position - self.size
+        if discard > len(self._buffer) // 2:
+            del self._buffer[:discard]
+            self._position -= discard
+        self._buffer += decoded
+
+        self._logfile.write(decoded)
+        now = time.monotonic()
+        if now - self._last_flush >= LOG_FLUSH_INTERVAL_S:
+            self._logfile.flush()
+            self._last_flush = now
+
+    @property
+    def num_buffered(self) -> int:
+        """
+        :return: Number of bytes that can be read without waiting on the stream
+        :rtype: int
+        """
+        return len(self._buffer) - self._position
 
     def read(self, number: int) -> bytes:
         """
         :param number: Number of bytes to read
         :type number: int
         :return: Bytes from stream
-        :rtype: Iterable of bytes
+        :rtype: bytes
+        :raises EOFError: If the stream closes first
+        :raises binascii.Error: If the stream has bytes outside of [A, A + 16)
         """
-        data = bytearray()
-        for _ in range(number):
-            data += next(self._logged_stream)
+        while len(self._buffer) - self._position < number:
+            self._fill()
 
-        return bytes(data)
+        end = self._position + number
+        data = bytes(self._buffer[self._position:end])
+        self._position = end
+        return data
+
+    def getHistory(self) -> bytes:
+        """
+        :return: Contents of circular buffer aka history, the last size bytes read
+        :rtype: bytes
+        """
+        return bytes(self._buffer[max(0, self._position - self.size):self._position])
 
-    def getHistory(self):
+    def close(self) -> None:
         """
-        :return: Contents of circular buffer aka history
-        :rtype: Iterable of bytes
+        Flushes and closes the stream log. The stream itself is left open.
         """
-        return self.circularBuffer
+        self._logfile.close()
 
 
 class WriteFilter:
@@ -74,14 +123,7 @@ class WriteFilter:
         :type data: bytes
         :return:
         """
-
-        for c in data:
-            msb = (c >> 4) + A
-            lsb = (c & 0x0F) + A
-
-            self.stream.write(bytes([msb]))
-            self.stream.write(bytes([lsb]))
+        self.stream.write(binascii.hexlify(data).translate(_ENCODE_TABLE))
 
     def flush(self) -> None:
         self.stream.flush()
-
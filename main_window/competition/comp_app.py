@@ -4,7 +4,7 @@ Competition app
 
 import math
 import os
-from typing import Callable, Dict
+from typing import Callable, Dict, Hashable, List, Optional, Set
 import logging
 
 from PyQt5.QtWidgets import QAction
@@ -15,11 +15,16 @@ from PIL import Image
 from connections.connection import Connection
 from profiles.label import Label
 from profiles.rocket_profile import RocketProfile
-from util.detail import LOCAL, BUNDLED_DATA, LOGGER, qtSignalLogHandler, qtHook, GIT_HASH
+from util.detail import LOCAL, LOGS_DIR, BUNDLED_DATA, LOGGER, qtSignalLogHandler, qtHook, GIT_HASH
 from util.event_stats import Event
 
+from main_window.data_entry_id import DataEntryIds
+from main_window.device_manager import DeviceType
+from main_window.flight_log import FLIGHT_LOG_EXTENSION, FlightLogError
+from main_window.live_series import LiveSeries
 from main_window.main_app import MainApp
 from main_window.mplwidget import MplWidget
+from main_window.refresh_scheduler import RefreshScheduler
 from .mapping import map_data, mapbox_utils
 from .mapping.mapping_thread import MappingThread
 from ..accel_widget import AccelWidget
@@ -32,6 +37,8 @@ Ui_MainWindow, QtBaseClass = uic.loadUiType(qtCreatorFile)
 MAP_MARKER = Image.open(mapbox_utils.MARKER_PATH).resize((12, 12), Image.LANCZOS)
 
 LABELS_UPDATED_EVENT = Event('labels_updated')
+LABELS_REFRESH_MAX_FPS = 20
+PLOTS_REFRESH_MAX_FPS = 20
 MAP_UPDATED_EVENT = Event('map_updated')
 
 
@@ -52,6 +59,8 @@ class CompApp(MainApp, Ui_MainWindow):
         self.plot_widget = AccelWidget()
         self.map_data = map_data.MapData()
         self.im = None  # Plot im
+        self.map_image = None  # Shown by im
+        self.live_series: Dict[tuple, LiveSeries] = dict()  # Of plotted series, by device and data id
 
         self.command_history = []
         self.command_history_index = None
@@ -60,6 +69,7 @@ class CompApp(MainApp, Ui_MainWindow):
         self.sendButton.clicked.connect(self.send_button_pressed)
         self.actionSave.triggered.connect(self.save_file)
         self.actionSave.setShortcut("Ctrl+S")
+        self.actionOpenFlightLog.triggered.connect(self.open_flight_log)
         self.actionReset.triggered.connect(self.reset_view)
 
         # Attach function for 'Srad GPS' action
@@ -87,7 +97,9 @@ class CompApp(MainApp, Ui_MainWindow):
         self.setup_buttons()
         self.selected_label = None
         self.setup_labels()
+        self.setup_label_refresh()
         self.label_windows = {label: None for label in self.rocket_profile.all_labels}
+        self.setup_plot_refresh()
         self.setup_subwindow().showMaximized()
         self.setup_view_menu()
         self.setWindowIcon(QtGui.QIcon(mapbox_utils.MARKER_PATH))
@@ -168,6 +180,7 @@ class CompApp(MainApp, Ui_MainWindow):
                 self.selected_label = label
                 if self.plot_widget.showing_checkboxes:
                     self.plot_widget.hide_checkboxes()
+                self.refresh_plots()
 
             return mousePressEvent
 
@@ -208,20 +221,17 @@ class CompApp(MainApp, Ui_MainWindow):
 
     def map_callback(self):
         """
-        Update map and data plots
+        Update map, time series are updated by refresh_plots()
         """
         # plot in main window
-        if self.selected_label and self.selected_label.map_fn:
-            if "GPS" in self.selected_label.name:
-                MAP_UPDATED_EVENT.increment()
-                self.selected_label.map_fn(self)
-            else:
-                self.selected_label.map_fn(self, self.plot_widget, self.selected_label)
+        if self.selected_label and self.selected_label.map_fn and "GPS" in self.selected_label.name:
+            MAP_UPDATED_EVENT.increment()
+            self.selected_label.map_fn(self)
 
         # plot in other open windows
         for label in self.label_windows:
             window = self.label_windows[label]
-            if window:
+            if window and "GPS" in label.name:
                 try:  # window may have been closed
                     label.map_fn(self, window, label)
                 except RuntimeError as e:  # catches canvas deleted exception
@@ -290,13 +300,135 @@ class CompApp(MainApp, Ui_MainWindow):
         self.zoom_in_button.clicked.connect(self.slider_dec)
         self.zoom_out_button.clicked.connect(self.slider_inc)
 
+    def setup_label_refresh(self, max_fps: float = LABELS_REFRESH_MAX_FPS) -> None:
+        """
+        Labels are refreshed at most max_fps times per second, and only those whose data changed since the last refresh.
+
+        :param max_fps:
+        :type max_fps: float
+        """
+        self.label_refresh = RefreshScheduler(self.refresh_labels, max_fps=max_fps, parent=self)
+
+        # Marked dirty by RocketData (from the read thread) as soon as their data is added
+        names_by_data = dict()
+        self.labels_on_any_data = []  # Unknown dependencies
+        for label in self.rocket_profile.labels:
+            if label.data_ids is None:
+                self.labels_on_any_data.append(label.name)
+            for data_id in label.data_ids or ():
+                names_by_data.setdefault((label.device, data_id), []).append(label.name)
+
+        for (device, data_id), names in names_by_data.items():
+            self.rocket_data.add_new_callback(device, data_id,
+                                              lambda names=names: self.label_refresh.mark_dirty(*names))
+
+        # Initial values, labels without data show as not available
+        self.refresh_labels({label.name for label in self.rocket_profile.labels})
+
+    def setup_plot_refresh(self, max_fps: float = PLOTS_REFRESH_MAX_FPS) -> None:
+        """
+        Time series plots are refreshed at most max_fps times per second, and only those whose data changed since the
+        last refresh.
+
+        :param max_fps:
+        :type max_fps: float
+        """
+        self.plot_refresh = RefreshScheduler(self.refresh_plots, max_fps=max_fps, parent=self)
+
+        # Marked dirty by RocketData (from the read thread) as soon as their data is added
+        keys = {(label.device, data_id) for label in self.rocket_profile.all_labels
+                for data_id in self.plot_data_ids(label)}
+        for device, data_id in keys:
+            self.rocket_data.add_new_callback(device, data_id,
+                                              lambda key=(device, data_id): self.plot_refresh.mark_dirty(key))
+
+        self.connect_plot_controls(self.plot_widget)
+
+    def connect_plot_controls(self, plot_widget: MplWidget) -> None:
+        """
+        Plots are redrawn as soon as what they show is changed, rather than on the next data.
+
+        :param plot_widget:
+        :type plot_widget: MplWidget
+        """
+        plot_widget.time_window_box.currentIndexChanged.connect(lambda _: self.refresh_plots())
+        for checkbox in getattr(plot_widget, "accel_checkboxes", ()):
+            checkbox.stateChanged.connect(lambda _: self.refresh_plots())
+
+    def plot_data_ids(self, label: Label) -> List[DataEntryIds]:
+        """
+        :param label:
+        :type label: Label
+        :return: Data plotted for label, none for the map
+        :rtype: List[DataEntryIds]
+        """
+        if "GPS" in label.name:
+            return []
+
+        data_ids = self.rocket_profile.label_to_data_id.get(label.name)
+        if data_ids is None:
+            return []
+        return data_ids if isinstance(data_ids, list) else [data_ids]
+
+    def get_live_series(self, device: DeviceType, data_id: DataEntryIds) -> LiveSeries:
+        """
+        :param device:
+        :type device: DeviceType
+        :param data_id:
+        :type data_id: DataEntryIds
+        :return: Kept up to date as long as the app runs, so only created the first time the series is plotted
+        :rtype: LiveSeries
+        """
+        key = (device, data_id)
+        if key not in self.live_series:
+            self.live_series[key] = LiveSeries(self.rocket_data, device, data_id)
+        return self.live_series[key]
+
+    def refresh_plots(self, keys: Optional[Set[Hashable]] = None) -> None:
+        """
+        Updates the time series plots, called by plot_refresh.
+
+        :param keys: (Optional) Device and data id of the data that changed, all plots are updated if None
+        :type keys: Set[Hashable]
+        """
+        def needs_refresh(label: Label) -> bool:
+            return label.map_fn is not None and "GPS" not in label.name and (
+                    keys is None or any((label.device, data_id) in keys for data_id in self.plot_data_ids(label)))
+
+        # plot in main window
+        if self.selected_label and needs_refresh(self.selected_label):
+            self.selected_label.map_fn(self, self.plot_widget, self.selected_label)
+
+        # plot in other open windows
+        for label in self.label_windows:
+            window = self.label_windows[label]
+            if window and needs_refresh(label):
+                try:  # window may have been closed
+                    label.map_fn(self, window, label)
+                except RuntimeError as e:  # catches canvas deleted exception
+                    self.label_windows[label] = None
+
     def receive_data(self) -> None:
         """
         This is called when new data is available to be displayed.
         :return:
         :rtype:
         """
+        self.label_refresh.mark_dirty(*self.labels_on_any_data)
+        self.label_refresh.request()
+        self.plot_refresh.request()
+
+    def refresh_labels(self, names: Set[str]) -> None:
+        """
+        Updates the text of the given labels, called by label_refresh.
+
+        :param names: Names of the labels to update
+        :type names: Set[str]
+        """
         for label in self.rocket_profile.labels:
+            if label.name not in names:
+                continue
+
             try:
                 if self.cots_gps_pressed:
                     continue  # Skip updating "gps" label when SRADS GPS button is pressed
@@ -462,6 +594,22 @@ class CompApp(MainApp, Ui_MainWindow):
 
             self.rocket_data.save(name)
 
+    def open_flight_log(self) -> None:
+        """ Load a flight log into the session """
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, 'Open Flight Log', LOGS_DIR,
+                                                        f"Flight logs (*{FLIGHT_LOG_EXTENSION})")
+        if not path:
+            return
+
+        try:
+            self.rocket_data.load(path)
+        except (FlightLogError, OSError, ValueError, KeyError) as e:
+            LOGGER.warning(f"Cannot open flight log {path}: {e}")
+            QtWidgets.QMessageBox.critical(self, "Cannot open flight log", f"{path}:\n{e}")
+            return
+
+        LOGGER.info(f"Loaded flight log {path}")
+
     def reset_view(self) -> None:
         """Reset window"""
         original_position = self.geometry().center()
@@ -538,11 +686,20 @@ class CompApp(MainApp, Ui_MainWindow):
             new_window.setAttribute(QtCore.Qt.WA_DeleteOnClose)
             new_window.setWindowTitle(f"{label.device} {label.display_name}")
             self.label_windows[label] = new_window
+            self.connect_plot_controls(new_window)
             new_window.show()
+            self.refresh_plots()
 
     def shutdown(self):
         """Close app"""
         self.save_view()
+        self.label_refresh.stop()
+        self.plot_refresh.stop()
+        stats = self.label_refresh.stats
+        LOGGER.info(f"Label refreshes: {stats.refreshes} for {stats.requests} data updates "
+                    f"({stats.coalesced_requests} coalesced, {stats.coalesced_updates} label values skipped), "
+                    f"{1000 * stats.refresh_time_total_s / max(1, stats.refreshes):.2f} ms avg, "
+                    f"{1000 * stats.refresh_time_max_s:.2f} ms max")
         self.MappingThread.shutdown()
         for window in self.label_windows.values():
             if window:
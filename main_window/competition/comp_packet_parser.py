@@ -3,10 +3,12 @@ from enum import Enum
 from io import BytesIO
 from typing import Any, Dict, List
 
+import numpy as np
+
 from util.detail import LOGGER
 from util.event_stats import Event
 from main_window.data_entry_id import DataEntryIds, DataEntryValues
-from main_window.packet_parser import PacketParser, Header
+from main_window.packet_parser import PacketParser, Header, SubpacketStruct
 
 BULK_SENSOR_EVENT = Event('bulk_sensor')
 
@@ -21,6 +23,26 @@ BITARRAY_TO_STATUS = {
     0b00000011: DataEntryValues.STATUS_CRITICAL_FAILURE,
 }
 
+# Float fields of the fixed layout subpackets, in order
+BULK_SENSOR_FLOAT_IDS = [
+    DataEntryIds.CALCULATED_ALTITUDE,
+    DataEntryIds.ACCELERATION_X,
+    DataEntryIds.ACCELERATION_Y,
+    DataEntryIds.ACCELERATION_Z,
+    DataEntryIds.ORIENTATION_1,  # TODO Remove soon?
+    DataEntryIds.ORIENTATION_2,  # TODO Remove soon?
+    DataEntryIds.ORIENTATION_3,  # TODO Remove soon?
+    DataEntryIds.LATITUDE,
+    DataEntryIds.LONGITUDE,
+]
+GPS_IDS = [DataEntryIds.LATITUDE, DataEntryIds.LONGITUDE, DataEntryIds.GPS_ALTITUDE]
+ORIENTATION_IDS = [DataEntryIds.ORIENTATION_1, DataEntryIds.ORIENTATION_2, DataEntryIds.ORIENTATION_3,
+                   DataEntryIds.ORIENTATION_4]
+
+BULK_SENSOR_STRUCT = SubpacketStruct('f' * len(BULK_SENSOR_FLOAT_IDS) + 'H')  # + state
+GPS_STRUCT = SubpacketStruct('f' * len(GPS_IDS))
+ORIENTATION_STRUCT = SubpacketStruct('f' * len(ORIENTATION_IDS))
+
 # Parser's subpacket ids, according to spec. NOT DataIds
 class SubpacketIds(Enum):
     STATUS_PING = 0x00
@@ -38,6 +60,10 @@ class CompPacketParser(PacketParser):
         self.register_packet(SubpacketIds.BULK_SENSOR.value, self.bulk_sensor)
         self.register_packet(SubpacketIds.STATUS_PING.value, self.status_ping)
 
+        self.register_batch_packet(SubpacketIds.GPS.value, GPS_STRUCT, self.gps_batch)
+        self.register_batch_packet(SubpacketIds.ORIENTATION.value, ORIENTATION_STRUCT, self.orientation_batch)
+        self.register_batch_packet(SubpacketIds.BULK_SENSOR.value, BULK_SENSOR_STRUCT, self.bulk_sensor_batch)
+
     def status_ping(self, byte_stream: BytesIO, header: Header):
         """
         Convert bit field into a series of statuses
@@ -93,19 +119,10 @@ class CompPacketParser(PacketParser):
         :return:
         :rtype:
         """
-        data: Dict[DataEntryIds, Any] = {}
-
-        data[DataEntryIds.CALCULATED_ALTITUDE] = self.fourtofloat(byte_stream.read(4))
-        data[DataEntryIds.ACCELERATION_X] = self.fourtofloat(byte_stream.read(4))
-        data[DataEntryIds.ACCELERATION_Y] = self.fourtofloat(byte_stream.read(4))
-        data[DataEntryIds.ACCELERATION_Z] = self.fourtofloat(byte_stream.read(4))
-        data[DataEntryIds.ORIENTATION_1] = self.fourtofloat(byte_stream.read(4))  # TODO Remove soon?
-        data[DataEntryIds.ORIENTATION_2] = self.fourtofloat(byte_stream.read(4))  # TODO Remove soon?
-        data[DataEntryIds.ORIENTATION_3] = self.fourtofloat(byte_stream.read(4))  # TODO Remove soon?
-        data[DataEntryIds.LATITUDE] = self.fourtofloat(byte_stream.read(4))
-        data[DataEntryIds.LONGITUDE] = self.fourtofloat(byte_stream.read(4))
-        state_data = super().state(byte_stream, header, print_state=False)
-        data[DataEntryIds.STATE] = state_data[DataEntryIds.STATE]
+        values = self.unpack(BULK_SENSOR_STRUCT, byte_stream)
+
+        data: Dict[DataEntryIds, Any] = dict(zip(BULK_SENSOR_FLOAT_IDS, values))
+        data[DataEntryIds.STATE] = self.state_from_id(values[-1], print_state=False)
 
         BULK_SENSOR_EVENT.increment()
         return data
@@ -120,12 +137,7 @@ class CompPacketParser(PacketParser):
         :return:
         :rtype:
         """
-        data = {}
-
-        data[DataEntryIds.LATITUDE] = self.fourtofloat(byte_stream.read(4))
-        data[DataEntryIds.LONGITUDE] = self.fourtofloat(byte_stream.read(4))
-        data[DataEntryIds.GPS_ALTITUDE] = self.fourtofloat(byte_stream.read(4))
-        return data
+        return dict(zip(GPS_IDS, self.unpack(GPS_STRUCT, byte_stream)))
 
     def orientation(self, byte_stream: BytesIO, header: Header):
         """
@@ -137,10 +149,28 @@ class CompPacketParser(PacketParser):
         :return:
         :rtype:
         """
-        data = {}
+        return dict(zip(ORIENTATION_IDS, self.unpack(ORIENTATION_STRUCT, byte_stream)))
 
-        data[DataEntryIds.ORIENTATION_1] = self.fourtofloat(byte_stream.read(4))
-        data[DataEntryIds.ORIENTATION_2] = self.fourtofloat(byte_stream.read(4))
-        data[DataEntryIds.ORIENTATION_3] = self.fourtofloat(byte_stream.read(4))
-        data[DataEntryIds.ORIENTATION_4] = self.fourtofloat(byte_stream.read(4))
+    def bulk_sensor_batch(self, fields: List[np.ndarray], subpacket_id: int) -> Dict[DataEntryIds, np.ndarray]:
+        """
+        Batch equivalent of bulk_sensor()
+
+        :param fields: One array per BULK_SENSOR_STRUCT field
+        :type fields: List[np.ndarray]
+        :param subpacket_id:
+        :type subpacket_id: int
+        :return: Columns
+        :rtype: Dict[DataEntryIds, np.ndarray]
+        """
+        data: Dict[DataEntryIds, np.ndarray] = {data_id: field.astype(np.float64)
+                                                 for data_id, field in zip(BULK_SENSOR_FLOAT_IDS, fields)}
+        data[DataEntryIds.STATE] = self.states_from_ids(fields[-1])
+
+        BULK_SENSOR_EVENT.increment(len(fields[-1]))
         return data
+
+    def gps_batch(self, fields: List[np.ndarray], subpacket_id: int) -> Dict[DataEntryIds, np.ndarray]:
+        return {data_id: field.astype(np.float64) for data_id, field in zip(GPS_IDS, fields)}
+
+    def orientation_batch(self, fields: List[np.ndarray], subpacket_id: int) -> Dict[DataEntryIds, np.ndarray]:
+        return {data_id: field.astype(np.float64) for data_id, field in zip(ORIENTATION_IDS, fields)}
@@ -0,0 +1,235 @@
+"""
+Ground track of each device for the map. Fixes are appended as they are received, and the track is simplified
+(Douglas-Peucker) per map zoom in web mercator pixels, a chunk at a time. Only the last chunk is simplified again when
+the track is read, so reading costs the same however many fixes were received. The line drawn only has as many points
+as its shape needs at that zoom, up to TRACK_MAX_POINTS: GPS noise can be larger than a pixel, and past that a track
+is simplified as for a lower zoom instead.
+"""
+import threading
+from functools import partial
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from main_window.device_manager import DeviceType
+from main_window.rocket_data import RocketData
+from .map_data import MapDataSource, POSITION_IDS
+from .mapbox_utils import TILE_SIZE
+
+TRACK_TOLERANCE_PX = 1.0  # Furthest a fix may be from the simplified track, in map pixels at the zoom of the map
+TRACK_CHUNK_SIZE = 256  # Fixes simplified at once
+TRACK_MAX_POINTS = 4096  # Most points a track is drawn with
+INITIAL_CAPACITY = 256
+
+
+def to_world(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Web mercator coordinates, same as MapPoint.x and MapPoint.y
+
+    :param latitudes:
+    :type latitudes: np.ndarray
+    :param longitudes:
+    :type longitudes: np.ndarray
+    :return: (N, 2) array of x, y, both within [0, 1]
+    :rtype: np.ndarray
+    """
+    siny = np.sin(np.radians(latitudes))
+    y = 0.5 - np.log((1 + siny) / (1 - siny)) / (4 * np.pi)
+    x = 0.5 + np.asarray(longitudes) / 360
+    return np.column_stack((x, y))
+
+
+def simplify(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker, using the distance to segments rather than lines so that doubling back is kept.
+
+    :param points: (N, 2)
+    :type points: np.ndarray
+    :param tolerance: Furthest a point may be from the simplified line
+    :type tolerance: float
+    :return: Indices of the points to keep, including the first and last
+    :rtype: np.ndarray
+    """
+    if len(points) <= 2:
+        return np.arange(len(points))
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        offsets = points[start + 1:end] - points[start]
+        chord = points[end] - points[start]
+        chord_length_sq = chord @ chord
+        if chord_length_sq > 0:
+            offsets = offsets - np.clip(offsets @ chord / chord_length_sq, 0, 1)[:, np.newaxis] * chord
+        distances_sq = np.einsum('ij,ij->i', offsets, offsets)
+
+        i = int(np.argmax(distances_sq))
+        if distances_sq[i] > tolerance * tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return np.flatnonzero(keep)
+
+
+class _SimplifiedTrack:
+    """
+    Track simplified for one tolerance. Fixes up to anchor are simplified once, in chunks that start and end on a fix.
+    """
+
+    def __init__(self, tolerance: float) -> None:
+        self.tolerance = tolerance
+        self.anchor = 0
+        self._vertices: np.ndarray = None  # Of the simplified chunks, ends with the anchor fix
+        self._line: Tuple[int, np.ndarray] = (0, None)  # Number of fixes and line of the last read
+
+    def line(self, points: np.ndarray) -> np.ndarray:
+        """
+        :param points: All fixes, (N, 2)
+        :type points: np.ndarray
+        :return: Simplified track, (M, 2)
+        :rtype: np.ndarray
+        """
+        if self._line[0] == len(points):
+            return self._line[1]
+
+        if self._vertices is None:
+            self._vertices = points[:1].copy()
+
+        while len(points) - 1 - self.anchor > TRACK_CHUNK_SIZE:
+            end = self.anchor + TRACK_CHUNK_SIZE
+            chunk = points[self.anchor:end + 1]
+            self._vertices = np.concatenate((self._vertices, chunk[simplify(chunk, self.tolerance)[1:]]))
+            self.anchor = end
+
+        tail = points[self.anchor:]
+        line = np.concatenate((self._vertices, tail[simplify(tail, self.tolerance)[1:]]))
+        self._line = (len(points), line)
+        return line
+
+
+class _DeviceTrack:
+    """
+    Fixes of one device from one source, in web mercator coordinates.
+    """
+
+    def __init__(self) -> None:
+        self.last_time: Optional[int] = None  # Of the last fix appended
+        self._points = np.empty((INITIAL_CAPACITY, 2), dtype=np.float64)
+        self._size = 0
+        self._simplified: Dict[int, _SimplifiedTrack] = dict()
+        self._max_zoom: Optional[int] = None  # Tracks simplified for higher zooms had too many points
+
+    @property
+    def points(self) -> np.ndarray:
+        return self._points[:self._size]
+
+    def extend(self, points: np.ndarray) -> None:
+        if self._size + len(points) > len(self._points):
+            grown = np.empty((max(2 * len(self._points), self._size + len(points)), 2), dtype=np.float64)
+            grown[:self._size] = self.points
+            self._points = grown
+
+        self._points[self._size:self._size + len(points)] = points
+        self._size += len(points)
+
+    def line(self, zoom: int) -> np.ndarray:
+        if self._max_zoom is not None:
+            zoom = min(zoom, self._max_zoom)
+
+        while True:
+            if zoom not in self._simplified:
+                self._simplified[zoom] = _SimplifiedTrack(TRACK_TOLERANCE_PX / (TILE_SIZE * 2 ** zoom))
+
+            line = self._simplified[zoom].line(self.points)
+            if len(line) <= TRACK_MAX_POINTS or zoom == 0:
+                return line
+
+            # Only gets longer, no need to keep it up to date
+            del self._simplified[zoom]
+            zoom -= 1
+            self._max_zoom = zoom
+
+
+class FlightTrack:
+    def __init__(self, rocket_data: RocketData, devices) -> None:
+        """
+        Tracks of devices, updated from the fixes received since the last read.
+
+        :param rocket_data:
+        :type rocket_data: RocketData
+        :param devices:
+        :type devices: list of rocket devices
+        """
+        self.rocket_data = rocket_data
+        self._tracks: Dict[Tuple[DeviceType, MapDataSource], _DeviceTrack] = dict()
+
+        # Callbacks only flag tracks as having new fixes, they are read when the track is
+        self._lock = threading.Lock()  # Protects _updated
+        self._updated: Set[Tuple[DeviceType, MapDataSource]] = set()
+
+        for device in devices:
+            for source, data_ids in POSITION_IDS.items():
+                for data_id in data_ids:
+                    self.rocket_data.add_new_callback(device, data_id, partial(self._on_fix, device, source))
+
+    def _on_fix(self, device: DeviceType, source: MapDataSource) -> None:
+        with self._lock:
+            self._updated.add((device, source))
+
+    def line(self, device: DeviceType, source: MapDataSource, zoom: int) -> Optional[np.ndarray]:
+        """
+        Not thread safe, used by the mapping thread only.
+
+        :param device:
+        :type device: DeviceType
+        :param source:
+        :type source: MapDataSource
+        :param zoom: Of the map tiles
+        :type zoom: int
+        :return: Track simplified for zoom, (N, 2) array of web mercator x, y. None if there are no fixes yet
+        :rtype: Optional[np.ndarray]
+        """
+        key = (device, source)
+        with self._lock:
+            is_updated = key in self._updated
+            self._updated.discard(key)
+
+        track = self._tracks.get(key)
+        if track is None:
+            track = self._tracks[key] = _DeviceTrack()
+            is_updated = True  # Fixes received before the track was first read
+
+        if is_updated:
+            self._append_fixes(track, device, source)
+
+        if len(track.points) == 0:
+            return None
+
+        return track.line(zoom)
+
+    def _append_fixes(self, track: _DeviceTrack, device: DeviceType, source: MapDataSource) -> None:
+        t_start = None if track.last_time is None else track.last_time + 1
+        latitude_id, longitude_id = POSITION_IDS[source]
+        latitude_series = self.rocket_data.series_by_device(device, latitude_id, t_start)
+        longitude_series = self.rocket_data.series_by_device(device, longitude_id, t_start)
+        if latitude_series is None or longitude_series is None:
+            return
+
+        # A fix is a latitude and a longitude received at the same time. One may arrive before the other, so the next
+        # read starts after the latest time both have
+        _, latitude_indices, longitude_indices = np.intersect1d(latitude_series[0], longitude_series[0],
+                                                                 assume_unique=True, return_indices=True)
+        latitudes = latitude_series[1][latitude_indices].astype(np.float64)
+        longitudes = longitude_series[1][longitude_indices].astype(np.float64)
+        track.last_time = int(min(latitude_series[0][-1], longitude_series[0][-1]))
+
+        # Same as the map, which skips missing (zero) positions. Poles are out of web mercator
+        is_valid = (latitudes != 0) & (longitudes != 0) & (np.abs(latitudes) < 85) & (np.abs(longitudes) < 180)
+        track.extend(to_world(latitudes[is_valid], longitudes[is_valid]))
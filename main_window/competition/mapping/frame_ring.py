@@ -0,0 +1,157 @@
+"""
+Ring of image frames in shared memory, so that map images don't get pickled through a queue between MapProcess and
+MappingThread. Only FrameSlot and FrameInfo (where to write, and what was written) go over the queues.
+"""
+from collections import namedtuple
+from multiprocessing import shared_memory
+from typing import Dict, Tuple
+
+import numpy as np
+
+from util.detail import LOGGER
+
+DEFAULT_NUM_SLOTS = 2  # Double buffered: one frame being displayed, one being written
+MAX_CHANNELS = 4  # RGBA
+
+# Where the map process should write the next frame
+FrameSlot = namedtuple('FrameSlot', ['shm_name', 'offset', 'capacity', 'sequence'])
+
+# What the map process wrote. image is only set if the frame did not fit in the slot and was sent through the queue
+FrameInfo = namedtuple('FrameInfo', ['sequence', 'shape', 'dtype', 'x_min', 'x_max', 'y_min', 'y_max', 'image'])
+
+
+def slot_size_for(width: int, height: int) -> int:
+    """
+    :return: Bytes needed for a uint8 frame of up to width x height pixels
+    :rtype: int
+    """
+    return width * height * MAX_CHANNELS
+
+
+class FrameRing:
+    """
+    Owns the shared memory, lives in the UI process. Frames returned by frame() are views into shared memory (no copy)
+    and change when that slot is written again, so the owner must not hand out a slot whose frame is still in use.
+    """
+
+    def __init__(self, slot_size: int, num_slots: int = DEFAULT_NUM_SLOTS) -> None:
+        """
+
+        :param slot_size: Bytes per frame
+        :type slot_size: int
+        :param num_slots:
+        :type num_slots: int
+        """
+        self.slot_size = slot_size
+        self.num_slots = num_slots
+        self._shm = shared_memory.SharedMemory(create=True, size=slot_size * num_slots)
+        self._buffer = np.ndarray((num_slots, slot_size), dtype=np.uint8, buffer=self._shm.buf)
+        self._is_unlinked = False
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def slot(self, index: int, sequence: int) -> FrameSlot:
+        """
+        :param index: Slot index
+        :type index: int
+        :param sequence: Sequence number of the frame to write there
+        :type sequence: int
+        :return: Description of the slot, to be sent to the writer
+        :rtype: FrameSlot
+        """
+        return FrameSlot(self._shm.name, index * self.slot_size, self.slot_size, sequence)
+
+    def slot_buffer(self, index: int) -> np.ndarray:
+        """
+        :return: Raw bytes of a slot
+        :rtype: np.ndarray
+        """
+        return self._buffer[index]
+
+    def frame(self, index: int, info: FrameInfo) -> np.ndarray:
+        """
+        :param index: Slot the frame was written to
+        :type index: int
+        :param info: Returned by the writer
+        :type info: FrameInfo
+        :return: Read-only view of the frame
+        :rtype: np.ndarray
+        """
+        dtype = np.dtype(info.dtype)
+        num_bytes = int(np.prod(info.shape)) * dtype.itemsize
+        view = self._buffer[index, :num_bytes].view(dtype).reshape(info.shape)
+        view.flags.writeable = False
+        return view
+
+    @property
+    def buffer(self) -> np.ndarray:
+        """
+        :return: Raw bytes of all slots
+        :rtype: np.ndarray
+        """
+        return self._buffer
+
+    def unlink(self) -> None:
+        """
+        Removes the shared memory's name, the OS frees it once every process has unmapped it.
+        """
+        if not self._is_unlinked:
+            self._is_unlinked = True
+            self._shm.unlink()
+
+    def close(self) -> None:
+        """
+        Unlinks and unmaps the shared memory. Frames from this ring must not be referenced anymore: NumPy views don't
+        keep the mapping alive, reading one after this crashes.
+        """
+        self.unlink()
+        self._buffer = None
+        self._shm.close()
+
+
+class FrameWriter:
+    """
+    Writer side of FrameRing, lives in the map process. Attaches to rings by name as they show up in FrameSlots.
+    """
+
+    def __init__(self) -> None:
+        self._attached: Dict[str, shared_memory.SharedMemory] = dict()
+
+    def write(self, slot: FrameSlot, image: np.ndarray, bounds: Tuple[float, float, float, float]) -> FrameInfo:
+        """
+        Copies image into slot, or sends it along with the info if it doesn't fit.
+
+        :param slot:
+        :type slot: FrameSlot
+        :param image:
+        :type image: np.ndarray
+        :param bounds: x_min, x_max, y_min, y_max
+        :type bounds: Tuple[float, float, float, float]
+        :return: To be sent back to the owner
+        :rtype: FrameInfo
+        """
+        info = FrameInfo(slot.sequence, image.shape, image.dtype.str, *bounds, image=None)
+
+        if image.nbytes > slot.capacity:
+            LOGGER.debug(f"Map frame of {image.nbytes} bytes does not fit in {slot.capacity} byte slot, sending as is")
+            return info._replace(image=image)
+
+        shm = self._attach(slot.shm_name)
+        target = np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf, offset=slot.offset)
+        target[...] = image
+        return info
+
+    def close(self) -> None:
+        for shm in self._attached.values():
+            shm.close()
+        self._attached.clear()
+
+    def _attach(self, name: str) -> shared_memory.SharedMemory:
+        shm = self._attached.get(name)
+        if shm is None:
+            # Rings are only replaced, never used again once the owner moves on to a new one
+            self.close()
+            shm = self._attached[name] = shared_memory.SharedMemory(name=name)
+        return shm
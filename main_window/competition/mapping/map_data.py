@@ -2,7 +2,12 @@ import threading
 from enum import Enum, auto
 from collections import namedtuple
 
-MapDataValue = namedtuple('MapDataValue', ('zoom', 'radius', 'image', 'mark', 'text'))
+import numpy as np
+
+from main_window.data_entry_id import DataEntryIds
+
+# track: flight track of each device, as (N, 2) arrays of image pixel coordinates
+MapDataValue = namedtuple('MapDataValue', ('zoom', 'radius', 'image', 'mark', 'text', 'track'), defaults=((),))
 
 class MapData:
     def __init__(self) -> None:
@@ -11,6 +16,7 @@ class MapData:
         """
         self.lock = threading.Lock()
         self.value: MapDataValue = None
+        self.displayed: MapDataValue = None  # Last value handed out by get_map_value(), its image may still be in use
 
     def get_map_value(self) -> MapDataValue:
         """
@@ -20,8 +26,39 @@ class MapData:
         :rtype:
         """
         with self.lock:
+            self.displayed = self.value
             return self.value
 
+    def uses_buffer(self, buffer: np.ndarray) -> bool:
+        """
+        :param buffer:
+        :type buffer: np.ndarray
+        :return: True if the stored or displayed image may be a view of buffer
+        :rtype: bool
+        """
+        with self.lock:
+            return any(value is not None and np.may_share_memory(value.image, buffer)
+                       for value in (self.value, self.displayed))
+
+    def release_buffer(self, buffer: np.ndarray) -> bool:
+        """
+        Must be called before overwriting a buffer that images may be views of (see FrameRing).
+
+        :param buffer:
+        :type buffer: np.ndarray
+        :return: False if the displayed image uses buffer. Otherwise True, and the stored value no longer uses it either,
+                 falling back to the displayed value if it had not been read yet.
+        :rtype: bool
+        """
+        with self.lock:
+            if self.displayed is not None and np.may_share_memory(self.displayed.image, buffer):
+                return False
+
+            if self.value is not None and np.may_share_memory(self.value.image, buffer):
+                self.value = self.displayed
+
+            return True
+
     def set_map_value(self, value: MapDataValue) -> None:
         """
         Set the value
@@ -35,3 +72,10 @@ class MapData:
 class MapDataSource(Enum):
     SRAD = auto()
     COTS = auto()
+
+
+# Latitude and longitude ids of each source
+POSITION_IDS = {
+    MapDataSource.SRAD: (DataEntryIds.LATITUDE, DataEntryIds.LONGITUDE),
+    MapDataSource.COTS: (DataEntryIds.NMEA_LATITUDE, DataEntryIds.NMEA_LONGITUDE),
+}
@@ -1,9 +1,14 @@
 import concurrent.futures
+import io
 import math
 import os
+import threading
+import urllib.error
+import urllib.request
+from collections import OrderedDict, namedtuple
 from sys import platform
 import time
-from typing import Any, Optional
+from typing import Any, Hashable, Optional
 from abc import ABC, abstractmethod
 
 import mapbox
@@ -11,15 +16,35 @@ import numpy as np
 from matplotlib import pyplot as plt
 
 from util.detail import LOCAL, BUNDLED_DATA, LOGGER
+from .tile_store import FileTileStore, SqliteTileStore, TileStore, migrate_tiles
 
 TILE_SIZE = 512
 
+TILE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # ~340 decoded 512x512 RGB tiles
+STITCHED_MAP_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+# Also keep stitched maps on disk as .npy (lossless, no decoding), so they survive restarts. Off by default: they are
+# uncompressed (~78 MB for a 10x10 grid) and never evicted, STITCHED_MAP_CACHE covers reuse within a session
+SAVE_STITCHED_MAPS = False
+TILE_DECODE_WORKERS = 4  # Tiles missing from TILE_CACHE are decoded concurrently (up to one per CPU), decoding releases the GIL
+
+# Set (to 1) to only use tiles already in MAPBOX_CACHE, e.g. at a launch site seeded with tile_seeder. It is read from
+# the environment so that MapProcess gets it too
+OFFLINE_MAPS_ENV = "GROUND_STATION_OFFLINE_MAPS"
+OFFLINE_MAPS = os.environ.get(OFFLINE_MAPS_ENV, "") == "1"
+
+TILE_FETCH_TIMEOUT_S = 10
+
 MARKER_PATH = os.path.join(BUNDLED_DATA, "qt_files", "marker.png")
 
 MAPBOX_CACHE = os.path.join(LOCAL, "mapbox_cache")
 if not os.path.exists(MAPBOX_CACHE):
     os.mkdir(MAPBOX_CACHE)
 
+TILE_STORE_NAME = "tiles.mbtiles"  # In MAPBOX_CACHE
+TILE_STORE: Optional[TileStore] = None  # Opened on first use, see getTileStore()
+_tile_store_lock = threading.Lock()
+
 
 def readKey() -> Optional[str]:
     """Reads MapBox API key from apikey.txt.
@@ -45,6 +70,24 @@ if platform == 'darwin':
     os.environ['NO_PROXY'] = '*'
 
 
+def getTileStore() -> TileStore:
+    """
+    Opens the tile store in MAPBOX_CACHE the first time, moving tiles from the older one file per tile layout into it.
+
+    :return: Where downloaded tiles are kept
+    :rtype: TileStore
+    """
+    global TILE_STORE
+    with _tile_store_lock:
+        if TILE_STORE is None:
+            store = SqliteTileStore(os.path.join(MAPBOX_CACHE, TILE_STORE_NAME))
+            if store.get_metadata("migrated") is None:
+                migrate_tiles(FileTileStore(os.path.join(MAPBOX_CACHE, "raw")), store)
+                store.set_metadata("migrated", "1")
+            TILE_STORE = store
+        return TILE_STORE
+
+
 def convertImage(image):
     # If image loaded is a png, data is stored as a float matrix
     # Convert to integer matrix instead
@@ -59,6 +102,113 @@ def convertImage(image):
         return image
     
     
+class TileCacheStats(namedtuple('TileCacheStats', ['hits', 'misses', 'evictions', 'entries', 'nbytes'])):
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / max(1, self.hits + self.misses)
+
+
+class TileCache:
+    """
+    Thread safe LRU cache of decoded images (tiles or stitched maps), bounded by bytes. Cached images are read-only
+    since they are shared.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        """
+
+        :param max_bytes: Least recently used images are evicted past this
+        :type max_bytes: int
+        """
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._images: OrderedDict = OrderedDict()
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        """
+        :param key:
+        :type key: Hashable
+        :return: Cached image, None on a miss
+        :rtype: Optional[np.ndarray]
+        """
+        with self._lock:
+            image = self._images.get(key)
+            if image is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, key: Hashable, image: np.ndarray) -> np.ndarray:
+        """
+        :param key:
+        :type key: Hashable
+        :param image:
+        :type image: np.ndarray
+        :return: image, made read-only
+        :rtype: np.ndarray
+        """
+        image.flags.writeable = False
+        if image.nbytes > self.max_bytes:
+            return image
+
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self._nbytes -= old.nbytes
+
+            self._images[key] = image
+            self._nbytes += image.nbytes
+
+            while self._nbytes > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+                self._evictions += 1
+
+        return image
+
+    def contains(self, key: Hashable) -> bool:
+        """
+        Same as get() but doesn't count as a hit or miss, nor as a use.
+
+        :param key:
+        :type key: Hashable
+        :return:
+        :rtype: bool
+        """
+        with self._lock:
+            return key in self._images
+
+    def clear(self) -> None:
+        """
+        Drops all images and resets stats.
+        """
+        with self._lock:
+            self._images.clear()
+            self._nbytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def stats(self) -> TileCacheStats:
+        """
+        :return: Counters since construction or clear()
+        :rtype: TileCacheStats
+        """
+        with self._lock:
+            return TileCacheStats(self._hits, self._misses, self._evictions, len(self._images), self._nbytes)
+
+
+# Process wide, so tiles decoded for one map are reused by the next ones (map is stitched in MapProcess)
+TILE_CACHE = TileCache(TILE_CACHE_MAX_BYTES)
+
+# Stitched maps by TileGrid, for when the same area is requested again
+STITCHED_MAP_CACHE = TileCache(STITCHED_MAP_CACHE_MAX_BYTES)
+
+
 class AbstractPoint(ABC):
     @abstractmethod
     def __repr__(self) -> str:
@@ -499,6 +649,63 @@ class AbsoluteText(AbstractText):
         return 0
 
 
+class TileSource(ABC):
+    """
+    Where missing tiles are fetched from
+    """
+
+    @abstractmethod
+    def fetch(self, tile: 'MapTile') -> Optional[bytes]:
+        """
+        :param tile:
+        :type tile: MapTile
+        :return: Encoded (jpeg) image, None if the tile isn't available
+        :rtype: Optional[bytes]
+        """
+        raise NotImplementedError()
+
+
+class MapboxTileSource(TileSource):
+    def __init__(self, mapbox_maps: Optional[mapbox.Maps] = None) -> None:
+        """
+
+        :param mapbox_maps: Defaults to the instance using apikey.txt
+        :type mapbox_maps: Optional[mapbox.Maps]
+        """
+        self.maps = mapbox_maps
+
+    def fetch(self, tile: 'MapTile') -> Optional[bytes]:
+        mapbox_maps = maps if self.maps is None else self.maps
+        if mapbox_maps is None:
+            return None
+
+        response = mapbox_maps.tile("mapbox.satellite", tile.x, tile.y, tile.s, retina=True)
+        return response.content if response.status_code == 200 else None
+
+
+class UrlTileSource(TileSource):
+    def __init__(self, url_template: str, timeout: float = TILE_FETCH_TIMEOUT_S) -> None:
+        """
+
+        :param url_template: With {x}, {y} and {s} (zoom) placeholders, e.g. http://localhost:8000/{s}/{x}/{y}.jpg
+        :type url_template: str
+        :param timeout: Seconds
+        :type timeout: float
+        """
+        self.url_template = url_template
+        self.timeout = timeout
+
+    def fetch(self, tile: 'MapTile') -> Optional[bytes]:
+        url = self.url_template.format(x=tile.x, y=tile.y, s=tile.s)
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as ex:
+            if ex.code == 404:
+                return None
+            raise
+
+
 class MapTile:
     def __init__(self, x: int, y: int, s: int):
         """
@@ -524,6 +731,10 @@ class MapTile:
     def __eq__(self, other: Any) -> bool:
         return self.x == other.x and self.y == other.y and self.s == other.s
 
+    @property
+    def key(self):
+        return self.x, self.y, self.s
+
     def getImage(self, overwrite: bool = False) -> np.ndarray:
         """
 
@@ -532,39 +743,60 @@ class MapTile:
         :return:
         :rtype: numpy.ndarray
         """
-        raw = os.path.join(MAPBOX_CACHE, "raw")
-        if not os.path.isdir(raw):
-            os.mkdir(raw)
-        scalefolder = os.path.join(raw, str(self.s))
-        if not os.path.isdir(scalefolder):
-            os.mkdir(scalefolder)
-
-        impath = os.path.join(scalefolder, str(self) + ".jpg")
+        if not overwrite:
+            image = TILE_CACHE.get(self.key)
+            if image is not None:
+                self.is_tile_not_blank = True
+                return image
 
-        if ((not os.path.exists(impath)) or overwrite) and not (maps is None):
-            response = maps.tile(
-                "mapbox.satellite", self.x, self.y, self.s, retina=True
-            )
-            if response.status_code == 200:
-                with open(impath, "wb") as output:
-                    output.write(response.content)
-                    # LOGGER.debug(f"x: {str(self.x)}, y: {str(self.y)}, s: {str(self.s)}\n")
+        store = getTileStore()
+        if (overwrite or not store.contains(self.key)) and not (maps is None) and not OFFLINE_MAPS:
+            self.download(MapboxTileSource())
 
-        if os.path.isfile(impath):
+        data = store.get(self.key)
+        if data is not None:
             self.is_tile_not_blank = True
-            return convertImage(plt.imread(impath, "jpeg"))
+            return TILE_CACHE.put(self.key, convertImage(plt.imread(io.BytesIO(data), "jpeg")))
         else:
             return np.zeros((TILE_SIZE, TILE_SIZE, 3), dtype=np.uint8) # np generates float by default, pillow doesnt support that
 
+    def fetch(self, source: TileSource) -> Optional[bytes]:
+        """
+
+        :param source:
+        :type source: TileSource
+        :return: Encoded tile, None if it isn't available or fetching failed
+        :rtype: Optional[bytes]
+        """
+        try:
+            return source.fetch(self)
+        except Exception as ex:
+            LOGGER.warning(f"Failed to fetch tile {repr(self)}: {ex}")
+            return None
+
+    def download(self, source: TileSource) -> bool:
+        """
+        Fetches the tile from source and stores it.
+
+        :param source:
+        :type source: TileSource
+        :return: True if stored, False if the tile isn't available or fetching failed
+        :rtype: bool
+        """
+        content = self.fetch(source)
+        if content is None:
+            return False
+
+        getTileStore().put(self.key, content)
+        return True
+
     def imageExists(self) -> bool:
         """
 
-        :return:
+        :return: True if the tile is in the tile store
         :rtype: bool
         """
-        return os.path.isfile(
-            os.path.join(MAPBOX_CACHE, "raw", str(self.s), str(self) + ".png")
-        )
+        return getTileStore().contains(self.key)
 
 
 class TileGrid:
@@ -636,6 +868,9 @@ class TileGrid:
         :param overwrite:
         :type overwrite: bool
         """
+        if OFFLINE_MAPS:
+            return
+
         LOGGER.debug(f"Beginning download of size {str(self.scale)} tiles.")
         t1 = time.perf_counter()
 
@@ -656,57 +891,61 @@ class TileGrid:
 
         :param overwrite:
         :type overwrite: bool
-        :return:
+        :return: Read-only if it came from or went into STITCHED_MAP_CACHE
         :rtype: numpy.ndarray
         """
+        key = str(self)
+        if not overwrite:
+            img = STITCHED_MAP_CACHE.get(key)
+            if img is not None:
+                return img
 
-        def appendv(A, B):
-            if A is None:
-                return B
-            elif B is None:
-                return A
-            else:
-                return np.vstack((A, B))
+        out = os.path.join(MAPBOX_CACHE, "out")
+        outfile = os.path.join(out, f"output_{key}.npy")
+        is_saved = SAVE_STITCHED_MAPS and os.path.isfile(outfile)
 
-        def appendh(A, B):
-            if A is None:
-                return B
-            elif B is None:
-                return A
-            else:
-                return np.column_stack((A, B))
+        # Stitching decoded tiles from memory is cheaper than loading the saved map
+        is_cached = not overwrite and all(TILE_CACHE.contains(j.key) for i in self.ta for j in i)
 
-        out = os.path.join(MAPBOX_CACHE, "out")
-        if not os.path.isdir(out):
-            os.mkdir(out)
+        if is_saved and not overwrite and not is_cached:
+            LOGGER.debug(f"Found size {str(self.scale)} map!")
+            return STITCHED_MAP_CACHE.put(key, np.load(outfile))
 
-        outfile = os.path.join(out, f"output_{str(self)}.png")
+        LOGGER.debug(f"Generating size {str(self.scale)} map!")
+        t1 = time.perf_counter()
 
-        if (not os.path.isfile(outfile)) or overwrite:
-            LOGGER.debug(f"Generating size {str(self.scale)} map!")
+        # Tiles are copied straight into their place, rather than concatenated row by row
+        img = np.empty((self.height * TILE_SIZE, self.width * TILE_SIZE, 3), dtype=np.uint8)
 
-            t1 = time.perf_counter()
+        def placeTile(position):
+            y, x, j = position
+            tile = j.getImage(overwrite=overwrite)
+            img[y * TILE_SIZE:(y + 1) * TILE_SIZE, x * TILE_SIZE:(x + 1) * TILE_SIZE] = tile[:, :, :3]
 
-            is_img_not_blank = False
-            img = None
-            for i in self.ta:
-                row = None
-                for j in i:
-                    row = appendh(row, j.getImage(overwrite=overwrite))
-                    if j.is_tile_not_blank is True:
-                        is_img_not_blank = True
+        positions = [(y, x, j) for y, i in enumerate(self.ta) for x, j in enumerate(i)]
+        workers = min(TILE_DECODE_WORKERS, len(positions), os.cpu_count() or 1)
+        if is_cached or workers <= 1:
+            for position in positions:
+                placeTile(position)
+        else:
+            # Each tile goes into its own part of img
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                for _ in executor.map(placeTile, positions):
+                    pass  # Raises what placeTile raised
 
-                img = appendv(img, row)
+        is_img_not_blank = any(j.is_tile_not_blank is True for i in self.ta for j in i)
 
-            if is_img_not_blank is True:
-                plt.imsave(outfile, img)
+        if is_img_not_blank is True:
+            if SAVE_STITCHED_MAPS and (not is_saved or overwrite):
+                os.makedirs(out, exist_ok=True)
+                np.save(outfile, img)
+            STITCHED_MAP_CACHE.put(key, img)
 
-            t2 = time.perf_counter()
-            LOGGER.debug(f"Successfully generated size {str(self.scale)} map in {t2 - t1} seconds.")
-            return img
-        else:
-            LOGGER.debug(f"Found size {str(self.scale)} map!")
-            return convertImage(plt.imread(outfile, "jpeg"))
+        t2 = time.perf_counter()
+        stats = TILE_CACHE.stats()
+        LOGGER.debug(f"Successfully generated size {str(self.scale)} map in {t2 - t1} seconds. Tile cache hit rate "
+                     f"{stats.hit_rate:.1%} ({stats.hits} hits, {stats.misses} misses, {stats.evictions} evictions)")
+        return img
 
 
 def pointToTile(p: MapPoint, s: int) -> MapTile:
@@ -1,7 +1,9 @@
 import math
+import queue
 import threading
 import time
 import multiprocessing
+from collections import namedtuple
 
 from PyQt5 import QtCore
 from PyQt5.QtCore import pyqtSignal
@@ -12,16 +14,141 @@ from main_window.data_entry_id import DataEntryIds
 from main_window.rocket_data import RocketData
 from profiles.rocket_profile import RocketProfile
 from . import mapbox_utils
-from .map_data import MapData, MapDataValue, MapDataSource
+from .flight_track import FlightTrack
+from .frame_ring import FrameRing, FrameWriter, FrameSlot, FrameInfo, slot_size_for
+from .map_data import MapData, MapDataValue, MapDataSource, POSITION_IDS
 from util.detail import LOGGER
 
-from typing import Tuple
+from typing import Callable, Optional, Tuple
 
 # Scaling is linear so a scale factor of 1 means no scaling (aka 1*x=x)
 SCALE_FACTOR_NO_SCALE = 1
 
 DEFAULT_RADIUS = 0.1  # Radius in km defining region to be shown in map
 DEFAULT_ZOOM = 20  # Scale factor for map tiles
+VIEW_REUSE_MARGIN = 0.1  # Fraction of the map on each side where devices must not be for it to be reused
+MIN_UPDATE_INTERVAL_S = 0.5  # Prevents update spam
+RENDER_POLL_INTERVAL_S = 0.01  # How often the mapping thread checks for a finished render
+
+# Last rendered map and what it was rendered for. The image is reused while devices stay inside its bounds
+MapView = namedtuple('MapView', ['desired_size', 'map_zoom', 'radius', 'zoom', 'image', 'x_min', 'x_max', 'y_min',
+                                 'y_max'])
+
+RenderRequest = namedtuple('RenderRequest', ['sequence', 'p0', 'p1', 'p2', 'zoom', 'desired_size'])
+
+
+class MapRenderService:
+    """
+    Renders maps in MapProcess, latest request first. Only one render is sent at a time. Requests submitted meanwhile
+    supersede it: MapProcess cancels it at its next step, its result is dropped, and only the latest of those requests
+    is sent next. Not thread safe, used by the mapping thread only.
+    """
+
+    def __init__(self, acquire_frame_slot: Callable[[Tuple[int, int], int], FrameSlot]) -> None:
+        """
+
+        :param acquire_frame_slot: Called with the desired size and sequence of a request when it is sent, returns where
+                                   MapProcess should write the frame
+        :type acquire_frame_slot: Callable[[Tuple[int, int], int], FrameSlot]
+        """
+        self._acquire_frame_slot = acquire_frame_slot
+        self._sequence = 0
+        self._in_flight: Tuple[RenderRequest, FrameSlot] = None
+        self._pending: RenderRequest = None
+        self.num_sent = 0
+        self.num_superseded = 0
+        self.num_failed = 0
+
+        self.resultQueue = multiprocessing.Queue()
+        self.requestQueue = multiprocessing.Queue()
+        self.latest_sequence = multiprocessing.Value('q', 0)  # Older renders are cancelled by MapProcess
+        self.process = multiprocessing.Process(target=processMap,
+                                               args=(self.requestQueue, self.resultQueue, self.latest_sequence),
+                                               daemon=True, name="MapProcess")
+        self.process.start()
+
+    @property
+    def is_busy(self) -> bool:
+        """
+        :return: True if a result is expected, receive() needs to be called
+        :rtype: bool
+        """
+        return self._in_flight is not None
+
+    def submit(self, p0: mapbox_utils.MapPoint, p1: mapbox_utils.MapPoint, p2: mapbox_utils.MapPoint, zoom: int,
+               desired_size: Tuple[int, int]) -> RenderRequest:
+        """
+        Supersedes all previous requests.
+
+        :return: The request, sent now or when the render in flight is done
+        :rtype: RenderRequest
+        """
+        self._sequence += 1
+        request = RenderRequest(self._sequence, p0, p1, p2, zoom, desired_size)
+        self.latest_sequence.value = request.sequence
+
+        if self._pending is not None:
+            self.num_superseded += 1  # Never sent
+        if self._in_flight is None:
+            self._send(request)
+        else:
+            self._pending = request
+        return request
+
+    def receive(self, timeout: float = 0) -> Optional[Tuple[RenderRequest, FrameSlot, FrameInfo]]:
+        """
+        :param timeout: Seconds to wait for the render in flight
+        :type timeout: float
+        :return: Result of the latest request, once. None if it isn't done, failed or was superseded
+        :rtype: Optional[Tuple[RenderRequest, FrameSlot, FrameInfo]]
+        """
+        if self._in_flight is None:
+            return None
+
+        try:
+            result = self.resultQueue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        request, frame_slot = self._in_flight
+        self._in_flight = None
+        if self._pending is not None:
+            # Nothing uses the frame of the render that just finished, it was superseded by this one
+            self._send(self._pending)
+            self._pending = None
+
+        if request.sequence != self._sequence:
+            self.num_superseded += 1
+            return None
+
+        if not result:
+            self.num_failed += 1
+            return None
+
+        if result.sequence != frame_slot.sequence:
+            LOGGER.error(f"Expected map frame {frame_slot.sequence}, got {result.sequence}")
+            self.num_failed += 1
+            return None
+
+        return request, frame_slot, result
+
+    def _send(self, request: RenderRequest) -> None:
+        frame_slot = self._acquire_frame_slot(request.desired_size, request.sequence)
+        self.requestQueue.put_nowait((request.p0, request.p1, request.p2, request.zoom, request.desired_size,
+                                      frame_slot))
+        self._in_flight = (request, frame_slot)
+        self.num_sent += 1
+
+    def shutdown(self) -> None:
+        self.requestQueue.put(None)
+
+        self.resultQueue.cancel_join_thread()
+        self.requestQueue.cancel_join_thread()
+
+        self.process.join()
+        self.process.close()
+        self.resultQueue.close()
+        self.requestQueue.close()
 
 
 class MappingThread(QtCore.QThread):
@@ -55,6 +182,7 @@ class MappingThread(QtCore.QThread):
         self._desiredMapSize: Tuple[int, int] = None  # Lock in cv is used to protect this
         self.map_zoom = 1
         self._is_shutting_down = False  # Lock in cv is used to protect this
+        self._is_notified = False  # Lock in cv is used to protect this
 
         # Condition variable to watch for notification of new lat and lon
         self.cv = threading.Condition()  # Uses RLock inside when none is provided
@@ -74,10 +202,18 @@ class MappingThread(QtCore.QThread):
         # Running the CPU bound tasks in a separate process gets around the GIL problems but introduces some additional
         # IPC complexities (i.e. the queue)
         # Might be able to turn MappingThread into a QProcess so that we dont need both a thread and a process
-        self.resultQueue = multiprocessing.Queue()
-        self.requestQueue = multiprocessing.Queue()
-        self.map_process = multiprocessing.Process(target=processMap, args=(self.requestQueue, self.resultQueue), daemon=True, name="MapProcess")
-        self.map_process.start()
+
+        # Images come back through shared memory, the queues only carry small requests and FrameInfo
+        self.frame_ring: FrameRing = None
+        self._retired_frame_rings = []  # Replaced by a bigger ring, but frames may still be displayed
+        self._next_frame_slot = 0
+        self._view: MapView = None  # Displayed
+        self._requested_view: MapView = None  # Being rendered, without image
+        self._positions = (dict(), dict())  # Latest latitudes and longitudes, for marks on renders when they are done
+        self.render_service = MapRenderService(self._acquire_frame_slot)
+        self.map_process = self.render_service.process
+
+        self.flight_track = FlightTrack(self.rocket_data, self.devices)
 
         # Must be done last to prevent race condition
         for device in self.viewed_devices:
@@ -89,6 +225,7 @@ class MappingThread(QtCore.QThread):
 
         """
         with self.cv:
+            self._is_notified = True
             self.cv.notify()
             
     def setDataSource(self, dataSource: MapDataSource) -> None:
@@ -160,17 +297,86 @@ class MappingThread(QtCore.QThread):
     # Draw and show the map on the UI
     def plotMap(self, latitudes, longitudes, radius: float):
         """
+        Only marks and text are updated if the devices are still well inside the last map. Otherwise a new map is
+        requested from the map process, see receiveRender().
 
         :param latitudes:
         :type latitudes: dict[device, float]
         :param longitudes:
         :type longitudes: dict[device, float]
-        :return:
-        :rtype:
+        :return: True if the map was updated
+        :rtype: bool
         """
         if len(latitudes) == 0:
             return False
 
+        desiredSize = self.getDesiredMapSize()  # x,y
+        if not desiredSize:
+            return False
+
+        self._positions = (latitudes, longitudes)
+        if self._view_covers(self._view, latitudes, longitudes, radius, desiredSize):
+            self.map.set_map_value(self._map_value(self._view, latitudes, longitudes))
+            return True
+
+        if not self._view_covers(self._requested_view, latitudes, longitudes, radius, desiredSize):
+            self._request_render(latitudes, longitudes, radius, desiredSize)
+        return False
+
+    def receiveRender(self, timeout: float = 0) -> bool:
+        """
+        Displays the latest requested map if it's done rendering.
+
+        :param timeout: Seconds to wait for it
+        :type timeout: float
+        :return: True if the map was updated
+        :rtype: bool
+        """
+        received = self.render_service.receive(timeout)
+        if received is None:
+            if not self.render_service.is_busy:
+                self._requested_view = None  # Failed, requested again by the next plotMap()
+            return False
+
+        request, frame_slot, result = received
+        if result.image is None:
+            # Zero copy, the image is read straight out of shared memory. Rings are only replaced when nothing is in flight
+            resizedMapImage = self.frame_ring.frame(frame_slot.offset // self.frame_ring.slot_size, result)
+        else:
+            resizedMapImage = result.image
+
+        self._view = self._requested_view._replace(image=resizedMapImage, x_min=result.x_min, x_max=result.x_max,
+                                                   y_min=result.y_min, y_max=result.y_max)
+        self._requested_view = None
+
+        latitudes, longitudes = self._positions
+        self.map.set_map_value(self._map_value(self._view, latitudes, longitudes))
+        return True
+
+    def _view_covers(self, view: Optional[MapView], latitudes, longitudes, radius: float,
+                     desired_size: Tuple[int, int]) -> bool:
+        """
+        :return: True if the devices are all inside view (not within VIEW_REUSE_MARGIN of its edges) and it was rendered
+                 for the same settings
+        :rtype: bool
+        """
+        if view is None or (view.desired_size, view.map_zoom, view.radius) != (desired_size, self.map_zoom, radius):
+            return False
+
+        x_margin = VIEW_REUSE_MARGIN * (view.x_max - view.x_min)
+        y_margin = VIEW_REUSE_MARGIN * (view.y_max - view.y_min)
+        for device in latitudes.keys():
+            p = mapbox_utils.MapPoint(latitudes[device], longitudes[device])
+            if not (view.x_min + x_margin <= p.x <= view.x_max - x_margin and
+                    view.y_min + y_margin <= p.y <= view.y_max - y_margin):
+                return False
+
+        return True
+
+    def _request_render(self, latitudes, longitudes, radius: float, desired_size: Tuple[int, int]) -> None:
+        """
+        Has the map process render a map around the devices, superseding any render not done yet.
+        """
         #Calculate average of device points
         avg_latitude = sum(latitudes.values())/len(latitudes)
         avg_longitude = sum(longitudes.values()) / len(longitudes)
@@ -192,26 +398,32 @@ class MappingThread(QtCore.QThread):
         lon2 = avg_longitude + (max_long_diff + radius / 111.320 / math.cos(lat2 * math.pi / 180.0))*self.map_zoom
         p2 = mapbox_utils.MapPoint(lat2, lon2)  # Map corner 2
 
-        desiredSize = self.getDesiredMapSize()  # x,y
-        if not desiredSize:
-            return False
-
         #Find zoom s.t. approximately 2x2 tiles are downloaded
         lon_zoom = math.floor(math.log2(2 / (abs(p1.x - p2.x))))
         lat_zoom = math.floor(math.log2(2 / (abs(p1.y - p2.y))))
         zoom = min(DEFAULT_ZOOM, lat_zoom, lon_zoom)
 
-        self.requestQueue.put_nowait((p0, p1, p2, zoom, desiredSize))
+        self.render_service.submit(p0, p1, p2, zoom, desired_size)
+        # The map process crops the map to the corners
+        self._requested_view = MapView(desired_size, self.map_zoom, radius, zoom, None, min(p1.x, p2.x),
+                                       max(p1.x, p2.x), min(p1.y, p2.y), max(p1.y, p2.y))
 
-        # NOTE: Passing numpy arrays through any sort of IPC other than plane old shared memory will result in the data
-        # being "pickled" and un-"pickled". This uses more processing time than just using shared memory. Since we're
-        # not worried about sync safety here, shared memory might be faster... but also harder to implement.
-        result = self.resultQueue.get()
-
-        if not result:
-            return False
+    def _map_value(self, view: MapView, latitudes, longitudes) -> MapDataValue:
+        """
+        :return: view with marks, tracks and text for the devices
+        :rtype: MapDataValue
+        """
+        resizedMapImage = view.image
+        xMin, xMax, yMin, yMax = view.x_min, view.x_max, view.y_min, view.y_max
 
-        (resizedMapImage, xMin, xMax, yMin, yMax) = result
+        # Tracks are simplified for the zoom of the tiles, which are never scaled up
+        track = []
+        for device in latitudes.keys():
+            line = self.flight_track.line(device, self.data_source, view.zoom)
+            if line is not None and len(line) > 1:
+                x = (line[:, 0] - xMin) * (resizedMapImage.shape[1] / (xMax - xMin))
+                y = (line[:, 1] - yMin) * (resizedMapImage.shape[0] / (yMax - yMin))
+                track.append(np.column_stack((x, y)))
 
         # Update mark coordinates
         marks = [] #list of device locations
@@ -261,9 +473,56 @@ class MappingThread(QtCore.QThread):
             )
             text.append(rs)
 
-        map_data_value = MapDataValue(zoom=zoom, radius=radius, image=resizedMapImage, mark=marks, text=text)
-        self.map.set_map_value(map_data_value)
+        return MapDataValue(zoom=view.zoom, radius=view.radius, image=resizedMapImage, mark=marks, text=text,
+                            track=track)
+
+    def _acquire_frame_slot(self, desired_size: Tuple[int, int], sequence: int) -> FrameSlot:
+        """
+        Picks where the map process writes the next frame: a slot that the image being displayed does not use. The ring
+        is replaced by a bigger one if frames of desired_size would not fit.
+
+        :param desired_size:
+        :type desired_size: Tuple[int, int]
+        :param sequence: Of the frame
+        :type sequence: int
+        :return: Slot to send to the map process
+        :rtype: FrameSlot
+        """
+        slot_size = slot_size_for(*desired_size)
+        if self.frame_ring is None or self.frame_ring.slot_size < slot_size:
+            if self.frame_ring is not None:
+                # Grow geometrically so that dragging the window bigger doesn't reallocate on every frame
+                slot_size = max(slot_size, 2 * self.frame_ring.slot_size)
+                self.frame_ring.unlink()
+                self._retired_frame_rings.append(self.frame_ring)
+            self.frame_ring = FrameRing(slot_size)
+            self._next_frame_slot = 0
+
+        self._retired_frame_rings = [ring for ring in self._retired_frame_rings
+                                     if not self._close_frame_ring_if_unused(ring)]
+
+        for i in range(self.frame_ring.num_slots):
+            index = (self._next_frame_slot + i) % self.frame_ring.num_slots
+            if self.map.release_buffer(self.frame_ring.slot_buffer(index)):
+                break
+        else:
+            raise RuntimeError("No free map frame slot")  # Only one frame is ever displayed, needs 2+ slots
+
+        if self._view is not None and np.may_share_memory(self._view.image, self.frame_ring.slot_buffer(index)):
+            self._view = None  # Not displayed yet, and about to be overwritten
+
+        self._next_frame_slot = index + 1
+        return self.frame_ring.slot(index, sequence)
+
+    def _close_frame_ring_if_unused(self, ring: FrameRing) -> bool:
+        """
+        :return: True if closed, False if MapData may still hand out frames from ring
+        :rtype: bool
+        """
+        if self.map.uses_buffer(ring.buffer):
+            return False
 
+        ring.close()
         return True
 
     # TODO Info
@@ -276,35 +535,46 @@ class MappingThread(QtCore.QThread):
         last_longitude = None
         last_desired_size = None
         last_map_zoom = None
+        last_num_failed = 0
         last_update_time = 0
 
         while True:
             with self.cv:
-                self.cv.wait()  # CV lock is released while waiting
+                # Woken up by new data, and polls for renders while one is in flight. Updates are spaced out by
+                # MIN_UPDATE_INTERVAL_S, but renders are displayed as soon as they are done
+                while not self._is_shutting_down:
+                    update_wait = last_update_time + MIN_UPDATE_INTERVAL_S - time.time()
+                    if self._is_notified and update_wait <= 0:
+                        break
+                    if self.render_service.is_busy:
+                        self.cv.wait(RENDER_POLL_INTERVAL_S)  # CV lock is released while waiting
+                        break
+                    self.cv.wait(update_wait if self._is_notified else None)
+
                 if self._is_shutting_down:
                     break
 
             try:
-                # Prevent update spam
+                if self.receiveRender():
+                    # notify UI that new data is available to be displayed
+                    self.sig_received.emit()
+
                 current_time = time.time()
-                if current_time - last_update_time < 0.5:
-                    time.sleep(0.5)
+                with self.cv:
+                    if not self._is_notified or current_time - last_update_time < MIN_UPDATE_INTERVAL_S:
+                        continue
+                    self._is_notified = False
 
                 # copy location values to use, to keep the values consistent in synchronous but adjacent calls
                 latitudes = dict()
                 longitudes = dict()
 
                 # Determine if we should draw NMEA or SRAD
-                if self.data_source == MapDataSource.SRAD:
+                if self.data_source in POSITION_IDS:
+                    latitude_id, longitude_id = POSITION_IDS[self.data_source]
                     for device in self.viewed_devices:
-                        latitude = self.rocket_data.last_value_by_device(device, DataEntryIds.LATITUDE)
-                        longitude = self.rocket_data.last_value_by_device(device, DataEntryIds.LONGITUDE)
-                        if latitude and longitude: #plot on map if data not None
-                            latitudes[device], longitudes[device] = latitude, longitude
-                elif self.data_source == MapDataSource.COTS:
-                    for device in self.viewed_devices:
-                        latitude = self.rocket_data.last_value_by_device(device, DataEntryIds.NMEA_LATITUDE)
-                        longitude = self.rocket_data.last_value_by_device(device, DataEntryIds.NMEA_LONGITUDE)
+                        latitude = self.rocket_data.last_value_by_device(device, latitude_id)
+                        longitude = self.rocket_data.last_value_by_device(device, longitude_id)
                         if latitude and longitude: #plot on map if data not None
                             latitudes[device], longitudes[device] = latitude, longitude
                 else:
@@ -317,21 +587,21 @@ class MappingThread(QtCore.QThread):
                 if len(latitudes) == 0: #latitudes does not store data if lat = None
                     continue
 
-                # Prevent unnecessary work while data hasnt changed
-                if (latitudes, longitudes, desired_size, map_zoom) == (last_latitude, last_longitude, last_desired_size, last_map_zoom):
+                # Prevent unnecessary work while data hasnt changed, unless the map failed to render
+                num_failed = self.render_service.num_failed
+                if (latitudes, longitudes, desired_size, map_zoom, num_failed) == (last_latitude, last_longitude, last_desired_size, last_map_zoom, last_num_failed):
                     continue
 
                 if self.plotMap(latitudes, longitudes, DEFAULT_RADIUS):
                     # notify UI that new data is available to be displayed
                     self.sig_received.emit()
-                else:
-                    continue
 
                 last_latitude = latitudes
                 last_longitude = longitudes
                 last_update_time = current_time
                 last_desired_size = desired_size
                 last_map_zoom = map_zoom
+                last_num_failed = num_failed
 
             except Exception:
                 LOGGER.exception("Error in map thread loop")  # Automatically grabs and prints exception info
@@ -345,32 +615,28 @@ class MappingThread(QtCore.QThread):
             else:
                 self._is_shutting_down = True
 
-        self.resultQueue.put(None)
-
         while self.isRunning():
             with self.cv:
                 self.cv.notify()  # Wake up thread
 
         self.wait()  # join thread
 
-        self.requestQueue.put(None)
-
-        self.resultQueue.cancel_join_thread()
-        self.requestQueue.cancel_join_thread()
+        self.render_service.shutdown()
 
-        self.map_process.join()
-        self.map_process.close()
-        self.resultQueue.close()
-        self.requestQueue.close()
+        for ring in self._retired_frame_rings + [self.frame_ring]:
+            if ring is not None and not self._close_frame_ring_if_unused(ring):
+                ring.unlink()  # Stays mapped until exit, MapData still has frames from it
 
 
-def processMap(requestQueue, resultQueue):
+def processMap(requestQueue, resultQueue, latestSequence):
     """To be run in a new process as the stitching and resizing is a CPU bound task
 
     :param requestQueue:
     :type requestQueue: Queue
     :param resultQueue:
     :type resultQueue: Queue
+    :param latestSequence: Of the latest request, renders of older ones are abandoned between steps
+    :type latestSequence: Value
     """
 
     # On Windows, process forking does not copy globals and thus all packeges are re-imported. Not for threads
@@ -382,6 +648,7 @@ def processMap(requestQueue, resultQueue):
     #  process-global constants. Look into file-locks to make this multiprocessing safe. This is an OS feature
 
     LOGGER.debug("Mapping process started")
+    frame_writer = FrameWriter()
     while True:
         try:
             request = requestQueue.get()
@@ -389,12 +656,25 @@ def processMap(requestQueue, resultQueue):
             if request is None:  # Shutdown request
                 break
 
-            (p0, p1, p2, zoom, desiredSize) = request
+            (p0, p1, p2, zoom, desiredSize, frame_slot) = request
+
+            def is_superseded() -> bool:
+                return frame_slot.sequence < latestSequence.value
+
+            if is_superseded():
+                resultQueue.put(None)
+                continue
 
             location = mapbox_utils.TileGrid(p1, p2, zoom)
             location.downloadArrayImages()
+            if is_superseded():
+                resultQueue.put(None)
+                continue
 
             largeMapImage = location.genStitchedMap()
+            if is_superseded():
+                resultQueue.put(None)
+                continue
             x_min, x_max, y_min, y_max = location.xMin, location.xMax, location.yMin, location.yMax
 
             if desiredSize is None:
@@ -436,11 +716,12 @@ def processMap(requestQueue, resultQueue):
                     resizedMapImage = np.array(Image.fromarray(croppedMapImage).resize(
                         (desiredSize[0], desiredSize[1])))  # x,y order is opposite for resize
 
-            resultQueue.put((resizedMapImage, x_min, x_max, y_min, y_max))
+            resultQueue.put(frame_writer.write(frame_slot, resizedMapImage, (x_min, x_max, y_min, y_max)))
         except Exception as ex:
             LOGGER.exception("Exception in processMap process")  # Automatically grabs and prints exception info
             resultQueue.put(None)
 
+    frame_writer.close()
     resultQueue.cancel_join_thread()
     requestQueue.cancel_join_thread()
     resultQueue.close()
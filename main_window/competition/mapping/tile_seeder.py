@@ -0,0 +1,205 @@
+"""
+Downloads every tile around a launch site ahead of time, at every zoom of a range, so that the map works without network
+(see mapbox_utils.OFFLINE_MAPS). Tiles already in the tile store are skipped, so an interrupted run resumes where it
+stopped when run again. What was seeded is recorded in a manifest in MAPBOX_CACHE.
+
+    python -m main_window.competition.mapping.tile_seeder 32.9401 -106.9119 --radius 5 --min-zoom 10 --max-zoom 18
+"""
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import sys
+import time
+from collections import namedtuple
+from typing import Optional
+
+from . import mapbox_utils
+from .mapbox_utils import MapPoint, MapTile, TileGrid, TileSource
+from util.detail import LOGGER
+
+MAX_ZOOM = 18  # Highest zoom TileGrid uses
+DEFAULT_RADIUS = 5  # km
+DEFAULT_MIN_ZOOM = 10
+DEFAULT_MAX_ZOOM = MAX_ZOOM
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_ATTEMPTS = 3
+SEED_BATCH_SIZE = 64  # Tiles stored per transaction
+
+MANIFEST_NAME = "manifest.json"
+
+SeedResult = namedtuple('SeedResult', ['fetched', 'skipped', 'missing'])
+
+
+def area_grid(latitude: float, longitude: float, radius: float, zoom: int) -> TileGrid:
+    """
+    :param latitude:
+    :type latitude: float
+    :param longitude:
+    :type longitude: float
+    :param radius: km
+    :type radius: float
+    :param zoom:
+    :type zoom: int
+    :return: Tiles covering the square of side 2*radius around the point
+    :rtype: TileGrid
+    """
+    # Same approximation as MappingThread
+    lat1 = latitude + radius / 110.574
+    lon1 = longitude - radius / 111.320 / math.cos(lat1 * math.pi / 180.0)
+    lat2 = latitude - radius / 110.574
+    lon2 = longitude + radius / 111.320 / math.cos(lat2 * math.pi / 180.0)
+    return TileGrid(MapPoint(lat1, lon1), MapPoint(lat2, lon2), zoom)
+
+
+def manifest_path() -> str:
+    return os.path.join(mapbox_utils.MAPBOX_CACHE, MANIFEST_NAME)
+
+
+def read_manifest() -> dict:
+    """
+    :return: Seeded areas by name, empty if nothing was seeded yet
+    :rtype: dict
+    """
+    if not os.path.isfile(manifest_path()):
+        return dict()
+
+    with open(manifest_path(), "r") as manifest_file:
+        return json.load(manifest_file)
+
+
+def seed_area(latitude: float,
+              longitude: float,
+              radius: float = DEFAULT_RADIUS,
+              min_zoom: int = DEFAULT_MIN_ZOOM,
+              max_zoom: int = DEFAULT_MAX_ZOOM,
+              source: Optional[TileSource] = None,
+              max_workers: int = DEFAULT_MAX_WORKERS,
+              attempts: int = DEFAULT_ATTEMPTS,
+              overwrite: bool = False,
+              name: Optional[str] = None) -> SeedResult:
+    """
+    Saves every tile of the area for zooms min_zoom to max_zoom, and records it in the manifest.
+
+    :param latitude:
+    :type latitude: float
+    :param longitude:
+    :type longitude: float
+    :param radius: km
+    :type radius: float
+    :param min_zoom:
+    :type min_zoom: int
+    :param max_zoom:
+    :type max_zoom: int
+    :param source: Defaults to Mapbox, using apikey.txt
+    :type source: Optional[TileSource]
+    :param max_workers: Concurrent fetches
+    :type max_workers: int
+    :param attempts: Per tile
+    :type attempts: int
+    :param overwrite: Fetch tiles that were already saved again
+    :type overwrite: bool
+    :param name: Of the area in the manifest, defaults to the coordinates and radius
+    :type name: Optional[str]
+    :return: Number of tiles fetched, already saved, and unavailable
+    :rtype: SeedResult
+    """
+    if not 0 <= min_zoom <= max_zoom <= MAX_ZOOM:
+        raise ValueError(f"Zoom range must be within 0 to {MAX_ZOOM}, got {min_zoom} to {max_zoom}")
+
+    if source is None:
+        if mapbox_utils.maps is None:
+            raise ValueError("No tile source given and no Mapbox API key (apikey.txt)")
+        source = mapbox_utils.MapboxTileSource()
+
+    if name is None:
+        name = f"{latitude:.5f}_{longitude:.5f}_{radius}km"
+
+    def fetch_tile(tile: MapTile) -> Optional[bytes]:
+        for _ in range(attempts):
+            content = tile.fetch(source)
+            if content is not None:
+                return content
+        return None
+
+    store = mapbox_utils.getTileStore()
+    area = dict(latitude=latitude, longitude=longitude, radius=radius, zooms=dict())
+    fetched = skipped = missing = 0
+    t1 = time.perf_counter()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for zoom in range(min_zoom, max_zoom + 1):
+            grid = area_grid(latitude, longitude, radius, zoom)
+            tiles = [tile for row in grid.ta for tile in row]
+            pending = [tile for tile in tiles if overwrite or not store.contains(tile.key)]
+            skipped += len(tiles) - len(pending)
+
+            # Fetched concurrently, stored in batches so that an interrupted run keeps most of what it fetched
+            missing_tiles = []
+            batch = []
+            for tile, content in zip(pending, executor.map(fetch_tile, pending)):
+                if content is None:
+                    missing_tiles.append([tile.x, tile.y])
+                else:
+                    batch.append((tile.key, content))
+
+                if len(batch) >= SEED_BATCH_SIZE:
+                    fetched += store.put_many(batch)
+                    batch = []
+            fetched += store.put_many(batch)
+            missing += len(missing_tiles)
+
+            area["zooms"][str(zoom)] = dict(x=[grid.tile_x_min, grid.tile_x_max],
+                                            y=[grid.tile_y_min, grid.tile_y_max],
+                                            tiles=len(tiles),
+                                            missing=missing_tiles)
+            LOGGER.info(f"Seeded {len(tiles)} size {zoom} tiles for {name}, {len(missing_tiles)} unavailable")
+
+    area["seeded_at"] = time.time()
+    _write_manifest_area(name, area)
+
+    t2 = time.perf_counter()
+    LOGGER.info(f"Seeded {name} in {t2 - t1:.1f} seconds: {fetched} tiles fetched, {skipped} already saved, "
+                f"{missing} unavailable")
+    return SeedResult(fetched, skipped, missing)
+
+
+def _write_manifest_area(name: str, area: dict) -> None:
+    manifest = read_manifest()
+    manifest[name] = area
+
+    os.makedirs(mapbox_utils.MAPBOX_CACHE, exist_ok=True)
+    partial_path = manifest_path() + ".part"
+    with open(partial_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(partial_path, manifest_path())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Download map tiles around a launch site for offline use")
+    parser.add_argument("latitude", type=float)
+    parser.add_argument("longitude", type=float)
+    parser.add_argument("-r", "--radius", type=float, default=DEFAULT_RADIUS, help="km")
+    parser.add_argument("--min-zoom", type=int, default=DEFAULT_MIN_ZOOM)
+    parser.add_argument("--max-zoom", type=int, default=DEFAULT_MAX_ZOOM)
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Concurrent downloads")
+    parser.add_argument("--attempts", type=int, default=DEFAULT_ATTEMPTS, help="Per tile")
+    parser.add_argument("--overwrite", action='store_true', help="Download tiles that were already saved again")
+    parser.add_argument("--url", type=str, default=None,
+                        help="Tile server instead of Mapbox, e.g. http://localhost:8000/{s}/{x}/{y}.jpg")
+    parser.add_argument("-n", "--name", type=str, default=None, help="Of the area in the manifest")
+    args = parser.parse_args(argv)
+
+    source = None if args.url is None else mapbox_utils.UrlTileSource(args.url)
+    try:
+        result = seed_area(args.latitude, args.longitude, args.radius, args.min_zoom, args.max_zoom, source=source,
+                           max_workers=args.workers, attempts=args.attempts, overwrite=args.overwrite, name=args.name)
+    except ValueError as ex:
+        parser.error(str(ex))
+
+    return 0 if result.missing == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
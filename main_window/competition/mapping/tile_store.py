@@ -0,0 +1,224 @@
+"""
+Where downloaded map tiles (encoded jpeg) are kept. SqliteTileStore keeps them all in one file, using the MBTiles layout
+so that other tools can open it. FileTileStore is the older one file per tile layout, which is migrated from.
+"""
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, Optional, Tuple
+
+from util.detail import LOGGER
+
+TileKey = Tuple[int, int, int]  # x, y, zoom, as MapTile.key
+
+MIGRATION_BATCH_SIZE = 512
+
+
+class TileStore(ABC):
+    @abstractmethod
+    def get(self, key: TileKey) -> Optional[bytes]:
+        """
+        :param key:
+        :type key: TileKey
+        :return: Encoded tile, None if not stored
+        :rtype: Optional[bytes]
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def contains(self, key: TileKey) -> bool:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def put(self, key: TileKey, data: bytes) -> None:
+        """
+        Stores data, replacing what was stored for key.
+
+        :param key:
+        :type key: TileKey
+        :param data: Encoded tile
+        :type data: bytes
+        """
+        raise NotImplementedError()
+
+    def put_many(self, items: Iterable[Tuple[TileKey, bytes]]) -> int:
+        """
+        :param items: Keys and encoded tiles
+        :type items: Iterable[Tuple[TileKey, bytes]]
+        :return: Number of tiles stored
+        :rtype: int
+        """
+        count = 0
+        for key, data in items:
+            self.put(key, data)
+            count += 1
+        return count
+
+    @abstractmethod
+    def keys(self) -> Iterator[TileKey]:
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        pass
+
+
+class FileTileStore(TileStore):
+    """
+    One file per tile, <root>/<zoom>/<x>_<y>.jpg
+    """
+
+    def __init__(self, root: str) -> None:
+        """
+
+        :param root:
+        :type root: str
+        """
+        self.root = root
+
+    def path(self, key: TileKey) -> str:
+        x, y, s = key
+        return os.path.join(self.root, str(s), f"{x}_{y}.jpg")
+
+    def get(self, key: TileKey) -> Optional[bytes]:
+        try:
+            with open(self.path(key), "rb") as tile_file:
+                return tile_file.read()
+        except FileNotFoundError:
+            return None
+
+    def contains(self, key: TileKey) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def put(self, key: TileKey, data: bytes) -> None:
+        # Replaced at once, an interrupted write leaves no partial tile behind
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = f"{path}.{threading.get_ident()}.part"
+        with open(partial_path, "wb") as tile_file:
+            tile_file.write(data)
+        os.replace(partial_path, path)
+
+    def keys(self) -> Iterator[TileKey]:
+        if not os.path.isdir(self.root):
+            return
+
+        for zoom in os.listdir(self.root):
+            zoom_dir = os.path.join(self.root, zoom)
+            if not zoom.isdigit() or not os.path.isdir(zoom_dir):
+                continue
+
+            for name in os.listdir(zoom_dir):
+                stem, extension = os.path.splitext(name)
+                x, _, y = stem.partition("_")
+                if extension == ".jpg" and x.isdigit() and y.isdigit():
+                    yield int(x), int(y), int(zoom)
+
+
+class SqliteTileStore(TileStore):
+    """
+    All tiles in one SQLite file with the MBTiles schema. Rows are flipped (TMS) as MBTiles requires. Thread safe, and
+    in WAL mode so that a process can read (MapProcess) while another writes (tile_seeder).
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+
+        :param path: Created if it doesn't exist
+        :type path: str
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")  # Safe in WAL mode, only the last writes may be lost
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, "
+                                     "tile_row INTEGER, tile_data BLOB)")
+            self._connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles "
+                                     "(zoom_level, tile_column, tile_row)")
+            self._connection.execute("INSERT OR IGNORE INTO metadata VALUES ('format', 'jpg')")
+
+    @staticmethod
+    def _row(key: TileKey) -> Tuple[int, int, int]:
+        x, y, s = key
+        return s, x, (1 << s) - 1 - y
+
+    def get(self, key: TileKey) -> Optional[bytes]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                self._row(key)).fetchone()
+        return None if row is None else row[0]
+
+    def contains(self, key: TileKey) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                self._row(key)).fetchone()
+        return row is not None
+
+    def put(self, key: TileKey, data: bytes) -> None:
+        self.put_many([(key, data)])
+
+    def put_many(self, items: Iterable[Tuple[TileKey, bytes]]) -> int:
+        """
+        Stores all items in one transaction.
+        """
+        rows = [self._row(key) + (sqlite3.Binary(data),) for key, data in items]
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def keys(self) -> Iterator[TileKey]:
+        with self._lock:
+            rows = self._connection.execute("SELECT zoom_level, tile_column, tile_row FROM tiles").fetchall()
+        for s, x, row in rows:
+            yield x, (1 << s) - 1 - row, s
+
+    def get_metadata(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM metadata WHERE name = ?", (name,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_metadata(self, name: str, value: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO metadata VALUES (?, ?)", (name, value))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def migrate_tiles(source: TileStore, target: TileStore, batch_size: int = MIGRATION_BATCH_SIZE) -> int:
+    """
+    Copies the tiles of source that target doesn't have yet.
+
+    :param source:
+    :type source: TileStore
+    :param target:
+    :type target: TileStore
+    :param batch_size: Tiles per put_many
+    :type batch_size: int
+    :return: Number of tiles copied
+    :rtype: int
+    """
+    count = 0
+    batch = []
+    for key in source.keys():
+        if target.contains(key):
+            continue
+
+        data = source.get(key)
+        if data is not None:
+            batch.append((key, data))
+
+        if len(batch) >= batch_size:
+            count += target.put_many(batch)
+            batch = []
+
+    count += target.put_many(batch)
+    if count > 0:
+        LOGGER.info(f"Migrated {count} map tiles")
+    return count
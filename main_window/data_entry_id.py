@@ -1,6 +1,10 @@
 from enum import Enum, auto
 
 class DataEntryIds(Enum):
+    # Members are singletons compared by identity, so hash them by identity too. Enum's default hashes the name in
+    # Python, which showed up as a large share of per-packet parsing and storage cost.
+    __hash__ = object.__hash__
+
     # Single Sensor:
     ACCELERATION_X = auto()
     ACCELERATION_Y = auto()
@@ -58,6 +62,8 @@ class DataEntryIds(Enum):
     NMEA_LAST_GPS_PING = auto()
 
 class DataEntryValues(Enum):
+    __hash__ = object.__hash__  # See DataEntryIds
+
     STATUS_NOMINAL = auto()
     STATUS_NONCRITICAL_FAILURE = auto()
     STATUS_CRITICAL_FAILURE = auto()
@@ -12,6 +12,8 @@ RegisteredDevice = namedtuple('RegisteredDevice', ['device_type', 'full_address'
 
 
 class DeviceType(Enum):
+    __hash__ = object.__hash__  # See DataEntryIds
+
     BNB_STAGE_1_FLARE = auto()
     BNB_STAGE_2_FLARE = auto()
     CO_PILOT_FLARE = auto()
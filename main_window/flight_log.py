@@ -0,0 +1,244 @@
+"""
+Compact binary session log.
+
+Layout (all integers little endian):
+
+    header       32 bytes: magic, format version, reserved, dictionary offset, dictionary length
+    arrays       each column's chunks of times, then its chunks of values, raw typed arrays aligned to ARRAY_ALIGNMENT
+                 bytes. Chunks hold CHUNK_LENGTH rows, except the last
+    dictionary   UTF-8 JSON describing every column (address, data id, dtype, side table and chunk locations) and the
+                 device type at each address
+
+The dictionary is written last so that arrays can be streamed out without knowing their offsets up front, one bounded
+chunk at a time. Readers memory map the file, so opening a multi-GB session is instant and a series whose chunks lie back
+to back, as written by write_flight_log(), is returned without copying.
+"""
+
+import json
+import os
+import struct
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .aprs_gps_status import AprsGpsStatus
+from .data_entry_id import DataEntryIds, DataEntryValues
+from .device_manager import DeviceType, FullAddress
+from .nmea_gps_status import NMEAGpsStatus
+
+MAGIC = b'UBCRFLOG'
+VERSION = 1
+
+HEADER = struct.Struct('<8sHHIQQ')  # magic, version, reserved, reserved, dictionary offset, dictionary length
+
+ARRAY_ALIGNMENT = 64
+CHUNK_LENGTH = 1 << 16  # Rows, a multiple of ARRAY_ALIGNMENT so that a column's chunks need no padding between them
+
+FLIGHT_LOG_EXTENSION = '.flog'
+
+TIME_DTYPE = np.dtype('<i8')
+
+# Enums that may be found in side tables. Any other non-numeric value is stored as its string representation.
+_ENUM_TYPES = {cls.__name__: cls for cls in (DataEntryValues, DeviceType, AprsGpsStatus, NMEAGpsStatus)}
+
+# Key as stored in a flight log, (FullAddress, DataEntryIds or str if the id is unknown)
+LogKey = Tuple[FullAddress, Any]
+
+
+class FlightLogError(Exception):
+    pass
+
+
+def write_flight_log(path: str, columns: Dict[LogKey, Tuple[np.ndarray, np.ndarray, Optional[List[Any]]]],
+                     session_id: Optional[str] = None, devices: Optional[Dict[FullAddress, DeviceType]] = None,
+                     chunk_length: int = CHUNK_LENGTH) -> None:
+    """
+    Writes columns to a flight log. The file is written next to path first and then moved into place, so an existing
+    log is never left half written.
+
+    :param path: Destination
+    :type path: str
+    :param columns: Key -> (times, values, side table) as returned by SeriesColumn.raw()
+    :type columns: Dict[LogKey, Tuple[np.ndarray, np.ndarray, Optional[List[Any]]]]
+    :param session_id: (Optional) Stored in the dictionary for reference
+    :type session_id: str
+    :param devices: (Optional) Device type at each address, so that readers can find the data of a device when it is at
+                    another address (see RocketData.load())
+    :type devices: Dict[FullAddress, DeviceType]
+    :param chunk_length: Rows per chunk, a multiple of ARRAY_ALIGNMENT
+    :type chunk_length: int
+    """
+    assert chunk_length > 0 and chunk_length % ARRAY_ALIGNMENT == 0
+    tmp_path = path + '.tmp'
+    descriptions = []
+
+    with open(tmp_path, 'wb') as f:
+        f.write(bytes(HEADER.size))
+
+        for ((connection_name, device_address), data_id), (times, values, table) in columns.items():
+            dtype = values.dtype.newbyteorder('<')
+            starts = range(0, len(times), chunk_length)
+            # Converted a chunk at a time, so writing never holds more than a chunk on top of the columns
+            times_offsets = [_write_aligned(f, times[start:start + chunk_length].astype(TIME_DTYPE, copy=False))
+                             for start in starts]
+            values_offsets = [_write_aligned(f, values[start:start + chunk_length].astype(dtype, copy=False))
+                              for start in starts]
+
+            descriptions.append({
+                'connection_name': connection_name,
+                'device_address': device_address,
+                'data_id': data_id.name if isinstance(data_id, DataEntryIds) else str(data_id),
+                'dtype': dtype.str,
+                'table': None if table is None else [_encode_table_value(v) for v in table],
+                'chunks': [{
+                    'length': min(chunk_length, len(times) - start),
+                    'times_offset': times_offset,
+                    'values_offset': values_offset,
+                } for start, times_offset, values_offset in zip(starts, times_offsets, values_offsets)],
+            })
+
+        devices = [{
+            'connection_name': connection_name,
+            'device_address': device_address,
+            'device_type': device_type.name,
+        } for (connection_name, device_address), device_type in (devices or {}).items()]
+
+        dictionary = json.dumps({'session_id': session_id, 'columns': descriptions, 'devices': devices}).encode('utf-8')
+        dictionary_offset = f.tell()
+        f.write(dictionary)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0, dictionary_offset, len(dictionary)))
+
+    os.replace(tmp_path, path)
+
+
+class FlightLog:
+    """
+    Memory mapped reader for files written by write_flight_log()
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        # Checked before mapping, empty files cannot be memory mapped
+        if os.path.getsize(path) < HEADER.size:
+            raise FlightLogError(f"{path} is too short to be a flight log")
+        self._map = np.memmap(path, dtype=np.uint8, mode='r')
+
+        magic, version, _, _, dictionary_offset, dictionary_length = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise FlightLogError(f"{path} is not a flight log")
+        if version != VERSION:
+            raise FlightLogError(f"Unsupported flight log version {version}")
+        if dictionary_offset + dictionary_length > len(self._map):
+            raise FlightLogError(f"{path} is truncated")
+
+        dictionary = json.loads(bytes(self._map[dictionary_offset:dictionary_offset + dictionary_length]))
+        self.session_id: Optional[str] = dictionary['session_id']
+        self.devices: Dict[FullAddress, DeviceType] = {
+            FullAddress(device['connection_name'], device['device_address']): DeviceType[device['device_type']]
+            for device in dictionary.get('devices', []) if device['device_type'] in DeviceType.__members__
+        }
+
+        self._columns: Dict[LogKey, dict] = dict()
+        for description in dictionary['columns']:
+            full_address = FullAddress(description['connection_name'], description['device_address'])
+            data_id = description['data_id']
+            data_id = DataEntryIds[data_id] if data_id in DataEntryIds.__members__ else data_id
+            self._columns[(full_address, data_id)] = description
+
+    def keys(self) -> List[LogKey]:
+        return list(self._columns.keys())
+
+    def raw(self, key: LogKey) -> Tuple[np.ndarray, np.ndarray, Optional[List[Any]]]:
+        """
+        Stored arrays for a key. These are read-only views into the file when the column's chunks lie back to back.
+
+        :param key:
+        :type key: LogKey
+        :return: times, values (codes if there is a side table), side table or None
+        :rtype: Tuple[np.ndarray, np.ndarray, Optional[List[Any]]]
+        """
+        description = self._columns[key]
+        times = self._chunked_array(description['chunks'], 'times_offset', TIME_DTYPE)
+        values = self._chunked_array(description['chunks'], 'values_offset', np.dtype(description['dtype']))
+
+        table = description['table']
+        if table is not None:
+            table = [_decode_table_value(v) for v in table]
+
+        return times, values, table
+
+    def series(self, key: LogKey) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Time and value arrays for a key, zero-copy for numeric columns with chunks back to back.
+
+        :param key:
+        :type key: LogKey
+        :return: times, values
+        :rtype: Tuple[np.ndarray, np.ndarray]
+        """
+        times, values, table = self.raw(key)
+        if table is not None:
+            table_array = np.empty(len(table), dtype=object)
+            table_array[:] = table
+            values = table_array[values]
+        return times, values
+
+    def close(self) -> None:
+        """
+        Drops the reader's reference to the mapping. Arrays handed out keep it alive until they are released.
+        """
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ex, value, tb):
+        self.close()
+
+    def _array(self, offset: int, dtype: np.dtype, length: int) -> np.ndarray:
+        return np.ndarray(shape=(length,), dtype=dtype, buffer=self._map, offset=offset)
+
+    def _chunked_array(self, chunks: List[dict], offset_name: str, dtype: np.dtype) -> np.ndarray:
+        if not chunks:
+            return np.empty(0, dtype=dtype)
+
+        # One view over chunks that follow each other, copied together otherwise
+        offset = chunks[0][offset_name]
+        length = 0
+        for chunk in chunks:
+            if chunk[offset_name] != offset + length * dtype.itemsize:
+                return np.concatenate([self._array(chunk[offset_name], dtype, chunk['length']) for chunk in chunks])
+            length += chunk['length']
+        return self._array(offset, dtype, length)
+
+
+def _write_aligned(f, array: np.ndarray) -> int:
+    padding = -f.tell() % ARRAY_ALIGNMENT
+    f.write(bytes(padding))
+    offset = f.tell()
+    np.ascontiguousarray(array).tofile(f)
+    return offset
+
+
+def _encode_table_value(value) -> Any:
+    if isinstance(value, Enum) and type(value).__name__ in _ENUM_TYPES:
+        return {'enum': type(value).__name__, 'name': value.name}
+    if isinstance(value, datetime):
+        return {'datetime': value.isoformat()}
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return str(value)
+
+
+def _decode_table_value(value) -> Any:
+    if isinstance(value, dict):
+        if 'enum' in value:
+            return _ENUM_TYPES[value['enum']][value['name']]
+        if 'datetime' in value:
+            return datetime.fromisoformat(value['datetime'])
+    return value
@@ -0,0 +1,252 @@
+"""
+Recent points of plotted series, kept in fixed-size ring buffers fed as data arrives, and min/max decimation so that
+drawing a series costs the same however many points it has. Older points are drawn from the aggregates of RocketData.
+"""
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .data_entry_id import DataEntryIds
+from .device_manager import DeviceType
+from .rocket_data import RocketData
+from .series_column import TIME_DTYPE
+
+LIVE_SERIES_CAPACITY = 2 ** 17  # Points kept per series, over 20 minutes at 100 Hz
+
+
+def decimate_min_max(times: np.ndarray, values: np.ndarray, t_start: float, t_end: float,
+                     num_columns: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Splits [t_start, t_end] in num_columns columns (one per pixel) and keeps the min and max of each, which draws the
+    same as all the points.
+
+    :param times: Sorted
+    :type times: np.ndarray
+    :param values:
+    :type values: np.ndarray
+    :param t_start: Points before are left out
+    :type t_start: float
+    :param t_end: Points after are in the last column
+    :type t_end: float
+    :param num_columns:
+    :type num_columns: int
+    :return: times, values of at most 2 * num_columns points
+    :rtype: Tuple[np.ndarray, np.ndarray]
+    """
+    first = np.searchsorted(times, t_start)
+    if len(times) - first <= 2 * num_columns:
+        return times[first:], values[first:]
+
+    edges = np.linspace(t_start, t_end, num_columns + 1)[:-1]
+    starts = np.unique(np.searchsorted(times, edges))  # Empty columns have the same start as the next one
+    starts = starts[starts < len(times)]
+    ends = np.append(starts[1:], len(times)) - 1  # Inclusive
+
+    minimums = np.minimum.reduceat(values, starts)
+    maximums = np.maximum.reduceat(values, starts)
+    # Rising columns go from their min to their max, so that the line joins the next column on the right side
+    is_rising = values[ends] >= values[starts]
+
+    decimated_times = np.empty(2 * len(starts), dtype=times.dtype)
+    decimated_times[0::2] = times[starts]
+    decimated_times[1::2] = times[ends]
+    decimated_values = np.empty(2 * len(starts), dtype=np.result_type(minimums, maximums))
+    decimated_values[0::2] = np.where(is_rising, minimums, maximums)
+    decimated_values[1::2] = np.where(is_rising, maximums, minimums)
+    return decimated_times, decimated_values
+
+
+class SeriesRing:
+    """
+    Last capacity points of a series. Older points are dropped as new ones are appended.
+
+    Not thread safe, owner is responsible for locking.
+    """
+
+    def __init__(self, capacity: int = LIVE_SERIES_CAPACITY) -> None:
+        self.capacity = capacity
+        self.num_dropped = 0  # Points appended then dropped
+        self._times = np.empty(capacity, dtype=TIME_DTYPE)
+        self._values: np.ndarray = None  # Allocated on first append, once we know the dtype
+        self._start = 0  # Of the oldest point
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def first_time(self) -> Optional[int]:
+        return int(self._times[self._start]) if self._size else None
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return int(self._times[(self._start + self._size - 1) % self.capacity]) if self._size else None
+
+    def extend(self, times: np.ndarray, values: np.ndarray) -> None:
+        """
+        :param times: From the last time appended, a point at that time replaces the last point
+        :type times: np.ndarray
+        :param values:
+        :type values: np.ndarray
+        """
+        if self._values is None:
+            self._values = np.empty(self.capacity, dtype=np.float64 if values.dtype.kind in 'biuf' else object)
+
+        if self._size and len(times) and times[0] == self.last_time:
+            self._values[(self._start + self._size - 1) % self.capacity] = values[0]
+            times, values = times[1:], values[1:]
+
+        if len(times) > self.capacity:
+            self.num_dropped += len(times) - self.capacity
+            times, values = times[-self.capacity:], values[-self.capacity:]
+
+        num_dropped = max(0, self._size + len(times) - self.capacity)
+        self.num_dropped += num_dropped
+        self._start = (self._start + num_dropped) % self.capacity
+        self._size -= num_dropped
+
+        # Up to two copies, before and after wrapping around
+        end = (self._start + self._size) % self.capacity
+        split = min(len(times), self.capacity - end)
+        self._times[end:end + split] = times[:split]
+        self._values[end:end + split] = values[:split]
+        self._times[:len(times) - split] = times[split:]
+        self._values[:len(times) - split] = values[split:]
+        self._size += len(times)
+
+    def series(self, t_start: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param t_start: (Optional) Inclusive lower time bound
+        :type t_start: int
+        :return: times, values in time order. Views of the ring unless it wraps around
+        :rtype: Tuple[np.ndarray, np.ndarray]
+        """
+        end = self._start + self._size
+        if end <= self.capacity:
+            times, values = self._times[self._start:end], self._values[self._start:end]
+        else:
+            times = np.concatenate((self._times[self._start:], self._times[:end - self.capacity]))
+            values = np.concatenate((self._values[self._start:], self._values[:end - self.capacity]))
+
+        if t_start is not None:
+            first = np.searchsorted(times, t_start)
+            times, values = times[first:], values[first:]
+        return times, values
+
+
+class LiveSeries:
+    def __init__(self, rocket_data: RocketData, device: DeviceType, data_id: DataEntryIds,
+                 capacity: int = LIVE_SERIES_CAPACITY) -> None:
+        """
+        Recent points of a series, appended from the points received since the last read.
+
+        :param rocket_data:
+        :type rocket_data: RocketData
+        :param device:
+        :type device: DeviceType
+        :param data_id:
+        :type data_id: DataEntryIds
+        :param capacity: Points kept, older ones are read from rocket_data
+        :type capacity: int
+        """
+        self.rocket_data = rocket_data
+        self.device = device
+        self.data_id = data_id
+        self.ring = SeriesRing(capacity)
+        self._first_time: Optional[int] = None
+
+        # Callbacks only flag that there are new points, they are read by update()
+        self._lock = threading.Lock()  # Protects _is_updated
+        self._is_updated = True  # Points received before the series was created
+        self.rocket_data.add_new_callback(device, data_id, self._on_data)
+
+    def _on_data(self) -> None:
+        with self._lock:
+            self._is_updated = True
+
+    @property
+    def first_time(self) -> Optional[int]:
+        return self._first_time
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return self.ring.last_time
+
+    def update(self) -> bool:
+        """
+        Appends the points received since the last update. Not thread safe, used by the UI thread only.
+
+        :return: True if there were new points
+        :rtype: bool
+        """
+        with self._lock:
+            is_updated = self._is_updated
+            self._is_updated = False
+
+        if not is_updated:
+            return False
+
+        # From the last time read, its value may have been overwritten since
+        series = self.rocket_data.series_by_device(self.device, self.data_id, self.ring.last_time)
+        if series is None:
+            return False
+
+        if self._first_time is None:
+            self._first_time = int(series[0][0])
+        self.ring.extend(*series)
+        return True
+
+    def _is_in_ring(self, t_start: Optional[int]) -> bool:
+        return not self.ring.num_dropped or (t_start is not None and t_start >= self.ring.first_time)
+
+    def series(self, t_start: Optional[int] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Points as of the last update().
+
+        :param t_start: (Optional) Inclusive lower time bound
+        :type t_start: int
+        :return: times, values. None if there are none
+        :rtype: Optional[Tuple[np.ndarray, np.ndarray]]
+        """
+        if len(self.ring) == 0:
+            return None
+
+        if not self._is_in_ring(t_start):
+            return self.rocket_data.series_by_device(self.device, self.data_id, t_start, self.ring.last_time)
+
+        return self.ring.series(t_start)
+
+    def envelope(self, t_start: float, t_end: float, num_columns: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Points as of the last update(), decimated to num_columns columns (see decimate_min_max()). Numeric series only.
+
+        :param t_start:
+        :type t_start: float
+        :param t_end:
+        :type t_end: float
+        :param num_columns:
+        :type num_columns: int
+        :return: times, values of at most 2 * num_columns points. None if there are none
+        :rtype: Optional[Tuple[np.ndarray, np.ndarray]]
+        """
+        if len(self.ring) == 0:
+            return None
+
+        if self._is_in_ring(int(t_start)):
+            return decimate_min_max(*self.ring.series(), t_start, t_end, num_columns)
+
+        # Older than what the ring kept
+        aggregate = self.rocket_data.aggregate_by_device(self.device, self.data_id, int(t_start), self.ring.last_time,
+                                                         num_columns)
+        if aggregate is None:
+            return None
+        if aggregate.bucket_ms == 0:
+            return aggregate.times, aggregate.means
+
+        # Both extremes of each bucket, the longest buckets can still be more than one per column
+        times = np.repeat(aggregate.times + aggregate.bucket_ms // 2, 2)
+        values = np.empty(len(times))
+        values[0::2] = aggregate.minimums
+        values[1::2] = aggregate.maximums
+        return decimate_min_max(times, values, t_start, t_end, num_columns)
@@ -6,7 +6,10 @@ from typing import Dict
 from PyQt5 import QtWidgets
 from PyQt5.QtCore import pyqtSignal
 
+from connections import capture
+from connections.capture import CaptureWriter, CAPTURE_EXTENSION
 from connections.connection import Connection
+from connections.replay.replay_connection import ReplayConnection
 from util.detail import LOGS_DIR, SESSION_ID, LOGGER
 
 from main_window.read_thread import ReadThread
@@ -15,6 +18,7 @@ from main_window.send_thread import SendThread
 from main_window.nmea_thread import NMEAThread
 from main_window.device_manager import DeviceManager, FullAddress
 from main_window.command_parser import CommandParser
+from main_window.flight_log import FLIGHT_LOG_EXTENSION
 
 
 class MainApp(QtWidgets.QMainWindow):
@@ -65,11 +69,18 @@ class MainApp(QtWidgets.QMainWindow):
 
         packet_parser = self.rocket_profile.construct_packet_parser()
 
+        # Record raw traffic for replay, unless it is a replay already
+        if not capture.CAPTURE_ENABLED or all(isinstance(c, ReplayConnection) for c in self.connections.values()):
+            self.capture = None
+        else:
+            self.capture = CaptureWriter(os.path.join(LOGS_DIR, "capture_" + SESSION_ID + CAPTURE_EXTENSION))
+
         # Init and connection of ReadThread
         self.ReadThread = ReadThread(self.connections,
                                      self.rocket_data,
                                      packet_parser,
-                                     self.device_manager)
+                                     self.device_manager,
+                                     capture=self.capture)
         # TODO: HACK
         # Force init radio
         self.ReadThread.sig_received.connect(self.receive_data)
@@ -103,10 +114,13 @@ class MainApp(QtWidgets.QMainWindow):
         self.rocket_data.shutdown()
         for connection in self.connections.values():
             connection.shutdown()
+        if self.capture is not None:
+            self.capture.close()
         LOGGER.debug(f"All threads shut down, remaining threads: {threading.enumerate()}")
 
         LOGGER.info("Saving...")
         self.rocket_data.save(os.path.join(LOGS_DIR, "finalsave_" + SESSION_ID + ".csv"))
+        self.rocket_data.save_log(os.path.join(LOGS_DIR, "finalsave_" + SESSION_ID + FLIGHT_LOG_EXTENSION))
         LOGGER.info("Saved!")
 
     def receive_data(self) -> None:
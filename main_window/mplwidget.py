@@ -1,7 +1,20 @@
+from typing import Dict, Hashable, List, Optional
+
+from matplotlib.artist import Artist
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as Canvas
 from matplotlib.figure import Figure
+from matplotlib.text import Text
+from matplotlib.transforms import Bbox
 from PyQt5 import QtWidgets
 
+# Time range shown by time series plots, as the length of the trailing window in ms. None is the full flight
+TIME_WINDOWS = [
+    ("Full flight", None),
+    ("Last 10 s", 10_000),
+    ("Last 60 s", 60_000),
+    ("Last 10 min", 600_000),
+]
+
 # Matplotlib canvas class to create figure
 class MplCanvas(Canvas):
     def __init__(self):
@@ -16,6 +29,130 @@ class MplCanvas(Canvas):
         Canvas.updateGeometry(self)
 
 
+class BlitManager:
+    """
+    Draws the static part of a figure (axes, ticks, map image, ...) once and keeps it as a background. Artists that
+    change often are added as animated artists, updated in place, and redrawn over the background by update(): only the
+    area around the artists that changed is copied to the screen.
+
+    What the figure shows is identified by a scene. Changing it (reset()) clears the axes and the animated artists.
+    """
+
+    def __init__(self, canvas: Canvas) -> None:
+        """
+
+        :param canvas:
+        :type canvas: Canvas
+        """
+        self.canvas = canvas
+        self.scene: Hashable = None
+        self._artists: Dict[Hashable, Artist] = dict()
+        self._extents: Dict[Artist, Bbox] = dict()  # Where each animated artist was last drawn, in display pixels
+        self._removed_extents: List[Bbox] = []  # Of animated artists removed since the last update
+        self._background = None
+        self._is_background_stale = True
+        self.num_full_draws = 0
+        self.num_blits = 0
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def reset(self, scene: Hashable) -> None:
+        """
+        Clears the axes and forgets the animated artists, for a new scene.
+
+        :param scene:
+        :type scene: Hashable
+        """
+        self.scene = scene
+        self._artists.clear()
+        self._extents.clear()
+        self._removed_extents.clear()
+        for ax in self.canvas.figure.axes:
+            ax.cla()
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+        The static part changed, the next update() redraws everything.
+        """
+        self._is_background_stale = True
+
+    def add(self, name: Hashable, artist: Artist) -> Artist:
+        """
+        :param name: To get the artist back with get()
+        :type name: Hashable
+        :param artist: Already added to the axes
+        :type artist: Artist
+        :return: artist
+        :rtype: Artist
+        """
+        artist.set_animated(True)
+        self._artists[name] = artist
+        return artist
+
+    def get(self, name: Hashable) -> Optional[Artist]:
+        return self._artists.get(name)
+
+    def remove(self, name: Hashable) -> None:
+        artist = self._artists.pop(name)
+        if artist in self._extents:
+            self._removed_extents.append(self._extents.pop(artist))
+        artist.remove()
+
+    def names(self) -> List[Hashable]:
+        return list(self._artists.keys())
+
+    def update(self, changed: Optional[List[Artist]] = None) -> None:
+        """
+        Shows the animated artists as they are now.
+
+        :param changed: Artists that changed, all of them if None. Removed artists are covered too
+        :type changed: Optional[List[Artist]]
+        """
+        if self._is_background_stale or self._background is None:
+            self.canvas.draw()  # Calls _on_draw()
+            return
+
+        renderer = self.canvas.get_renderer()
+        if changed is None:
+            changed = list(self._artists.values())
+
+        # Old and new areas of what changed, and of what was removed
+        dirty = [self._extents[artist] for artist in changed if artist in self._extents] + self._removed_extents
+        self._removed_extents = []
+
+        self.canvas.restore_region(self._background)
+        self._draw_artists(renderer)
+        dirty += [self._extents[artist] for artist in changed if artist in self._extents]
+
+        if dirty:
+            # Antialiased edges go a little past the extents
+            area = Bbox.intersection(Bbox.union(dirty).padded(2), self.canvas.figure.bbox)
+            if area is not None:
+                self.canvas.blit(area)
+        self.num_blits += 1
+
+    def _on_draw(self, event) -> None:
+        # A full draw skips animated artists, so what was drawn is the background. The whole canvas gets painted after
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._is_background_stale = False
+        self._draw_artists(self.canvas.get_renderer())
+        self.num_full_draws += 1
+
+    def _draw_artists(self, renderer) -> None:
+        self._extents = dict()
+        for artist in self._artists.values():
+            if artist.get_visible():
+                artist.draw(renderer)
+                self._extents[artist] = self._extent(artist, renderer)
+
+    @staticmethod
+    def _extent(artist: Artist, renderer) -> Bbox:
+        extent = artist.get_window_extent(renderer)
+        if isinstance(artist, Text) and artist.get_bbox_patch() is not None:
+            extent = Bbox.union([extent, artist.get_bbox_patch().get_window_extent(renderer)])
+        return extent
+
+
 # Matplotlib widget
 class MplWidget(QtWidgets.QWidget):
     def __init__(self, parent=None):
@@ -25,3 +162,32 @@ class MplWidget(QtWidgets.QWidget):
         self.vbl.setContentsMargins(0, 0, 0, 0)
         self.vbl.addWidget(self.canvas)
         self.setLayout(self.vbl)
+        self.blit_manager = BlitManager(self.canvas)
+
+        self.time_window_box = QtWidgets.QComboBox()
+        for text, window in TIME_WINDOWS:
+            self.time_window_box.addItem(text, window)
+        self.vbl.addWidget(self.time_window_box)
+        self.hide_time_window_box()
+
+    @property
+    def time_window(self) -> Optional[int]:
+        """
+        :return: Length of the trailing window time series are shown for, in ms. None for the full flight
+        :rtype: Optional[int]
+        """
+        return self.time_window_box.currentData()
+
+    def hide_time_window_box(self):
+        """
+        Hide time window choice when not viewing time series
+        """
+        self.time_window_box.setVisible(False)
+        self.showing_time_window_box = False
+
+    def show_time_window_box(self):
+        """
+        Show time window choice when viewing time series
+        """
+        self.time_window_box.setVisible(True)
+        self.showing_time_window_box = True
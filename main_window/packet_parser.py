@@ -3,7 +3,9 @@ import struct
 from enum import Enum
 from .device_manager import DeviceType
 from io import BytesIO
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Iterator, List, Tuple, Union
+
+import numpy as np
 
 from util.detail import LOGGER
 from util.event_stats import Event
@@ -19,6 +21,15 @@ STATE_EVENT = Event('event')
 # can be expanded if necessary elsewhere.
 Header = collections.namedtuple('Header', ['subpacket_id', 'timestamp'])
 
+# A run of same id subpackets decoded together, columns map DataEntryIds (including TIME) to one array each
+SubpacketBatch = collections.namedtuple('SubpacketBatch', ['subpacket_id', 'columns'])
+
+# Shortest run of same id subpackets worth decoding with NumPy rather than one by one
+BATCH_MIN_RUN = 8
+
+# Decodes a run of subpackets: receives one array per field of the subpacket's layout and the subpacket id
+BatchParsingFn = Callable[[List[np.ndarray], int], Dict[Any, np.ndarray]]
+
 # Parser's subpacket ids. Should not be used elsewhere, NOT DataIds
 class SubpacketIds(Enum):
     MESSAGE = 0x01
@@ -84,6 +95,101 @@ STATE_IDS = {
 }
 
 
+class SubpacketStruct:
+    """
+    Precompiled decoder for a fixed layout part of a subpacket, one struct.Struct per endianness combination.
+
+    Fields are struct format characters without a byte order prefix. Integer and float fields follow the connection's
+    int and float endianness respectively, so when the two differ the fields are decoded in runs of the same kind.
+    """
+
+    _FLOAT_FORMATS = 'efd'
+
+    # struct format character -> NumPy type, for standard sizes
+    _NUMPY_TYPES = {'?': 'b1', 'b': 'i1', 'B': 'u1', 'h': 'i2', 'H': 'u2', 'i': 'i4', 'I': 'u4', 'l': 'i4', 'L': 'u4',
+                    'q': 'i8', 'Q': 'u8', 'e': 'f2', 'f': 'f4', 'd': 'f8'}
+
+    def __init__(self, fields: str) -> None:
+        self.fields = fields
+        self.size = struct.calcsize('<' + fields)
+        self._unpackers = {(big_endian_ints, big_endian_floats): self._compile(big_endian_ints, big_endian_floats)
+                           for big_endian_ints in (False, True) for big_endian_floats in (False, True)}
+
+    def unpack(self, byte_stream: BytesIO, big_endian_ints: bool, big_endian_floats: bool) -> Tuple:
+        """
+        Decodes the fields at the stream's position and advances the stream past them.
+
+        :param byte_stream:
+        :type byte_stream: BytesIO
+        :param big_endian_ints:
+        :type big_endian_ints: bool
+        :param big_endian_floats:
+        :type big_endian_floats: bool
+        :return: One value per field
+        :rtype: Tuple
+        """
+        # Reading the few bytes out of the BytesIO is cheaper than exporting its buffer and seeking past the fields
+        return self._unpackers[(big_endian_ints, big_endian_floats)](byte_stream.read(self.size))
+
+    def dtype(self, big_endian_ints: bool, big_endian_floats: bool) -> np.dtype:
+        """
+        Equivalent NumPy structured dtype, fields are named f0, f1, ...
+
+        :param big_endian_ints:
+        :type big_endian_ints: bool
+        :param big_endian_floats:
+        :type big_endian_floats: bool
+        :return:
+        :rtype: np.dtype
+        """
+        def byte_order(field):
+            big_endian = big_endian_floats if field in self._FLOAT_FORMATS else big_endian_ints
+            return '>' if big_endian else '<'
+
+        return np.dtype([(f'f{i}', byte_order(field) + self._NUMPY_TYPES[field]) for i, field in enumerate(self.fields)])
+
+    def _compile(self, big_endian_ints: bool, big_endian_floats: bool) -> Callable[[bytes], Tuple]:
+        def prefix(field):
+            big_endian = big_endian_floats if field in self._FLOAT_FORMATS else big_endian_ints
+            return '>' if big_endian else '<'
+
+        # Split into runs of fields sharing a byte order, usually just one
+        runs = []
+        for field in self.fields:
+            if runs and prefix(field) == runs[-1][0]:
+                runs[-1][1] += field
+            else:
+                runs.append([prefix(field), field])
+
+        if len(runs) == 1:
+            return struct.Struct(''.join(runs[0])).unpack
+
+        structs = []
+        offset = 0
+        for byte_order, fields in runs:
+            run_struct = struct.Struct(byte_order + fields)
+            structs.append((run_struct.unpack_from, offset))
+            offset += run_struct.size
+
+        def unpack(buffer):
+            if len(buffer) != self.size:
+                raise struct.error(f"unpack requires a buffer of {self.size} bytes")
+            values = ()
+            for run_unpack_from, run_offset in structs:
+                values += run_unpack_from(buffer, run_offset)
+            return values
+
+        return unpack
+
+
+HEADER_STRUCT = SubpacketStruct('BI')  # subpacket id, timestamp
+EVENT_STRUCT = SubpacketStruct('H')
+STATE_STRUCT = SubpacketStruct('H')
+SINGLE_SENSOR_STRUCT = SubpacketStruct('f')
+
+_FLOAT_STRUCT = {False: struct.Struct('<f'), True: struct.Struct('>f')}
+
+
 class PacketParser:
     """
     This class takes care of converting subpacket data coming in, according to the specifications.
@@ -111,12 +217,17 @@ class PacketParser:
         for i in range(MIN_SINGLE_SENSOR_ID, MAX_SINGLE_SENSOR_ID + 1):
             self.packet_type_to_parser[i] = self.single_sensor
 
+        # Fixed layout subpackets that can also be decoded in runs, see extract_batch()
+        self.packet_type_to_batch_parser: Dict[int, Tuple[SubpacketStruct, BatchParsingFn]] = {}
+        for i in range(MIN_SINGLE_SENSOR_ID, MAX_SINGLE_SENSOR_ID + 1):
+            self.register_batch_packet(i, SINGLE_SENSOR_STRUCT, self.single_sensor_batch)
+
     @property
     def header_size(self):
         """
         Essentially a constant field belonging to PacketParser.
         """
-        return 5
+        return HEADER_STRUCT.size
 
     def set_endianness(self, big_endian_ints: bool, big_endian_floats: bool):
         self.big_endian_ints = big_endian_ints
@@ -150,6 +261,77 @@ class PacketParser:
         self.big_endian_floats = None
         return parsed_data
 
+    def extract_batch(self, byte_stream: BytesIO) -> Iterator[Union[Dict[Any, Any], SubpacketBatch]]:
+        """
+        Parses every subpacket from the stream's position to its end. Runs of at least BATCH_MIN_RUN same id, fixed
+        layout subpackets are decoded together with NumPy and yielded as one SubpacketBatch; anything else is yielded
+        as the dict extract() returns. Order is preserved.
+
+        Endianness is set once for the whole stream. Exceptions are the same as extract().
+
+        :param byte_stream:
+        :type byte_stream: BytesIO
+        :return: Iterator over parsed data
+        :rtype: Iterator[Union[Dict[Any, Any], SubpacketBatch]]
+        """
+        big_endian_ints, big_endian_floats = self.big_endian_ints, self.big_endian_floats
+        if big_endian_ints is None or big_endian_floats is None:
+            raise Exception("Endianness not set before parsing")
+
+        data = byte_stream.getvalue()
+        end = len(data)
+        position = byte_stream.tell()
+
+        while position < end:
+            subpacket_id = data[position]
+            count = 1
+
+            if subpacket_id in self.packet_type_to_batch_parser:
+                subpacket_struct, parsing_fn = self.packet_type_to_batch_parser[subpacket_id]
+                size = HEADER_STRUCT.size + subpacket_struct.size
+                while position + (count + 1) * size <= end and data[position + count * size] == subpacket_id:
+                    count += 1
+
+                if count >= BATCH_MIN_RUN:
+                    batch = self._parse_batch(data, position, count, big_endian_ints, big_endian_floats)
+                    if batch is not None:
+                        yield batch
+                        position += count * size
+                        continue
+
+            # One by one, for a whole run that failed batch decoding as well so that errors are handled the same
+            byte_stream.seek(position)
+            for _ in range(count):
+                self.set_endianness(big_endian_ints, big_endian_floats)
+                yield self.extract(byte_stream)
+            position = byte_stream.tell()
+
+        byte_stream.seek(end)
+
+    def _parse_batch(self, data: bytes, offset: int, count: int, big_endian_ints: bool,
+                     big_endian_floats: bool) -> Union[SubpacketBatch, None]:
+        """
+        :return: Decoded run, or None if it could not be decoded as a batch (e.g. an invalid enum id somewhere)
+        """
+        subpacket_id = data[offset]
+        subpacket_struct, parsing_fn = self.packet_type_to_batch_parser[subpacket_id]
+
+        header_dtype = HEADER_STRUCT.dtype(big_endian_ints, big_endian_floats)
+        body_dtype = subpacket_struct.dtype(big_endian_ints, big_endian_floats)
+        dtype = np.dtype([('header', header_dtype), ('body', body_dtype)])
+
+        records = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        fields = [records['body'][name] for name in body_dtype.names]
+
+        try:
+            columns = parsing_fn(fields, subpacket_id)
+        except Exception as e:
+            LOGGER.debug(f"Batch decoding of subpacket id {subpacket_id} failed, falling back to one by one: {e}")
+            return None
+
+        columns[DataEntryIds.TIME] = records['header']['f1'].astype(np.int64)
+        return SubpacketBatch(subpacket_id, columns)
+
     def parse_data(self, byte_stream: BytesIO, header: Header) -> Dict[Any, Any]:
         """
          General data parser interface. Routes to the right parser, based on subpacket_id.
@@ -172,17 +354,13 @@ class PacketParser:
         :return:
         :rtype:
         """
-        # Get ID
-        subpacket_id: int = byte_stream.read(1)[0]
+        subpacket_id, timestamp = self.unpack(HEADER_STRUCT, byte_stream)
 
         # check that id is valid:
         if subpacket_id not in self.packet_type_to_parser:
             LOGGER.error("Subpacket id %d not valid.", subpacket_id)
             raise ValueError("Subpacket id " + str(subpacket_id) + " not valid.")
 
-        # Get timestamp
-        timestamp: int = self.bytestoint(byte_stream.read(4))
-
         return Header(subpacket_id, timestamp)
 
     def message(self, byte_stream: BytesIO, header: Header):
@@ -217,8 +395,7 @@ class PacketParser:
         :return:
         """
         data: Dict = {}
-        event_bytes = byte_stream.read(2)
-        event_int = self.bytestoint(event_bytes)
+        event_int, = self.unpack(EVENT_STRUCT, byte_stream)
         data_entry_value = EVENT_IDS[event_int]
         data[DataEntryIds.EVENT] = data_entry_value
 
@@ -258,16 +435,25 @@ class PacketParser:
         :param header:
         :return:
         """
-        data = {}
-        state_id = self.bytestoint(byte_stream.read(2))
+        state_id, = self.unpack(STATE_STRUCT, byte_stream)
+        return {DataEntryIds.STATE: self.state_from_id(state_id, print_state=print_state)}
+
+    def state_from_id(self, state_id: int, print_state=True) -> DataEntryValues:
+        """
+        For subpackets that carry a state amongst other fields.
+
+        :param state_id: Id as sent by the rocket
+        :type state_id: int
+        :return: State
+        :rtype: DataEntryValues
+        """
         data_entry_value = STATE_IDS[state_id]
-        data[DataEntryIds.STATE] = data_entry_value
 
         if print_state:
             LOGGER.info("State: %s", str(data_entry_value.name))
 
         STATE_EVENT.increment()
-        return data
+        return data_entry_value
 
     def single_sensor(self, byte_stream: BytesIO, header: Header):
         """
@@ -283,14 +469,76 @@ class PacketParser:
         data_id = DataEntryIds[SubpacketIds(header.subpacket_id).name]
 
         data: Dict = {}
-        data[data_id] = self.fourtofloat(byte_stream.read(4))
+        data[data_id], = self.unpack(SINGLE_SENSOR_STRUCT, byte_stream)
 
         SINGLE_SENSOR_EVENT.increment()
         return data
 
+    def unpack(self, subpacket_struct: SubpacketStruct, byte_stream: BytesIO) -> Tuple:
+        """
+        Decodes a fixed layout part of a subpacket using the current endianness.
+
+        :param subpacket_struct:
+        :type subpacket_struct: SubpacketStruct
+        :param byte_stream:
+        :type byte_stream: BytesIO
+        :return: One value per field
+        :rtype: Tuple
+        """
+        return subpacket_struct.unpack(byte_stream, self.big_endian_ints, self.big_endian_floats)
+
+    def single_sensor_batch(self, fields: List[np.ndarray], subpacket_id: int) -> Dict[Any, np.ndarray]:
+        """
+        Batch equivalent of single_sensor()
+
+        :param fields: One array per SINGLE_SENSOR_STRUCT field
+        :type fields: List[np.ndarray]
+        :param subpacket_id:
+        :type subpacket_id: int
+        :return: Columns
+        :rtype: Dict[Any, np.ndarray]
+        """
+        data_id = DataEntryIds[SubpacketIds(subpacket_id).name]
+        data = {data_id: fields[0].astype(np.float64)}
+
+        SINGLE_SENSOR_EVENT.increment(len(fields[0]))
+        return data
+
+    def states_from_ids(self, state_ids: np.ndarray) -> np.ndarray:
+        """
+        Batch equivalent of state_from_id(), without logging.
+
+        :param state_ids: Ids as sent by the rocket
+        :type state_ids: np.ndarray
+        :return: Object array of states
+        :rtype: np.ndarray
+        """
+        unique_ids, inverse = np.unique(state_ids, return_inverse=True)
+        unique_states = np.empty(len(unique_ids), dtype=object)
+        unique_states[:] = [STATE_IDS[state_id] for state_id in unique_ids.tolist()]
+
+        STATE_EVENT.increment(len(state_ids))
+        return unique_states[inverse]
+
     def register_packet(self, packetType: int, parsing_fn: Callable[[BytesIO, Header], Dict[Any, Any]]):
         self.packet_type_to_parser[packetType] = parsing_fn
 
+    def register_batch_packet(self, packetType: int, subpacket_struct: SubpacketStruct,
+                              parsing_fn: BatchParsingFn):
+        """
+        Allows runs of a fixed layout subpacket to be decoded together, see extract_batch(). packetType must also be
+        registered with register_packet(), which is used for short runs.
+
+        :param packetType:
+        :type packetType: int
+        :param subpacket_struct: Layout of the subpacket after the header
+        :type subpacket_struct: SubpacketStruct
+        :param parsing_fn: Receives one array per field of subpacket_struct and the subpacket id, returns columns. Must
+                           not have side effects before it is sure to succeed, it is retried one by one if it raises.
+        :type parsing_fn: BatchParsingFn
+        """
+        self.packet_type_to_batch_parser[packetType] = (subpacket_struct, parsing_fn)
+
     # TODO Put these in utils folder/file?
     def fourtofloat(self, byte_list):
         """
@@ -301,10 +549,7 @@ class PacketParser:
         :rtype:
         """
         assert len(byte_list) == 4
-        data = byte_list
-        b = struct.pack('4B', *data)
-        c = struct.unpack('>f' if self.big_endian_floats else '<f', b)
-        return c[0]
+        return _FLOAT_STRUCT[bool(self.big_endian_floats)].unpack(bytes(byte_list))[0]
 
     def bytestoint(self, byte_list: list):
         """
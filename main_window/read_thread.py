@@ -1,7 +1,7 @@
 import queue
-from typing import Dict
+from typing import Dict, Optional
 from threading import RLock
-from io import BytesIO, SEEK_END
+from io import BytesIO
 
 from PyQt5 import QtCore
 from PyQt5.QtCore import pyqtSignal
@@ -9,6 +9,7 @@ from PyQt5.QtCore import pyqtSignal
 from main_window.data_entry_id import DataEntryIds
 from util.detail import LOGGER
 from util.event_stats import Event
+from connections.capture import CaptureWriter
 from connections.connection import Connection, ConnectionMessage
 from .rocket_data import RocketData
 from .packet_parser import PacketParser
@@ -19,13 +20,15 @@ CONNECTION_MESSAGE_READ_EVENT = Event('connection_message_read')
 class ReadThread(QtCore.QThread):
     sig_received = pyqtSignal()
 
-    def __init__(self, connections: Dict[str, Connection], rocket_data: RocketData, packet_parser: PacketParser, device_manager: DeviceManager, parent=None) -> None:
+    def __init__(self, connections: Dict[str, Connection], rocket_data: RocketData, packet_parser: PacketParser, device_manager: DeviceManager, capture: Optional[CaptureWriter] = None, parent=None) -> None:
         """Updates GUI, therefore needs to be a QThread and use signals/slots
 
         :param connection:
         :type connection:
         :param rocket_data:
         :type rocket_data:
+        :param capture: (Optional) Every message received is recorded here, for replay with ReplayConnection
+        :type capture: CaptureWriter
         :param parent:
         :type parent:
         """
@@ -41,6 +44,8 @@ class ReadThread(QtCore.QThread):
 
         self.device_manager = device_manager
 
+        self.capture = capture
+
         self.dataQueue = queue.Queue()
 
         for connection in self.connections.values():
@@ -57,6 +62,8 @@ class ReadThread(QtCore.QThread):
         :param data:
         :type data:
         """
+        if self.capture is not None:
+            self.capture.write(self.connection_to_name[connection_message.connection], connection_message)
         self.dataQueue.put_nowait(connection_message)
 
     def run(self):
@@ -81,17 +88,11 @@ class ReadThread(QtCore.QThread):
 
             byte_stream: BytesIO = BytesIO(data)
 
-            # Get length of bytes (without using len(data) for decoupling)
-            byte_stream.seek(0, SEEK_END)
-            end = byte_stream.tell()
-            byte_stream.seek(0)
-
-            # Iterate over stream to extract subpackets where possible
-            while byte_stream.tell() < end:
-                try:
-                    self.packet_parser.set_endianness(connection.isIntBigEndian(), connection.isFloatBigEndian())
-                    parsed_data: Dict[DataEntryIds, any] = self.packet_parser.extract(byte_stream)
-
+            # Extract subpackets where possible. Runs of same type subpackets come out as one batch of columns
+            parsed_bundles = []
+            try:
+                self.packet_parser.set_endianness(connection.isIntBigEndian(), connection.isFloatBigEndian())
+                for parsed_data in self.packet_parser.extract_batch(byte_stream):
                     # if DataEntryIds.DEVICE_TYPE in parsed_data and DataEntryIds.VERSION_ID in parsed_data:
                     #     self.device_manager.register_device(parsed_data[DataEntryIds.DEVICE_TYPE], parsed_data[DataEntryIds.VERSION_ID], full_address)
                     # elif DataEntryIds.DEVICE_TYPE in parsed_data:
@@ -99,14 +100,17 @@ class ReadThread(QtCore.QThread):
                     # elif DataEntryIds.VERSION_ID in parsed_data:
                     #     LOGGER.warning('Received VERSION_ID but not DEVICE_TYPE')
 
-                    self.rocket_data.add_bundle(full_address, parsed_data)
+                    parsed_bundles.append(parsed_data)
+            except Exception as e:
+                LOGGER.exception("Error decoding new packet! %s", e)
+                # Just discard rest of data TODO Review policy on handling remaining data or problem packets. Consider data errors too
+
+            # Store the whole frame at once, subpackets decoded before an error are kept
+            if parsed_bundles:
+                self.rocket_data.add_bundles(full_address, parsed_bundles)
 
-                    # notify UI that new data is available to be displayed
-                    self.sig_received.emit()
-                except Exception as e:
-                    LOGGER.exception("Error decoding new packet! %s", e)
-                    # Just discard rest of data TODO Review policy on handling remaining data or problem packets. Consider data errors too
-                    byte_stream.seek(0, SEEK_END)
+                # notify UI that new data is available to be displayed
+                self.sig_received.emit()
 
             CONNECTION_MESSAGE_READ_EVENT.increment()
 
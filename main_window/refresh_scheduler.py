@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Hashable, Set
+
+from PyQt5 import QtCore
+
+DEFAULT_MAX_FPS = 20
+
+RefreshStats = namedtuple('RefreshStats', [
+    'refreshes',  # Number of times refresh_fn ran, refreshes with nothing dirty are skipped
+    'requests',  # Number of calls to request()
+    'coalesced_requests',  # Requests folded into a later refresh because one ran less than an interval ago
+    'coalesced_updates',  # Keys marked dirty again before being refreshed, i.e. values never displayed
+    'refresh_time_total_s',  # UI thread time spent in refresh_fn
+    'refresh_time_max_s',
+])
+
+
+class RefreshScheduler(QtCore.QObject):
+    """
+    Rate limits UI refreshes to at most max_fps, refreshing only what changed since the last one.
+
+    Any thread can mark keys (e.g. labels) dirty. The UI thread calls request() when new data is available: if the last
+    refresh was at least a frame interval ago the dirty keys are refreshed right away, otherwise a single timer is armed
+    to refresh everything that became dirty in the meantime at the end of the interval.
+
+    request() and the refresh itself run on the thread that owns the scheduler, normally the UI thread.
+    """
+
+    def __init__(self, refresh_fn: Callable[[Set[Hashable]], None], max_fps: float = DEFAULT_MAX_FPS,
+                 parent=None) -> None:
+        """
+
+        :param refresh_fn: Called with the set of dirty keys to refresh
+        :type refresh_fn: Callable[[Set[Hashable]], None]
+        :param max_fps: Maximum refreshes per second
+        :type max_fps: float
+        :param parent:
+        :type parent:
+        """
+        super().__init__(parent)
+
+        self.refresh_fn = refresh_fn
+        self.max_fps = max_fps
+
+        self._lock = threading.Lock()
+        self._dirty: Set[Hashable] = set()
+        self._last_refresh = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.refresh)
+
+        self._refreshes = 0
+        self._requests = 0
+        self._coalesced_requests = 0
+        self._coalesced_updates = 0
+        self._refresh_time_total = 0.0
+        self._refresh_time_max = 0.0
+
+    @property
+    def interval(self) -> float:
+        """
+        :return: Minimum seconds between refreshes
+        :rtype: float
+        """
+        return 1 / self.max_fps
+
+    def mark_dirty(self, *keys: Hashable) -> None:
+        """
+        Thread safe. Keys are refreshed on the next refresh.
+
+        :param keys:
+        :type keys: Hashable
+        """
+        with self._lock:
+            for key in keys:
+                if key in self._dirty:
+                    self._coalesced_updates += 1
+                else:
+                    self._dirty.add(key)
+
+    def request(self) -> None:
+        """
+        Refreshes now, or at the end of the current frame interval if a refresh ran less than one interval ago.
+        """
+        self._requests += 1
+
+        if self._timer.isActive():
+            self._coalesced_requests += 1
+            return
+
+        now = time.perf_counter()
+        if self._last_refresh is None or now - self._last_refresh >= self.interval:
+            self.refresh()
+        else:
+            self._coalesced_requests += 1
+            remaining_ms = (self._last_refresh + self.interval - now) * 1000
+            self._timer.start(max(0, round(remaining_ms)))
+
+    def refresh(self) -> None:
+        """
+        Refreshes dirty keys immediately, ignoring the rate limit.
+        """
+        self._timer.stop()
+
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = set()
+
+        if not dirty:
+            return  # Nothing drawn, so doesn't count against the rate limit
+
+        start = time.perf_counter()
+        self._last_refresh = start
+        self.refresh_fn(dirty)
+        elapsed = time.perf_counter() - start
+
+        self._refreshes += 1
+        self._refresh_time_total += elapsed
+        self._refresh_time_max = max(self._refresh_time_max, elapsed)
+
+    def stop(self) -> None:
+        """
+        Cancels any pending refresh.
+        """
+        self._timer.stop()
+
+    @property
+    def stats(self) -> RefreshStats:
+        """
+        :return: Counters since construction
+        :rtype: RefreshStats
+        """
+        with self._lock:
+            coalesced_updates = self._coalesced_updates
+
+        return RefreshStats(
+            refreshes=self._refreshes,
+            requests=self._requests,
+            coalesced_requests=self._coalesced_requests,
+            coalesced_updates=coalesced_updates,
+            refresh_time_total_s=self._refresh_time_total,
+            refresh_time_max_s=self._refresh_time_max,
+        )
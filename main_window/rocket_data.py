@@ -2,9 +2,8 @@ import os
 import threading
 import time
 from enum import Enum
-from typing import Dict, Union, Set, Callable, List, Optional
+from typing import Dict, Union, Set, Callable, List, Optional, Tuple
 from collections import namedtuple
-from sortedcontainers import SortedDict
 
 import numpy as np
 
@@ -12,30 +11,51 @@ from util.detail import LOGS_DIR, SESSION_ID, LOGGER
 from util.event_stats import Event
 from .data_entry_id import DataEntryIds
 from .device_manager import DeviceManager, DeviceType, FullAddress
+from .flight_log import FlightLog, write_flight_log
+from .series_column import SeriesColumn
+from .series_pyramid import SeriesAggregate, SeriesPyramid, SeriesSummary
 
 BUNDLE_ADDED_EVENT = Event('bundle_added')
 
 DataEntryKey = namedtuple('DataEntry', ['full_address', 'data_id'])
 CallBackKey = namedtuple('DataEntry', ['device', 'data_id'])
+ColumnBundle = namedtuple('ColumnBundle', ['columns'])  # Columns of bundles, see add_columns()
 
 AUTOSAVE_INTERVAL_S = 10
 
 class RocketData:
-    def __init__(self, device_manager: DeviceManager) -> None:
+    def __init__(self, device_manager: DeviceManager, autosave: bool = True) -> None:
         """
-        Timeset is dictionary of all of the time points mapped to a dictionary of DataEntryKey -> value.
+        Keyset is a dictionary of DataEntryKey -> columnar time series for that key.
+
+        :param device_manager:
+        :type device_manager: DeviceManager
+        :param autosave: Append received data to the session's autosave file periodically and on shutdown(). Off for
+                         data that isn't received live (tools, benchmarks, loaded logs), which then keep nothing for it.
+        :type autosave: bool
         """
         self.device_manager = device_manager
 
         self.data_lock = threading.RLock()  # create lock ASAP since self.lock needs to be defined when autosave starts
-        # Map: Time -> key-indexed list of data
-        self.timeset: SortedDict[int, Dict[DataEntryKey, Union[int, float, str, Enum]]] = SortedDict()
-        # Map: Key -> time-indexed list of data
-        self.keyset: Dict[DataEntryKey, SortedDict[int, Union[int, float, str, Enum]]] = dict()
+        # Map: Key -> time-ordered column of data
+        self.keyset: Dict[DataEntryKey, SeriesColumn] = dict()
+        # Same columns indexed by address then id, so that inserting doesn't build a DataEntryKey per value
+        self._columns: Dict[FullAddress, Dict[DataEntryIds, SeriesColumn]] = dict()
+        # Aggregates of numeric series that were queried, kept up to date as they are read
+        self._pyramids: Dict[DataEntryKey, SeriesPyramid] = dict()
         self.last_time = 0
         self.highest_altitude: Dict[FullAddress, float] = dict()
 
         self.session_name = os.path.join(LOGS_DIR, "autosave_" + SESSION_ID + ".csv")
+        # Bundles added since the last autosave checkpoint, as (full_address, time, bundle). Protected by data_lock.
+        # Columns from add_columns() are kept as (full_address, times array, columns) and only split into rows on save.
+        # Only kept while autosave runs, _is_journaling is protected by data_lock too.
+        self._unsaved: List[Tuple[FullAddress, Union[int, np.ndarray], Dict[DataEntryIds, any]]] = []
+        self._is_journaling = autosave
+        # Columns of the current autosave header block, None until the file is first written. Autosave thread only.
+        self._autosave_keys: Optional[List[DataEntryKey]] = None
+        # Row of the latest time held back from the file by the last checkpoint, see autosave(). Autosave thread only.
+        self._held_row: Optional[Tuple[int, Dict[DataEntryKey, any]]] = None
 
         self.callback_lock = threading.RLock()  # Only for callback dict
         self.callbacks: Dict[CallBackKey, List[Callable]] = {}
@@ -43,13 +63,16 @@ class RocketData:
         self.as_cv = threading.Condition()  # Condition variable for autosave (as)
         self._as_is_shutting_down = False  # Lock in cv is used to protect this
 
-        self.autosave_thread = threading.Thread(target=self.timer, daemon=True, name="AutosaveThread")
-        self.autosave_thread.start()
+        self.autosave_thread: Optional[threading.Thread] = None
+        if autosave:
+            self.autosave_thread = threading.Thread(target=self.timer, daemon=True, name="AutosaveThread")
+            self.autosave_thread.start()
 
     # TODO Missing unit test
     def timer(self):
         """
-
+        Appends data received since the last checkpoint to the autosave file every AUTOSAVE_INTERVAL_S, and once more
+        on shutdown.
         """
         LOGGER.debug("Auto-save thread started")
 
@@ -57,31 +80,36 @@ class RocketData:
 
             with self.as_cv:
                 self.as_cv.wait_for(lambda: self._as_is_shutting_down, timeout=AUTOSAVE_INTERVAL_S)
-
-                if self._as_is_shutting_down:
-                    break
+                is_shutting_down = self._as_is_shutting_down
 
             try:
-                t1 = time.perf_counter()
-                self.save(self.session_name)
-                t2 = time.perf_counter()
-                # LOGGER.debug("Auto-Save Successful.")
-                LOGGER.debug(f"Successfully Auto-Saved in {t2 - t1} seconds.")
+                self.autosave(self.session_name, hold_back_last=not is_shutting_down)
             except Exception as e:
                 LOGGER.exception("Exception in autosave thread")  # Automatically grabs and prints exception info
 
+            if is_shutting_down:
+                break
+
         LOGGER.warning("Auto save thread shut down")
 
     # TODO Missing unit test
     def shutdown(self):
+        """
+        Stops autosave after a last checkpoint. Data received afterwards is no longer kept for it.
+        """
         with self.as_cv:
             self._as_is_shutting_down = True
 
-        while self.autosave_thread.is_alive():
-            with self.as_cv:
-                self.as_cv.notify()  # Wake up thread
+        if self.autosave_thread is not None:
+            while self.autosave_thread.is_alive():
+                with self.as_cv:
+                    self.as_cv.notify()  # Wake up thread
 
-        self.autosave_thread.join()  # join thread
+            self.autosave_thread.join()  # join thread
+
+        with self.data_lock:
+            self._is_journaling = False
+            self._unsaved = []
 
     def add_bundle(self, full_address: FullAddress, incoming_data: Dict[DataEntryIds, any]):
         """
@@ -93,44 +121,126 @@ class RocketData:
         :param incoming_data:
         :type incoming_data:
         """
-        with self.data_lock:
-            # if there's a time, set this to the most recent time val
-            if DataEntryIds.TIME in incoming_data:
-                self.last_time = incoming_data[DataEntryIds.TIME]
-
-            # if the timeset then setup a respective dict for the data
-            if self.last_time not in self.timeset:
-                self.timeset[self.last_time] = {}
-
-            # if there's an altitude value, update max
-            if DataEntryIds.CALCULATED_ALTITUDE in incoming_data:
-                if full_address in self.highest_altitude:
-                    self.highest_altitude[full_address] = max(self.highest_altitude[full_address],
-                                                              incoming_data[DataEntryIds.CALCULATED_ALTITUDE])
-                else:
-                    self.highest_altitude[full_address] = incoming_data[DataEntryIds.CALCULATED_ALTITUDE]
+        self.add_bundles(full_address, [incoming_data])
+
+    def add_columns(self, full_address: FullAddress, columns: Dict[DataEntryIds, np.ndarray]):
+        """
+        Bulk add_bundle(): same result as adding one bundle per row of the columns, in order, but each column is
+        appended in one go and callbacks are notified once per data id.
+
+        :param full_address:
+        :type full_address: FullAddress
+        :param columns: Arrays of equal length, must include DataEntryIds.TIME
+        :type columns: Dict[DataEntryIds, np.ndarray]
+        """
+        self.add_bundles(full_address, [ColumnBundle(columns)])
+
+    def add_bundles(self, full_address: FullAddress, bundles: List[Union[Dict[DataEntryIds, any], ColumnBundle]]):
+        """
+        Adds bundles in order, e.g. everything decoded from one radio frame. The data lock is taken once for all of
+        them, and callbacks fire once per data id that appeared rather than once per bundle.
 
-            # write the data
-            for data_id in incoming_data:
-                key = DataEntryKey(full_address, data_id)
+        :param full_address:
+        :type full_address: FullAddress
+        :param bundles: Bundles as given to add_bundle(), or anything with a columns attribute as given to add_columns()
+                        (e.g. ColumnBundle, SubpacketBatch)
+        :type bundles: List[Union[Dict[DataEntryIds, any], ColumnBundle]]
+        """
+        data_ids = dict()  # Ordered set of ids received, for notifications
+        num_bundles = 0
 
-                if key not in self.keyset:
-                    self.keyset[key] = SortedDict()
-                self.timeset[self.last_time][key] = incoming_data[data_id]
-                self.keyset[key][self.last_time] = incoming_data[data_id]
+        with self.data_lock:
+            columns = self._columns.get(full_address)
+            if columns is None:
+                columns = self._columns[full_address] = dict()
+
+            for bundle in bundles:
+                if isinstance(bundle, dict):
+                    self._insert_bundle(full_address, columns, bundle)
+                    num_bundles += 1
+                else:
+                    num_bundles += self._insert_columns(full_address, columns, bundle.columns)
+                    bundle = bundle.columns
+                data_ids.update(dict.fromkeys(bundle))
 
         device = self.device_manager.get_device_type(full_address)
         if device is not None:
             # Notify after all data has been updated
             # Also, do so outside data_lock to prevent mutex contention with notification listeners
-            for data_id in incoming_data:
-                key = CallBackKey(device, data_id)
-                self._notify_callbacks_of_id(key)
+            self._notify_callbacks_of_ids(device, data_ids)
 
-        BUNDLE_ADDED_EVENT.increment()
+        if num_bundles > 0:
+            BUNDLE_ADDED_EVENT.increment(num_bundles)
 
-    # TODO Missing unit test
-    def time_series_by_device(self, device: DeviceType, data_entry_id: DataEntryIds):
+    def _insert_bundle(self, full_address: FullAddress, columns: Dict[DataEntryIds, SeriesColumn],
+                       incoming_data: Dict[DataEntryIds, any]) -> None:
+        """
+        Data lock must be held. columns is self._columns[full_address].
+        """
+        # if there's a time, set this to the most recent time val
+        if DataEntryIds.TIME in incoming_data:
+            self.last_time = incoming_data[DataEntryIds.TIME]
+
+        if self._is_journaling:
+            self._unsaved.append((full_address, self.last_time, incoming_data))
+
+        # if there's an altitude value, update max
+        if DataEntryIds.CALCULATED_ALTITUDE in incoming_data:
+            if full_address in self.highest_altitude:
+                self.highest_altitude[full_address] = max(self.highest_altitude[full_address],
+                                                          incoming_data[DataEntryIds.CALCULATED_ALTITUDE])
+            else:
+                self.highest_altitude[full_address] = incoming_data[DataEntryIds.CALCULATED_ALTITUDE]
+
+        # write the data
+        last_time = self.last_time
+        for data_id, value in incoming_data.items():
+            column = columns.get(data_id)
+            if column is None:
+                column = self._new_column(full_address, data_id)
+            column.append(last_time, value)
+
+    def _insert_columns(self, full_address: FullAddress, columns: Dict[DataEntryIds, SeriesColumn],
+                        incoming_columns: Dict[DataEntryIds, np.ndarray]) -> int:
+        """
+        Data lock must be held. columns is self._columns[full_address].
+
+        :return: Number of rows inserted
+        """
+        times = incoming_columns[DataEntryIds.TIME]
+        if len(times) == 0:
+            return 0
+
+        self.last_time = int(times[-1])
+
+        if self._is_journaling:
+            self._unsaved.append((full_address, times, incoming_columns))
+
+        # if there's an altitude value, update max
+        if DataEntryIds.CALCULATED_ALTITUDE in incoming_columns:
+            highest = float(np.max(incoming_columns[DataEntryIds.CALCULATED_ALTITUDE]))
+            self.highest_altitude[full_address] = max(self.highest_altitude.get(full_address, highest), highest)
+
+        # write the data
+        for data_id, values in incoming_columns.items():
+            column = columns.get(data_id)
+            if column is None:
+                column = self._new_column(full_address, data_id)
+            column.extend(times, values)
+
+        return len(times)
+
+    def _new_column(self, full_address: FullAddress, data_id: DataEntryIds) -> SeriesColumn:
+        """
+        Data lock must be held.
+        """
+        column = SeriesColumn()
+        self.keyset[DataEntryKey(full_address, data_id)] = column
+        self._columns.setdefault(full_address, dict())[data_id] = column
+        return column
+
+    def time_series_by_device(self, device: DeviceType, data_entry_id: DataEntryIds,
+                              t_start: Optional[int] = None, t_end: Optional[int] = None):
         """
         Get a time series list and a value series list for the specified DataEntryIds (enum object)
 
@@ -138,29 +248,115 @@ class RocketData:
         :type device:
         :param data_entry_id:
         :type data_entry_id:
+        :param t_start: (Optional) Inclusive lower time bound
+        :type t_start: int
+        :param t_end: (Optional) Inclusive upper time bound
+        :type t_end: int
         :return: [times], [values]
         :rtype:
         """
-        t = []
-        y = []
+        series = self.series_by_device(device, data_entry_id, t_start, t_end)
 
-        with self.data_lock:
-            all_times = list(self.timeset.keys())
+        if series is None:
+            return None
+
+        return series[0].tolist(), series[1].tolist()
 
+    def series_by_device(self, device: DeviceType, data_entry_id: DataEntryIds,
+                         t_start: Optional[int] = None, t_end: Optional[int] = None
+                         ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Get the time and value arrays for the specified DataEntryIds (enum object), straight from that key's column.
+        Cost depends only on the number of points returned, not on how much other data has been received.
+        Returns None if requested device address not available or if no value found in the time range.
+
+        :param device:
+        :type device:
+        :param data_entry_id:
+        :type data_entry_id:
+        :param t_start: (Optional) Inclusive lower time bound
+        :type t_start: int
+        :param t_end: (Optional) Inclusive upper time bound
+        :type t_end: int
+        :return: times, values. Numeric series are read-only (see SeriesColumn.slice()), others are object arrays.
+        :rtype: Tuple[np.ndarray, np.ndarray]
+        """
+        with self.data_lock:
             full_address = self.device_manager.get_full_address(device)
             if full_address is None:
                 return None
 
             data_entry_key = DataEntryKey(full_address, data_entry_id)
-            for time in all_times:
-                if data_entry_key in self.timeset[time]:
-                    t.append(time)
-                    y.append(self.timeset[time][data_entry_key])
+            if data_entry_key not in self.keyset:
+                return None
 
-            if len(t) == 0:
+            times, values = self.keyset[data_entry_key].slice(t_start, t_end)
+
+            if len(times) == 0:
                 return None
 
-            return t, y
+            return times, values
+
+    def aggregate_by_device(self, device: DeviceType, data_entry_id: DataEntryIds, t_start: Optional[int] = None,
+                            t_end: Optional[int] = None, num_buckets: int = 1000) -> Optional[SeriesAggregate]:
+        """
+        Min, max and mean of a numeric series over time buckets, the longest that still split the time range in at
+        least num_buckets (see SeriesPyramid.aggregate()).
+
+        :param device:
+        :type device:
+        :param data_entry_id:
+        :type data_entry_id:
+        :param t_start: (Optional) Inclusive lower time bound
+        :type t_start: int
+        :param t_end: (Optional) Inclusive upper time bound
+        :type t_end: int
+        :param num_buckets: e.g. the width of a plot in pixels
+        :type num_buckets: int
+        :return: None if the series isn't numeric or has no value in the time range
+        :rtype: Optional[SeriesAggregate]
+        """
+        with self.data_lock:
+            pyramid = self._pyramid(device, data_entry_id)
+            return None if pyramid is None else pyramid.aggregate(t_start, t_end, num_buckets)
+
+    def summary_by_device(self, device: DeviceType, data_entry_id: DataEntryIds, t_start: Optional[int] = None,
+                          t_end: Optional[int] = None) -> Optional[SeriesSummary]:
+        """
+        Exact min, max, mean and count of a numeric series over a time range, mostly read from aggregates.
+
+        :param device:
+        :type device:
+        :param data_entry_id:
+        :type data_entry_id:
+        :param t_start: (Optional) Inclusive lower time bound
+        :type t_start: int
+        :param t_end: (Optional) Inclusive upper time bound
+        :type t_end: int
+        :return: None if the series isn't numeric or has no value in the time range
+        :rtype: Optional[SeriesSummary]
+        """
+        with self.data_lock:
+            pyramid = self._pyramid(device, data_entry_id)
+            return None if pyramid is None else pyramid.summary(t_start, t_end)
+
+    def _pyramid(self, device: DeviceType, data_entry_id: DataEntryIds) -> Optional[SeriesPyramid]:
+        """
+        Data lock must be held.
+        """
+        full_address = self.device_manager.get_full_address(device)
+        if full_address is None:
+            return None
+
+        data_entry_key = DataEntryKey(full_address, data_entry_id)
+        column = self.keyset.get(data_entry_key)
+        if column is None or column.dtype is None or column.is_coded:
+            return None
+
+        pyramid = self._pyramids.get(data_entry_key)
+        if pyramid is None or pyramid.column is not column:  # Replaced by load()
+            pyramid = self._pyramids[data_entry_key] = SeriesPyramid(column)
+        return pyramid
 
     # TODO Missing unit test
     def last_value_and_time(self, device: DeviceType, data_entry_id: DataEntryIds) -> Optional[tuple]:
@@ -226,6 +422,107 @@ class RocketData:
 
             return None
 
+    def autosave(self, csv_path, hold_back_last: bool = False):
+        """
+        Incremental save. Appends only the rows received since the previous call to the csv, starting a new header
+        block only when new columns have appeared. The data lock is held just long enough to swap out the list of
+        pending bundles, so cost no longer grows with session length and add_bundle is never blocked on file IO.
+
+        Rows are grouped by time. The first call truncates the file. If writing fails, the rows are kept for the next
+        call.
+
+        :param csv_path:
+        :type csv_path:
+        :param hold_back_last: Keep the row of the latest time for the next call instead of writing it, so that bundles
+                               of that time arriving just after this checkpoint still end up in the same row
+        :type hold_back_last: bool
+        """
+        t1 = time.perf_counter()
+        with self.data_lock:
+            pending = self._unsaved
+            self._unsaved = []
+        t2 = time.perf_counter()
+
+        if len(pending) == 0 and (hold_back_last or self._held_row is None):
+            return
+
+        # Merge bundles sharing the same time into one row, last value wins
+        rows: Dict[int, Dict[DataEntryKey, any]] = dict()
+        if self._held_row is not None:
+            held_time, held_row = self._held_row
+            rows[held_time] = dict(held_row)
+
+        for full_address, row_time, bundle in pending:
+            if isinstance(row_time, np.ndarray):  # From add_columns()
+                keys = [DataEntryKey(full_address, data_id) for data_id in bundle]
+                column_values = zip(*(values.tolist() for values in bundle.values()))
+                for column_time, values in zip(row_time.tolist(), column_values):
+                    rows.setdefault(column_time, dict()).update(zip(keys, values))
+                continue
+
+            row = rows.setdefault(row_time, dict())
+            for data_id, value in bundle.items():
+                row[DataEntryKey(full_address, data_id)] = value
+
+        held_row = None
+        if hold_back_last:
+            last_time = max(rows)
+            held_row = (last_time, rows.pop(last_time))
+
+        is_first_write = self._autosave_keys is None
+        autosave_keys = self._autosave_keys
+        known_keys = set() if is_first_write else set(autosave_keys)
+        new_keys = {key for row in rows.values() for key in row if key not in known_keys}
+
+        lines = []
+        if new_keys:
+            column_names, autosave_keys = self._sorted_column_names(known_keys | new_keys)
+            lines.append(','.join(column_names))
+
+        for row_time in sorted(rows):
+            row = rows[row_time]
+            lines.append(','.join(self._csv_field(key, row_time, row) for key in autosave_keys))
+
+        if lines:
+            try:
+                with open(csv_path, 'w' if is_first_write else 'a') as f:
+                    f.write('\n'.join(lines) + '\n')
+            except Exception:
+                # Nothing is committed until the write succeeds, so the next call retries the same rows
+                with self.data_lock:
+                    if self._is_journaling:
+                        self._unsaved = pending + self._unsaved
+                raise
+
+        self._autosave_keys = autosave_keys
+        self._held_row = held_row
+
+        t3 = time.perf_counter()
+        LOGGER.debug(f"Auto-saved {len(rows)} rows ({len(new_keys)} new columns) in {t3 - t1:.4f} seconds, "
+                     f"data lock held for {t2 - t1:.6f} seconds")
+
+    def _sorted_column_names(self, keys) -> Tuple[List[str], List[DataEntryKey]]:
+        """
+        Column names for the given keys, with both sorted based on device name (alphabetically)
+        """
+        column_names = list(map(lambda x: (x.data_id.name if isinstance(x.data_id, DataEntryIds) else str(x.data_id)) + '_'
+            + (self.device_manager.get_device_type(x.full_address).name if self.device_manager.get_device_type(x.full_address)
+            else f"{x.full_address.connection_name}_{x.full_address.device_address}"), keys))
+
+        column_names, keys = zip(*sorted(zip(column_names, keys)))
+        return list(column_names), list(keys)
+
+    @staticmethod
+    def _csv_field(key: DataEntryKey, row_time: int, row: Dict[DataEntryKey, any]) -> str:
+        # For a time entry, use the row time
+        if key.data_id == DataEntryIds.TIME:
+            return str(row_time)
+        # Empty entry if this row of data doesn't have a val in this column
+        if key not in row:
+            return ""
+        value = row[key]
+        return str(value) if not isinstance(value, Enum) else value.name
+
     # TODO Missing unit test
     def save(self, csv_path):
         """
@@ -237,41 +534,93 @@ class RocketData:
         :rtype:
         """
         with self.data_lock:
-            if len(self.timeset) <= 0:
+            if len(self.keyset) <= 0:
                 return
 
-            # all appearing keys
-            keys: List[DataEntryKey] = list(map(
-                lambda data_entry_key: DataEntryKey(data_entry_key.full_address, data_entry_key.data_id),
-                set(self.keyset.keys())))
+            # all appearing keys, sorted based on device name (alphabetically)
+            column_names, keys = self._sorted_column_names(self.keyset.keys())
 
-            column_names = list(map(lambda x: (x.data_id.name if isinstance(x.data_id, DataEntryIds) else str(x.data_id)) + '_'
-                + (self.device_manager.get_device_type(x.full_address).name if self.device_manager.get_device_type(x.full_address)
-                else f"{x.full_address.connection_name}_{x.full_address.device_address}"), keys))
+            # Union of every column's times makes up the rows
+            times = np.unique(np.concatenate([self.keyset[key].times() for key in keys]))
 
-            #sort keys based on device name (alphabetically)
-            column_names, keys = zip(*sorted(zip(column_names, keys)))
-
-            data = np.empty((len(keys), len(self.timeset) + 1), dtype=object)
-            times = list(self.timeset.keys())
-            for ix, iy in np.ndindex(data.shape):
+            # Empty entry if this row of data doesn't have a val in this column
+            data = np.full((len(keys), len(times) + 1), "", dtype=object)
+            for ix, key in enumerate(keys):
                 # Make the first row a list of sensor names. Use the enum's name property
-                if iy == 0:
-                    data[ix, iy] = column_names[ix]
+                data[ix, 0] = column_names[ix]
+
                 # For a time entry, copy over from time list
-                elif keys[ix].data_id == DataEntryIds.TIME:
-                    data[ix, iy] = times[iy - 1]
-                # Otherwise as long as it exists, copy it over, trying to stringify from enum
-                elif keys[ix] in self.timeset[times[iy - 1]]:
-                    value = self.timeset[times[iy - 1]][keys[ix]]
-                    data[ix, iy] = value if not isinstance(value, Enum) else value.name
-                # Empty entry if this row of data doesn't have a val in this column
+                if key.data_id == DataEntryIds.TIME:
+                    data[ix, 1:] = times.tolist()
+                    continue
+
+                # Otherwise copy over the rows this column has a value for, trying to stringify from enum
+                column = self.keyset[key]
+                rows = np.searchsorted(times, column.times()) + 1
+                values = column.values()
+                if column.is_coded:
+                    values = np.array([value if not isinstance(value, Enum) else value.name for value in values],
+                                      dtype=object)
                 else:
-                    data[ix, iy] = ""
+                    values = np.array(values.tolist(), dtype=object)  # Python scalars so %s formats like before
+                data[ix, rows] = values
 
         # Can free up the lock while we save since were no longer accessing the original data
         np.savetxt(csv_path, np.transpose(data), delimiter=',', fmt="%s")
 
+    def save_log(self, log_path):
+        """
+        Saves all data to a binary flight log (see flight_log.py). Much smaller and faster to write and load than csv,
+        and lossless. The data lock is only held while copying out the column arrays.
+
+        :param log_path:
+        :type log_path:
+        """
+        with self.data_lock:
+            columns = {(key.full_address, key.data_id): column.raw() for key, column in self.keyset.items()}
+
+        devices = {full_address: self.device_manager.get_device_type(full_address) for full_address, _ in columns}
+        devices = {full_address: device_type for full_address, device_type in devices.items() if device_type is not None}
+        write_flight_log(log_path, columns, session_id=SESSION_ID, devices=devices)
+
+    def load(self, log_path):
+        """
+        Rehydrates a session from a binary flight log, replacing any series with the same key. Numeric series stay
+        memory mapped, so large sessions load almost instantly and are only paged in as they are read.
+
+        Data of a device that is registered now goes to its current address, e.g. a flight received over serial can
+        be looked at while connected to the debug connection. Other data keeps the address it was logged with.
+
+        Callbacks are notified once loading is done.
+
+        :param log_path:
+        :type log_path:
+        """
+        with FlightLog(log_path) as flight_log:
+            addresses = {logged_address: self.device_manager.get_full_address(device_type)
+                         for logged_address, device_type in flight_log.devices.items()}
+            columns = {DataEntryKey(addresses.get(full_address) or full_address, data_id):
+                       SeriesColumn.from_arrays(*flight_log.raw((full_address, data_id)))
+                       for full_address, data_id in flight_log.keys()}
+
+        with self.data_lock:
+            self.keyset.update(columns)
+
+            for key, column in columns.items():
+                self._columns.setdefault(key.full_address, dict())[key.data_id] = column
+
+                if len(column) == 0:
+                    continue
+
+                self.last_time = max(self.last_time, column.peekitem()[0])
+
+                if key.data_id == DataEntryIds.CALCULATED_ALTITUDE:
+                    highest = float(np.max(column.values()))
+                    self.highest_altitude[key.full_address] = max(
+                        self.highest_altitude.get(key.full_address, highest), highest)
+
+        self._notify_all_callbacks()
+
     # TODO Missing unit test
     def add_new_callback(self, device: DeviceType, data_id: DataEntryIds, callback_fn: Callable):
         """
@@ -303,6 +652,22 @@ class RocketData:
                 for fn in self.callbacks[key]:
                     fn()
 
+    def _notify_callbacks_of_ids(self, device: DeviceType, data_ids):
+        """
+        Same as calling _notify_callbacks_of_id() for each id, but takes the callback lock once.
+
+        :param device:
+        :type device: DeviceType
+        :param data_ids:
+        :type data_ids: Iterable[DataEntryIds]
+        """
+        with self.callback_lock:
+            for data_id in data_ids:
+                callbacks = self.callbacks.get(CallBackKey(device, data_id))
+                if callbacks:
+                    for fn in callbacks:
+                        fn()
+
     # TODO Missing unit test
     def _notify_all_callbacks(self):
         """
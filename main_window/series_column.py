@@ -0,0 +1,447 @@
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+INITIAL_CAPACITY = 64
+
+TIME_DTYPE = np.int64
+
+# Values that cannot live in a numeric array (enums, strings, datetimes, ...) are stored as codes into a side table
+CODE_DTYPE = np.int32
+
+
+# Python type that can be written straight into a column of a given dtype without any checks (fast path)
+_NATIVE_TYPE = {
+    np.dtype(np.bool_): bool,
+    np.dtype(np.int64): int,
+    np.dtype(np.float64): float,
+}
+
+
+def _dtype_for(value) -> np.dtype:
+    """
+    Picks the narrowest column dtype able to hold value, or None if it has to go in the side table.
+
+    :param value:
+    :return:
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return np.dtype(np.bool_)
+    if isinstance(value, (int, np.integer)) and not isinstance(value, Enum):
+        return np.dtype(np.int64)
+    if isinstance(value, (float, np.floating)):
+        return np.dtype(np.float64)
+    return None
+
+
+def _dtype_for_array(values: np.ndarray) -> np.dtype:
+    """
+    Array equivalent of _dtype_for(), None if values have to go in the side table.
+    """
+    if values.dtype.kind == 'b':
+        return np.dtype(np.bool_)
+    if values.dtype.kind in 'iu':
+        return np.dtype(np.int64)
+    if values.dtype.kind == 'f':
+        return np.dtype(np.float64)
+    return None
+
+
+class SeriesColumn:
+    """
+    Growable, typed time series for a single (FullAddress, DataEntryIds) pair.
+
+    Times and values live in two preallocated NumPy arrays that double in size when full, so appending is amortized
+    O(1) and a million float samples cost ~16 MB instead of two boxed SortedDict entries. Values that are not numeric
+    (enums, strings, datetimes) are stored as int32 codes into a per-column side table.
+
+    Mirrors the SortedDict semantics it replaces: series are ordered by time and writing an existing time overwrites
+    its value. Out of order appends are accepted and sorted lazily on the next read.
+
+    Not thread safe, owner is responsible for locking.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY) -> None:
+        self._times = np.empty(capacity, dtype=TIME_DTYPE)
+        self._values = None  # Allocated on first append, once we know the dtype
+        self._coded = False
+        self._native_type = None
+        self._size = 0
+        self._last_time = None
+        self._is_sorted = True
+        self._earliest_rewrite: Optional[int] = None  # See pop_earliest_rewrite()
+        self._last_value_shared = False  # A view including the last value was handed out, see _decode_all()
+
+        # Side table for non-numeric values
+        self._table: List[Any] = []
+        self._table_index: Dict[Any, int] = {}
+        self._table_array: Optional[np.ndarray] = None  # Cached object array of _table, for vectorized decoding
+
+    @classmethod
+    def from_arrays(cls, times: np.ndarray, values: np.ndarray, table: Optional[List[Any]] = None) -> 'SeriesColumn':
+        """
+        Wraps existing arrays without copying them, e.g. arrays memory mapped from a flight log. They may be read-only,
+        the column switches to its own buffers on the first write.
+
+        :param times: Sorted, unique times
+        :type times: np.ndarray
+        :param values: Values, or codes into table
+        :type values: np.ndarray
+        :param table: Side table if values are codes, otherwise None
+        :type table: Optional[List[Any]]
+        :return: New column
+        :rtype: SeriesColumn
+        """
+        assert len(times) == len(values)
+
+        column = cls(capacity=0)
+        column._times = times
+        column._values = values
+        column._size = len(times)
+        column._last_time = int(times[-1]) if len(times) > 0 else None
+
+        if table is not None:
+            column._coded = True
+            column._table = list(table)
+            for code, value in enumerate(column._table):
+                try:
+                    column._table_index.setdefault(value, code)
+                except TypeError:  # Unhashable, see _encode()
+                    pass
+        else:
+            column._native_type = _NATIVE_TYPE.get(values.dtype)
+
+        return column
+
+    def raw(self) -> Tuple[np.ndarray, np.ndarray, Optional[List[Any]]]:
+        """
+        Snapshot of the column's storage, safe to use after releasing the owner's lock.
+
+        :return: Copies of the times, the stored values (codes for side table columns) and the side table (None if not
+                 coded)
+        :rtype: Tuple[np.ndarray, np.ndarray, Optional[List[Any]]]
+        """
+        self._compact()
+        values = self._values[:self._size] if self._values is not None else np.empty(0, dtype=np.float64)
+        return self._times[:self._size].copy(), values.copy(), list(self._table) if self._coded else None
+
+    @property
+    def dtype(self) -> np.dtype:
+        return None if self._values is None else self._values.dtype
+
+    @property
+    def is_coded(self) -> bool:
+        """
+        :return: True if values are stored as codes into the side table
+        """
+        return self._coded
+
+    def __len__(self) -> int:
+        self._compact()
+        return self._size
+
+    def append(self, time: int, value) -> None:
+        """
+        Adds value at time. Overwrites the previous value if time was already the most recent time in the series.
+
+        :param time:
+        :type time: int
+        :param value:
+        :type value: Any
+        """
+        if self._values is None:
+            dtype = _dtype_for(value)
+            self._values = np.empty(len(self._times), dtype=CODE_DTYPE if dtype is None else dtype)
+            self._coded = dtype is None
+            self._native_type = _NATIVE_TYPE.get(dtype)
+
+        stored = value if type(value) is self._native_type else self._store_value(value)
+
+        if self._last_time is not None:
+            if time == self._last_time:
+                # Copied first if a view handed out by values() or slice() could see the overwrite (see
+                # _decode_all()), or if wrapping read-only arrays (see from_arrays())
+                if self._last_value_shared or not self._values.flags.writeable:
+                    self._values = self._values.copy()
+                    self._last_value_shared = False
+                self._values[self._size - 1] = stored
+                self._rewritten(time)
+                return
+            if time < self._last_time:
+                self._is_sorted = False
+                self._rewritten(time)
+
+        if self._size == len(self._times):
+            self._grow()
+
+        self._times[self._size] = time
+        self._values[self._size] = stored
+        self._size += 1
+        self._last_time = time
+        self._last_value_shared = False
+
+    def extend(self, times: np.ndarray, values: np.ndarray) -> None:
+        """
+        Vectorized append(), same result as appending each (time, value) pair in order.
+
+        :param times:
+        :type times: np.ndarray
+        :param values: Numeric array, or object array of anything else
+        :type values: np.ndarray
+        """
+        assert len(times) == len(values)
+        if len(times) == 0:
+            return
+
+        if self._values is None:
+            dtype = _dtype_for_array(values)
+            self._values = np.empty(len(self._times), dtype=CODE_DTYPE if dtype is None else dtype)
+            self._coded = dtype is None
+            self._native_type = _NATIVE_TYPE.get(dtype)
+
+        stored = self._store_values(values)
+
+        first_time = int(times[0])
+        if (self._last_time is not None and first_time <= self._last_time) or np.any(times[1:] <= times[:-1]):
+            # Overwrites or out of order, _compact() sorts it out keeping the last write for each time
+            self._is_sorted = False
+            self._rewritten(int(np.min(times)))
+
+        new_size = self._size + len(times)
+        if new_size > len(self._times) or not self._values.flags.writeable:
+            capacity = max(len(self._times), INITIAL_CAPACITY)
+            while capacity < new_size:
+                capacity *= 2
+            self._grow(capacity)
+
+        self._times[self._size:new_size] = times
+        self._values[self._size:new_size] = stored
+        self._size = new_size
+        self._last_time = int(times[-1])
+        self._last_value_shared = False
+
+    def pop_earliest_rewrite(self) -> Optional[int]:
+        """
+        For keeping something derived from the column up to date (see SeriesPyramid): values from the returned time on
+        may have changed, not only been appended to.
+
+        :return: Earliest time overwritten or appended out of order since the last call, None if there was none
+        :rtype: Optional[int]
+        """
+        time = self._earliest_rewrite
+        self._earliest_rewrite = None
+        return time
+
+    def _rewritten(self, time: int) -> None:
+        if self._earliest_rewrite is None or time < self._earliest_rewrite:
+            self._earliest_rewrite = time
+
+    def peekitem(self) -> Tuple[int, Any]:
+        """
+        Same as SortedDict.peekitem(), returns the item with the greatest time.
+
+        :return: time, value
+        :rtype: Tuple[int, Any]
+        """
+        self._compact()
+        if self._size == 0:
+            raise IndexError("peekitem on empty column")
+        return int(self._times[self._size - 1]), self._decode(self._values[self._size - 1])
+
+    def times(self) -> np.ndarray:
+        """
+        :return: Read-only view of the times, sorted ascending
+        :rtype: np.ndarray
+        """
+        self._compact()
+        view = self._times[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def values(self) -> np.ndarray:
+        """
+        :return: Values ordered by time. Read-only for numeric columns, object array otherwise. See _decode_all()
+        :rtype: np.ndarray
+        """
+        self._compact()
+        if self._values is None:
+            return np.empty(0, dtype=object)
+
+        return self._decode_all(0, self._size)
+
+    def values_view(self) -> np.ndarray:
+        """
+        Same as values() for numeric columns, but always a view, including the last value that a later append() may
+        overwrite. For reading under the owner's lock (see SeriesPyramid), not for handing out.
+
+        :return: Read-only view of the values ordered by time
+        :rtype: np.ndarray
+        """
+        self._compact()
+        if self._values is None:
+            return np.empty(0, dtype=np.float64)
+
+        view = self._values[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def slice(self, t_start: Optional[int] = None, t_end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Times and values within [t_start, t_end], found by binary search so cost only depends on the slice length.
+
+        :param t_start: Inclusive lower time bound, None for unbounded
+        :type t_start: Optional[int]
+        :param t_end: Inclusive upper time bound, None for unbounded
+        :type t_end: Optional[int]
+        :return: times, values (see times() and values())
+        :rtype: Tuple[np.ndarray, np.ndarray]
+        """
+        times = self.times()
+        start = 0 if t_start is None else int(np.searchsorted(times, t_start, side='left'))
+        end = len(times) if t_end is None else int(np.searchsorted(times, t_end, side='right'))
+        end = max(start, end)
+
+        if self._values is None:
+            return times[start:end], np.empty(0, dtype=object)
+
+        return times[start:end], self._decode_all(start, end)
+
+    def items(self) -> List[Tuple[int, Any]]:
+        """
+        :return: List of (time, value) pairs ordered by time
+        """
+        return list(zip(self.times().tolist(), self.values().tolist()))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        :return: Bytes held by the column buffers (excluding the side table)
+        """
+        return self._times.nbytes + (0 if self._values is None else self._values.nbytes)
+
+    def _store_value(self, value):
+        if self._coded:
+            return self._encode(value)
+
+        dtype = _dtype_for(value)
+        if dtype is None:
+            # Numeric column received something that isn't a number, fall back to side table for the whole column
+            self._convert_to_coded()
+            return self._encode(value)
+
+        if dtype != self._values.dtype:
+            # e.g. int column receiving a float. Promote so no precision is lost
+            promoted = np.promote_types(self._values.dtype, dtype)
+            if promoted != self._values.dtype:
+                self._values = self._values.astype(promoted)
+                self._native_type = _NATIVE_TYPE.get(promoted)
+
+        return value
+
+    def _store_values(self, values: np.ndarray) -> np.ndarray:
+        dtype = _dtype_for_array(values)
+
+        if not self._coded and dtype is None:
+            self._convert_to_coded()
+
+        if self._coded:
+            return np.fromiter((self._encode(value) for value in values.tolist()), dtype=CODE_DTYPE, count=len(values))
+
+        promoted = np.promote_types(self._values.dtype, dtype)
+        if promoted != self._values.dtype:
+            self._values = self._values.astype(promoted)
+            self._native_type = _NATIVE_TYPE.get(promoted)
+
+        return values
+
+    def _encode(self, value) -> int:
+        try:
+            return self._table_index[value]
+        except KeyError:
+            code = len(self._table)
+            self._table.append(value)
+            self._table_index[value] = code
+            return code
+        except TypeError:  # Unhashable, store as-is without de-duplicating
+            self._table.append(value)
+            return len(self._table) - 1
+
+    def _decode_all(self, start: int, end: int) -> np.ndarray:
+        """
+        Values in [start, end) for handing out, numeric ones read-only. append() overwrites the last value for a
+        repeated time, so a short range including it is copied, and a long one is a view that makes the next overwrite
+        copy the buffer. Either way, a copy costs about as much as the read that made it necessary.
+        """
+        stored = self._values[start:end]
+        if self._coded:
+            if self._table_array is None or len(self._table_array) != len(self._table):
+                self._table_array = np.empty(len(self._table), dtype=object)
+                self._table_array[:] = self._table
+            return self._table_array[stored]
+
+        if end == self._size and end > start:
+            if 2 * (end - start) < self._size:
+                stored = stored.copy()
+            else:
+                self._last_value_shared = True
+        stored.flags.writeable = False
+        return stored
+
+    def _decode(self, stored):
+        if self._coded:
+            return self._table[stored]
+        return stored.item()
+
+    def _convert_to_coded(self) -> None:
+        old = self._values[:self._size].tolist()
+        self._values = np.empty(len(self._times), dtype=CODE_DTYPE)
+        self._coded = True
+        self._native_type = None
+        for i, value in enumerate(old):
+            self._values[i] = self._encode(value)
+
+    def _grow(self, capacity: Optional[int] = None) -> None:
+        if capacity is None:
+            capacity = max(2 * len(self._times), INITIAL_CAPACITY)
+
+        times = np.empty(capacity, dtype=TIME_DTYPE)
+        times[:self._size] = self._times[:self._size]
+        self._times = times
+
+        values = np.empty(capacity, dtype=self._values.dtype)
+        values[:self._size] = self._values[:self._size]
+        self._values = values
+        self._last_value_shared = False
+
+    def _compact(self) -> None:
+        """
+        Restores time ordering after out of order appends. The last value written for a given time wins, matching
+        SortedDict assignment. New arrays are allocated so that views handed out earlier are not modified.
+        """
+        if self._is_sorted:
+            return
+
+        times = self._times[:self._size]
+        values = self._values[:self._size]
+
+        order = np.argsort(times, kind='stable')
+        times = times[order]
+        values = values[order]
+
+        # Keep the last occurrence of each time
+        keep = np.ones(len(times), dtype=bool)
+        keep[:-1] = times[1:] != times[:-1]
+        times = times[keep]
+        values = values[keep]
+
+        self._size = len(times)
+        self._last_time = int(times[-1])
+        self._times = np.empty(max(len(self._times), INITIAL_CAPACITY), dtype=TIME_DTYPE)
+        self._times[:self._size] = times
+        new_values = np.empty(len(self._times), dtype=self._values.dtype)
+        new_values[:self._size] = values
+        self._values = new_values
+        self._last_value_shared = False
+
+        self._is_sorted = True
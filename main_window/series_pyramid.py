@@ -0,0 +1,236 @@
+"""
+Aggregates (min, max, mean, count) of a series over fixed time buckets, at several resolutions, so that plots and
+summaries of long sessions read a few thousand buckets instead of every sample.
+"""
+from collections import namedtuple
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .series_column import SeriesColumn, TIME_DTYPE
+
+PYRAMID_LEVELS_MS = (10, 100, 1_000, 10_000)  # Bucket lengths, each a multiple of the previous one
+SUMMARY_SCAN_SAMPLES = 65_536  # Summaries of fewer samples are computed from the samples, faster than from buckets
+INITIAL_CAPACITY = 64
+
+SeriesAggregate = namedtuple('SeriesAggregate', [
+    'times',  # Start of each bucket
+    'minimums',
+    'maximums',
+    'means',
+    'counts',  # Samples in each bucket, buckets without any are left out
+    'bucket_ms',  # Length of the buckets, 0 for samples (one per bucket)
+])
+
+SeriesSummary = namedtuple('SeriesSummary', ['minimum', 'maximum', 'mean', 'count'])
+
+
+def _group(indices: np.ndarray, minimums: np.ndarray, maximums: np.ndarray, sums: np.ndarray,
+           counts: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """
+    Merges consecutive rows with the same bucket index.
+
+    :param indices: Sorted
+    :type indices: np.ndarray
+    :return: indices, minimums, maximums, sums, counts with one row per bucket
+    :rtype: Tuple[np.ndarray, ...]
+    """
+    starts = np.flatnonzero(np.diff(indices, prepend=indices[0] - 1))
+    return (indices[starts], np.minimum.reduceat(minimums, starts), np.maximum.reduceat(maximums, starts),
+            np.add.reduceat(sums, starts), np.add.reduceat(counts, starts))
+
+
+class _Level:
+    """
+    Buckets of one length, growable arrays ordered by bucket index (time // length).
+    """
+
+    def __init__(self, bucket_ms: int) -> None:
+        self.bucket_ms = bucket_ms
+        self._size = 0
+        self._indices = np.empty(INITIAL_CAPACITY, dtype=TIME_DTYPE)
+        self._minimums = np.empty(INITIAL_CAPACITY, dtype=np.float64)
+        self._maximums = np.empty(INITIAL_CAPACITY, dtype=np.float64)
+        self._sums = np.empty(INITIAL_CAPACITY, dtype=np.float64)
+        self._counts = np.empty(INITIAL_CAPACITY, dtype=np.int64)
+
+    @property
+    def indices(self) -> np.ndarray:
+        return self._indices[:self._size]
+
+    def rows(self, start: int = 0, end: Optional[int] = None) -> Tuple[np.ndarray, ...]:
+        """
+        :return: indices, minimums, maximums, sums, counts of buckets [start, end)
+        :rtype: Tuple[np.ndarray, ...]
+        """
+        end = self._size if end is None else end
+        return (self._indices[start:end], self._minimums[start:end], self._maximums[start:end], self._sums[start:end],
+                self._counts[start:end])
+
+    def search(self, index: int) -> int:
+        """
+        :return: Position of the first bucket with an index of at least index
+        :rtype: int
+        """
+        return int(np.searchsorted(self.indices, index))
+
+    def truncate(self, index: int) -> None:
+        """
+        Drops the buckets from index on.
+        """
+        self._size = self.search(index)
+
+    def extend(self, indices: np.ndarray, minimums: np.ndarray, maximums: np.ndarray, sums: np.ndarray,
+               counts: np.ndarray) -> None:
+        """
+        :param indices: Sorted and after the last bucket, repeated indices are merged
+        :type indices: np.ndarray
+        """
+        if len(indices) == 0:
+            return
+
+        rows = _group(indices, minimums, maximums, sums, counts)
+        new_size = self._size + len(rows[0])
+        if new_size > len(self._indices):
+            capacity = len(self._indices)
+            while capacity < new_size:
+                capacity *= 2
+            for name in ('_indices', '_minimums', '_maximums', '_sums', '_counts'):
+                grown = np.empty(capacity, dtype=getattr(self, name).dtype)
+                grown[:self._size] = getattr(self, name)[:self._size]
+                setattr(self, name, grown)
+
+        for array, row in zip((self._indices, self._minimums, self._maximums, self._sums, self._counts), rows):
+            array[self._size:new_size] = row
+        self._size = new_size
+
+
+class SeriesPyramid:
+    def __init__(self, column: SeriesColumn) -> None:
+        """
+        Buckets of a numeric column for each of PYRAMID_LEVELS_MS. Samples appended since the last read are folded in
+        when it is read: only the last bucket of each level is recomputed, so keeping it up to date costs the same
+        however long the series is. Values overwritten or appended out of order recompute the buckets from their time on.
+
+        Not thread safe, owner is responsible for locking.
+
+        :param column:
+        :type column: SeriesColumn
+        """
+        self.column = column
+        self.levels = [_Level(bucket_ms) for bucket_ms in PYRAMID_LEVELS_MS]
+        self._num_folded = 0  # Samples of the column in the buckets
+        column.pop_earliest_rewrite()  # Everything is folded on the first update
+
+    def update(self) -> None:
+        """
+        Folds in the samples appended to the column since the last update.
+        """
+        times = self.column.times()
+        rewrite = self.column.pop_earliest_rewrite()
+        if rewrite is None and self._num_folded == len(times):
+            return
+
+        # Buckets from the one the first new sample falls in are recomputed, from their first sample
+        start_times = [] if rewrite is None else [rewrite]
+        if self._num_folded < len(times):
+            start_times.append(int(times[self._num_folded]))
+        start_time = min(start_times)
+
+        values = self.column.values_view()
+        for i, level in enumerate(self.levels):
+            first_index = start_time // level.bucket_ms
+            level.truncate(first_index)
+            if i == 0:
+                first = int(np.searchsorted(times, first_index * level.bucket_ms))
+                samples = values[first:].astype(np.float64)
+                level.extend(times[first:] // level.bucket_ms, samples, samples, samples,
+                             np.ones(len(samples), dtype=np.int64))
+            else:
+                child = self.levels[i - 1]
+                child_start = child.search(first_index * level.bucket_ms // child.bucket_ms)
+                child_indices, *aggregates = child.rows(child_start)
+                level.extend(child_indices * child.bucket_ms // level.bucket_ms, *aggregates)
+
+        self._num_folded = len(times)
+
+    def aggregate(self, t_start: Optional[int], t_end: Optional[int], num_buckets: int) -> Optional[SeriesAggregate]:
+        """
+        Picks the longest buckets that still split [t_start, t_end] in at least num_buckets, e.g. one per pixel column
+        so that the min and max of each column can be found from them. Samples themselves if they are fewer, or if
+        buckets of PYRAMID_LEVELS_MS are all too long.
+
+        :param t_start: Inclusive lower time bound, None for unbounded
+        :type t_start: Optional[int]
+        :param t_end: Inclusive upper time bound, None for unbounded
+        :type t_end: Optional[int]
+        :param num_buckets:
+        :type num_buckets: int
+        :return: Buckets intersecting [t_start, t_end], None if there are none
+        :rtype: Optional[SeriesAggregate]
+        """
+        self.update()
+        times = self.column.times()
+        first = 0 if t_start is None else int(np.searchsorted(times, t_start, side='left'))
+        end = len(times) if t_end is None else int(np.searchsorted(times, t_end, side='right'))
+        if end <= first:
+            return None
+
+        t_start = int(times[first]) if t_start is None else t_start
+        t_end = int(times[end - 1]) if t_end is None else t_end
+        levels = [level for level in self.levels if level.bucket_ms * num_buckets <= t_end - t_start + 1]
+        if end - first <= num_buckets or not levels:
+            values = self.column.values_view()[first:end].astype(np.float64)
+            return SeriesAggregate(times[first:end], values, values, values, np.ones(end - first, dtype=np.int64), 0)
+
+        level = levels[-1]
+        start = level.search(int(times[first]) // level.bucket_ms)
+        stop = level.search(int(times[end - 1]) // level.bucket_ms + 1)
+        indices, minimums, maximums, sums, counts = level.rows(start, stop)
+        return SeriesAggregate(indices * level.bucket_ms, minimums, maximums, sums / counts, counts, level.bucket_ms)
+
+    def summary(self, t_start: Optional[int] = None, t_end: Optional[int] = None) -> Optional[SeriesSummary]:
+        """
+        Exact aggregates over [t_start, t_end]: whole buckets of the longest length that fit, shorter ones towards the
+        ends and samples for what is left at each end.
+
+        :param t_start: Inclusive lower time bound, None for unbounded
+        :type t_start: Optional[int]
+        :param t_end: Inclusive upper time bound, None for unbounded
+        :type t_end: Optional[int]
+        :return: None if there are no samples in the range
+        :rtype: Optional[SeriesSummary]
+        """
+        self.update()
+        times = self.column.times()
+        if len(times) == 0:
+            return None
+
+        # Half open time intervals left to cover
+        intervals = [(int(times[0]) if t_start is None else t_start, int(times[-1]) + 1 if t_end is None else t_end + 1)]
+        parts: List[Tuple[np.ndarray, ...]] = []
+        first, stop = np.searchsorted(times, intervals[0])
+        for level in reversed(self.levels if stop - first > SUMMARY_SCAN_SAMPLES else []):
+            remaining = []
+            for start, end in intervals:
+                first_index = -(-start // level.bucket_ms)  # First bucket starting within the interval
+                end_index = end // level.bucket_ms  # First bucket ending past it
+                if first_index < end_index:
+                    parts.append(level.rows(level.search(first_index), level.search(end_index))[1:])
+                    remaining += [(start, first_index * level.bucket_ms), (end_index * level.bucket_ms, end)]
+                else:
+                    remaining.append((start, end))
+            intervals = [(start, end) for start, end in remaining if start < end]
+
+        values = self.column.values_view()
+        parts.append((np.empty(0), np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)))
+        for start, end in intervals:
+            first, stop = np.searchsorted(times, [start, end])
+            samples = values[first:stop].astype(np.float64)
+            parts.append((samples, samples, samples, np.ones(len(samples), dtype=np.int64)))
+
+        minimums, maximums, sums, counts = (np.concatenate(arrays) for arrays in zip(*parts))
+        count = int(np.sum(counts))
+        if count == 0:
+            return None
+        return SeriesSummary(float(np.min(minimums)), float(np.max(maximums)), float(np.sum(sums)) / count, count)
@@ -1,5 +1,5 @@
 import math
-from typing import TYPE_CHECKING, Callable, Optional, Union
+from typing import TYPE_CHECKING, Callable, Iterable, Optional, Union
 from main_window.main_app import MainApp
 from main_window.data_entry_id import DataEntryIds, DataEntryValues
 from main_window.rocket_data import RocketData
@@ -18,6 +18,9 @@ class Label:
     :param display_name: The label name that is display on the front-end.
                          Should support most characters.
     :type display_name: str
+    :param data_ids: Data the label's value depends on, so it is only refreshed when those change. Defaults to the ids
+                     known for update_func, None if unknown in which case it is refreshed whenever new data arrives.
+    :type data_ids: Optional[Iterable[DataEntryIds]]
     """
 
     def __init__(
@@ -27,12 +30,16 @@ class Label:
             update_func: Callable[[RocketData, DeviceType], str],
             display_name: Optional[str] = None,
             map_fn: Optional[Callable[[MainApp], None]] = None,
+            data_ids: Optional[Iterable[DataEntryIds]] = None,
     ):
         self.device = device
         self.name = name
         self.display_name = display_name if display_name is not None else name
         self.update_fn = update_func  # Must support last_value_by_device returning None
         self.map_fn = map_fn
+        if data_ids is None:
+            data_ids = UPDATE_FUNC_DATA_IDS.get(update_func)
+        self.data_ids = None if data_ids is None else tuple(data_ids)
 
     def update(self, rocket_data: RocketData):
         return self.update_fn(rocket_data, self.device)
@@ -130,4 +137,20 @@ def update_chamber_pressure(rocket_data: RocketData, device: DeviceType) -> str:
 
 # TODO: Implement Co-Pilot chamber temperature label update.
 def update_chamber_temp(rocket_data: RocketData, device: DeviceType) -> str:
-    return "283 K"
\ No newline at end of file
+    return "283 K"
+
+
+# Data each update function reads for its own device. Functions that read other devices (e.g. update_nmea) are left
+# out so that labels using them refresh on any new data
+UPDATE_FUNC_DATA_IDS = {
+    update_altitude: (DataEntryIds.CALCULATED_ALTITUDE,),
+    update_max_altitude: (DataEntryIds.CALCULATED_ALTITUDE,),
+    update_gps: (DataEntryIds.LATITUDE, DataEntryIds.LONGITUDE),
+    update_state: (DataEntryIds.STATE,),
+    update_pressure: (DataEntryIds.PRESSURE,),
+    update_acceleration: (DataEntryIds.ACCELERATION_X, DataEntryIds.ACCELERATION_Y, DataEntryIds.ACCELERATION_Z),
+    update_test_separation: (),
+    update_tank_pressure: (),
+    update_chamber_pressure: (),
+    update_chamber_temp: (),
+}
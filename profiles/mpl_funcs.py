@@ -1,157 +1,302 @@
 """Receive and plot data"""
 
 from textwrap import wrap
+from typing import List, Optional, Tuple
+
+import numpy as np
+from matplotlib.artist import Artist
 from matplotlib.offsetbox import AnnotationBbox, OffsetImage
 
 from main_window.competition.comp_app import MAP_MARKER
+from main_window.data_entry_id import DataEntryIds
+from main_window.live_series import decimate_min_max
 from main_window.mplwidget import MplWidget
 from profiles.label import Label
 
+MAP_SCENE = "map"
 
-def receive_map(self, longitude: float = None, latitude: float = None) -> None:
-    """
-    Updates the UI when a new map is available for display
-    """
-    children = self.plot_widget.canvas.ax.get_children()
-    for c in children:
-        if isinstance(c, AnnotationBbox):
-            c.remove()
+TRACK_COLOR = "red"
+TRACK_LINE_WIDTH = 1.5
 
-    zoom, radius, map_image, mark, text = self.map_data.get_map_value()
-    
-    # plotMap UI modification
-    self.plot_widget.canvas.ax.set_axis_off()
-    # self.plot_widget.canvas.ax.set_ylim(map_image.shape[0], 0)
-    # self.plot_widget.canvas.ax.set_xlim(0, map_image.shape[1])
+# Drawing order of the map overlays, they are all drawn over the map image
+TRACK_ZORDER = 2
+MARK_ZORDER = 3
+TEXT_ZORDER = 4
 
-    # Removes pesky white border
-    self.plot_widget.canvas.fig.subplots_adjust(left=0, bottom=0, right=1, top=1, wspace=0, hspace=0)
+# Time series axes limits leave this much room (fraction of the data range) on the side the data went past them, so
+# that they don't have to be redrawn for each new point
+SERIES_HEADROOM = 0.25
+SERIES_MARGIN = 0.05  # On the other side
 
-    if self.im:
-        # Required because plotting images over old ones creates memory leak
-        # NOTE: im.set_data() can also be used
-        self.im.remove()
+ACCELERATION_LABELS = ["X", "Y", "Z"]
+ACCELERATION_COLORS = ["Red", "Blue", "Green"]
 
-    self.im = self.plot_widget.canvas.ax.imshow(map_image)
+
+def receive_map(self, longitude: float = None, latitude: float = None) -> None:
+    """
+    Updates the UI when a new map is available for display. The map image is drawn as the background, marks, tracks and
+    text are moved in place and blitted over it.
+    """
+    value = self.map_data.get_map_value()
+    if value is None:
+        return
+
+    zoom, radius, map_image, mark, text, track = value
+    ax = self.plot_widget.canvas.ax
+    blit_manager = self.plot_widget.blit_manager
+
+    if self.plot_widget.showing_time_window_box:
+        self.plot_widget.hide_time_window_box()
+
+    if blit_manager.scene != MAP_SCENE:
+        blit_manager.reset(MAP_SCENE)
+        self.im = None
+        self.map_image = None
+
+        # plotMap UI modification
+        ax.set_axis_off()
+
+        # Removes pesky white border
+        self.plot_widget.canvas.fig.subplots_adjust(left=0, bottom=0, right=1, top=1, wspace=0, hspace=0)
+
+    if self.im is None:
+        self.im = ax.imshow(map_image)
+        blit_manager.invalidate()
+    elif map_image is not self.map_image:
+        # Same artist, plotting images over old ones creates memory leak
+        height, width = map_image.shape[:2]
+        if self.im.get_array().shape[:2] != (height, width):
+            self.im.set_extent((-0.5, width - 0.5, height - 0.5, -0.5))
+            ax.set_xlim(-0.5, width - 0.5)
+            ax.set_ylim(height - 0.5, -0.5)
+        self.im.set_data(map_image)
+        blit_manager.invalidate()
+    self.map_image = map_image
+
+    changed: List[Artist] = []
+
+    # Flight tracks, already simplified and in image pixels
+    for i, line in enumerate(track):
+        track_line = blit_manager.get(("track", i))
+        if track_line is None:
+            track_line, = ax.plot(line[:, 0], line[:, 1], color=TRACK_COLOR, linewidth=TRACK_LINE_WIDTH,
+                                  zorder=TRACK_ZORDER, scalex=False, scaley=False)
+            changed.append(blit_manager.add(("track", i), track_line))
+        elif not (np.array_equal(track_line.get_xdata(), line[:, 0])
+                  and np.array_equal(track_line.get_ydata(), line[:, 1])):
+            track_line.set_data(line[:, 0], line[:, 1])
+            changed.append(track_line)
 
     # updateMark UI modification
     if longitude is not None and latitude is not None:
-        custom_mark = [(longitude, latitude)]
-        for i in range(len(custom_mark)):
-            annotation_box = AnnotationBbox(OffsetImage(MAP_MARKER), custom_mark[i], frameon=False)
-            self.plot_widget.canvas.ax.add_artist(annotation_box)
-    else:
-        for i in range(len(mark)):
-            annotation_box = AnnotationBbox(OffsetImage(MAP_MARKER), mark[i], frameon=False)
-            self.plot_widget.canvas.ax.add_artist(annotation_box)
-            
-    # Clear previous text boxes
-    # TODO: This is a hacky way to do this, look into why its now clearing text boxes??
-
-    for ax_text in self.plot_widget.canvas.ax.texts[:]:
-       ax_text.remove()
-    
-    # Draw text
-    for t in text:
+        mark = [(longitude, latitude)]
+
+    for i, xy in enumerate(mark):
+        annotation_box = blit_manager.get(("mark", i))
+        if annotation_box is None:
+            annotation_box = ax.add_artist(AnnotationBbox(OffsetImage(MAP_MARKER), xy, frameon=False))
+            annotation_box.set_zorder(MARK_ZORDER)
+            changed.append(blit_manager.add(("mark", i), annotation_box))
+        elif tuple(annotation_box.xy) != tuple(xy):
+            annotation_box.xy = annotation_box.xybox = xy
+            changed.append(annotation_box)
+
+    for i, t in enumerate(text):
         # Get text position
         xPos = t.getPixelX(zoom)
         yPos = t.getPixelY(zoom)
-        
+
         # If negative, stick to opposite edge of canvas
         if xPos < 0:
-            xPos = self.plot_widget.canvas.ax.get_xlim()[1] + xPos
+            xPos = ax.get_xlim()[1] + xPos
         if yPos < 0:
-            yPos = self.plot_widget.canvas.ax.get_ylim()[0] + yPos
-        
-        # Draw Text
-        mplText = self.plot_widget.canvas.ax.text(
-            x=xPos,
-            y=yPos,
-            s=t.getText(),
-            fontsize=t.getSize(),
-            color=t.getForegroundColor(),
-            verticalalignment=t.getAlignment()[0],
-            horizontalalignment=t.getAlignment()[1],
-            alpha=t.getAlpha()
-        )
+            yPos = ax.get_ylim()[0] + yPos
+
+        mplText = blit_manager.get(("text", i))
+        if mplText is None:
+            mplText = blit_manager.add(("text", i), ax.text(x=xPos, y=yPos, s="", zorder=TEXT_ZORDER))
+        elif mplText.get_position() == (xPos, yPos) and mplText.get_text() == t.getText():
+            continue
+
+        mplText.set_position((xPos, yPos))
+        mplText.set_text(t.getText())
+        mplText.set_fontsize(t.getSize())
+        mplText.set_color(t.getForegroundColor())
+        mplText.set_verticalalignment(t.getAlignment()[0])
+        mplText.set_horizontalalignment(t.getAlignment()[1])
+        mplText.set_alpha(t.getAlpha())
         # Draw background separately to avoid weird text artifacts
         if t.getBackgroundColor() is not None:
             mplText.set_bbox(dict(facecolor=t.getBackgroundColor(), alpha=t.getAlpha(), linewidth=0))
+        else:
+            mplText.set_bbox(None)
+        changed.append(mplText)
 
-    # For debugging marker position
-    #self.plot_widget.canvas.ax.plot(mark[1][0], mark[1][1], marker='o', markersize=3, color="red")
+    # Overlays that are no longer shown
+    for name in blit_manager.names():
+        kind, i = name
+        if i >= {"track": len(track), "mark": len(mark), "text": len(text)}[kind]:
+            blit_manager.remove(name)
 
-    self.plot_widget.canvas.draw()
+    blit_manager.update(changed)
 
 
-def receive_time_series(self, plot_widget: MplWidget, label: Label) -> None:
+def _widened_limits(limits: Optional[Tuple[float, float]], data_min: float,
+                    data_max: float) -> Optional[Tuple[float, float]]:
     """
-        Setup for plotting time series
-        Clear previous plot, change subplot settings
+    :param limits: Current axis limits, None if there are none yet
+    :type limits: Optional[Tuple[float, float]]
+    :param data_min:
+    :type data_min: float
+    :param data_max:
+    :type data_max: float
+    :return: New limits if the data is not within limits, otherwise None
+    :rtype: Optional[Tuple[float, float]]
     """
-    children = plot_widget.canvas.ax.get_children()
+    if limits is not None and limits[0] <= data_min and data_max <= limits[1]:
+        return None
 
-    # clear children if still exist from last plot
-    for c in children:
-        if isinstance(c, AnnotationBbox):
-            c.remove()
+    span = (data_max - data_min) or abs(data_max) or 1
+    below = SERIES_HEADROOM if limits is not None and data_min < limits[0] else SERIES_MARGIN
+    above = SERIES_HEADROOM if limits is None or data_max > limits[1] else SERIES_MARGIN
+    return data_min - below * span, data_max + above * span
 
-    plot_widget.canvas.fig.subplots_adjust(
-        left=0.2, bottom=0.1, right=0.95, top=0.9, wspace=0, hspace=0)
-
-    if self.im:
-        # Required because plotting images over old ones creates memory leak
-        # NOTE: im.set_data() can also be used
-        self.im.remove()
-
-    self.im = None
 
+def receive_time_series(self, plot_widget: MplWidget, label: Label) -> None:
+    """
+        Setup for plotting time series
+        Axes, labels and legend are drawn once per series as the background, the lines are updated in place and
+        blitted over it. The background is only redrawn when the data goes past the axes limits.
+        Lines are the live series of the app over the time window chosen in plot_widget, decimated to the min and max
+        of each pixel column.
+    """
     is_acceleration = "Acceleration" in label.name
     if is_acceleration and not plot_widget.showing_checkboxes:
         plot_widget.show_checkboxes()
+    if not plot_widget.showing_time_window_box:
+        plot_widget.show_time_window_box()
 
-    # Plot data on graph
-    plot_widget.canvas.ax.set_axis_on()
-    plot_widget.canvas.ax.set_aspect('auto')
-
-    plot_widget.canvas.ax.cla()
+    ax = plot_widget.canvas.ax
+    blit_manager = plot_widget.blit_manager
     data_entry_id = self.rocket_profile.label_to_data_id[label.name]
+    time_window = plot_widget.time_window
 
+    # (name, color, data id) of each line
     if is_acceleration:
-        labels = ["X", "Y", "Z"]
-        colors = ["Red", "Blue", "Green"]
-        plot_data = False
+        plotted = [(ACCELERATION_LABELS[i], ACCELERATION_COLORS[i], data_entry_id[i])
+                   for i, checkbox in enumerate(plot_widget.accel_checkboxes) if checkbox.isChecked()]
+    elif data_entry_id:
+        plotted = [(None, None, data_entry_id)]
+    else:
+        plotted = []
+
+    live_series = [self.get_live_series(label.device, data_id) for _, _, data_id in plotted]
+    for live in live_series:
+        live.update()
+    last_times = [live.last_time for live in live_series if live.last_time is not None]
+    last_time = max(last_times) if last_times else None
+
+    # Same series and time window as what is shown, the axes limits still apply
+    scene_base = ("series", label.device, label.name, tuple(name for name, _, _ in plotted), time_window)
+    shown_base = blit_manager.scene[0] if isinstance(blit_manager.scene, tuple) else None
+
+    # A trailing window moves by SERIES_HEADROOM of its length at a time, rather than for each new point
+    x_limits = None
+    t_start = None
+    if time_window is not None and last_time is not None:
+        if shown_base != scene_base or last_time > ax.get_xlim()[1]:
+            x_limits = (last_time - time_window, last_time + SERIES_HEADROOM * time_window)
+        t_start = int((x_limits or ax.get_xlim())[0])
+
+    # (name, live series, points) of each line with data. Points are only read here for state series, numeric ones
+    # are read decimated once the axes limits are known
+    lines = []
+    categories = ()  # Names of the values of a state series, plotted as their index
+    for (name, color, data_id), live in zip(plotted, live_series):
+        if live.last_time is None:
+            pass  # possible TODO: log if no data found
+
+        elif data_id == DataEntryIds.STATE:
+            t, y = live.series(t_start) or (np.empty(0, dtype=np.int64), ())
+            # Figure width in pixels
+            fig_width = plot_widget.canvas.fig.get_size_inches()[0] * plot_widget.canvas.fig.dpi
+            # Trim state name (STATE_LANDED -> LANDED)
+            names = ['\n'.join(wrap(e.name[6:], int(fig_width * 0.015))) for e in y]
+            categories = tuple(dict.fromkeys(names))
+            codes = {name: code for code, name in enumerate(categories)}
+            lines.append((name, live, (t, np.array([codes[name] for name in names], dtype=np.int64))))
 
-        for i, checkbox in enumerate(plot_widget.accel_checkboxes):
-            if checkbox.isChecked():
-                plot_data = True  # there is data to plot
-                t, y = self.rocket_data.time_series_by_device(label.device, data_entry_id[i])
-                plot_widget.canvas.ax.plot(t, y, color=colors[i], label=labels[i])
+        else:
+            lines.append((name, live, None))
 
-        if plot_data:
-            plot_widget.canvas.ax.legend(loc="upper right")
+    scene = (scene_base, categories)
+    is_new_scene = blit_manager.scene != scene
+    if is_new_scene:
+        blit_manager.reset(scene)
 
-    elif data_entry_id and self.rocket_data.time_series_by_device(label.device, data_entry_id):
+        plot_widget.canvas.fig.subplots_adjust(
+            left=0.2, bottom=0.1, right=0.95, top=0.9, wspace=0, hspace=0)
 
-        t, y = self.rocket_data.time_series_by_device(label.device, data_entry_id)
+        # Plot data on graph
+        ax.set_axis_on()
+        ax.set_aspect('auto')
 
-        if y is None:
-            pass  # possible TODO: log if no data found
+        for name, color, _ in plotted:
+            blit_manager.add(("line", name), ax.plot([], [], color=color, label=name)[0])
 
-        elif data_entry_id == data_entry_id.STATE:
-            # Figure width in pixels
-            fig_width = plot_widget.canvas.fig.get_size_inches()[0] * plot_widget.canvas.fig.dpi
-            # Trim state name (STATE_LANDED -> LANDED)
-            plot_widget.canvas.ax.plot(t, ['\n'.join(wrap(e.name[6:], int(fig_width * 0.015))) for e in y])
+        if is_acceleration and plotted:
+            ax.legend(loc="upper right")
+        elif categories:
+            ax.set_yticks(range(len(categories)))
+            ax.set_yticklabels(categories)
+            ax.tick_params(axis='y', labelsize=6)
+        elif lines:
+            ax.grid()
 
-            plot_widget.canvas.ax.tick_params(axis='y', labelsize=6)
+        ax.set_xlabel("Time (ms)")
+        ax.set_ylabel(f"{label.name} ({self.rocket_profile.label_unit[label.name]})")
 
-        else:
-            plot_widget.canvas.ax.plot(t, y)
-            plot_widget.canvas.ax.grid()
+        ax.set_title(f"{label.device.name} {label.name}", fontsize=10, pad=10, wrap=True)
 
-    plot_widget.canvas.ax.set_xlabel("Time (ms)")
-    plot_widget.canvas.ax.set_ylabel(f"{label.name} ({self.rocket_profile.label_unit[label.name]})")
+    if not lines:
+        blit_manager.update([])
+        return
 
-    plot_widget.canvas.ax.set_title(f"{label.device.name} {label.name}", fontsize=10, pad=10, wrap=True)
-    plot_widget.canvas.draw()
+    if time_window is not None:
+        if x_limits is None and is_new_scene:
+            x_limits = (last_time - time_window, last_time + SERIES_HEADROOM * time_window)
+    else:
+        x_limits = _widened_limits(None if is_new_scene else ax.get_xlim(),
+                                   min(live.first_time for _, live, _ in lines),
+                                   max(live.last_time for _, live, _ in lines))
+    if x_limits is not None:
+        ax.set_xlim(*x_limits)
+        blit_manager.invalidate()
+
+    changed: List[Artist] = []
+    num_columns = max(1, int(ax.bbox.width))
+    x_start, x_end = ax.get_xlim()
+    y_min, y_max = np.inf, -np.inf
+    for name, live, points in lines:
+        if points is None:
+            points = live.envelope(x_start, x_end, num_columns)
+            if points is None:
+                continue
+        t, y = decimate_min_max(*points, x_start, x_end, num_columns)
+        if len(t) == 0:
+            continue
+        y_min, y_max = min(y_min, np.min(y)), max(y_max, np.max(y))
+
+        # Values too, an overwritten last point or a new min/max within a pixel column keeps the same times
+        line = blit_manager.get(("line", name))
+        if not np.array_equal(line.get_xdata(), t) or not np.array_equal(line.get_ydata(), y):
+            line.set_data(t, y)
+            changed.append(line)
+
+    if y_min <= y_max:
+        y_limits = _widened_limits(None if is_new_scene else ax.get_ylim(), y_min, y_max)
+        if y_limits is not None:
+            ax.set_ylim(*y_limits)
+            blit_manager.invalidate()
+
+    blit_manager.update(changed)
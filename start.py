@@ -7,6 +7,8 @@ import platform
 import subprocess
 matplotlib.use('QT5Agg') # Ensures that the Qt5 backend is used, otherwise there might be some issues on some OSs (Mac)
 from com_window.main import ComWindow
+from connections import capture
+from main_window.competition.mapping import mapbox_utils
 from PyQt5 import QtWidgets, QtCore
 from profiles.rockets.bnb import BNBProfile
 from util.self_test import SelfTest
@@ -36,9 +38,21 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
 
     parser.add_argument("-t", "--self-test", action='store_true')
+    parser.add_argument("--offline-maps", action='store_true',
+                        help="Only use map tiles that were already downloaded, see tile_seeder")
+    parser.add_argument("--no-capture", action='store_true',
+                        help="Do not record the raw connection traffic to logs/ for replay")
 
     args, unparsed_args = parser.parse_known_args()
 
+    if args.offline_maps:
+        os.environ[mapbox_utils.OFFLINE_MAPS_ENV] = "1"  # For MapProcess, which reads it when it starts
+        mapbox_utils.OFFLINE_MAPS = True
+
+    if args.no_capture:
+        os.environ[capture.CAPTURE_ENV] = "0"
+        capture.CAPTURE_ENABLED = False
+
     # QApplication expects the first argument to be the program name.
     qt_args = sys.argv[:1] + unparsed_args
     app = QtWidgets.QApplication(qt_args)
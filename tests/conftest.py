@@ -0,0 +1,17 @@
+import pytest
+
+from connections.sim import stream_filter
+from main_window import main_app, rocket_data
+
+
+@pytest.fixture(autouse=True)
+def logs_dir(tmp_path, monkeypatch):
+    """
+    Autosaves, stream logs and final saves of tests go to a temporary directory instead of the repository's logs/.
+    The debug log is opened on import of util.detail, before any test runs, and still goes to logs/.
+    """
+    logs_dir = tmp_path / "logs"
+    logs_dir.mkdir()
+    for module in (main_app, rocket_data, stream_filter):
+        monkeypatch.setattr(module, "LOGS_DIR", str(logs_dir))
+    return logs_dir
@@ -2,6 +2,7 @@ import pytest
 import logging
 from typing import List, Tuple
 
+from connections import capture
 from main_window.data_entry_id import DataEntryIds
 from profiles.rocket_profile_list import ROCKET_PROFILES, RocketProfile
 from main_window.main_app import MainApp
@@ -13,14 +14,16 @@ from util.event_stats import get_event_stats_snapshot
 
 
 @pytest.fixture(scope="function")
-def test_app(caplog):
+def test_app(caplog, monkeypatch):
     """
     Provides factory for constructing an instance of main_app for tests. Ensures that main_app is ready before starting
-    test and shutdown after test is complete.
+    test and shutdown after test is complete. Apps don't record captures, which would be left in logs/.
 
     :param caplog: fixture
+    :param monkeypatch: fixture
     :return: Function handle to factory
     """
+    monkeypatch.setattr(capture, "CAPTURE_ENABLED", False)
 
     app = None
 
@@ -1,13 +1,17 @@
+import numpy as np
 import pytest
+from PyQt5 import QtWidgets
 from unittest.mock import MagicMock, ANY
 from .integration_utils import test_app, valid_paramitrization, all_profiles
+from connections import capture
 from connections.debug.debug_connection import DebugConnection, ARMED_EVENT, DISARMED_EVENT
 from main_window.competition.comp_app import LABELS_UPDATED_EVENT
 from profiles.rockets.bnb import BNBProfile
 from connections.debug import radio_packets
 from main_window.rocket_data import BUNDLE_ADDED_EVENT
 from main_window.data_entry_id import DataEntryIds, DataEntryValues
-from main_window.device_manager import DeviceType, DEVICE_REGISTERED_EVENT
+from main_window.device_manager import DeviceType, DEVICE_REGISTERED_EVENT, FullAddress
+from main_window.flight_log import write_flight_log
 from main_window.send_thread import COMMAND_SENT_EVENT
 from main_window.packet_parser import (
     VERSION_ID_LEN,
@@ -371,8 +375,29 @@ def test_register_after_data(qtbot, test_app):
     assert app.rocket_data.last_value_by_device(DeviceType.BNB_STAGE_2_FLARE, DataEntryIds.PRESSURE) == 1
 
 
+def test_open_flight_log(qtbot, single_connection_bnb, tmp_path, mocker):
+    app = single_connection_bnb
+    logged_address = FullAddress('SERIAL_CONNECTION', 'BNB_STAGE_1_SERIAL_ADDRESS')
+    log_path = tmp_path / "finalsave.flog"
+    write_flight_log(str(log_path), {(logged_address, DataEntryIds.PRESSURE): (np.array([10]), np.array([2.5]), None)},
+                     devices={logged_address: DeviceType.BNB_STAGE_1_FLARE})
+    mocker.patch.object(QtWidgets.QFileDialog, 'getOpenFileName', return_value=(str(log_path), ''))
+    critical = mocker.patch.object(QtWidgets.QMessageBox, 'critical')
+
+    app.actionOpenFlightLog.trigger()
+
+    critical.assert_not_called()
+    assert app.rocket_data.last_value_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.PRESSURE) == 2.5
+
+    log_path.write_bytes(b"not a flight log")
+    app.actionOpenFlightLog.trigger()
+
+    critical.assert_called_once()
+
+
 @pytest.mark.parametrize("profile", valid_paramitrization(all_profiles(excluding=['WbProfile', 'TantalusProfile'])))
-def test_clean_shutdown(qtbot, profile):
+def test_clean_shutdown(qtbot, profile, monkeypatch):
+    monkeypatch.setattr(capture, "CAPTURE_ENABLED", False)
     app = profile.construct_app(profile.construct_debug_connection(nmea_serial_port=_nmea_serial_port, nmea_baud_rate = _nmea_baud_rate))
 
     assert app.ReadThread.isRunning()
@@ -21,6 +21,7 @@ from main_window.packet_parser import (
     STATE_IDS,
 )
 
+from util.detail import LOGGER
 from util.event_stats import get_event_stats_snapshot
 
 S_TO_MS = int(1e3)
@@ -304,27 +305,25 @@ def test_full_flight(qtbot, sim_app, device_type):
 
     hw.launch()
 
-    # Run simulation until complete
-    stuck_count = 0
+    # Run simulation until complete, it runs as fast as the firmware goes so poll often
+    start = time.monotonic()
+    stuck_since = start
     last_time = None
     while True:
-        time.sleep(1)
+        time.sleep(0.1)
         with hw:
             if FlightEvent.GROUND_HIT in hw._rocket_sim.get_flight_events():
                 break
 
-            print(
-                f"FLIGHT RUNNING: t = {hw._rocket_sim.get_time()}, alt = {hw._rocket_sim.get_data(FlightDataType.TYPE_ALTITUDE)}")
-
-            if hw._rocket_sim.get_time() != last_time or last_time is None:
-                stuck_count = 0
-            else:
-                stuck_count += 1
-                if stuck_count >= 5:
-                    assert False  # Flight sim stuck
+            if hw._rocket_sim.get_time() != last_time:
+                stuck_since = time.monotonic()
+            elif time.monotonic() - stuck_since >= 5:
+                assert False  # Flight sim stuck
 
             last_time = hw._rocket_sim.get_time()
 
+    LOGGER.info(f"Flight complete: {hw._rocket_sim.get_time_since_launch()} simulated s in {time.monotonic() - start:.1f} s")
+
     profile = get_profile(sim_app)
 
     # Define helper function
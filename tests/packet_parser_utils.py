@@ -0,0 +1,98 @@
+"""
+Legacy parser and synthetic data for comparing the packet parser against the implementation it replaced, shared by
+tests/test_packet_parser.py and benchmarks/bench_packet_parser.py.
+"""
+
+import random
+import struct
+from io import BytesIO
+from typing import Any, Dict
+
+import connections.debug.radio_packets as radio_packets
+from main_window.competition.comp_packet_parser import CompPacketParser
+from main_window.data_entry_id import DataEntryIds
+from main_window.packet_parser import Header, STATE_IDS
+from util.detail import LOGGER
+from util.event_stats import Event
+
+# Events are incremented from the module that defines them, these cost the same as the parser's
+LEGACY_STATE_EVENT = Event('legacy_state')
+LEGACY_BULK_SENSOR_EVENT = Event('legacy_bulk_sensor')
+
+
+class LegacyCompPacketParser(CompPacketParser):
+    """The extract() path from before precompiled structs, one read and repack per field, kept only for comparison"""
+
+    def extract(self, byte_stream: BytesIO):
+        if self.big_endian_ints is None or self.big_endian_floats is None:
+            raise Exception("Endianness not set before parsing")
+
+        header: Header = self.header(byte_stream)
+
+        parsed_data: Dict[Any, Any] = {}
+        try:
+            parsed_data = self.parse_data(byte_stream, header)
+        except Exception:
+            LOGGER.exception("Error parsing data")
+
+        parsed_data[DataEntryIds.TIME] = header.timestamp
+
+        self.big_endian_ints = None
+        self.big_endian_floats = None
+        return parsed_data
+
+    def header(self, byte_stream: BytesIO) -> Header:
+        subpacket_id: int = byte_stream.read(1)[0]
+        if subpacket_id not in self.packet_type_to_parser:
+            LOGGER.error("Subpacket id %d not valid.", subpacket_id)
+            raise ValueError("Subpacket id " + str(subpacket_id) + " not valid.")
+
+        timestamp: int = self.bytestoint(byte_stream.read(4))
+        return Header(subpacket_id, timestamp)
+
+    def state(self, byte_stream: BytesIO, header: Header, print_state=True):
+        data = {}
+        state_id = self.bytestoint(byte_stream.read(2))
+        data_entry_value = STATE_IDS[state_id]
+        data[DataEntryIds.STATE] = data_entry_value
+
+        if print_state:
+            LOGGER.info("State: %s", str(data_entry_value.name))
+
+        LEGACY_STATE_EVENT.increment()
+        return data
+
+    def bulk_sensor(self, byte_stream: BytesIO, header: Header):
+        data: Dict[DataEntryIds, Any] = {}
+
+        data[DataEntryIds.CALCULATED_ALTITUDE] = self.fourtofloat(byte_stream.read(4))
+        data[DataEntryIds.ACCELERATION_X] = self.fourtofloat(byte_stream.read(4))
+        data[DataEntryIds.ACCELERATION_Y] = self.fourtofloat(byte_stream.read(4))
+        data[DataEntryIds.ACCELERATION_Z] = self.fourtofloat(byte_stream.read(4))
+        data[DataEntryIds.ORIENTATION_1] = self.fourtofloat(byte_stream.read(4))
+        data[DataEntryIds.ORIENTATION_2] = self.fourtofloat(byte_stream.read(4))
+        data[DataEntryIds.ORIENTATION_3] = self.fourtofloat(byte_stream.read(4))
+        data[DataEntryIds.LATITUDE] = self.fourtofloat(byte_stream.read(4))
+        data[DataEntryIds.LONGITUDE] = self.fourtofloat(byte_stream.read(4))
+        state_data = self.state(byte_stream, header, print_state=False)
+        data[DataEntryIds.STATE] = state_data[DataEntryIds.STATE]
+
+        LEGACY_BULK_SENSOR_EVENT.increment()
+        return data
+
+    def fourtofloat(self, byte_list):
+        assert len(byte_list) == 4
+        b = struct.pack('4B', *byte_list)
+        return struct.unpack('>f' if self.big_endian_floats else '<f', b)[0]
+
+    def bytestoint(self, byte_list: list):
+        return int.from_bytes(byte_list, 'big' if self.big_endian_ints else 'little')
+
+
+def bulk_sensor_run(run_length: int) -> bytes:
+    random.seed(0)
+    data = bytearray()
+    for i in range(run_length):
+        data.extend(radio_packets.bulk_sensor(i * 10, *(random.uniform(0, 1e4) for _ in range(9)),
+                                              random.randint(0, 0x09)))
+    return bytes(data)
@@ -0,0 +1,35 @@
+import pytest
+from PyQt5 import QtWidgets
+
+from com_window.main import ComWindow
+
+
+@pytest.fixture(scope="function")
+def com_window(qtbot):
+    window = ComWindow()
+    qtbot.addWidget(window)
+    window.typeBox.setCurrentText('Replay')
+    yield window
+
+
+def test_replay_corrupt_capture(com_window, tmp_path, mocker):
+    capture_path = tmp_path / "session.cap"
+    capture_path.write_bytes(b"not a capture at all")
+    mocker.patch.object(QtWidgets.QFileDialog, 'getOpenFileName', return_value=(str(capture_path), ''))
+    critical = mocker.patch.object(QtWidgets.QMessageBox, 'critical')
+
+    com_window.doneButtonPressed()
+
+    critical.assert_called_once()
+    assert str(capture_path) in critical.call_args[0][2]
+    assert com_window.chosen_connection is None
+
+
+def test_replay_cancelled(com_window, mocker):
+    mocker.patch.object(QtWidgets.QFileDialog, 'getOpenFileName', return_value=('', ''))
+    critical = mocker.patch.object(QtWidgets.QMessageBox, 'critical')
+
+    com_window.doneButtonPressed()
+
+    critical.assert_not_called()
+    assert com_window.chosen_connection is None
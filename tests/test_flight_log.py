@@ -0,0 +1,100 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from main_window.data_entry_id import DataEntryIds, DataEntryValues
+from main_window.device_manager import DeviceType, FullAddress
+from main_window.flight_log import FlightLog, FlightLogError, write_flight_log
+
+ADDRESS = FullAddress('CONNECTION', 'DEVICE')
+
+
+@pytest.fixture()
+def columns():
+    return {
+        (ADDRESS, DataEntryIds.PRESSURE): (np.array([0, 10, 20]), np.array([1.5, 2.5, 3.5]), None),
+        (ADDRESS, DataEntryIds.TIME): (np.array([0, 10]), np.array([0, 10]), None),
+        (ADDRESS, DataEntryIds.STATE): (np.array([5, 15]), np.array([0, 1], dtype=np.int32),
+                                        [DataEntryValues.STATE_STANDBY, DataEntryValues.STATE_ARMED]),
+        (ADDRESS, DataEntryIds.DEVICE_TYPE): (np.array([5]), np.array([0], dtype=np.int32),
+                                              [DeviceType.SUNBURST_FLARE]),
+        (ADDRESS, DataEntryIds.NMEA_LAST_GPS_PING): (np.array([7]), np.array([0], dtype=np.int32),
+                                                     [datetime(2024, 6, 1, 12, 30)]),
+    }
+
+
+def test_write_flight_log(tmp_path, columns):
+    path = str(tmp_path / "session.flog")
+
+    write_flight_log(path, columns, session_id="1234")
+
+    with FlightLog(path) as flight_log:
+        assert flight_log.session_id == "1234"
+        assert set(flight_log.keys()) == set(columns.keys())
+        for key, (times, values, table) in columns.items():
+            read_times, read_values = flight_log.series(key)
+            np.testing.assert_array_equal(read_times, times)
+            if table is None:
+                np.testing.assert_array_equal(read_values, values)
+            else:
+                assert list(read_values) == [table[code] for code in values]
+
+
+class TestFlightLog:
+    def test_series_is_zero_copy(self, tmp_path, columns):
+        path = str(tmp_path / "session.flog")
+        write_flight_log(path, columns)
+
+        times, values = FlightLog(path).series((ADDRESS, DataEntryIds.PRESSURE))
+
+        assert not values.flags.owndata
+        assert not values.flags.writeable
+
+    def test_chunks(self, tmp_path):
+        times = np.arange(200) * 10
+        columns = {
+            (ADDRESS, DataEntryIds.PRESSURE): (times, times / 2, None),
+            (ADDRESS, DataEntryIds.STATE): (times, np.arange(200, dtype=np.int32) % 2,
+                                            [DataEntryValues.STATE_STANDBY, DataEntryValues.STATE_ARMED]),
+            (ADDRESS, DataEntryIds.EVENT): (np.empty(0, dtype=np.int64), np.empty(0), None),
+        }
+        path = str(tmp_path / "session.flog")
+
+        write_flight_log(path, columns, chunk_length=64)
+
+        with FlightLog(path) as flight_log:
+            assert [chunk['length'] for chunk in flight_log._columns[(ADDRESS, DataEntryIds.PRESSURE)]['chunks']] == \
+                   [64, 64, 64, 8]
+            for key, (times, values, table) in columns.items():
+                read_times, read_values, read_table = flight_log.raw(key)
+                np.testing.assert_array_equal(read_times, times)
+                np.testing.assert_array_equal(read_values, values)
+                assert read_table == table
+            # Chunks are back to back, so still a view into the file
+            assert not flight_log.raw((ADDRESS, DataEntryIds.PRESSURE))[1].flags.owndata
+
+    def test_not_a_flight_log(self, tmp_path):
+        path = tmp_path / "session.csv"
+        path.write_text("PRESSURE_DEVICE,TIME_DEVICE\n" * 10)
+
+        with pytest.raises(FlightLogError):
+            FlightLog(str(path))
+
+    def test_empty(self, tmp_path):
+        path = tmp_path / "session.flog"
+        path.write_bytes(b"")
+
+        with pytest.raises(FlightLogError):
+            FlightLog(str(path))
+
+    def test_truncated(self, tmp_path, columns):
+        path = str(tmp_path / "session.flog")
+        write_flight_log(path, columns, session_id="123")
+        with open(path, 'rb') as f:
+            contents = f.read()
+        with open(path, 'wb') as f:
+            f.write(contents[:-10])  # Interrupted while writing the dictionary
+
+        with pytest.raises(FlightLogError):
+            FlightLog(path)
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+from main_window.competition.mapping import flight_track
+from main_window.competition.mapping.flight_track import FlightTrack, simplify, to_world
+from main_window.competition.mapping.map_data import MapDataSource
+from main_window.competition.mapping.mapbox_utils import MapPoint, TILE_SIZE
+from main_window.data_entry_id import DataEntryIds
+from main_window.device_manager import DeviceManager, DeviceType
+from main_window.rocket_data import RocketData
+
+DEVICE = DeviceType.BNB_STAGE_1_FLARE
+LATITUDE, LONGITUDE = 49.2606, -123.2460
+ZOOM = 18
+
+
+def _segment_distances(points, line):
+    """
+    :return: Distance of each point to the closest segment of line
+    """
+    starts, ends = line[:-1], line[1:]
+    chords = ends - starts
+    offsets = points[:, np.newaxis, :] - starts[np.newaxis, :, :]
+    t = np.clip(np.einsum('ijk,jk->ij', offsets, chords) / np.einsum('jk,jk->j', chords, chords), 0, 1)
+    return np.min(np.linalg.norm(offsets - t[:, :, np.newaxis] * chords, axis=2), axis=1)
+
+
+@pytest.fixture()
+def rocket_data():
+    device_manager = DeviceManager(None, None)
+    device_manager.register_device(DEVICE, None, ('CONNECTION', DEVICE.name))
+    rocket_data = RocketData(device_manager)
+    yield rocket_data
+    rocket_data.shutdown()
+
+
+def _add_fixes(rocket_data, times, latitudes, longitudes):
+    full_address = rocket_data.device_manager.get_full_address(DEVICE)
+    rocket_data.add_columns(full_address, {DataEntryIds.TIME: np.asarray(times),
+                                           DataEntryIds.LATITUDE: np.asarray(latitudes),
+                                           DataEntryIds.LONGITUDE: np.asarray(longitudes)})
+
+
+def test_to_world():
+    world = to_world(np.array([LATITUDE]), np.array([LONGITUDE]))
+
+    point = MapPoint(LATITUDE, LONGITUDE)
+    np.testing.assert_allclose(world, [[point.x, point.y]])
+
+
+class TestSimplify:
+    def test_straight_line(self):
+        points = np.column_stack((np.arange(100.0), np.zeros(100)))
+
+        np.testing.assert_array_equal(simplify(points, 1), [0, 99])
+
+    def test_keeps_corners_and_doubling_back(self):
+        points = np.array([[0, 0], [5, 0], [10, 0], [10, 5], [10, 10], [10, 4], [10, 2]], dtype=float)
+
+        # [10, 10] is on the line from [10, 0] to [10, 2], but not on the segment
+        np.testing.assert_array_equal(simplify(points, 1), [0, 2, 4, 6])
+
+    def test_within_tolerance(self):
+        points = np.cumsum(np.random.default_rng(0).normal(size=(2000, 2)), axis=0)
+
+        kept = simplify(points, 3)
+
+        assert 2 < len(kept) < len(points) / 4
+        assert np.max(_segment_distances(points, points[kept])) <= 3
+
+
+class TestFlightTrack:
+    def test_line(self, rocket_data):
+        track = FlightTrack(rocket_data, [DEVICE])
+        assert track.line(DEVICE, MapDataSource.SRAD, ZOOM) is None
+
+        # Straight south, then east, with zero (no fix yet) positions at first
+        latitudes = np.concatenate(([0, 0], LATITUDE - np.arange(50) * 1e-4, np.full(50, LATITUDE - 49e-4)))
+        longitudes = np.concatenate(([0, 0], np.full(50, LONGITUDE), LONGITUDE + np.arange(1, 51) * 1e-4))
+        _add_fixes(rocket_data, np.arange(102), latitudes, longitudes)
+
+        line = track.line(DEVICE, MapDataSource.SRAD, ZOOM)
+
+        corners = to_world(np.array([LATITUDE, LATITUDE - 49e-4, LATITUDE - 49e-4]),
+                           np.array([LONGITUDE, LONGITUDE, LONGITUDE + 50e-4]))
+        np.testing.assert_allclose(line, corners)
+        assert track.line(DEVICE, MapDataSource.COTS, ZOOM) is None
+
+    def test_line_reads_new_fixes(self, rocket_data, mocker):
+        track = FlightTrack(rocket_data, [DEVICE])
+        _add_fixes(rocket_data, [0, 1], [LATITUDE, LATITUDE + 1e-3], [LONGITUDE, LONGITUDE])
+        assert len(track.line(DEVICE, MapDataSource.SRAD, ZOOM)) == 2
+
+        series_by_device = mocker.spy(rocket_data, "series_by_device")
+        assert len(track.line(DEVICE, MapDataSource.SRAD, ZOOM)) == 2
+        series_by_device.assert_not_called()  # Nothing new
+
+        # Latitude arrives before its longitude
+        full_address = rocket_data.device_manager.get_full_address(DEVICE)
+        rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 2, DataEntryIds.LATITUDE: LATITUDE + 1e-3})
+        rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 3, DataEntryIds.LATITUDE: LATITUDE + 2e-3})
+        rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 2, DataEntryIds.LONGITUDE: LONGITUDE + 1e-3})
+        assert len(track.line(DEVICE, MapDataSource.SRAD, ZOOM)) == 3
+        rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 3, DataEntryIds.LONGITUDE: LONGITUDE + 2e-3})
+        assert len(track.line(DEVICE, MapDataSource.SRAD, ZOOM)) == 4
+
+        assert [call.args[2] for call in series_by_device.call_args_list] == [2, 2, 3, 3]
+
+    def test_line_in_chunks(self, rocket_data, mocker):
+        mocker.patch("main_window.competition.mapping.flight_track.TRACK_CHUNK_SIZE", 64)
+        track = FlightTrack(rocket_data, [DEVICE])
+        steps = np.random.default_rng(0).normal(scale=1e-6, size=(1000, 2))
+        latitudes, longitudes = LATITUDE + np.cumsum(steps[:, 0]), LONGITUDE + np.cumsum(steps[:, 1])
+
+        for start in range(0, 1000, 100):
+            _add_fixes(rocket_data, np.arange(start, start + 100), latitudes[start:start + 100],
+                       longitudes[start:start + 100])
+            line = track.line(DEVICE, MapDataSource.SRAD, ZOOM)
+
+        # Every fix within a pixel of the line
+        points = to_world(latitudes, longitudes) * TILE_SIZE * 2 ** ZOOM
+        line_pixels = line * TILE_SIZE * 2 ** ZOOM
+        assert np.max(_segment_distances(points, line_pixels)) <= flight_track.TRACK_TOLERANCE_PX + 1e-6
+        assert len(line) < len(points) / 2
+        np.testing.assert_allclose(line_pixels[[0, -1]], points[[0, -1]])
+
+    def test_line_within_budget(self, rocket_data, mocker):
+        mocker.patch("main_window.competition.mapping.flight_track.TRACK_MAX_POINTS", 50)
+        track = FlightTrack(rocket_data, [DEVICE])
+        noise = np.random.default_rng(0).normal(scale=1e-5, size=(1000, 2))  # Several pixels at ZOOM
+        _add_fixes(rocket_data, np.arange(1000), LATITUDE + noise[:, 0], LONGITUDE + noise[:, 1])
+
+        line = track.line(DEVICE, MapDataSource.SRAD, ZOOM)
+
+        assert len(line) <= 50
+        # Simplified as for a lower zoom, which is also used when asking for ZOOM again
+        assert track.line(DEVICE, MapDataSource.SRAD, ZOOM + 1) is line
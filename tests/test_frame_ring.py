@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from main_window.competition.mapping.frame_ring import FrameRing, FrameWriter, slot_size_for
+from main_window.competition.mapping.map_data import MapData, MapDataValue
+
+
+@pytest.fixture(scope="function")
+def frame_ring():
+    frame_ring = FrameRing(slot_size_for(4, 3))
+    frame_writer = FrameWriter()
+    yield frame_ring, frame_writer
+    frame_writer.close()
+    frame_ring.close()
+
+
+def map_value(image):
+    return MapDataValue(zoom=1, radius=1, image=image, mark=[], text=[])
+
+
+class TestFrameRing:
+    def test_write_and_read(self, frame_ring):
+        frame_ring, frame_writer = frame_ring
+        image = np.arange(3 * 4 * 3, dtype=np.uint8).reshape((3, 4, 3))
+
+        info = frame_writer.write(frame_ring.slot(1, sequence=7), image[:, 1:], (0.1, 0.2, 0.3, 0.4))
+        frame = frame_ring.frame(1, info)
+
+        assert info.sequence == 7
+        assert info.image is None
+        assert (info.x_min, info.x_max, info.y_min, info.y_max) == (0.1, 0.2, 0.3, 0.4)
+        np.testing.assert_array_equal(frame, image[:, 1:])
+        assert np.may_share_memory(frame, frame_ring.slot_buffer(1))  # Not a copy
+        assert not np.may_share_memory(frame, frame_ring.slot_buffer(0))
+
+    def test_write_too_large(self, frame_ring):
+        frame_ring, frame_writer = frame_ring
+        image = np.zeros((10, 10, 4), dtype=np.uint8)
+
+        info = frame_writer.write(frame_ring.slot(0, sequence=1), image, (0, 1, 0, 1))
+
+        assert info.image is image  # Sent along instead
+
+class TestMapData:
+    def test_release_buffer(self, frame_ring):
+        frame_ring, frame_writer = frame_ring
+        frames = [frame_ring.frame(i, frame_writer.write(frame_ring.slot(i, i), np.full((3, 4, 3), i, dtype=np.uint8),
+                                                         (0, 1, 0, 1)))
+                  for i in range(2)]
+        map_data = MapData()
+
+        map_data.set_map_value(map_value(frames[0]))
+        assert map_data.get_map_value().image is frames[0]
+        map_data.set_map_value(map_value(frames[1]))
+
+        # Displayed frame is never overwritten
+        assert not map_data.release_buffer(frame_ring.slot_buffer(0))
+
+        # Latest frame wasn't read yet, falls back to the displayed one
+        assert map_data.release_buffer(frame_ring.slot_buffer(1))
+        assert map_data.get_map_value().image is frames[0]
+        assert map_data.uses_buffer(frame_ring.buffer)
+        assert not map_data.uses_buffer(frame_ring.slot_buffer(1))
@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+
+from main_window.data_entry_id import DataEntryIds, DataEntryValues
+from main_window.device_manager import DeviceManager, DeviceType
+from main_window.live_series import LiveSeries, SeriesRing, decimate_min_max
+from main_window.rocket_data import RocketData
+
+DEVICE = DeviceType.BNB_STAGE_1_FLARE
+
+
+@pytest.fixture()
+def rocket_data():
+    device_manager = DeviceManager(None, None)
+    device_manager.register_device(DEVICE, None, ('CONNECTION', DEVICE.name))
+    rocket_data = RocketData(device_manager)
+    yield rocket_data
+    rocket_data.shutdown()
+
+
+def _add_altitudes(rocket_data, times, altitudes):
+    full_address = rocket_data.device_manager.get_full_address(DEVICE)
+    rocket_data.add_columns(full_address, {DataEntryIds.TIME: np.asarray(times),
+                                           DataEntryIds.CALCULATED_ALTITUDE: np.asarray(altitudes, dtype=float)})
+
+
+class TestDecimateMinMax:
+    def test_min_max_per_column(self):
+        rng = np.random.default_rng(0)
+        times = np.sort(rng.choice(100_000, size=20_000, replace=False))
+        values = rng.normal(size=len(times))
+
+        decimated_times, decimated_values = decimate_min_max(times, values, 0, 100_000, 100)
+
+        assert len(decimated_times) <= 200
+        assert np.all(np.diff(decimated_times) >= 0)
+        # Brute force
+        columns = times // 1000
+        for column in range(100):
+            in_column = columns == column
+            is_decimated = (decimated_times >= times[in_column][0]) & (decimated_times <= times[in_column][-1])
+            assert np.min(decimated_values[is_decimated]) == np.min(values[in_column])
+            assert np.max(decimated_values[is_decimated]) == np.max(values[in_column])
+
+    def test_few_points_unchanged(self):
+        times = np.arange(10)
+        values = np.arange(10.0)
+
+        decimated_times, decimated_values = decimate_min_max(times, values, 3, 20, 100)
+
+        np.testing.assert_array_equal(decimated_times, times[3:])
+        np.testing.assert_array_equal(decimated_values, values[3:])
+
+    def test_rising_column_ends_on_max(self):
+        times = np.arange(1000)
+        values = np.arange(1000.0)
+
+        decimated_times, decimated_values = decimate_min_max(times, values, 0, 1000, 10)
+
+        np.testing.assert_array_equal(decimated_values, np.repeat(np.arange(10) * 100, 2) + [0, 99] * 10)
+        np.testing.assert_array_equal(decimated_times, decimated_values)
+
+
+class TestSeriesRing:
+    def test_wraps_around(self):
+        ring = SeriesRing(capacity=8)
+        ring.extend(np.arange(5), np.arange(5.0))
+        ring.extend(np.arange(5, 11), np.arange(5.0, 11))
+
+        times, values = ring.series()
+
+        np.testing.assert_array_equal(times, np.arange(3, 11))
+        np.testing.assert_array_equal(values, np.arange(3.0, 11))
+        assert ring.num_dropped == 3
+        assert (ring.first_time, ring.last_time) == (3, 10)
+        np.testing.assert_array_equal(ring.series(t_start=9)[0], [9, 10])
+
+    def test_replaces_last_point(self):
+        ring = SeriesRing(capacity=4)
+        ring.extend(np.arange(4), np.arange(4.0))
+        ring.extend(np.array([3, 4]), np.array([30.0, 4.0]))
+
+        times, values = ring.series()
+
+        np.testing.assert_array_equal(times, [1, 2, 3, 4])
+        np.testing.assert_array_equal(values, [1.0, 2.0, 30.0, 4.0])
+        assert ring.num_dropped == 1
+
+    def test_more_than_capacity(self):
+        ring = SeriesRing(capacity=4)
+        ring.extend(np.arange(2), np.arange(2.0))
+        ring.extend(np.arange(2, 12), np.arange(2.0, 12))
+
+        np.testing.assert_array_equal(ring.series()[0], np.arange(8, 12))
+        assert ring.num_dropped == 8
+
+
+class TestLiveSeries:
+    def test_reads_new_points(self, rocket_data, mocker):
+        _add_altitudes(rocket_data, np.arange(10), np.arange(10))
+        live = LiveSeries(rocket_data, DEVICE, DataEntryIds.CALCULATED_ALTITUDE)
+        assert live.update()
+        assert live.last_time == 9
+
+        series_by_device = mocker.spy(rocket_data, "series_by_device")
+        assert not live.update()
+        series_by_device.assert_not_called()  # Nothing new
+
+        _add_altitudes(rocket_data, np.arange(10, 15), np.arange(10, 15))
+        assert live.update()
+        assert series_by_device.call_args.args[2] == 9  # From the last point read, in case it was overwritten
+        times, values = live.series()
+        np.testing.assert_array_equal(times, np.arange(15))
+        np.testing.assert_array_equal(values, np.arange(15.0))
+
+    def test_overwritten_last_point(self, rocket_data):
+        _add_altitudes(rocket_data, np.arange(10), np.arange(10))
+        live = LiveSeries(rocket_data, DEVICE, DataEntryIds.CALCULATED_ALTITUDE)
+        live.update()
+
+        _add_altitudes(rocket_data, [9], [90])
+        assert live.update()
+
+        times, values = live.series()
+        np.testing.assert_array_equal(times, np.arange(10))
+        assert values[-1] == 90
+
+    def test_older_than_ring(self, rocket_data):
+        live = LiveSeries(rocket_data, DEVICE, DataEntryIds.CALCULATED_ALTITUDE, capacity=10)
+        assert live.series() is None
+
+        _add_altitudes(rocket_data, np.arange(30), np.arange(30))
+        live.update()
+        _add_altitudes(rocket_data, [30], [30])  # Not read yet
+
+        assert len(live.series(t_start=25)[0]) == 5
+        times, _ = live.series()
+        np.testing.assert_array_equal(times, np.arange(30))
+
+    def test_state(self, rocket_data):
+        full_address = rocket_data.device_manager.get_full_address(DEVICE)
+        rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 0, DataEntryIds.STATE: DataEntryValues.STATE_STANDBY})
+        rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 5, DataEntryIds.STATE: DataEntryValues.STATE_LANDED})
+        live = LiveSeries(rocket_data, DEVICE, DataEntryIds.STATE)
+        live.update()
+
+        _, values = live.series()
+
+        assert list(values) == [DataEntryValues.STATE_STANDBY, DataEntryValues.STATE_LANDED]
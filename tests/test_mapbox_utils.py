@@ -1,11 +1,31 @@
+import io
 import os
 
 import numpy
 import pytest
 from matplotlib import pyplot
+from PIL import Image
 
 from util.detail import LOCAL
 from main_window.competition.mapping import mapbox_utils
+from main_window.competition.mapping import tile_store as tile_store_module
+
+
+@pytest.fixture(autouse=True)
+def tile_store(tmp_path, mocker):
+    tile_store = tile_store_module.SqliteTileStore(str(tmp_path / mapbox_utils.TILE_STORE_NAME))
+    mocker.patch("main_window.competition.mapping.mapbox_utils.TILE_STORE", tile_store)
+    yield tile_store
+    tile_store.close()
+
+
+@pytest.fixture(autouse=True)
+def empty_tile_cache():
+    mapbox_utils.TILE_CACHE.clear()
+    mapbox_utils.STITCHED_MAP_CACHE.clear()
+    yield
+    mapbox_utils.TILE_CACHE.clear()
+    mapbox_utils.STITCHED_MAP_CACHE.clear()
 
 
 @pytest.fixture()
@@ -91,19 +111,66 @@ class TestMapTile:
         numpy.testing.assert_array_equal(i, hennings_image)
 
     @pytest.mark.parametrize("success", [True, False])
-    def test_image_exists(self, hennings_tile, mocker, success):
-        mocked_isfile = mocker.patch("main_window.competition.mapping.mapbox_utils.os.path.isfile")
-
-        mocked_isfile.return_value = success
+    def test_image_exists(self, hennings_tile, tile_store, success):
+        if success:
+            tile_store.put(hennings_tile.key, b"jpeg")
 
         ie = hennings_tile.imageExists()
 
-        mocked_isfile.assert_called_once()
-        mocked_isfile.assert_called_with(
-            os.path.join(mapbox_utils.MAPBOX_CACHE, "raw", "18", "41322_89729" + ".png")
-        )
         assert ie is success
 
+    def test_get_image_cached(self, hennings_tile, tile_store, mocker):
+        mocker.patch("main_window.competition.mapping.mapbox_utils.maps", None)
+        tile_store.put(hennings_tile.key, b"jpeg")
+        mocked_imread = mocker.patch("main_window.competition.mapping.mapbox_utils.plt.imread",
+                                     return_value=numpy.ones((4, 4, 3), dtype=numpy.uint8))
+
+        first = hennings_tile.getImage()
+        second = mapbox_utils.MapTile(41322, 89729, 18).getImage()
+
+        mocked_imread.assert_called_once()  # Decoded once, then reused
+        assert second is first
+        assert not second.flags.writeable
+        stats = mapbox_utils.TILE_CACHE.stats()
+        assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+
+        hennings_tile.getImage(overwrite=True)
+        assert mocked_imread.call_count == 2
+
+    def test_get_image_stored(self, hennings_tile, tile_store, mocker):
+        mocker.patch("main_window.competition.mapping.mapbox_utils.maps", None)
+        with open(os.path.join(LOCAL, "tests", "test_mapbox_utils", "41322_89729.jpg"), "rb") as tile_file:
+            tile_store.put(hennings_tile.key, tile_file.read())
+
+        i = hennings_tile.getImage()
+
+        assert hennings_tile.is_tile_not_blank
+        assert i.shape == (mapbox_utils.TILE_SIZE, mapbox_utils.TILE_SIZE, 3)
+        assert i.dtype == numpy.uint8
+
+
+class TestTileCache:
+    def test_evicts_least_recently_used(self):
+        tile_cache = mapbox_utils.TileCache(max_bytes=3 * 100)
+        for key in "abc":
+            tile_cache.put(key, numpy.zeros(100, dtype=numpy.uint8))
+
+        assert tile_cache.get("a") is not None  # Now most recently used
+        tile_cache.put("d", numpy.zeros(100, dtype=numpy.uint8))
+
+        assert tile_cache.get("b") is None
+        assert tile_cache.get("c") is not None
+        stats = tile_cache.stats()
+        assert (stats.evictions, stats.entries, stats.nbytes) == (1, 3, 300)
+        assert stats.hit_rate == 2 / 3
+
+    def test_put_too_large(self):
+        tile_cache = mapbox_utils.TileCache(max_bytes=10)
+
+        tile_cache.put("a", numpy.zeros(11, dtype=numpy.uint8))
+
+        assert tile_cache.get("a") is None
+
 
 class TestTileGrid:
     @pytest.fixture()
@@ -140,6 +207,71 @@ class TestTileGrid:
             ubc_tile_grid.ta[0]
         )
 
+    @pytest.fixture()
+    def cached_tiles(self, ubc_tile_grid):
+        for y, row in enumerate(ubc_tile_grid.ta):
+            for x, tile in enumerate(row):
+                image = numpy.full((mapbox_utils.TILE_SIZE, mapbox_utils.TILE_SIZE, 3), 10 * y + x, dtype=numpy.uint8)
+                mapbox_utils.TILE_CACHE.put(tile.key, image)
+
+    def test_gen_stitched_map_cached(self, ubc_tile_grid, cached_tiles, mocker):
+        mocker.patch("main_window.competition.mapping.mapbox_utils.SAVE_STITCHED_MAPS", True)
+        mocker.patch("main_window.competition.mapping.mapbox_utils.os.path.isfile", return_value=True)
+        mocked_load = mocker.patch("main_window.competition.mapping.mapbox_utils.np.load")
+        mocked_save = mocker.patch("main_window.competition.mapping.mapbox_utils.np.save")
+
+        stitched_map = ubc_tile_grid.genStitchedMap()
+
+        # Stitched from memory, saved map isn't loaded nor saved again
+        mocked_load.assert_not_called()
+        mocked_save.assert_not_called()
+        assert stitched_map.shape == (2 * mapbox_utils.TILE_SIZE, 3 * mapbox_utils.TILE_SIZE, 3)
+        numpy.testing.assert_array_equal(stitched_map[::mapbox_utils.TILE_SIZE, ::mapbox_utils.TILE_SIZE, 0],
+                                         [[0, 1, 2], [10, 11, 12]])
+
+        # Same area again comes out of the stitched map cache
+        assert ubc_tile_grid.genStitchedMap() is stitched_map
+
+    def test_gen_stitched_map_not_saved(self, ubc_tile_grid, cached_tiles, tmp_path, mocker):
+        mocker.patch("main_window.competition.mapping.mapbox_utils.MAPBOX_CACHE", str(tmp_path))
+
+        ubc_tile_grid.genStitchedMap()
+
+        # Off by default, only kept in memory
+        assert not (tmp_path / "out").exists()
+
+    def test_gen_stitched_map_saved(self, ubc_tile_grid, cached_tiles, tmp_path, mocker):
+        mocker.patch("main_window.competition.mapping.mapbox_utils.MAPBOX_CACHE", str(tmp_path))
+        mocker.patch("main_window.competition.mapping.mapbox_utils.SAVE_STITCHED_MAPS", True)
+        stitched_map = ubc_tile_grid.genStitchedMap()
+        mapbox_utils.TILE_CACHE.clear()
+        mapbox_utils.STITCHED_MAP_CACHE.clear()
+        mocked_get_image = mocker.patch("main_window.competition.mapping.mapbox_utils.MapTile.getImage")
+
+        loaded_map = ubc_tile_grid.genStitchedMap()
+
+        # Lossless, and tiles aren't needed anymore
+        mocked_get_image.assert_not_called()
+        numpy.testing.assert_array_equal(loaded_map, stitched_map)
+
+    def test_gen_stitched_map_decodes_concurrently(self, ubc_tile_grid, tile_store, tmp_path, mocker):
+        mocker.patch("main_window.competition.mapping.mapbox_utils.MAPBOX_CACHE", str(tmp_path))
+        mocker.patch("main_window.competition.mapping.mapbox_utils.os.cpu_count", return_value=4)
+        executor = mocker.spy(mapbox_utils.concurrent.futures, "ThreadPoolExecutor")
+        for y, row in enumerate(ubc_tile_grid.ta):
+            for x, tile in enumerate(row):
+                image = Image.fromarray(numpy.full((mapbox_utils.TILE_SIZE, mapbox_utils.TILE_SIZE, 3), 40 * y + 80 * x,
+                                                   dtype=numpy.uint8))
+                buffer = io.BytesIO()
+                image.save(buffer, format="jpeg")
+                tile_store.put(tile.key, buffer.getvalue())
+
+        stitched_map = ubc_tile_grid.genStitchedMap()
+
+        executor.assert_called_once_with(max_workers=4)
+        numpy.testing.assert_allclose(stitched_map[::mapbox_utils.TILE_SIZE, ::mapbox_utils.TILE_SIZE, 0],
+                                      [[0, 80, 160], [40, 120, 200]], atol=2)
+
     def test_gen_stitched_map(self, ubc_tile_grid):
         hennings_image = pyplot.imread(
             os.path.join(
@@ -0,0 +1,135 @@
+import numpy
+import pytest
+
+from main_window.competition.mapping.frame_ring import FrameInfo
+from main_window.competition.mapping.map_data import MapData
+from main_window.competition.mapping.mapping_thread import MappingThread, DEFAULT_RADIUS
+from main_window.data_entry_id import DataEntryIds
+from main_window.device_manager import DeviceManager, DeviceType
+from main_window.rocket_data import RocketData
+from profiles.rockets.bnb import BNBProfile
+
+DEVICE = DeviceType.BNB_STAGE_1_FLARE
+LATITUDE, LONGITUDE = 49.2606, -123.2460
+
+
+@pytest.fixture()
+def mapping_thread(mocker):
+    mocker.patch("main_window.competition.mapping.mapping_thread.multiprocessing.Process")
+    rocket_data = RocketData(DeviceManager(None, None))
+    mapping_thread = MappingThread(None, MapData(), rocket_data, BNBProfile())
+    render_service = mapping_thread.render_service
+    render_service.requestQueue = mocker.MagicMock()
+    render_service.resultQueue = mocker.MagicMock()
+
+    def render(timeout=None):
+        # What the map process sends back for the last request sent, without stitching anything
+        (p0, p1, p2, zoom, desired_size, frame_slot) = render_service.requestQueue.put_nowait.call_args[0][0]
+        image = numpy.zeros((desired_size[1], desired_size[0], 3), dtype=numpy.uint8)
+        return FrameInfo(frame_slot.sequence, image.shape, image.dtype.str, min(p1.x, p2.x), max(p1.x, p2.x),
+                         min(p1.y, p2.y), max(p1.y, p2.y), image=image)
+
+    render_service.resultQueue.get.side_effect = render
+    mapping_thread.setDesiredMapSize(640, 480)
+    yield mapping_thread
+    mapping_thread.shutdown()  # Frees the frame ring
+    rocket_data.shutdown()
+
+
+def _sent_requests(mapping_thread):
+    return [call[0][0] for call in mapping_thread.render_service.requestQueue.put_nowait.call_args_list]
+
+
+class TestMappingThread:
+    def test_plot_map_reuses_view(self, mapping_thread):
+        assert not mapping_thread.plotMap({DEVICE: LATITUDE}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+        assert mapping_thread.receiveRender()
+        first = mapping_thread.map.get_map_value()
+
+        # Moved a few meters, still well inside the map
+        assert mapping_thread.plotMap({DEVICE: LATITUDE + 1e-5}, {DEVICE: LONGITUDE + 1e-5}, DEFAULT_RADIUS)
+        second = mapping_thread.map.get_map_value()
+
+        assert len(_sent_requests(mapping_thread)) == 1
+        assert second.image is first.image
+        assert second.mark[0][0] > first.mark[0][0]  # Further east
+        assert second.mark[0][1] < first.mark[0][1]  # Further north
+        assert f"{LATITUDE + 1e-5:.6f}" in second.text[1].getText()
+
+    def test_plot_map_renders_outside_view(self, mapping_thread):
+        assert not mapping_thread.plotMap({DEVICE: LATITUDE}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+        assert mapping_thread.receiveRender()
+
+        assert not mapping_thread.plotMap({DEVICE: LATITUDE + 0.01}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+        assert mapping_thread.receiveRender()
+
+        assert len(_sent_requests(mapping_thread)) == 2
+
+    def test_plot_map_renders_on_resize(self, mapping_thread):
+        assert not mapping_thread.plotMap({DEVICE: LATITUDE}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+        assert mapping_thread.receiveRender()
+
+        mapping_thread.setDesiredMapSize(1280, 720)
+        assert not mapping_thread.plotMap({DEVICE: LATITUDE}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+        assert mapping_thread.receiveRender()
+
+        assert len(_sent_requests(mapping_thread)) == 2
+        assert mapping_thread.map.get_map_value().image.shape == (720, 1280, 3)
+
+    def test_plot_map_waits_for_requested_view(self, mapping_thread):
+        assert not mapping_thread.plotMap({DEVICE: LATITUDE}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+
+        # Still inside the map being rendered, marks are placed when it's done
+        assert not mapping_thread.plotMap({DEVICE: LATITUDE + 1e-5}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+        assert mapping_thread.receiveRender()
+
+        assert len(_sent_requests(mapping_thread)) == 1
+        assert f"{LATITUDE + 1e-5:.6f}" in mapping_thread.map.get_map_value().text[1].getText()
+
+    def test_superseded_renders_are_dropped(self, mapping_thread):
+        render_service = mapping_thread.render_service
+        mapping_thread.plotMap({DEVICE: LATITUDE}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+        for size in [(800, 600), (1024, 768), (1280, 720)]:  # Resized while the first map renders
+            mapping_thread.setDesiredMapSize(*size)
+            mapping_thread.plotMap({DEVICE: LATITUDE}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+
+        assert render_service.latest_sequence.value == 4  # The map process abandons the first render
+        assert len(_sent_requests(mapping_thread)) == 1
+
+        # Result of the first render is dropped, only the latest request is sent
+        assert not mapping_thread.receiveRender()
+        assert mapping_thread.map.get_map_value() is None
+        assert mapping_thread.receiveRender()
+
+        sent = _sent_requests(mapping_thread)
+        assert [request[4] for request in sent] == [(640, 480), (1280, 720)]
+        assert sent[1][5].sequence == 4
+        assert render_service.num_superseded == 3
+        assert mapping_thread.map.get_map_value().image.shape == (720, 1280, 3)
+        assert not mapping_thread.receiveRender()  # Nothing in flight
+
+    def test_failed_render_is_requested_again(self, mapping_thread):
+        mapping_thread.render_service.resultQueue.get.side_effect = [None]
+        assert not mapping_thread.plotMap({DEVICE: LATITUDE}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+        assert not mapping_thread.receiveRender()
+
+        assert not mapping_thread.plotMap({DEVICE: LATITUDE}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+
+        assert len(_sent_requests(mapping_thread)) == 2
+        assert mapping_thread.render_service.num_failed == 1
+
+    def test_map_value_has_track(self, mapping_thread):
+        rocket_data = mapping_thread.rocket_data
+        rocket_data.device_manager.register_device(DEVICE, None, ('CONNECTION', DEVICE.name))
+        rocket_data.add_columns(rocket_data.device_manager.get_full_address(DEVICE),
+                                {DataEntryIds.TIME: numpy.array([0, 1]),
+                                 DataEntryIds.LATITUDE: numpy.array([LATITUDE - 1e-4, LATITUDE]),
+                                 DataEntryIds.LONGITUDE: numpy.array([LONGITUDE, LONGITUDE])})
+
+        mapping_thread.plotMap({DEVICE: LATITUDE}, {DEVICE: LONGITUDE}, DEFAULT_RADIUS)
+        assert mapping_thread.receiveRender()
+
+        value = mapping_thread.map.get_map_value()
+        assert len(value.track) == 1
+        numpy.testing.assert_allclose(value.track[0][-1], value.mark[0])  # Ends at the device, in image pixels
+        assert value.track[0][0][1] > value.track[0][-1][1]  # Came from the south
@@ -0,0 +1,88 @@
+import pytest
+
+from main_window.mplwidget import MplWidget
+
+
+@pytest.fixture(scope="function")
+def plot_widget(qtbot):
+    widget = MplWidget()
+    qtbot.addWidget(widget)
+    widget.resize(640, 480)
+    widget.show()
+    qtbot.waitExposed(widget)
+    return widget
+
+
+class TestBlitManager:
+    def test_full_draw_then_blits(self, plot_widget, mocker):
+        blit_manager = plot_widget.blit_manager
+        blit_manager.reset("scene")
+        line = blit_manager.add("line", plot_widget.canvas.ax.plot([0, 1], [0, 1])[0])
+        blit_manager.update()
+        num_full_draws = blit_manager.num_full_draws
+
+        blit = mocker.spy(plot_widget.canvas, "blit")
+        line.set_data([0, 0.5], [0, 0.5])
+        blit_manager.update([line])
+
+        assert blit_manager.num_full_draws == num_full_draws
+        assert blit_manager.num_blits == 1
+        # Only around the line, which went from the whole axes to its lower left quarter
+        area = blit.call_args.args[0]
+        axes_box = plot_widget.canvas.ax.bbox
+        assert area.width < axes_box.width + 10 and area.height < axes_box.height + 10
+        assert line.get_animated()
+
+    def test_nothing_changed(self, plot_widget, mocker):
+        blit_manager = plot_widget.blit_manager
+        blit_manager.reset("scene")
+        blit_manager.add("line", plot_widget.canvas.ax.plot([0, 1], [0, 1])[0])
+        blit_manager.update()
+
+        blit = mocker.spy(plot_widget.canvas, "blit")
+        blit_manager.update([])
+
+        blit.assert_not_called()
+
+    def test_invalidate_draws_everything(self, plot_widget):
+        blit_manager = plot_widget.blit_manager
+        blit_manager.reset("scene")
+        blit_manager.update()
+        num_full_draws = blit_manager.num_full_draws
+
+        plot_widget.canvas.ax.set_xlim(0, 10)
+        blit_manager.invalidate()
+        blit_manager.update()
+
+        assert blit_manager.num_full_draws == num_full_draws + 1
+
+    def test_remove_blits_old_extent(self, plot_widget, mocker):
+        blit_manager = plot_widget.blit_manager
+        blit_manager.reset("scene")
+        text = blit_manager.add("text", plot_widget.canvas.ax.text(0.5, 0.5, "text"))
+        blit_manager.update()
+        extent = text.get_window_extent()
+
+        blit = mocker.spy(plot_widget.canvas, "blit")
+        blit_manager.remove("text")
+        blit_manager.update([])
+
+        assert blit_manager.names() == []
+        assert text not in plot_widget.canvas.ax.texts
+        area = blit.call_args.args[0]
+        assert area.x0 <= extent.x0 and extent.x1 <= area.x1
+
+    def test_reset(self, plot_widget):
+        blit_manager = plot_widget.blit_manager
+        blit_manager.reset("scene")
+        blit_manager.add("line", plot_widget.canvas.ax.plot([0, 1], [0, 1])[0])
+        blit_manager.update()
+        num_full_draws = blit_manager.num_full_draws
+
+        blit_manager.reset("other scene")
+        blit_manager.update()
+
+        assert blit_manager.scene == "other scene"
+        assert blit_manager.get("line") is None
+        assert plot_widget.canvas.ax.get_lines() == []
+        assert blit_manager.num_full_draws == num_full_draws + 1
@@ -0,0 +1,124 @@
+import struct
+from io import BytesIO
+
+import numpy as np
+import pytest
+
+from connections.debug import radio_packets
+from main_window.competition.comp_packet_parser import CompPacketParser
+from main_window.data_entry_id import DataEntryIds, DataEntryValues
+from main_window.packet_parser import SubpacketStruct, SubpacketIds, SubpacketBatch, BATCH_MIN_RUN
+from tests.packet_parser_utils import LegacyCompPacketParser, bulk_sensor_run
+
+
+@pytest.fixture(scope="function")
+def parser():
+    yield CompPacketParser()
+
+
+def extract_all(parser, data, big_endian=True):
+    byte_stream = BytesIO(data)
+    parsed = []
+    while byte_stream.tell() < len(data):
+        parser.set_endianness(big_endian, big_endian)
+        parsed.append(parser.extract(byte_stream))
+    return parsed
+
+
+class TestSubpacketStruct:
+    def test_unpack(self):
+        subpacket_struct = SubpacketStruct('fH')
+        byte_stream = BytesIO(struct.pack('>fH', 1.5, 513) + b'\xff')
+
+        assert subpacket_struct.size == 6
+        assert subpacket_struct.unpack(byte_stream, True, True) == (1.5, 513)
+        assert byte_stream.tell() == 6
+
+    def test_unpack_mixed_endianness(self):
+        subpacket_struct = SubpacketStruct('IffH')
+        data = struct.pack('<I', 7) + struct.pack('>ff', 1.5, -2.0) + struct.pack('<H', 3)
+
+        assert subpacket_struct.unpack(BytesIO(data), False, True) == (7, 1.5, -2.0, 3)
+
+    def test_unpack_short(self):
+        with pytest.raises(struct.error):
+            SubpacketStruct('fH').unpack(BytesIO(b'\x00\x00\x00'), True, True)
+
+
+class TestCompPacketParser:
+    def test_extract(self, parser):
+        data = radio_packets.bulk_sensor(1000, 1, 2, 3, 4, 5, 6, 7, 49.25, -123.25, 0x09) + \
+               radio_packets.orientation(1001, 0.5, 0.25, 0.125, 1) + \
+               radio_packets.gps(1002, 49.25, -123.25, 100) + \
+               radio_packets.single_sensor(1003, SubpacketIds.PRESSURE, 3.5) + \
+               radio_packets.state(1004, 0x01) + \
+               radio_packets.event(1005, 0x00)
+
+        bulk, orientation, gps, single_sensor, state, event = extract_all(parser, data)
+
+        assert bulk == {
+            DataEntryIds.CALCULATED_ALTITUDE: 1,
+            DataEntryIds.ACCELERATION_X: 2,
+            DataEntryIds.ACCELERATION_Y: 3,
+            DataEntryIds.ACCELERATION_Z: 4,
+            DataEntryIds.ORIENTATION_1: 5,
+            DataEntryIds.ORIENTATION_2: 6,
+            DataEntryIds.ORIENTATION_3: 7,
+            DataEntryIds.LATITUDE: 49.25,
+            DataEntryIds.LONGITUDE: -123.25,
+            DataEntryIds.STATE: DataEntryValues.STATE_LANDED,
+            DataEntryIds.TIME: 1000,
+        }
+        assert orientation[DataEntryIds.ORIENTATION_3] == 0.125
+        assert gps[DataEntryIds.GPS_ALTITUDE] == 100
+        assert single_sensor == {DataEntryIds.PRESSURE: 3.5, DataEntryIds.TIME: 1003}
+        assert state[DataEntryIds.STATE] == DataEntryValues.STATE_ARMED
+        assert event == {DataEntryIds.EVENT: DataEntryValues.EVENT_IGNITOR_FIRED, DataEntryIds.TIME: 1005}
+
+    def test_extract_batch(self, parser):
+        bulk = b''.join(radio_packets.bulk_sensor(i, i, 2, 3, 4, 5, 6, 7, 8, 9, i % 10) for i in range(BATCH_MIN_RUN))
+        single_sensors = b''.join(radio_packets.single_sensor(100 + i, SubpacketIds.PRESSURE, i / 2)
+                                  for i in range(BATCH_MIN_RUN))
+        data = bytes(bulk + radio_packets.state(99, 0x01) + single_sensors + radio_packets.gps(200, 1, 2, 3))
+
+        parser.set_endianness(True, True)
+        parsed = list(parser.extract_batch(BytesIO(data)))
+
+        assert [type(p) for p in parsed] == [SubpacketBatch, dict, SubpacketBatch, dict]
+        one_by_one = extract_all(parser, data)
+        rows = [{data_id: values[i] for data_id, values in parsed[0].columns.items()} for i in range(BATCH_MIN_RUN)]
+        assert rows == one_by_one[:BATCH_MIN_RUN]
+        assert parsed[1] == one_by_one[BATCH_MIN_RUN]
+        np.testing.assert_array_equal(parsed[2].columns[DataEntryIds.PRESSURE], np.arange(BATCH_MIN_RUN) / 2)
+        np.testing.assert_array_equal(parsed[2].columns[DataEntryIds.TIME], np.arange(BATCH_MIN_RUN) + 100)
+
+    def test_extract_batch_invalid_run(self, parser):
+        states = [0x01] * (BATCH_MIN_RUN - 1) + [0xFF]  # Last one has an unknown state
+        data = bytes(b''.join(radio_packets.bulk_sensor(i, 1, 2, 3, 4, 5, 6, 7, 8, 9, state)
+                              for i, state in enumerate(states)))
+
+        parser.set_endianness(True, True)
+        parsed = list(parser.extract_batch(BytesIO(data)))
+
+        # Falls back to one by one, so only the bad subpacket loses its data
+        assert parsed == extract_all(parser, data)
+        assert parsed[0][DataEntryIds.STATE] == DataEntryValues.STATE_ARMED
+        assert parsed[-1] == {DataEntryIds.TIME: BATCH_MIN_RUN - 1}
+
+    @pytest.mark.parametrize("run_length", [1, 8, 64])
+    def test_same_as_legacy(self, parser, run_length):
+        """Throughput against the legacy extract() is measured by benchmarks/bench_packet_parser.py"""
+        data = bulk_sensor_run(run_length)
+
+        legacy = extract_all(LegacyCompPacketParser(), data)
+        assert extract_all(parser, data) == legacy
+
+        parser.set_endianness(True, True)
+        rows = []
+        for parsed in parser.extract_batch(BytesIO(data)):
+            if isinstance(parsed, SubpacketBatch):
+                num_rows = len(parsed.columns[DataEntryIds.TIME])
+                rows += [{data_id: values[i] for data_id, values in parsed.columns.items()} for i in range(num_rows)]
+            else:
+                rows.append(parsed)
+        assert rows == legacy
@@ -0,0 +1,57 @@
+import pytest
+
+from main_window.refresh_scheduler import RefreshScheduler
+
+
+@pytest.fixture(scope="function")
+def scheduler(qtbot):
+    refreshed = []
+    scheduler = RefreshScheduler(refreshed.append, max_fps=10)
+    yield scheduler, refreshed
+    scheduler.stop()
+
+
+class TestRefreshScheduler:
+    def test_first_request_refreshes_immediately(self, scheduler):
+        scheduler, refreshed = scheduler
+        scheduler.mark_dirty('a', 'b')
+
+        scheduler.request()
+
+        assert refreshed == [{'a', 'b'}]
+
+    def test_requests_within_interval_are_coalesced(self, qtbot, scheduler):
+        scheduler, refreshed = scheduler
+        scheduler.mark_dirty('a')
+        scheduler.request()
+
+        for _ in range(5):
+            scheduler.mark_dirty('b')
+            scheduler.request()
+        scheduler.mark_dirty('c')
+        scheduler.request()
+
+        assert refreshed == [{'a'}]
+        qtbot.waitUntil(lambda: len(refreshed) == 2, timeout=1000)
+        assert refreshed[1] == {'b', 'c'}
+
+        stats = scheduler.stats
+        assert stats.refreshes == 2
+        assert stats.requests == 7
+        assert stats.coalesced_requests == 6
+        assert stats.coalesced_updates == 4
+        assert stats.refresh_time_max_s <= stats.refresh_time_total_s
+
+    def test_nothing_dirty(self, scheduler):
+        scheduler, refreshed = scheduler
+
+        scheduler.request()
+
+        assert refreshed == []
+        assert scheduler.stats.refreshes == 0
+
+        # Didn't draw anything, so doesn't hold back the next refresh
+        scheduler.mark_dirty('a')
+        scheduler.request()
+
+        assert refreshed == [{'a'}]
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+
+from connections.capture import CaptureWriter, CaptureError, read_capture
+from connections.connection import ConnectionMessage
+from connections.debug.debug_connection import DebugConnection
+from connections.replay.replay_connection import ReplayConnection, replay_connections, AS_FAST_AS_POSSIBLE
+
+
+@pytest.fixture(scope="function")
+def capture_path(tmp_path):
+    connection_1 = DebugConnection('ADDRESS_1', 0, generate_radio_packets=False)
+    connection_2 = DebugConnection('ADDRESS_2', 0, generate_radio_packets=False)
+
+    path = str(tmp_path / "session.cap")
+    writer = CaptureWriter(path)
+    for i in range(10):
+        writer.write('CONNECTION_1', ConnectionMessage('ADDRESS_1', connection_1, bytes([i, 1])))
+        writer.write('CONNECTION_2', ConnectionMessage('ADDRESS_2', connection_2, bytes([i, 2])))
+    writer.write('CONNECTION_2', ConnectionMessage(None, connection_2, b''))
+    writer.close()
+
+    yield path
+
+
+def replay(connection: ReplayConnection):
+    received = []
+    connection.registerCallback(received.append)
+    assert connection.wait_until_done(timeout=10)
+    return received
+
+
+def test_read_capture(capture_path):
+    frames = list(read_capture(capture_path))
+
+    assert len(frames) == 21
+    assert [f.connection_name for f in frames[:2]] == ['CONNECTION_1', 'CONNECTION_2']
+    assert frames[2].data == bytes([1, 1])
+    assert frames[-1].device_address is None
+    assert all(a.time <= b.time for a, b in zip(frames, frames[1:]))
+
+
+def test_read_capture_truncated(capture_path):
+    with open(capture_path, 'rb') as f:
+        contents = f.read()
+    with open(capture_path, 'wb') as f:
+        f.write(contents[:-5])  # Crashed mid-frame
+
+    assert len(list(read_capture(capture_path))) == 20
+
+
+def test_read_capture_while_writing(tmp_path):
+    connection = DebugConnection('ADDRESS', 0, generate_radio_packets=False)
+    path = str(tmp_path / "session.cap")
+    writer = CaptureWriter(path, flush_interval_s=0.05)
+    for i in range(5):
+        writer.write('CONNECTION', ConnectionMessage('ADDRESS', connection, bytes([i])))
+
+    # Flushed without any further writes, as after a crash
+    deadline = time.monotonic() + 5
+    while len(list(read_capture(path))) < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    frames = list(read_capture(path))
+    writer.close()
+
+    assert [f.data for f in frames] == [bytes([i]) for i in range(5)]
+
+
+def test_not_a_capture(tmp_path):
+    path = tmp_path / "session.csv"
+    path.write_text("Time,Altitude\n")
+
+    with pytest.raises(CaptureError):
+        list(read_capture(str(path)))
+
+
+class TestReplayConnection:
+    def test_replay(self, capture_path):
+        connection = ReplayConnection(capture_path, 'CONNECTION_1', speed=AS_FAST_AS_POSSIBLE)
+
+        received = replay(connection)
+
+        assert [m.data for m in received] == [bytes([i, 1]) for i in range(10)]
+        assert all(m.connection is connection and m.device_address == 'ADDRESS_1' for m in received)
+        assert connection.getDeviceAddress() == 'ADDRESS_1'
+        assert connection.frames_sent == 10
+
+    def test_replay_speed(self, tmp_path):
+        connection = DebugConnection('ADDRESS', 0, generate_radio_packets=False)
+        path = str(tmp_path / "session.cap")
+        writer = CaptureWriter(path)
+        writer.write('CONNECTION', ConnectionMessage('ADDRESS', connection, b'\x00'))
+        time.sleep(0.4)
+        writer.write('CONNECTION', ConnectionMessage('ADDRESS', connection, b'\x01'))
+        writer.close()
+
+        start = time.monotonic()
+        replay(ReplayConnection(path, 'CONNECTION', speed=2))
+        elapsed = time.monotonic() - start
+
+        assert 0.2 <= elapsed < 0.4
+
+    def test_shutdown_before_callback(self, capture_path):
+        connection = ReplayConnection(capture_path, 'CONNECTION_1')
+
+        connection.shutdown()
+
+        assert connection.frames_sent == 0
+        assert not connection.replayThread.is_alive()
+
+    def test_unknown_connection_name(self, capture_path):
+        with pytest.raises(ValueError):
+            ReplayConnection(capture_path, 'CONNECTION_3')
+
+    def test_replay_connections(self, capture_path):
+        connections = replay_connections(capture_path, speed=AS_FAST_AS_POSSIBLE)
+
+        assert list(connections.keys()) == ['CONNECTION_1', 'CONNECTION_2']
+        assert len(replay(connections['CONNECTION_2'])) == 11
+        for connection in connections.values():
+            connection.shutdown()
@@ -1,8 +1,9 @@
+import numpy as np
 import pytest
 
-from main_window.data_entry_id import DataEntryIds
+from main_window.data_entry_id import DataEntryIds, DataEntryValues
 from main_window.device_manager import DeviceManager, DeviceType
-from main_window.rocket_data import RocketData, DataEntryKey
+from main_window.rocket_data import RocketData, DataEntryKey, ColumnBundle
 
 
 @pytest.fixture(scope="function")
@@ -40,12 +41,39 @@ def rocket_data_with_bulk_added(full_device_manager, bulk_sensor_bundle):
     return rocket_data, bulk_address
 
 
+@pytest.fixture()
+def manual_autosave(mocker):
+    """Autosave without its timer, so that checkpoints are only taken by the test"""
+    mocker.patch.object(RocketData, "timer")
+
+
 def test_timer():
     pass  # TODO
 
 
-def test_shutdown():
-    pass  # TODO
+def test_shutdown(full_device_manager, manual_autosave, tmp_path):
+    rocket_data = RocketData(full_device_manager)
+    full_address = full_device_manager.get_full_address(DeviceType.BNB_STAGE_1_FLARE)
+
+    rocket_data.shutdown()
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 10, DataEntryIds.PRESSURE: 1.5})
+    rocket_data.autosave(tmp_path / "autosave.csv")
+
+    # Not kept for autosave anymore, but still stored
+    assert not (tmp_path / "autosave.csv").exists()
+    assert rocket_data.last_value_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.PRESSURE) == 1.5
+
+
+def test_without_autosave(full_device_manager, tmp_path):
+    rocket_data = RocketData(full_device_manager, autosave=False)
+    full_address = full_device_manager.get_full_address(DeviceType.BNB_STAGE_1_FLARE)
+
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 10, DataEntryIds.PRESSURE: 1.5})
+    rocket_data.autosave(tmp_path / "autosave.csv")
+
+    assert rocket_data.autosave_thread is None
+    assert not (tmp_path / "autosave.csv").exists()
+    rocket_data.shutdown()
 
 
 def test_add_bundle(full_device_manager, rocket_data_with_bulk_added, bulk_sensor_bundle):
@@ -61,8 +89,116 @@ def test_add_bundle(full_device_manager, rocket_data_with_bulk_added, bulk_senso
     return
 
 
-def test_time_series_by_device():
-    pass  # TODO
+def test_add_columns(full_device_manager, manual_autosave, tmp_path):
+    full_address = full_device_manager.get_full_address(DeviceType.BNB_STAGE_1_FLARE)
+    states = np.empty(3, dtype=object)
+    states[:] = [DataEntryValues.STATE_STANDBY, DataEntryValues.STATE_ARMED, DataEntryValues.STATE_ARMED]
+    columns = {
+        DataEntryIds.CALCULATED_ALTITUDE: np.array([1.5, 9.5, 3.5]),
+        DataEntryIds.STATE: states,
+        DataEntryIds.TIME: np.array([10, 20, 30]),
+    }
+
+    by_columns = RocketData(full_device_manager)
+    by_columns.add_bundle(full_address, {DataEntryIds.TIME: 0, DataEntryIds.CALCULATED_ALTITUDE: 1})
+    by_columns.add_columns(full_address, columns)
+    by_bundles = RocketData(full_device_manager)
+    by_bundles.add_bundle(full_address, {DataEntryIds.TIME: 0, DataEntryIds.CALCULATED_ALTITUDE: 1})
+    for i in range(3):
+        by_bundles.add_bundle(full_address, {data_id: values[i].item() if isinstance(values[i], np.generic) else values[i]
+                                             for data_id, values in columns.items()})
+
+    assert by_columns.keyset.keys() == by_bundles.keyset.keys()
+    for key in by_columns.keyset:
+        assert by_columns.keyset[key].items() == by_bundles.keyset[key].items()
+    assert by_columns.last_time == by_bundles.last_time == 30
+    assert by_columns.highest_altitude_by_device(DeviceType.BNB_STAGE_1_FLARE) == 9.5
+
+    by_columns.autosave(tmp_path / "columns.csv")
+    by_bundles.autosave(tmp_path / "bundles.csv")
+    assert (tmp_path / "columns.csv").read_text() == (tmp_path / "bundles.csv").read_text()
+
+
+def test_add_bundles(full_device_manager, manual_autosave, tmp_path):
+    full_address = full_device_manager.get_full_address(DeviceType.BNB_STAGE_1_FLARE)
+    bundles = [
+        {DataEntryIds.TIME: 10, DataEntryIds.CALCULATED_ALTITUDE: 1.5, DataEntryIds.STATE: DataEntryValues.STATE_ARMED},
+        ColumnBundle({DataEntryIds.TIME: np.array([20, 30]), DataEntryIds.CALCULATED_ALTITUDE: np.array([9.5, 3.5])}),
+        {DataEntryIds.PRESSURE: 2.0},  # No time, uses the last one
+    ]
+
+    together = RocketData(full_device_manager)
+    notified = []
+    for data_id in (DataEntryIds.CALCULATED_ALTITUDE, DataEntryIds.PRESSURE):
+        together.add_new_callback(DeviceType.BNB_STAGE_1_FLARE, data_id, lambda data_id=data_id: notified.append(data_id))
+    together.add_bundles(full_address, bundles)
+
+    one_by_one = RocketData(full_device_manager)
+    one_by_one.add_bundle(full_address, bundles[0])
+    one_by_one.add_columns(full_address, bundles[1].columns)
+    one_by_one.add_bundle(full_address, bundles[2])
+
+    assert together.keyset.keys() == one_by_one.keyset.keys()
+    for key in together.keyset:
+        assert together.keyset[key].items() == one_by_one.keyset[key].items()
+    assert together.last_value_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.PRESSURE) == 2.0
+    assert together.highest_altitude_by_device(DeviceType.BNB_STAGE_1_FLARE) == 9.5
+
+    # Callbacks fire once per id for the whole batch
+    assert notified == [DataEntryIds.CALCULATED_ALTITUDE, DataEntryIds.PRESSURE]
+
+    together.autosave(tmp_path / "together.csv")
+    one_by_one.autosave(tmp_path / "one_by_one.csv")
+    assert (tmp_path / "together.csv").read_text() == (tmp_path / "one_by_one.csv").read_text()
+
+
+def test_time_series_by_device(full_device_manager, rocket_data_with_bulk_added):
+    rocket_data, full_address = rocket_data_with_bulk_added
+    for time in range(10, 100, 10):
+        rocket_data.add_bundle(full_address, {DataEntryIds.TIME: time, DataEntryIds.PRESSURE: time / 10})
+
+    t, y = rocket_data.time_series_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.PRESSURE, 20, 50)
+
+    assert t == [20, 30, 40, 50]
+    assert y == [2.0, 3.0, 4.0, 5.0]
+
+
+def test_series_by_device(full_device_manager, rocket_data_with_bulk_added, bulk_sensor_bundle):
+    rocket_data, full_address = rocket_data_with_bulk_added
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 10, DataEntryIds.CALCULATED_ALTITUDE: 20.5})
+
+    t, y = rocket_data.series_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.CALCULATED_ALTITUDE)
+
+    np.testing.assert_array_equal(t, [0, 10])
+    np.testing.assert_array_equal(y, [bulk_sensor_bundle[DataEntryIds.CALCULATED_ALTITUDE], 20.5])
+    assert rocket_data.series_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.PRESSURE) is None
+    assert rocket_data.series_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.CALCULATED_ALTITUDE, 11) is None
+
+
+def test_aggregate_by_device(full_device_manager):
+    rocket_data = RocketData(full_device_manager)
+    full_address = full_device_manager.get_full_address(DeviceType.BNB_STAGE_1_FLARE)
+    times = np.arange(0, 100_000, 10)
+    altitudes = np.sin(times / 1e4)
+    rocket_data.add_columns(full_address, {DataEntryIds.TIME: times, DataEntryIds.CALCULATED_ALTITUDE: altitudes})
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 0, DataEntryIds.STATE: DataEntryValues.STATE_STANDBY})
+
+    aggregate = rocket_data.aggregate_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.CALCULATED_ALTITUDE,
+                                                num_buckets=50)
+    assert aggregate.bucket_ms == 1000
+    np.testing.assert_array_equal(aggregate.times, np.arange(0, 100_000, 1000))
+    np.testing.assert_array_equal(aggregate.maximums, np.max(altitudes.reshape(100, 100), axis=1))
+
+    # Aggregates are kept up to date with new data
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 100_000, DataEntryIds.CALCULATED_ALTITUDE: 5.0})
+    summary = rocket_data.summary_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.CALCULATED_ALTITUDE, 50_005)
+    assert summary.maximum == 5.0
+    assert summary.count == 5000
+    assert summary.mean == pytest.approx((np.sum(altitudes[5001:]) + 5) / 5000)
+
+    assert rocket_data.summary_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.STATE) is None
+    assert rocket_data.aggregate_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.PRESSURE) is None
+    rocket_data.shutdown()
 
 
 def test_last_value_and_time():
@@ -128,10 +264,121 @@ def test_highest_altitude_by_device_multiple(full_device_manager, rocket_data_wi
     ) == bulk_sensor_bundle[DataEntryIds.CALCULATED_ALTITUDE]
 
 
+def test_autosave(full_device_manager, manual_autosave, tmp_path):
+    rocket_data = RocketData(full_device_manager)
+    full_address = full_device_manager.get_full_address(DeviceType.BNB_STAGE_1_FLARE)
+    csv_path = tmp_path / "autosave.csv"
+
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 10, DataEntryIds.PRESSURE: 1.5})
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 20, DataEntryIds.PRESSURE: 2.5})
+    rocket_data.autosave(csv_path)
+    rocket_data.autosave(csv_path)  # Nothing new, should not write anything
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 30, DataEntryIds.PRESSURE: 3.5})
+    rocket_data.autosave(csv_path)
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 40, DataEntryIds.STATE: DataEntryValues.STATE_ARMED})
+    rocket_data.autosave(csv_path)
+
+    assert csv_path.read_text().splitlines() == [
+        "PRESSURE_BNB_STAGE_1_FLARE,TIME_BNB_STAGE_1_FLARE",
+        "1.5,10",
+        "2.5,20",
+        "3.5,30",
+        "PRESSURE_BNB_STAGE_1_FLARE,STATE_BNB_STAGE_1_FLARE,TIME_BNB_STAGE_1_FLARE",
+        ",STATE_ARMED,40",
+    ]
+
+
+def test_autosave_hold_back_last(full_device_manager, manual_autosave, tmp_path):
+    rocket_data = RocketData(full_device_manager)
+    full_address = full_device_manager.get_full_address(DeviceType.BNB_STAGE_1_FLARE)
+    csv_path = tmp_path / "autosave.csv"
+
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 10, DataEntryIds.PRESSURE: 1.5})
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 20, DataEntryIds.PRESSURE: 2.5})
+    rocket_data.autosave(csv_path, hold_back_last=True)
+    rocket_data.autosave(csv_path, hold_back_last=True)  # Nothing new, the held back row stays
+    # Same time as the last checkpoint's latest bundle
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 20, DataEntryIds.STATE: DataEntryValues.STATE_ARMED})
+    rocket_data.autosave(csv_path, hold_back_last=True)
+    assert csv_path.read_text().splitlines() == [
+        "PRESSURE_BNB_STAGE_1_FLARE,TIME_BNB_STAGE_1_FLARE",
+        "1.5,10",
+    ]
+
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 30, DataEntryIds.PRESSURE: 3.5})
+    rocket_data.autosave(csv_path, hold_back_last=True)
+    rocket_data.autosave(csv_path)  # Last checkpoint writes the held back row too
+
+    assert csv_path.read_text().splitlines() == [
+        "PRESSURE_BNB_STAGE_1_FLARE,TIME_BNB_STAGE_1_FLARE",
+        "1.5,10",
+        "PRESSURE_BNB_STAGE_1_FLARE,STATE_BNB_STAGE_1_FLARE,TIME_BNB_STAGE_1_FLARE",
+        "2.5,STATE_ARMED,20",
+        "3.5,,30",
+    ]
+
+
+def test_autosave_write_fails(full_device_manager, manual_autosave, tmp_path):
+    rocket_data = RocketData(full_device_manager)
+    full_address = full_device_manager.get_full_address(DeviceType.BNB_STAGE_1_FLARE)
+    csv_path = tmp_path / "autosave.csv"
+
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 10, DataEntryIds.PRESSURE: 1.5})
+    rocket_data.autosave(csv_path)
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 20, DataEntryIds.STATE: DataEntryValues.STATE_ARMED})
+    with pytest.raises(OSError):
+        rocket_data.autosave(tmp_path / "missing" / "autosave.csv")
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 30, DataEntryIds.PRESSURE: 3.5})
+    rocket_data.autosave(csv_path)
+
+    # Rows of the failed checkpoint are written by the next one, under the header for their columns
+    assert csv_path.read_text().splitlines() == [
+        "PRESSURE_BNB_STAGE_1_FLARE,TIME_BNB_STAGE_1_FLARE",
+        "1.5,10",
+        "PRESSURE_BNB_STAGE_1_FLARE,STATE_BNB_STAGE_1_FLARE,TIME_BNB_STAGE_1_FLARE",
+        ",STATE_ARMED,20",
+        "3.5,,30",
+    ]
+
+
 def test_save():
     pass  # TODO
 
 
+def test_save_log_and_load(full_device_manager, rocket_data_with_bulk_added, bulk_sensor_bundle, tmp_path):
+    rocket_data, full_address = rocket_data_with_bulk_added
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 10, DataEntryIds.CALCULATED_ALTITUDE: 50.5})
+    log_path = str(tmp_path / "session.flog")
+
+    rocket_data.save_log(log_path)
+    loaded = RocketData(full_device_manager)
+    loaded.load(log_path)
+    loaded.add_bundle(full_address, {DataEntryIds.TIME: 20, DataEntryIds.CALCULATED_ALTITUDE: 5})
+
+    for key, val in bulk_sensor_bundle.items():
+        if key not in (DataEntryIds.TIME, DataEntryIds.CALCULATED_ALTITUDE):
+            assert loaded.last_value_by_device(DeviceType.BNB_STAGE_1_FLARE, key) == val
+    assert loaded.time_series_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.CALCULATED_ALTITUDE) == \
+           ([0, 10, 20], [1, 50.5, 5])
+    assert loaded.highest_altitude_by_device(DeviceType.BNB_STAGE_1_FLARE) == 50.5
+
+
+def test_load_registered_device_elsewhere(full_device_manager, rocket_data_with_bulk_added, tmp_path):
+    rocket_data, full_address = rocket_data_with_bulk_added
+    rocket_data.add_bundle(full_address, {DataEntryIds.TIME: 10, DataEntryIds.PRESSURE: 2.5})
+    log_path = str(tmp_path / "session.flog")
+    rocket_data.save_log(log_path)
+
+    # Same device on another connection, as after a flight received over serial
+    device_manager = DeviceManager(None, None)
+    device_manager.register_device(DeviceType.BNB_STAGE_1_FLARE, None, ('OTHER_CONNECTION', 'OTHER_ADDRESS'))
+    loaded = RocketData(device_manager, autosave=False)
+    loaded.load(log_path)
+
+    assert loaded.last_value_by_device(DeviceType.BNB_STAGE_1_FLARE, DataEntryIds.PRESSURE) == 2.5
+    assert DataEntryKey(full_address, DataEntryIds.PRESSURE) not in loaded.keyset
+
+
 def test_add_new_callback():
     pass  # TODO
 
@@ -1,5 +1,13 @@
+import numpy as np
+import pytest
+
+from os import path
+
+from connections.sim.hw import simulation_cache
 from connections.sim.hw.clock_sim import Clock
-from connections.sim.hw.rocket_sim import RocketSim, FlightState, FlightEvent, FlightDataType
+from connections.sim.hw.rocket_sim import RocketSim, FlightState, FlightEvent, FlightDataType, TrajectoryCursor, \
+    SimulationWorker
+from util.detail import ORK_FILES_PATH
 
 S_TO_US = int(1e6)
 
@@ -52,4 +60,82 @@ def test_simple_flight():
 
     clock.add_time(5 * S_TO_US)
     assert rocket_sim.get_data(FlightDataType.TYPE_ALTITUDE) <= 0
-    assert rocket_sim.get_flight_state() == FlightState.LANDED
\ No newline at end of file
+    assert rocket_sim.get_flight_state() == FlightState.LANDED
+
+    rocket_sim.shutdown()
+
+
+def test_worker_errors():
+    worker = SimulationWorker(path.join(ORK_FILES_PATH, 'missing.ork'), 'Drogue', 'Main')
+    process = worker._process
+
+    # Keeps answering after an error
+    for _ in range(2):
+        with pytest.raises(Exception, match="Error (starting OpenRocket|inside JVM)"):
+            worker.simulate(0, None, None)
+
+    worker.shutdown()
+    with pytest.raises(ValueError):
+        process.is_alive()  # Closed
+
+
+def test_cached_simulation(tmp_path, mocker):
+    mocker.patch.object(simulation_cache, "SIMULATION_CACHE", str(tmp_path / "simulation_cache"))
+    ork_file = tmp_path / "cached.ork"
+    ork_file.write_bytes(b"Not read by OpenRocket")
+
+    times = np.linspace(0, 60, 100)
+    data = {data_type: np.zeros(len(times)) for data_type in FlightDataType}
+    data[FlightDataType.TYPE_TIME] = times
+    events = {FlightEvent.IGNITION: [0.0], FlightEvent.LAUNCH: [0.0], FlightEvent.GROUND_HIT: [60.0],
+              FlightEvent.SIMULATION_END: [60.0]}
+    key = simulation_cache.cache_key(str(ork_file), 0, 'Drogue', 'Main', None, None)
+    simulation_cache.store_simulation(key, data, events)
+
+    # OpenRocket, which could not simulate the file, is started for the deployments but not asked for the cached flight
+    worker = mocker.patch("connections.sim.hw.rocket_sim.SimulationWorker")
+    rocket_sim = RocketSim(str(ork_file))
+    worker.assert_called_once_with(str(ork_file), 'Drogue', 'Main')
+
+    rocket_sim.launch()
+    worker.assert_called_once()
+    rocket_sim.get_clock().add_time(61 * S_TO_US)
+    assert rocket_sim.get_flight_events() == events
+    assert rocket_sim.get_data(FlightDataType.TYPE_TIME) == 60
+    worker.return_value.simulate.assert_not_called()
+
+    rocket_sim.shutdown()
+    worker.return_value.shutdown.assert_called_once()
+
+
+@pytest.fixture()
+def trajectory():
+    rng = np.random.default_rng(0)
+    times = np.cumsum(rng.choice([0, 0.001, 0.01, 0.05], size=2000))  # Repeated times, as at flight events
+    values = rng.normal(size=len(times))
+    values[rng.random(len(times)) < 0.05] = np.nan
+    values[100:110] = np.inf
+    return times, values
+
+
+def test_cursor_matches_interp(trajectory):
+    times, values = trajectory
+    cursor = TrajectoryCursor(times.tolist())
+
+    # Forward a few samples at a time, then jumps both ways and past the ends
+    read_times = np.concatenate((np.arange(-0.1, times[-1] + 0.1, 0.003), [5.0, 0.5, 0.5, 12.345, -1.0, 1e6],
+                                 times[::37]))
+    for t in read_times:
+        expected = np.interp(t, times, values)
+        np.testing.assert_equal(cursor.interpolate(float(t), values.tolist()), expected)
+
+
+def test_cursor_several_series(trajectory):
+    times, values = trajectory
+    cursor = TrajectoryCursor(times.tolist())
+
+    # Series read at the same time share the lookup
+    for t in np.linspace(0, times[-1], 500):
+        for series in (values, values * 2, times):
+            np.testing.assert_equal(cursor.interpolate(float(t), series.tolist()), np.interp(t, times, series))
+
@@ -0,0 +1,163 @@
+import numpy as np
+import pytest
+
+from main_window.data_entry_id import DataEntryValues
+from main_window.series_column import SeriesColumn
+
+
+class TestSeriesColumn:
+    def test_append(self):
+        column = SeriesColumn(capacity=2)
+
+        for i in range(100):
+            column.append(i, i * 0.5)
+
+        assert len(column) == 100
+        assert column.dtype == np.float64
+        np.testing.assert_array_equal(column.times(), np.arange(100))
+        np.testing.assert_array_equal(column.values(), np.arange(100) * 0.5)
+
+    def test_append_same_time_overwrites(self):
+        column = SeriesColumn()
+
+        column.append(5, 1.0)
+        column.append(5, 2.0)
+
+        assert len(column) == 1
+        assert column.peekitem() == (5, 2.0)
+
+    def test_append_same_time_keeps_views(self):
+        column = SeriesColumn()
+        column.append(4, 0.5)
+        column.append(5, 1.0)
+        times, values = column.slice()
+
+        column.append(5, 2.0)
+
+        # Views read before the overwrite keep their values
+        np.testing.assert_array_equal(values, [0.5, 1.0])
+        np.testing.assert_array_equal(column.values(), [0.5, 2.0])
+
+    def test_append_same_time_does_not_copy(self):
+        column = SeriesColumn()
+        column.extend(np.arange(10_000), np.zeros(10_000))
+        buffer = column._values
+
+        # A live reader between each overwrite, as LiveSeries and FlightTrack read
+        for i in range(100):
+            times, values = column.slice(t_start=9_990)
+            column.append(9_999, float(i + 1))
+            assert values[-1] == i
+            assert column.values_view()[-1] == i + 1
+
+        assert column._values is buffer  # Never copied on overwrite
+        assert np.shares_memory(column.slice(t_end=9_998)[1], buffer)
+        assert not np.shares_memory(column.slice(t_start=9_990)[1], buffer)
+
+        # Reading most of the column is a view instead, the next overwrite copies once
+        assert np.shares_memory(column.values(), buffer)
+        column.append(9_999, 0.0)
+        column.append(9_999, 1.0)
+        assert column._values is not buffer
+
+    def test_append_out_of_order(self):
+        column = SeriesColumn()
+
+        for t, v in [(10, 1), (30, 3), (20, 2), (10, 4), (40, 5)]:
+            column.append(t, v)
+
+        # Last write for a time wins, same as SortedDict assignment
+        assert column.items() == [(10, 4), (20, 2), (30, 3), (40, 5)]
+        assert column.peekitem() == (40, 5)
+
+    def test_pop_earliest_rewrite(self):
+        column = SeriesColumn()
+        column.extend(np.array([10, 20, 30]), np.array([1.0, 2.0, 3.0]))
+        column.append(40, 4.0)
+        assert column.pop_earliest_rewrite() is None
+
+        column.append(40, 5.0)
+        column.append(25, 6.0)
+        column.extend(np.array([15, 50]), np.array([7.0, 8.0]))
+
+        assert column.pop_earliest_rewrite() == 15
+        assert column.pop_earliest_rewrite() is None
+
+    def test_append_promotes_dtype(self):
+        column = SeriesColumn()
+
+        column.append(0, 1)
+        column.append(1, 2.5)
+
+        assert column.dtype == np.float64
+        assert column.items() == [(0, 1.0), (1, 2.5)]
+
+    def test_append_enum(self):
+        column = SeriesColumn()
+
+        column.append(0, DataEntryValues.STATE_STANDBY)
+        column.append(1, DataEntryValues.STATE_ARMED)
+        column.append(2, DataEntryValues.STATE_STANDBY)
+
+        assert column.is_coded
+        assert column.peekitem() == (2, DataEntryValues.STATE_STANDBY)
+        assert column.values()[1] is DataEntryValues.STATE_ARMED
+
+    def test_append_mixed_falls_back_to_side_table(self):
+        column = SeriesColumn()
+
+        column.append(0, 1.5)
+        column.append(1, "hello")
+
+        assert column.is_coded
+        assert column.items() == [(0, 1.5), (1, "hello")]
+
+    def test_extend(self):
+        column = SeriesColumn(capacity=2)
+
+        column.append(0, 1)
+        column.extend(np.arange(1, 100), np.arange(1, 100) * 0.5)
+
+        assert len(column) == 100
+        assert column.dtype == np.float64
+        np.testing.assert_array_equal(column.times(), np.arange(100))
+        assert column.peekitem() == (99, 49.5)
+
+    def test_extend_overlapping(self):
+        column = SeriesColumn()
+        column.extend(np.array([10, 20, 30]), np.array([1, 2, 3]))
+
+        column.extend(np.array([30, 5, 40, 40]), np.array([4, 5, 6, 7]))
+
+        # Same as appending one by one, last write for a time wins
+        assert column.items() == [(5, 5), (10, 1), (20, 2), (30, 4), (40, 7)]
+
+    def test_extend_enum(self):
+        column = SeriesColumn()
+        column.append(0, DataEntryValues.STATE_STANDBY)
+        states = np.empty(2, dtype=object)
+        states[:] = [DataEntryValues.STATE_ARMED, DataEntryValues.STATE_STANDBY]
+
+        column.extend(np.array([1, 2]), states)
+        column.extend(np.array([3]), np.array([1.5]))
+
+        assert column.is_coded
+        assert column.items() == [(0, DataEntryValues.STATE_STANDBY), (1, DataEntryValues.STATE_ARMED),
+                                  (2, DataEntryValues.STATE_STANDBY), (3, 1.5)]
+
+    def test_slice(self):
+        column = SeriesColumn()
+        for i in range(10):
+            column.append(i * 10, DataEntryValues.STATE_ARMED if i % 2 else DataEntryValues.STATE_STANDBY)
+
+        times, values = column.slice(15, 40)
+
+        np.testing.assert_array_equal(times, [20, 30, 40])
+        assert list(values) == [DataEntryValues.STATE_STANDBY, DataEntryValues.STATE_ARMED,
+                                DataEntryValues.STATE_STANDBY]
+        assert len(column.slice(t_start=100)[0]) == 0
+        assert len(column.slice(t_end=-1)[0]) == 0
+
+    def test_peekitem_empty(self):
+        with pytest.raises(IndexError):
+            SeriesColumn().peekitem()
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from main_window import series_pyramid
+from main_window.series_column import SeriesColumn
+from main_window.series_pyramid import PYRAMID_LEVELS_MS, SeriesPyramid
+
+
+def _random_series(rng, size):
+    """
+    :return: Times with gaps of up to a few seconds (so some buckets are empty), values
+    """
+    gaps = np.where(rng.random(size) < 0.001, rng.integers(1, 5000, size), rng.integers(1, 4, size))
+    return np.cumsum(gaps), rng.normal(size=size)
+
+
+def _brute_force_buckets(times, values, bucket_ms):
+    indices = times // bucket_ms
+    unique = np.unique(indices)
+    return (unique * bucket_ms,
+            np.array([np.min(values[indices == i]) for i in unique]),
+            np.array([np.max(values[indices == i]) for i in unique]),
+            np.array([np.mean(values[indices == i]) for i in unique]),
+            np.array([np.sum(indices == i) for i in unique]))
+
+
+def _assert_levels_match(pyramid, times, values):
+    pyramid.update()
+    for level in pyramid.levels:
+        indices, minimums, maximums, sums, counts = level.rows()
+        expected = _brute_force_buckets(times, values, level.bucket_ms)
+        np.testing.assert_array_equal(indices * level.bucket_ms, expected[0])
+        np.testing.assert_array_equal(minimums, expected[1])
+        np.testing.assert_array_equal(maximums, expected[2])
+        np.testing.assert_allclose(sums / counts, expected[3])
+        np.testing.assert_array_equal(counts, expected[4])
+
+
+@pytest.fixture()
+def series():
+    return _random_series(np.random.default_rng(0), 20_000)
+
+
+class TestSeriesPyramid:
+    def test_levels_match_brute_force(self, series):
+        times, values = series
+        column = SeriesColumn()
+        column.extend(times, values)
+
+        _assert_levels_match(SeriesPyramid(column), times, values)
+
+    def test_incremental_updates(self, series):
+        times, values = series
+        column = SeriesColumn()
+        pyramid = SeriesPyramid(column)
+
+        # Single samples and chunks, read in between
+        for i in range(500):
+            column.append(int(times[i]), float(values[i]))
+            if i % 7 == 0:
+                pyramid.update()
+        for start in range(500, len(times), 3001):
+            column.extend(times[start:start + 3001], values[start:start + 3001])
+            pyramid.update()
+
+        _assert_levels_match(pyramid, times, values)
+
+    def test_rewrites(self, series):
+        times, values = series
+        column = SeriesColumn()
+        column.extend(times, values)
+        pyramid = SeriesPyramid(column)
+        pyramid.update()
+
+        # Overwrite the last value, then earlier ones and an out of order time
+        values = values.copy()
+        values[-1] = 100
+        column.append(int(times[-1]), 100.0)
+        _assert_levels_match(pyramid, times, values)
+
+        values[[10, 5000]] = -100
+        column.extend(times[[10, 5000]], values[[10, 5000]])
+        new_time = int(times[3000]) + 1 if times[3001] > times[3000] + 1 else int(times[3000]) - 1
+        column.append(new_time, 50.0)
+        order = np.argsort(np.append(times, new_time), kind='stable')
+        times, values = np.append(times, new_time)[order], np.append(values, 50.0)[order]
+        assert len(np.unique(times)) == len(times)
+        _assert_levels_match(pyramid, times, values)
+
+    @pytest.mark.parametrize("scan_samples", [0, series_pyramid.SUMMARY_SCAN_SAMPLES])  # From buckets, from samples
+    @pytest.mark.parametrize("t_start, t_end", [(None, None), (12_345, 23_456), (100, 104), (5, 5), (-10, 0)])
+    def test_summary_matches_brute_force(self, series, mocker, scan_samples, t_start, t_end):
+        mocker.patch("main_window.series_pyramid.SUMMARY_SCAN_SAMPLES", scan_samples)
+        times, values = series
+        column = SeriesColumn()
+        column.extend(times, values)
+        pyramid = SeriesPyramid(column)
+
+        summary = pyramid.summary(t_start, t_end)
+
+        in_range = np.ones(len(times), dtype=bool)
+        if t_start is not None:
+            in_range &= times >= t_start
+        if t_end is not None:
+            in_range &= times <= t_end
+        if not np.any(in_range):
+            assert summary is None
+            return
+        assert summary.minimum == np.min(values[in_range])
+        assert summary.maximum == np.max(values[in_range])
+        assert summary.mean == pytest.approx(np.mean(values[in_range]))
+        assert summary.count == np.sum(in_range)
+
+    def test_aggregate_level(self, series):
+        times, values = series
+        column = SeriesColumn()
+        column.extend(times, values)
+        pyramid = SeriesPyramid(column)
+        duration = int(times[-1] - times[0])
+
+        for num_buckets in (10, 100, 1000):
+            aggregate = pyramid.aggregate(None, None, num_buckets)
+            # Longest buckets that still give at least num_buckets over the range
+            expected_ms = max(bucket_ms for bucket_ms in PYRAMID_LEVELS_MS if bucket_ms * num_buckets <= duration + 1)
+            assert aggregate.bucket_ms == expected_ms
+            expected = _brute_force_buckets(times, values, expected_ms)
+            np.testing.assert_array_equal(aggregate.times, expected[0])
+            np.testing.assert_array_equal(aggregate.maximums, expected[2])
+            np.testing.assert_allclose(aggregate.means, expected[3])
+
+        # Fewer samples than buckets
+        aggregate = pyramid.aggregate(int(times[100]), int(times[110]), 1000)
+        assert aggregate.bucket_ms == 0
+        np.testing.assert_array_equal(aggregate.times, times[100:111])
+        np.testing.assert_array_equal(aggregate.minimums, values[100:111])
+        assert pyramid.aggregate(-100, -1, 1000) is None
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from connections.sim.hw import simulation_cache
+from connections.sim.hw.simulation_cache import cache_key, load_simulation, store_simulation, round_deployment_time, \
+    FlightDataType, FlightEvent
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, mocker):
+    cache_dir = tmp_path / "simulation_cache"
+    mocker.patch.object(simulation_cache, "SIMULATION_CACHE", str(cache_dir))
+    return cache_dir
+
+
+@pytest.fixture()
+def ork_file(tmp_path):
+    ork_file = tmp_path / "rocket.ork"
+    ork_file.write_bytes(b"rocket")
+    return str(ork_file)
+
+
+@pytest.fixture()
+def simulation():
+    times = np.linspace(0, 60, 1000)
+    data = {FlightDataType.TYPE_TIME: times, FlightDataType.TYPE_ALTITUDE: np.sin(times) * 1000,
+            FlightDataType.TYPE_LATITUDE: np.array(None)}
+    events = {FlightEvent.LAUNCH: [0.0], FlightEvent.RECOVERY_DEVICE_DEPLOYMENT: [20.5, 40.25],
+              FlightEvent.GROUND_HIT: [60.0]}
+    return data, events
+
+
+def test_round_trip(ork_file, simulation):
+    key = cache_key(ork_file, 0, 'Drogue', 'Main', None, None)
+    assert load_simulation(key) is None
+
+    store_simulation(key, *simulation)
+    data, events = load_simulation(key)
+
+    assert data.keys() == simulation[0].keys()
+    for data_type, values in simulation[0].items():
+        np.testing.assert_array_equal(data[data_type], values)
+    assert data[FlightDataType.TYPE_LATITUDE].item() is None
+    assert events == simulation[1]
+
+
+def test_key(ork_file, tmp_path):
+    key = cache_key(ork_file, 0, 'Drogue', 'Main', 20.0, None)
+    assert key == cache_key(ork_file, 0, 'Drogue', 'Main', round_deployment_time(20.000000000001), None)
+
+    other_ork_file = tmp_path / "other.ork"
+    other_ork_file.write_bytes(b"other rocket")
+    assert key != cache_key(str(other_ork_file), 0, 'Drogue', 'Main', 20.0, None)
+    assert key != cache_key(ork_file, 1, 'Drogue', 'Main', 20.0, None)
+    assert key != cache_key(ork_file, 0, 'Main', 'Drogue', 20.0, None)
+    assert key != cache_key(ork_file, 0, 'Drogue', 'Main', 20.001, None)
+    assert key != cache_key(ork_file, 0, 'Drogue', 'Main', None, 20.0)
+
+    assert cache_key(str(tmp_path / "missing.ork"), 0, 'Drogue', 'Main', None, None) is None
+
+
+def test_unreadable_file(ork_file, simulation, cache_dir):
+    key = cache_key(ork_file, 0, 'Drogue', 'Main', None, None)
+    store_simulation(key, *simulation)
+    (cache_dir / (key + ".npz")).write_bytes(b"truncated")
+
+    assert load_simulation(key) is None
+
+    store_simulation(key, *simulation)  # Replaced
+    assert load_simulation(key) is not None
+    assert [path.name for path in cache_dir.iterdir()] == [key + ".npz"]
+
+
+def test_not_cached(ork_file, simulation):
+    data, events = simulation
+    data[FlightDataType.TYPE_LATITUDE] = np.array([1.0, None])
+
+    key = cache_key(ork_file, 0, 'Drogue', 'Main', None, None)
+    store_simulation(key, data, events)
+    assert load_simulation(key) is None
+
+
+def test_unwritable_cache_dir(ork_file, simulation, tmp_path, mocker):
+    not_a_dir = tmp_path / "not_a_dir"
+    not_a_dir.write_bytes(b"")
+    mocker.patch.object(simulation_cache, "SIMULATION_CACHE", str(not_a_dir / "simulation_cache"))
+
+    key = cache_key(ork_file, 0, 'Drogue', 'Main', None, None)
+    store_simulation(key, *simulation)  # Only logged
+
+    assert load_simulation(key) is None
+
+
+def test_write_fails(ork_file, simulation, cache_dir, mocker):
+    mocker.patch.object(simulation_cache.np, "savez_compressed", side_effect=OSError("No space left on device"))
+
+    key = cache_key(ork_file, 0, 'Drogue', 'Main', None, None)
+    store_simulation(key, *simulation)
+
+    assert load_simulation(key) is None
+    assert list(cache_dir.iterdir()) == []  # Temporary file removed
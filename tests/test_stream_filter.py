@@ -1,6 +1,10 @@
-from connections.sim.stream_filter import ReadFilter, WriteFilter, A
+import binascii
 from io import BytesIO
 
+import pytest
+
+from connections.sim.stream_filter import ReadFilter, WriteFilter, A
+
 def test_passthrough():
     test_data = [x for x in range(0, 255)]
     test_stream = BytesIO()
@@ -27,4 +31,70 @@ def test_passthrough():
         assert b == read_filter.read(1)[0]
 
 
+class TrickleStream(BytesIO):
+    """Returns at most chunk_size bytes per read, like a pipe the other end writes to a bit at a time"""
+
+    def __init__(self, data: bytes, chunk_size: int) -> None:
+        super().__init__(data)
+        self.chunk_size = chunk_size
+
+    def read1(self, size: int = -1) -> bytes:
+        return super().read1(min(size, self.chunk_size))
+
+
+def _encode(data: bytes) -> bytes:
+    test_stream = BytesIO()
+    WriteFilter(test_stream).write(data)
+    return test_stream.getvalue()
+
+
+def test_encoding_unchanged():
+    data = bytes(range(256))
+
+    expected = b''.join(bytes([(c >> 4) + A, (c & 0x0F) + A]) for c in data)
+    assert _encode(data) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, 65536])
+def test_read_across_chunks(chunk_size):
+    data = bytes(range(256)) * 10
+    read_filter = ReadFilter(TrickleStream(_encode(data), chunk_size), 5)
+
+    # Packet sized reads, like SimConnection
+    read = bytearray()
+    for size in [1, 2, 7, 0, 300, 1] * 6:
+        read += read_filter.read(size)
+        assert read_filter.getHistory() == read[-5:]
+    read += read_filter.read(len(data) - len(read))
+
+    assert read == data
+    read_filter.close()
+
+
+def test_read_invalid_byte():
+    read_filter = ReadFilter(TrickleStream(_encode(b'\x12') + b'0A', 2), 0)
+
+    assert read_filter.read(1) == b'\x12'
+    with pytest.raises(binascii.Error):
+        read_filter.read(1)
+    read_filter.close()
+
+
+def test_read_closed_stream():
+    read_filter = ReadFilter(BytesIO(_encode(b'\x12\x34') + b'A'), 0)
+
+    with pytest.raises(EOFError):
+        read_filter.read(3)
+    read_filter.close()
+
+
+def test_num_buffered():
+    read_filter = ReadFilter(TrickleStream(_encode(bytes(range(10))), 8), 0)
+    assert read_filter.num_buffered == 0
+
+    read_filter.read(1)
+    assert read_filter.num_buffered == 3  # Rest of the first chunk
 
+    read_filter.read(3)
+    assert read_filter.num_buffered == 0
+    read_filter.close()
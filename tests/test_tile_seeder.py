@@ -0,0 +1,161 @@
+import io
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy
+import pytest
+from PIL import Image
+
+from main_window.competition.mapping import mapbox_utils, tile_seeder
+from main_window.competition.mapping.tile_store import SqliteTileStore
+
+LATITUDE, LONGITUDE = 49.2606, -123.2460  # UBC
+RADIUS = 0.5  # km
+
+
+def _jpeg() -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(numpy.full((8, 8, 3), 100, dtype=numpy.uint8)).save(buffer, format="jpeg")
+    return buffer.getvalue()
+
+
+class TileServer(ThreadingHTTPServer):
+    """
+    Local stand-in for a tile server, serves /{s}/{x}/{y}.jpg
+    """
+
+    def __init__(self, missing=()) -> None:
+        """
+
+        :param missing: (x, y, s) of tiles to answer 404 for
+        """
+        super().__init__(("127.0.0.1", 0), TileRequestHandler)
+        self.content = _jpeg()
+        self.missing = set(missing)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url_template(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/{{s}}/{{x}}/{{y}}.jpg"
+
+
+class TileRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        s, x, y = map(int, re.fullmatch(r"/(\d+)/(\d+)/(\d+)\.jpg", self.path).groups())
+        with self.server.lock:
+            self.server.requests.append((x, y, s))
+
+        if (x, y, s) in self.server.missing:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(self.server.content)))
+        self.end_headers()
+        self.wfile.write(self.server.content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture()
+def tile_cache_dir(tmp_path, mocker):
+    mocker.patch("main_window.competition.mapping.mapbox_utils.MAPBOX_CACHE", str(tmp_path))
+    tile_store = SqliteTileStore(str(tmp_path / mapbox_utils.TILE_STORE_NAME))
+    mocker.patch("main_window.competition.mapping.mapbox_utils.TILE_STORE", tile_store)
+    yield tmp_path
+    tile_store.close()
+
+
+@pytest.fixture()
+def tile_server():
+    server = TileServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _area_tiles(min_zoom, max_zoom):
+    tiles = []
+    for zoom in range(min_zoom, max_zoom + 1):
+        grid = tile_seeder.area_grid(LATITUDE, LONGITUDE, RADIUS, zoom)
+        tiles += [tile for row in grid.ta for tile in row]
+    return tiles
+
+
+def test_seed_area(tile_cache_dir, tile_server):
+    source = mapbox_utils.UrlTileSource(tile_server.url_template)
+
+    result = tile_seeder.seed_area(LATITUDE, LONGITUDE, RADIUS, 14, 16, source=source, max_workers=4, name="ubc")
+
+    tiles = _area_tiles(14, 16)
+    assert result == tile_seeder.SeedResult(fetched=len(tiles), skipped=0, missing=0)
+    assert all(tile.imageExists() for tile in tiles)
+    assert sorted(tile_server.requests) == sorted(tile.key for tile in tiles)
+
+    manifest = tile_seeder.read_manifest()
+    assert list(manifest["ubc"]["zooms"].keys()) == ["14", "15", "16"]
+    assert sum(zoom["tiles"] for zoom in manifest["ubc"]["zooms"].values()) == len(tiles)
+
+
+def test_seed_area_resumes(tile_cache_dir, tile_server):
+    source = mapbox_utils.UrlTileSource(tile_server.url_template)
+    tiles = _area_tiles(15, 16)
+    mapbox_utils.getTileStore().put(tiles[0].key, tile_server.content)  # Stored by an interrupted run
+
+    result = tile_seeder.seed_area(LATITUDE, LONGITUDE, RADIUS, 15, 16, source=source)
+
+    assert result == tile_seeder.SeedResult(fetched=len(tiles) - 1, skipped=1, missing=0)
+    assert tiles[0].key not in tile_server.requests
+
+    tile_server.requests.clear()
+    result = tile_seeder.seed_area(LATITUDE, LONGITUDE, RADIUS, 15, 16, source=source)
+
+    assert result == tile_seeder.SeedResult(fetched=0, skipped=len(tiles), missing=0)
+    assert tile_server.requests == []
+
+
+def test_seed_area_missing_tiles(tile_cache_dir, tile_server):
+    tiles = _area_tiles(16, 16)
+    tile_server.missing.add(tiles[1].key)
+
+    result = tile_seeder.seed_area(LATITUDE, LONGITUDE, RADIUS, 16, 16, attempts=2,
+                                   source=mapbox_utils.UrlTileSource(tile_server.url_template), name="ubc")
+
+    assert result == tile_seeder.SeedResult(fetched=len(tiles) - 1, skipped=0, missing=1)
+    assert not tiles[1].imageExists()
+    assert tile_server.requests.count(tiles[1].key) == 2
+    with open(os.path.join(tile_cache_dir, tile_seeder.MANIFEST_NAME)) as manifest_file:
+        assert json.load(manifest_file)["ubc"]["zooms"]["16"]["missing"] == [[tiles[1].x, tiles[1].y]]
+
+
+def test_seed_area_bad_zoom(tile_cache_dir):
+    with pytest.raises(ValueError):
+        tile_seeder.seed_area(LATITUDE, LONGITUDE, RADIUS, 15, 19, source=mapbox_utils.UrlTileSource(""))
+
+
+def test_offline_maps(tile_cache_dir, mocker):
+    mocker.patch("main_window.competition.mapping.mapbox_utils.OFFLINE_MAPS", True)
+    mocked_maps = mocker.patch("main_window.competition.mapping.mapbox_utils.maps")
+    grid = tile_seeder.area_grid(LATITUDE, LONGITUDE, RADIUS, 16)
+
+    grid.downloadArrayImages()
+    grid.genStitchedMap()
+
+    mocked_maps.tile.assert_not_called()
+
+
+def test_main(tile_cache_dir, tile_server):
+    tile_server.missing.add(_area_tiles(16, 16)[0].key)
+    args = [str(LATITUDE), str(LONGITUDE), "--radius", str(RADIUS), "--min-zoom", "15", "--max-zoom", "16",
+            "--url", tile_server.url_template, "--attempts", "1"]
+
+    assert tile_seeder.main(args) == 1  # A tile is unavailable
+    assert len(tile_seeder.read_manifest()) == 1
@@ -0,0 +1,75 @@
+import os
+import sqlite3
+
+import pytest
+
+from main_window.competition.mapping import mapbox_utils
+from main_window.competition.mapping.tile_store import FileTileStore, SqliteTileStore, migrate_tiles
+
+HENNINGS_KEY = (41322, 89729, 18)
+
+
+@pytest.fixture()
+def sqlite_tile_store(tmp_path):
+    sqlite_tile_store = SqliteTileStore(str(tmp_path / "tiles.mbtiles"))
+    yield sqlite_tile_store
+    sqlite_tile_store.close()
+
+
+@pytest.fixture()
+def file_tile_store(tmp_path):
+    return FileTileStore(str(tmp_path / "raw"))
+
+
+@pytest.mark.parametrize("store_name", ["sqlite_tile_store", "file_tile_store"])
+def test_put_get(store_name, request):
+    store = request.getfixturevalue(store_name)
+
+    assert store.get(HENNINGS_KEY) is None
+    assert not store.contains(HENNINGS_KEY)
+
+    store.put(HENNINGS_KEY, b"first")
+    store.put(HENNINGS_KEY, b"second")
+    assert store.put_many([((1, 2, 3), b"a"), ((2, 2, 3), b"b")]) == 2
+
+    assert store.get(HENNINGS_KEY) == b"second"
+    assert store.contains((1, 2, 3))
+    assert sorted(store.keys()) == sorted([HENNINGS_KEY, (1, 2, 3), (2, 2, 3)])
+
+
+def test_sqlite_mbtiles_layout(sqlite_tile_store):
+    sqlite_tile_store.put(HENNINGS_KEY, b"jpeg")
+
+    # Readable as MBTiles: TMS rows, y flipped
+    connection = sqlite3.connect(sqlite_tile_store.path)
+    rows = connection.execute("SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles").fetchall()
+    assert rows == [(18, 41322, 2 ** 18 - 1 - 89729, b"jpeg")]
+    assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    connection.close()
+
+
+def test_migrate_tiles(sqlite_tile_store, file_tile_store):
+    file_tile_store.put(HENNINGS_KEY, b"old")
+    file_tile_store.put((41323, 89729, 18), b"jpeg")
+    sqlite_tile_store.put(HENNINGS_KEY, b"new")
+    with open(os.path.join(file_tile_store.root, "18", "notes.txt"), "w") as other_file:
+        other_file.write("Not a tile")
+
+    assert migrate_tiles(file_tile_store, sqlite_tile_store, batch_size=1) == 1
+
+    assert sqlite_tile_store.get(HENNINGS_KEY) == b"new"  # Already stored tiles are kept
+    assert sqlite_tile_store.get((41323, 89729, 18)) == b"jpeg"
+
+
+def test_get_tile_store_migrates(tmp_path, mocker):
+    mocker.patch("main_window.competition.mapping.mapbox_utils.MAPBOX_CACHE", str(tmp_path))
+    mocker.patch("main_window.competition.mapping.mapbox_utils.TILE_STORE", None)
+    FileTileStore(str(tmp_path / "raw")).put(HENNINGS_KEY, b"jpeg")
+
+    store = mapbox_utils.getTileStore()
+
+    assert mapbox_utils.getTileStore() is store
+    assert store.path == str(tmp_path / mapbox_utils.TILE_STORE_NAME)
+    assert store.get(HENNINGS_KEY) == b"jpeg"
+    assert store.get_metadata("migrated") == "1"
+    store.close()
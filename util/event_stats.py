@@ -1,4 +1,4 @@
-import inspect
+import sys
 from threading import Lock, Condition
 from util.detail import IS_PYINSTALLER
 
@@ -7,6 +7,7 @@ from util.detail import IS_PYINSTALLER
 _stats_lock = Lock()
 _stats_cv = Condition(_stats_lock)
 _stats = dict()
+_num_waiting = 0  # Threads blocked in Event.wait(), increments only notify when there are any
 
 """
 
@@ -37,13 +38,11 @@ class Event:
         if type(num) is not int or num < 1:
             raise ValueError("Invalid value for num")
 
-        with _stats_cv:
-            if self._key in _stats:
-                _stats[self._key] += num
-            else:
-                _stats[self._key] = num
+        with _stats_lock:  # Same lock as _stats_cv
+            _stats[self._key] = _stats.get(self._key, 0) + num
 
-            _stats_cv.notify_all()
+            if _num_waiting:
+                _stats_cv.notify_all()
 
     def wait(self, snapshot, timeout=60, num_expected=1):
         """Waits for the event counter to change compared to snapshot, indicating that it has occurred.
@@ -60,6 +59,8 @@ class Event:
         :rtype: int
         """
 
+        global _num_waiting
+
         initial_value = snapshot[self._key] if self._key in snapshot else 0
 
         with _stats_cv:
@@ -68,7 +69,11 @@ class Event:
             if current_value() < initial_value:
                 raise ValueError("Invalid snapshot. Event counter greater than current value.")
 
-            _stats_cv.wait_for(lambda: current_value() - initial_value >= num_expected, timeout=timeout)
+            _num_waiting += 1
+            try:
+                _stats_cv.wait_for(lambda: current_value() - initial_value >= num_expected, timeout=timeout)
+            finally:
+                _num_waiting -= 1
 
             return current_value() - initial_value
 
@@ -92,13 +97,15 @@ def _get_calling_module():
     :return: Calling module name
     :rtype: str
     """
-    frm = inspect.stack()[2] # 2 because we are not interested in two frames up (the previous frame wants to know who called it)
+    # Two frames up because the previous frame wants to know who called it. Walk frames directly rather than with
+    # inspect.stack(), which reads source context for every frame and is far too slow for per-packet events.
+    frm = sys._getframe(2)
 
     if not IS_PYINSTALLER:
-        module = inspect.getmodule(frm.frame).__name__
+        module = frm.f_globals['__name__']
     else:
         # getmodule doesnt like pyinstaller, use file name instead
-        module = frm.filename
+        module = frm.f_code.co_filename
 
     return module
 